@@ -1,11 +1,66 @@
+import hashlib
+from collections.abc import Sequence
+from typing import Any
+
 import redis.asyncio
 from redis.asyncio import Redis as _Redis
+from redis.asyncio.client import Pipeline
+from redis.asyncio.connection import AbstractConnection
+from redis.exceptions import NoScriptError
 
 
 class Redis(_Redis):
     ...
 
 
+# every Script, to be loaded into redis as connections are made
+_scripts: list["Script"] = []
+
+
+class Script:
+    """A lua script, which is run by its sha (EVALSHA) rather than its source.
+
+    Scripts are loaded into redis as each connection is made, so they're
+    loaded again when redis restarts. (redis-py's own scripts check that
+    they're loaded before every pipeline they're queued in.)
+    """
+
+    def __init__(self, source: str) -> None:
+        self.source = source
+        self.sha = hashlib.sha1(source.encode()).hexdigest()
+        _scripts.append(self)
+
+    def queue(
+        self,
+        pipe: Pipeline,
+        keys: Sequence[Any],
+        args: Sequence[Any] = (),
+    ) -> None:
+        pipe.evalsha(self.sha, len(keys), *keys, *args)
+
+    async def run(
+        self,
+        client: _Redis,
+        keys: Sequence[Any],
+        args: Sequence[Any] = (),
+    ) -> Any:
+        try:
+            return await client.evalsha(self.sha, len(keys), *keys, *args)
+        except NoScriptError:
+            # (the scripts were flushed since this connection was made)
+            await client.script_load(self.source)
+            return await client.evalsha(self.sha, len(keys), *keys, *args)
+
+
+async def _load_scripts(connection: AbstractConnection) -> None:
+    await connection.on_connect()
+
+    for script in _scripts:
+        await connection.send_command("SCRIPT", "LOAD", script.source)
+    for _ in _scripts:
+        await connection.read_response()
+
+
 def dsn(
     scheme: str,
     username: str | None,
@@ -22,4 +77,4 @@ def dsn(
 
 
 async def from_url(url: str) -> Redis:
-    return await redis.asyncio.from_url(url)
+    return await redis.asyncio.from_url(url, redis_connect_func=_load_scripts)
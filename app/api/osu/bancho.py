@@ -8,13 +8,15 @@ from fastapi import APIRouter
 from fastapi import Request
 from fastapi import Response
 
-from app import geolocation
+from app import broadcasts
+from app import idle_polls
 from app import logger
 from app import packet_handlers
 from app import packets
+from app import presence
 from app import privileges
-from app import ranking
 from app import security
+from app import unit_of_work
 from app.adapters import ip_api
 from app.game_modes import GameMode
 from app.mods import Mods
@@ -25,7 +27,6 @@ from app.repositories import channels
 from app.repositories import osu_sessions
 from app.repositories import packet_bundles
 from app.repositories import relationships
-from app.repositories import stats
 
 bancho_router = APIRouter(default_response_class=Response)
 
@@ -181,6 +182,9 @@ async def handle_login(request: Request) -> Response:
         ),
     )
 
+    # only broadcasts from after our login are relevant to us
+    await broadcasts.start_reading(own_osu_session["osu_session_id"])
+
     # we will respond to this request with several bancho packets
     response_data = bytearray()
 
@@ -219,29 +223,8 @@ async def handle_login(request: Request) -> Response:
     # notify the client that we're done sending channel info
     response_data += packets.write_channel_listing_complete_packet()
 
-    own_global_rank = await ranking.get_global_rank(
-        own_osu_session["account_id"],
-        own_osu_session["game_mode"],
-    )
-
-    # user presence
-    own_presence_packet_data = packets.write_user_presence_packet(
-        own_osu_session["account_id"],
-        own_osu_session["username"],
-        own_osu_session["utc_offset"],
-        geolocation.country_str_to_int(own_osu_session["country"]),
-        privileges.server_to_client_privileges(own_osu_session["privileges"]),
-        vanilla_game_mode,
-        int(own_osu_session["latitude"]),
-        int(own_osu_session["longitude"]),
-        own_global_rank,
-    )
-
-    own_stats = await stats.fetch_one(
-        account_id=account["account_id"],
-        game_mode=own_osu_session["game_mode"],
-    )
-    if not own_stats:
+    own_packets = await presence.fetch_packets(own_osu_session)
+    if own_packets is None:
         return Response(
             content=(
                 packets.write_user_id_packet(-1)
@@ -250,59 +233,22 @@ async def handle_login(request: Request) -> Response:
             headers={"cho-token": "no"},
         )
 
-    own_global_rank = await ranking.get_global_rank(
-        own_stats["account_id"],
-        own_stats["game_mode"],
-    )
-
-    own_stats_packet_data = packets.write_user_stats_packet(
-        own_stats["account_id"],
-        own_osu_session["action"],
-        own_osu_session["info_text"],
-        own_osu_session["beatmap_md5"],
-        own_osu_session["mods"],
-        vanilla_game_mode,
-        own_osu_session["beatmap_id"],
-        own_stats["ranked_score"],
-        own_stats["accuracy"],
-        own_stats["play_count"],
-        own_stats["total_score"],
-        own_global_rank,
-        own_stats["performance_points"],
-    )
+    own_presence_packet_data = own_packets["presence_packet"]
+    own_stats_packet_data = own_packets["stats_packet"]
 
     # send our presence & stats to ourselves
     response_data += own_presence_packet_data
     response_data += own_stats_packet_data
 
-    for other_osu_session in await osu_sessions.fetch_all():
-        if other_osu_session["osu_session_id"] == own_osu_session["osu_session_id"]:
-            continue
+    other_osu_sessions = [
+        other_osu_session
+        for other_osu_session in await osu_sessions.fetch_all()
+        if other_osu_session["osu_session_id"] != own_osu_session["osu_session_id"]
+    ]
 
-        other_global_rank = await ranking.get_global_rank(
-            other_osu_session["account_id"],
-            own_osu_session["game_mode"],
-        )
-
-        # send other user's presence to us
-        response_data += packets.write_user_presence_packet(
-            other_osu_session["account_id"],
-            other_osu_session["username"],
-            other_osu_session["utc_offset"],
-            geolocation.country_str_to_int(other_osu_session["country"]),
-            privileges.server_to_client_privileges(other_osu_session["privileges"]),
-            vanilla_game_mode,
-            int(other_osu_session["latitude"]),
-            int(other_osu_session["longitude"]),
-            other_global_rank,
-        )
-
-        # send other user's stats to us
-        others_stats = await stats.fetch_one(
-            account_id=other_osu_session["account_id"],
-            game_mode=other_osu_session["game_mode"],
-        )
-        if not others_stats:
+    # send other users' presences & stats to us
+    for others_packets in await presence.fetch_many_packets(other_osu_sessions):
+        if others_packets is None:
             return Response(
                 content=(
                     packets.write_user_id_packet(-1)
@@ -311,28 +257,15 @@ async def handle_login(request: Request) -> Response:
                 headers={"cho-token": "no"},
             )
 
-        response_data += packets.write_user_stats_packet(
-            others_stats["account_id"],
-            other_osu_session["action"],
-            other_osu_session["info_text"],
-            other_osu_session["beatmap_md5"],
-            other_osu_session["mods"],
-            vanilla_game_mode,
-            other_osu_session["beatmap_id"],
-            others_stats["ranked_score"],
-            others_stats["accuracy"],
-            others_stats["play_count"],
-            others_stats["total_score"],
-            other_global_rank,
-            others_stats["performance_points"],
-        )
+        response_data += others_packets["presence_packet"]
+        response_data += others_packets["stats_packet"]
 
-        if account["privileges"] & ServerPrivileges.UNRESTRICTED:
-            # send our presence & stats to other user
-            await packet_bundles.enqueue(
-                other_osu_session["osu_session_id"],
-                data=own_presence_packet_data + own_stats_packet_data,
-            )
+    # send our presence & stats to other users
+    await broadcasts.publish(
+        own_presence_packet_data + own_stats_packet_data,
+        sender=own_osu_session,
+        include_sender=False,
+    )
 
     # welcome message/notification
     response_data += packets.write_notification_packet(
@@ -372,46 +305,68 @@ async def handle_login(request: Request) -> Response:
     )
 
 
+def _server_restarted_response() -> Response:
+    return Response(
+        content=(
+            packets.write_restart_packet(millseconds_until_restart=0)
+            + packets.write_notification_packet("The server has restarted.")
+        )
+    )
+
+
 async def handle_bancho_request(request: Request) -> Response:
-    # authenticate the request
     osu_session_id = UUID(request.headers["osu-token"])
-    osu_session = await osu_sessions.fetch_by_id(osu_session_id)
-    if osu_session is None:
+    request_body = await request.body()
+
+    # idle clients' polls need no packet handling, so take a faster path
+    if packets.is_ping_only(request_body):
+        response_content = await idle_polls.poll(osu_session_id)
+        if response_content is None:
+            return _server_restarted_response()
+
         return Response(
-            content=(
-                packets.write_restart_packet(millseconds_until_restart=0)
-                + packets.write_notification_packet("The server has restarted.")
-            )
+            content=response_content,
+            headers={"cho-token": str(osu_session_id)},
         )
 
-    # read packets
-    request_body = await request.body()
-    osu_packets = packets.read_packets(request_body)
-
-    # handle packets
-    for packet in osu_packets:
-        packet_handler = packet_handlers.get_packet_handler(packet.packet_id)
-        if packet_handler is None:
-            logger.warning("Unhandled packet type", packet_id=packet.packet_id)
-            continue
+    # authenticate the request
+    osu_session = await osu_sessions.fetch_by_id(osu_session_id)
+    if osu_session is None:
+        return _server_restarted_response()
+
+    # this worker is serving the session's polls, so may deliver to it directly
+    await packet_bundles.claim(osu_session_id)
+
+    # batch the request's redis writes, flushing them together at the end
+    async with unit_of_work.begin():
+        # read & handle packets as they are parsed
+        try:
+            for packet in packets.read_packets(request_body):
+                packet_handler = packet_handlers.get_packet_handler(packet.packet_id)
+                if packet_handler is None:
+                    logger.warning("Unhandled packet type", packet_id=packet.packet_id)
+                    continue
+
+                await packet_handler(osu_session, packet.packet_data)
+                logger.debug("Handled packet", packet_id=packet.packet_id)
+        except packets.MalformedPacketError as exc:
+            logger.warning(
+                "Received malformed packet data",
+                reason=str(exc),
+                osu_session_id=osu_session["osu_session_id"],
+                request_length=len(request_body),
+            )
 
-        await packet_handler(osu_session, packet.packet_data)
-        logger.debug("Handled packet", packet_id=packet.packet_id)
+        # (the session may already be signed out, no worries if so)
+        await osu_sessions.heartbeat(osu_session["osu_session_id"], datetime.now())
 
     # dequeue all packets to send back to the client
-    response_content = bytearray()
-    own_packet_bundles = await packet_bundles.dequeue_all(osu_session["osu_session_id"])
-    for packet_bundle in own_packet_bundles:
-        response_content.extend(packet_bundle["data"])
-
-    # (the session may already be signed out, no worries if so)
-    await osu_sessions.partial_update(
-        osu_session["osu_session_id"],
-        last_communicated_at=datetime.now(),
-    )
+    response_content = await packet_bundles.dequeue_all_data(
+        osu_session["osu_session_id"]
+    ) + await broadcasts.read_pending(osu_session)
 
     return Response(
-        content=bytes(response_content),
+        content=response_content,
         headers={"cho-token": str(osu_session["osu_session_id"])},
     )
 
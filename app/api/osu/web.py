@@ -18,10 +18,12 @@ from py3rijndael import RijndaelCbc
 from starlette.datastructures import UploadFile as _StarletteUploadFile
 
 from app import achievement_handlers
+from app import broadcasts
 from app import game_modes
 from app import logger
 from app import packets
 from app import performance
+from app import presence
 from app import ranked_statuses
 from app import ranking
 from app import security
@@ -31,7 +33,6 @@ from app.adapters import s3
 from app.errors import ServiceError
 from app.game_modes import GameMode
 from app.mods import filter_invalid_mod_combinations
-from app.privileges import ServerPrivileges
 from app.ranked_statuses import BeatmapRankedStatus
 from app.ranked_statuses import BeatmapWebRankedStatus
 from app.repositories import accounts
@@ -217,34 +218,18 @@ async def get_scores_handler(
         )
         assert osu_session is not None
 
-        own_stats = await stats.fetch_one(osu_session["account_id"], game_mode)
-        assert own_stats is not None
+        own_packets = await presence.fetch_packets(osu_session)
+        assert own_packets is not None
 
-        own_global_rank = await ranking.get_global_rank(
-            own_stats["account_id"],
-            own_stats["game_mode"],
+        await broadcasts.publish(
+            own_packets["stats_packet"],
+            sender=osu_session,
+            supersede_key=packet_bundles.make_supersede_key(
+                packets.ServerPackets.USER_STATS,
+                osu_session["account_id"],
+            ),
         )
 
-        for other_osu_session in await osu_sessions.fetch_all():
-            await packet_bundles.enqueue(
-                other_osu_session["osu_session_id"],
-                data=packets.write_user_stats_packet(
-                    osu_session["account_id"],
-                    osu_session["action"],
-                    osu_session["info_text"],
-                    osu_session["beatmap_md5"],
-                    osu_session["mods"],
-                    osu_session["game_mode"],
-                    osu_session["beatmap_id"],
-                    own_stats["ranked_score"],
-                    own_stats["accuracy"],
-                    own_stats["play_count"],
-                    own_stats["total_score"],
-                    own_global_rank,
-                    own_stats["performance_points"],
-                ),
-            )
-
     # fetch the beatmap with this md5
     beatmap = await beatmaps.fetch_one(beatmap_md5=beatmap_md5)
     if isinstance(beatmap, ServiceError):
@@ -664,37 +649,24 @@ async def submit_score_handler(
     )
     assert gamemode_stats is not None
 
-    # send account stats to all other osu! sessions if we're not restricted
-    if account["privileges"] & ServerPrivileges.UNRESTRICTED:
-        osu_sessions_to_notify = await osu_sessions.fetch_all()
-    else:
-        osu_sessions_to_notify = [osu_session]
-
     own_global_rank = await ranking.get_global_rank(
         gamemode_stats["account_id"],
         gamemode_stats["game_mode"],
     )
 
-    for other_osu_session in osu_sessions_to_notify:
-        packet_data = packets.write_user_stats_packet(
-            gamemode_stats["account_id"],
-            osu_session["action"],
-            osu_session["info_text"],
-            osu_session["beatmap_md5"],
-            osu_session["mods"],
-            vanilla_game_mode,
-            osu_session["beatmap_id"],
-            gamemode_stats["ranked_score"],
-            gamemode_stats["accuracy"],
-            gamemode_stats["play_count"],
-            gamemode_stats["total_score"],
-            own_global_rank,
-            gamemode_stats["performance_points"],
-        )
-        await packet_bundles.enqueue(
-            other_osu_session["osu_session_id"],
-            packet_data,
-        )
+    # (the score's mode's stats, which needn't be the session's current mode)
+    own_packets = await presence.fetch_packets(osu_session, game_mode)
+    assert own_packets is not None
+
+    # send account stats to all other osu! sessions if we're not restricted
+    await broadcasts.publish(
+        own_packets["stats_packet"],
+        sender=osu_session,
+        supersede_key=packet_bundles.make_supersede_key(
+            packets.ServerPackets.USER_STATS,
+            osu_session["account_id"],
+        ),
+    )
 
     score_rank = 1  # TODO
 
@@ -722,8 +694,7 @@ async def submit_score_handler(
             announce_channel_members = await channel_members.members(
                 announce_channel["channel_id"]
             )
-            for osu_session_id in announce_channel_members:
-                await packet_bundles.enqueue(osu_session_id, packet_data)
+            await packet_bundles.enqueue_many(announce_channel_members, packet_data)
 
     # unlock achievements
     own_achievements = await user_achievements.fetch_many(
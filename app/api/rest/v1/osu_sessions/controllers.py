@@ -18,6 +18,8 @@ def determine_status_code(error: ServiceError) -> int:
     match error:
         case ServiceError.OSU_SESSIONS_NOT_FOUND:
             return status.HTTP_404_NOT_FOUND
+        case ServiceError.OSU_SESSIONS_CURSOR_INVALID:
+            return status.HTTP_400_BAD_REQUEST
         case (ServiceError.INTERNAL_SERVER_ERROR):
             return status.HTTP_500_INTERNAL_SERVER_ERROR
         case _:
@@ -31,12 +33,12 @@ def determine_status_code(error: ServiceError) -> int:
 @router.get("/v1/osu_sessions")
 async def fetch_many(
     has_any_privilege_bit: int | None = None,
-    page: int = 1,
+    cursor: str | None = None,
     page_size: int = 50,
 ) -> Success[list[OsuSession]]:
     data = await osu_sessions.fetch_many(
         has_any_privilege_bit=has_any_privilege_bit,
-        page=page,
+        cursor=cursor,
         page_size=page_size,
     )
     if isinstance(data, ServiceError):
@@ -58,12 +60,14 @@ async def fetch_many(
             status_code=status_code,
         )
 
-    resp = [OsuSession.parse_obj(rec) for rec in data]
+    page, next_cursor = data
+
+    resp = [OsuSession.parse_obj(rec) for rec in page]
     return responses.success(
         content=resp,
         meta={
-            "page": page,
             "page_size": page_size,
+            "next_cursor": next_cursor,
             "total": total,
         },
     )
@@ -0,0 +1,109 @@
+from typing import TYPE_CHECKING
+from uuid import UUID
+
+from app import logger
+from app import packets
+from app.privileges import ServerPrivileges
+from app.repositories import broadcast_log
+from app.repositories.broadcast_log import Broadcast
+
+if TYPE_CHECKING:
+    from app.repositories.osu_sessions import OsuSession
+
+# global events are appended to a single log, rather than copied into every
+# session's packet bundle queue; sessions read what they haven't seen yet
+# on each poll, filtered by what they're allowed to see
+
+
+async def publish(
+    data: bytes,
+    sender: "OsuSession | None" = None,
+    include_sender: bool = True,
+    read_privileges: int = 0,
+    supersede_key: str | None = None,
+) -> None:
+    await broadcast_log.create(
+        data,
+        sender_osu_session_id=sender["osu_session_id"] if sender else None,
+        sender_privileges=sender["privileges"] if sender else 0,
+        include_sender=include_sender,
+        read_privileges=read_privileges,
+        supersede_key=supersede_key,
+    )
+
+
+async def start_reading(osu_session_id: UUID) -> None:
+    """Start a session reading from the end of the log."""
+    latest_broadcast_id = await broadcast_log.fetch_latest_id()
+    await broadcast_log.update_cursor(osu_session_id, latest_broadcast_id)
+
+
+async def read_pending(osu_session: "OsuSession") -> bytes:
+    """Read the data of all broadcasts a session hasn't seen & is allowed to."""
+    pending_broadcasts = await broadcast_log.read_after_cursor(
+        osu_session["osu_session_id"]
+    )
+    return await join_visible(
+        osu_session["osu_session_id"],
+        osu_session["privileges"],
+        pending_broadcasts,
+    )
+
+
+async def join_visible(
+    osu_session_id: UUID,
+    privileges: int,
+    pending_broadcasts: list[Broadcast] | None,
+) -> bytes:
+    """Join the data of the broadcasts a session has read & is allowed to see."""
+    if pending_broadcasts is None:
+        # the session's cursor expired or fell behind the log, so it may have
+        # missed presences, stats or messages; have it reconnect for them
+        logger.warning(
+            "Session may have missed broadcasts; forcing a restart",
+            osu_session_id=osu_session_id,
+        )
+        await start_reading(osu_session_id)
+        return packets.write_restart_packet(millseconds_until_restart=0)
+
+    visible_broadcasts = [
+        broadcast
+        for broadcast in pending_broadcasts
+        if _is_visible_to(broadcast, osu_session_id, privileges)
+    ]
+
+    # only the latest of the broadcasts sharing a supersede key is worth sending
+    latest_superseding_broadcast_ids = {
+        broadcast["supersede_key"]: broadcast["broadcast_id"]
+        for broadcast in visible_broadcasts
+        if broadcast["supersede_key"] is not None
+    }
+
+    return b"".join(
+        broadcast["data"]
+        for broadcast in visible_broadcasts
+        if broadcast["supersede_key"] is None
+        or latest_superseding_broadcast_ids[broadcast["supersede_key"]]
+        == broadcast["broadcast_id"]
+    )
+
+
+def _is_visible_to(
+    broadcast: Broadcast,
+    osu_session_id: UUID,
+    privileges: int,
+) -> bool:
+    if broadcast["sender_osu_session_id"] == osu_session_id:
+        return broadcast["include_sender"]
+
+    # restricted users' broadcasts are only visible to themselves
+    if (
+        broadcast["sender_osu_session_id"] is not None
+        and not broadcast["sender_privileges"] & ServerPrivileges.UNRESTRICTED
+    ):
+        return False
+
+    if broadcast["read_privileges"]:
+        return privileges & broadcast["read_privileges"] != 0
+
+    return True
@@ -3,8 +3,8 @@ from collections.abc import Awaitable
 from collections.abc import Callable
 from typing import TYPE_CHECKING
 
-from app import game_modes
 from app import logger
+from app import multiplayer
 from app import packets
 from app.errors import ServiceError
 from app.privileges import ServerPrivileges
@@ -291,54 +291,28 @@ async def match_start_handler(osu_session: "OsuSession", args: list[str]) -> str
             assert new_slot
             slots[i] = new_slot
 
-    vanilla_game_mode = game_modes.for_client(match["game_mode"])
-
-    osu_match_data: packets.OsuMatch = {
-        "match_id": match["match_id"],
-        "match_in_progress": match["status"] == MatchStatus.PLAYING,
-        "mods": match["mods"],
-        "match_name": match["match_name"],
-        "match_password": match["match_password"],
-        "beatmap_name": match["beatmap_name"],
-        "beatmap_id": match["beatmap_id"],
-        "beatmap_md5": match["beatmap_md5"],
-        "slot_statuses": [s["status"] for s in slots],
-        "slot_teams": [s["team"] for s in slots],
-        "per_slot_account_ids": [
-            s["account_id"] for s in slots if s["status"] & SlotStatus.HAS_PLAYER != 0
-        ],
-        "host_account_id": match["host_account_id"],
-        "game_mode": vanilla_game_mode,
-        "win_condition": match["win_condition"],
-        "team_type": match["team_type"],
-        "freemods_enabled": match["freemods_enabled"],
-        "per_slot_mods": [s["mods"] for s in slots]
-        if match["freemods_enabled"]
-        else [],
-        "random_seed": match["random_seed"],
-    }
+    osu_match_data = multiplayer.osu_match_data(match, slots)
 
     match_started_packet = packets.write_match_start_packet(
         osu_match_data,
         should_send_password=False,
     )
 
-    for slot in slots:
-        if slot["account_id"] == -1 or (slot["status"] & SlotStatus.PLAYING) == 0:
-            continue
-
-        await packet_bundles.enqueue(
-            slot["osu_session_id"],
-            data=match_started_packet,
-        )
+    await packet_bundles.enqueue_many(
+        [
+            slot["osu_session_id"]
+            for slot in slots
+            if slot["account_id"] != -1 and (slot["status"] & SlotStatus.PLAYING) != 0
+        ],
+        data=match_started_packet,
+    )
 
     lobby_channel = await channels.fetch_one_by_name("#lobby")
     if lobby_channel is None:
         logger.error("Failed to fetch #lobby channel")
         return
 
-    for osu_session_id in await channel_members.members(lobby_channel["channel_id"]):
-        await packet_bundles.enqueue(
-            osu_session_id,
-            data=match_started_packet,
-        )
+    await packet_bundles.enqueue_many(
+        await channel_members.members(lobby_channel["channel_id"]),
+        data=match_started_packet,
+    )
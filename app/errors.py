@@ -14,6 +14,7 @@ class ServiceError(str, Enum):
     ACCOUNTS_COUNTRY_INVALID = "accounts.country_invalid"
 
     OSU_SESSIONS_NOT_FOUND = "osu_sessions.not_found"
+    OSU_SESSIONS_CURSOR_INVALID = "osu_sessions.cursor_invalid"
 
     WEB_SESSIONS_NOT_FOUND = "web_sessions.not_found"
 
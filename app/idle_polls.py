@@ -0,0 +1,39 @@
+from datetime import datetime
+from uuid import UUID
+
+from app import broadcasts
+from app import clients
+from app.repositories import broadcast_log
+from app.repositories import osu_sessions
+from app.repositories import packet_bundles
+
+# idle clients poll constantly with nothing but PINGs, which need no handling;
+# their polls only refresh the session's heartbeat & send what's pending for
+# it, so do all of that in a single round trip, without decoding the session
+
+
+async def poll(osu_session_id: UUID) -> bytes | None:
+    """Handle an idle session's poll, returning the data to send back to it.
+
+    Returns None if the session doesn't exist.
+    """
+    await packet_bundles.claim(osu_session_id)
+
+    async with clients.redis.pipeline(transaction=True) as pipe:
+        osu_sessions.queue_heartbeat(pipe, osu_session_id, datetime.now())
+        packet_bundles.queue_drain(pipe, osu_session_id)
+        broadcast_log.queue_read_after_cursor(pipe, osu_session_id)
+        privileges, raw_bundles, _, raw_broadcasts = await pipe.execute()
+
+    if privileges is None:
+        # (anything drained from its queue was undeliverable anyway)
+        packet_bundles.discard(osu_session_id)
+        return None
+
+    return packet_bundles.join_data(
+        packet_bundles.drained(osu_session_id, raw_bundles)
+    ) + await broadcasts.join_visible(
+        osu_session_id,
+        privileges,
+        broadcast_log.deserialize_read(raw_broadcasts),
+    )
@@ -1,3 +1,4 @@
+import asyncio
 import base64
 import ssl
 
@@ -9,6 +10,8 @@ from app import logger
 from app import settings
 from app.adapters import database
 from app.adapters import redis
+from app.repositories import osu_session_cache
+from app.repositories import packet_bundles
 
 
 async def _start_database():
@@ -116,14 +119,65 @@ async def _shutdown_s3_client():
     del clients.s3_client
 
 
+_handoff_listener: "asyncio.Task[None] | None" = None
+
+
+async def _start_handoff_listener():
+    global _handoff_listener
+    _handoff_listener = asyncio.create_task(packet_bundles.listen_for_handoffs())
+
+
+async def _shutdown_handoff_listener():
+    if _handoff_listener is None:
+        return
+
+    _handoff_listener.cancel()
+    try:
+        await _handoff_listener
+    except asyncio.CancelledError:
+        pass
+
+    # our sessions' next polls will land on other workers
+    await packet_bundles.release_all()
+
+
+_invalidation_listener: "asyncio.Task[None] | None" = None
+
+
+async def _start_invalidation_listener():
+    global _invalidation_listener
+    _invalidation_listener = asyncio.create_task(
+        osu_session_cache.listen_for_invalidations()
+    )
+
+
+async def _shutdown_invalidation_listener():
+    if _invalidation_listener is None:
+        return
+
+    _invalidation_listener.cancel()
+    try:
+        await _invalidation_listener
+    except asyncio.CancelledError:
+        pass
+
+    await osu_session_cache.flush_stats()
+
+
 async def start():
     await _start_database()
     await _start_redis()
     await _start_osu_api_client()
     await _start_s3_client()
+    if settings.PACKET_BUNDLE_LOCAL_DELIVERY:
+        await _start_handoff_listener()
+    if osu_session_cache.is_enabled():
+        await _start_invalidation_listener()
 
 
 async def shutdown():
+    await _shutdown_invalidation_listener()
+    await _shutdown_handoff_listener()
     await _shutdown_s3_client()
     await _shutdown_osu_api_client()
     await _shutdown_redis()
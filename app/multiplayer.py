@@ -0,0 +1,71 @@
+from app import game_modes
+from app import packets
+from app.repositories import match_packets
+from app.repositories import multiplayer_matches
+from app.repositories import multiplayer_slots
+from app.repositories.match_packets import MatchPackets
+from app.repositories.multiplayer_matches import MatchStatus
+from app.repositories.multiplayer_matches import MultiplayerMatch
+from app.repositories.multiplayer_slots import MultiplayerSlot
+from app.repositories.multiplayer_slots import SlotStatus
+
+
+def osu_match_data(
+    match: MultiplayerMatch,
+    slots: list[MultiplayerSlot],
+) -> packets.OsuMatch:
+    return {
+        "match_id": match["match_id"],
+        "match_in_progress": match["status"] == MatchStatus.PLAYING,
+        "mods": match["mods"],
+        "match_name": match["match_name"],
+        "match_password": match["match_password"],
+        "beatmap_name": match["beatmap_name"],
+        "beatmap_id": match["beatmap_id"],
+        "beatmap_md5": match["beatmap_md5"],
+        "slot_statuses": [s["status"] for s in slots],
+        "slot_teams": [s["team"] for s in slots],
+        "per_slot_account_ids": [
+            s["account_id"] for s in slots if s["status"] & SlotStatus.HAS_PLAYER != 0
+        ],
+        "host_account_id": match["host_account_id"],
+        "game_mode": game_modes.for_client(match["game_mode"]),
+        "win_condition": match["win_condition"],
+        "team_type": match["team_type"],
+        "freemods_enabled": match["freemods_enabled"],
+        "per_slot_mods": [s["mods"] for s in slots]
+        if match["freemods_enabled"]
+        else [],
+        "random_seed": match["random_seed"],
+    }
+
+
+async def fetch_update_match_packets(match_id: int) -> MatchPackets | None:
+    """Fetch a match's encoded UPDATE_MATCH packets, encoding them if stale."""
+    cached_packets = await match_packets.fetch_one(match_id)
+    if cached_packets is not None:
+        return cached_packets
+
+    # read the version first; if it's bumped while we encode, our packets are
+    # stored as stale and will be encoded again by the next reader
+    version = await multiplayer_matches.fetch_version(match_id)
+
+    match = await multiplayer_matches.fetch_one(match_id)
+    if match is None:
+        return None
+
+    slots = await multiplayer_slots.fetch_all(match_id)
+    match_data = osu_match_data(match, slots)
+
+    return await match_packets.create(
+        match_id,
+        version,
+        update_match_packet=packets.write_update_match_packet(
+            match_data,
+            should_send_password=True,
+        ),
+        lobby_update_match_packet=packets.write_update_match_packet(
+            match_data,
+            should_send_password=False,
+        ),
+    )
@@ -1,3 +1,4 @@
+import random
 import re
 import urllib.parse
 from collections.abc import Awaitable
@@ -6,16 +7,21 @@ from datetime import datetime
 from typing import TYPE_CHECKING
 from uuid import UUID
 
+from app import broadcasts
 from app import clients
 from app import commands
 from app import game_modes
 from app import logger
+from app import multiplayer
 from app import packets
-from app import ranking
+from app import presence
+from app import settings
+from app import validation
 from app.errors import ServiceError
 from app.mods import filter_invalid_mod_combinations
 from app.mods import Mods
 from app.privileges import ServerPrivileges
+from app.repositories import broadcast_log
 from app.repositories import channel_members
 from app.repositories import channels
 from app.repositories import multiplayer_slots
@@ -23,7 +29,6 @@ from app.repositories import osu_sessions
 from app.repositories import packet_bundles
 from app.repositories import relationships
 from app.repositories import spectators
-from app.repositories import stats
 from app.repositories.multiplayer_matches import MatchStatus
 from app.repositories.multiplayer_matches import MatchTeams
 from app.repositories.multiplayer_matches import MatchTeamTypes
@@ -35,7 +40,7 @@ from app.services import multiplayer_matches
 if TYPE_CHECKING:
     from app.repositories.osu_sessions import OsuSession
 
-BanchoHandler = Callable[["OsuSession", bytes], Awaitable[None]]
+BanchoHandler = Callable[["OsuSession", memoryview], Awaitable[None]]
 
 packet_handlers: dict[int, BanchoHandler] = {}
 
@@ -56,7 +61,7 @@ def bancho_handler(packet_id: int) -> Callable[[BanchoHandler], BanchoHandler]:
 
 
 @bancho_handler(packets.ClientPackets.CHANGE_ACTION)
-async def change_action_handler(osu_session: "OsuSession", packet_data: bytes):
+async def change_action_handler(osu_session: "OsuSession", packet_data: memoryview):
     if not osu_session["privileges"] & ServerPrivileges.UNRESTRICTED:
         return
 
@@ -89,40 +94,27 @@ async def change_action_handler(osu_session: "OsuSession", packet_data: bytes):
     assert maybe_osu_session is not None
     osu_session = maybe_osu_session
 
-    own_stats = await stats.fetch_one(osu_session["account_id"], game_mode)
-    assert own_stats is not None
+    own_packets = await presence.fetch_packets(osu_session)
+    assert own_packets is not None
 
-    own_global_rank = await ranking.get_global_rank(
-        osu_session["account_id"], game_mode
+    # send the stats update to all active osu sessions
+    await broadcasts.publish(
+        own_packets["stats_packet"],
+        sender=osu_session,
+        supersede_key=packet_bundles.make_supersede_key(
+            packets.ServerPackets.USER_STATS,
+            osu_session["account_id"],
+        ),
     )
 
-    # send the stats update to all active osu osu_sessions' packet bundles
-    for other_osu_session in await osu_sessions.fetch_all():
-        await packet_bundles.enqueue(
-            other_osu_session["osu_session_id"],
-            packets.write_user_stats_packet(
-                osu_session["account_id"],
-                osu_session["action"],
-                osu_session["info_text"],
-                osu_session["beatmap_md5"],
-                osu_session["mods"],
-                vanilla_game_mode,
-                osu_session["beatmap_id"],
-                own_stats["ranked_score"],
-                own_stats["accuracy"],
-                own_stats["play_count"],
-                own_stats["total_score"],
-                own_global_rank,
-                own_stats["performance_points"],
-            ),
-        )
-
 
 # SEND_PUBLIC_MESSAGE = 1
 
 
 @bancho_handler(packets.ClientPackets.SEND_PUBLIC_MESSAGE)
-async def send_public_message_handler(osu_session: "OsuSession", packet_data: bytes):
+async def send_public_message_handler(
+    osu_session: "OsuSession", packet_data: memoryview
+):
     if not osu_session["privileges"] & ServerPrivileges.UNRESTRICTED:
         return
 
@@ -184,14 +176,14 @@ async def send_public_message_handler(osu_session: "OsuSession", packet_data: by
     else:
         target_osu_session_ids = await channel_members.members(channel["channel_id"])
 
-    for other_osu_session_id in target_osu_session_ids:
-        if other_osu_session_id == osu_session["osu_session_id"]:
-            continue
-
-        await packet_bundles.enqueue(
-            other_osu_session_id,
-            data=send_message_packet_data,
-        )
+    await packet_bundles.enqueue_many(
+        [
+            other_osu_session_id
+            for other_osu_session_id in target_osu_session_ids
+            if other_osu_session_id != osu_session["osu_session_id"]
+        ],
+        data=send_message_packet_data,
+    )
 
     # keep track of user's last /np'ed beatmaps
     if message_content.startswith("\x01ACTION"):
@@ -252,16 +244,15 @@ async def send_public_message_handler(osu_session: "OsuSession", packet_data: by
                         channel["channel_id"]
                     )
 
-                for other_osu_session_id in target_osu_session_ids:
-                    await packet_bundles.enqueue(
-                        other_osu_session_id,
-                        data=packets.write_send_message_packet(
-                            sender_name="BanchoBot",
-                            message_content=bancho_bot_message,
-                            recipient_name=recipient_name,
-                            sender_id=0,
-                        ),
-                    )
+                await packet_bundles.enqueue_many(
+                    target_osu_session_ids,
+                    data=packets.write_send_message_packet(
+                        sender_name="BanchoBot",
+                        message_content=bancho_bot_message,
+                        recipient_name=recipient_name,
+                        sender_id=0,
+                    ),
+                )
 
 
 # LOGOUT = 2
@@ -273,7 +264,7 @@ class ExitReason:
 
 
 @bancho_handler(packets.ClientPackets.OSU_EXIT)
-async def logout_handler(osu_session: "OsuSession", packet_data: bytes) -> None:
+async def logout_handler(osu_session: "OsuSession", packet_data: memoryview) -> None:
     packet_reader = packets.PacketReader(packet_data)
     reason = packet_reader.read_i32()
 
@@ -311,27 +302,30 @@ async def logout_handler(osu_session: "OsuSession", packet_data: bytes) -> None:
                 channel["channel_id"]
             )
 
-            for osu_session_id in current_channel_members:
-                await packet_bundles.enqueue(
-                    osu_session_id,
-                    packets.write_channel_info_packet(
-                        channel["name"],
-                        channel["topic"],
-                        len(current_channel_members),
-                    ),
-                )
+            await packet_bundles.enqueue_many(
+                current_channel_members,
+                packets.write_channel_info_packet(
+                    channel["name"],
+                    channel["topic"],
+                    len(current_channel_members),
+                ),
+                supersede_key=packet_bundles.make_supersede_key(
+                    packets.ServerPackets.CHANNEL_INFO,
+                    channel["name"],
+                ),
+            )
 
     # TODO: spectator
     # TODO: multiplayer
 
     # tell everyone else we logged out
-    if osu_session["privileges"] & ServerPrivileges.UNRESTRICTED:
-        logout_packet_data = packets.write_logout_packet(osu_session["account_id"])
-        for other_osu_session in await osu_sessions.fetch_all():
-            await packet_bundles.enqueue(
-                other_osu_session["osu_session_id"],
-                data=logout_packet_data,
-            )
+    await broadcasts.publish(
+        packets.write_logout_packet(osu_session["account_id"]),
+        sender=osu_session,
+        include_sender=False,
+    )
+    await broadcast_log.delete_cursor(osu_session["osu_session_id"])
+    packet_bundles.discard(osu_session["osu_session_id"])
 
     logger.info(
         "User logout successful",
@@ -344,37 +338,15 @@ async def logout_handler(osu_session: "OsuSession", packet_data: bytes) -> None:
 
 
 @bancho_handler(packets.ClientPackets.REQUEST_STATUS_UPDATE)
-async def request_status_update_handler(osu_session: "OsuSession", packet_data: bytes):
-    own_stats = await stats.fetch_one(
-        osu_session["account_id"],
-        osu_session["game_mode"],
-    )
-    assert own_stats is not None
-
-    vanilla_game_mode = game_modes.for_client(osu_session["game_mode"])
-
-    own_global_rank = await ranking.get_global_rank(
-        osu_session["account_id"],
-        osu_session["game_mode"],
-    )
+async def request_status_update_handler(
+    osu_session: "OsuSession", packet_data: memoryview
+):
+    own_packets = await presence.fetch_packets(osu_session)
+    assert own_packets is not None
 
     await packet_bundles.enqueue(
         osu_session["osu_session_id"],
-        packets.write_user_stats_packet(
-            own_stats["account_id"],
-            osu_session["action"],
-            osu_session["info_text"],
-            osu_session["beatmap_md5"],
-            osu_session["mods"],
-            vanilla_game_mode,
-            osu_session["beatmap_id"],
-            own_stats["ranked_score"],
-            own_stats["accuracy"],
-            own_stats["play_count"],
-            own_stats["total_score"],
-            own_global_rank,
-            own_stats["performance_points"],
-        ),
+        own_packets["stats_packet"],
     )
 
 
@@ -382,7 +354,7 @@ async def request_status_update_handler(osu_session: "OsuSession", packet_data:
 
 
 @bancho_handler(packets.ClientPackets.PING)
-async def ping_handler(osu_session: "OsuSession", packet_data: bytes):
+async def ping_handler(osu_session: "OsuSession", packet_data: memoryview):
     pass
 
 
@@ -390,7 +362,7 @@ async def ping_handler(osu_session: "OsuSession", packet_data: bytes):
 
 
 @bancho_handler(packets.ClientPackets.START_SPECTATING)
-async def start_spectating_handler(osu_session: "OsuSession", packet_data: bytes):
+async def start_spectating_handler(osu_session: "OsuSession", packet_data: memoryview):
     if not osu_session["privileges"] & ServerPrivileges.UNRESTRICTED:
         return
 
@@ -464,38 +436,41 @@ async def start_spectating_handler(osu_session: "OsuSession", packet_data: bytes
         current_channel_members = await channel_members.members(
             spectator_channel["channel_id"]
         )
-        for osu_session_id in current_channel_members:
-            await packet_bundles.enqueue(
-                osu_session_id,
-                packets.write_channel_info_packet(
-                    "#spectator",
-                    spectator_channel["topic"],
-                    len(current_channel_members),
-                ),
-            )
+        await packet_bundles.enqueue_many(
+            current_channel_members,
+            packets.write_channel_info_packet(
+                "#spectator",
+                spectator_channel["topic"],
+                len(current_channel_members),
+            ),
+            supersede_key=packet_bundles.make_supersede_key(
+                packets.ServerPackets.CHANNEL_INFO,
+                "#spectator",
+            ),
+        )
 
     await packet_bundles.enqueue(
         host_osu_session["osu_session_id"],
         packets.write_spectator_joined_packet(osu_session["account_id"]),
     )
 
-    for spectator_osu_session_id in await spectators.members(
-        host_osu_session["osu_session_id"]
-    ):
-        if spectator_osu_session_id == osu_session["osu_session_id"]:
-            continue
-
-        await packet_bundles.enqueue(
-            spectator_osu_session_id,
-            packets.write_fellow_spectator_joined_packet(osu_session["account_id"]),
-        )
+    await packet_bundles.enqueue_many(
+        [
+            spectator_osu_session_id
+            for spectator_osu_session_id in await spectators.members(
+                host_osu_session["osu_session_id"]
+            )
+            if spectator_osu_session_id != osu_session["osu_session_id"]
+        ],
+        packets.write_fellow_spectator_joined_packet(osu_session["account_id"]),
+    )
 
 
 # STOP_SPECTATING = 17
 
 
 @bancho_handler(packets.ClientPackets.STOP_SPECTATING)
-async def stop_spectating_handler(osu_session: "OsuSession", packet_data: bytes):
+async def stop_spectating_handler(osu_session: "OsuSession", packet_data: memoryview):
     if not osu_session["privileges"] & ServerPrivileges.UNRESTRICTED:
         return
 
@@ -544,15 +519,18 @@ async def stop_spectating_handler(osu_session: "OsuSession", packet_data: bytes)
     current_channel_members = await channel_members.members(
         spectator_channel["channel_id"]
     )
-    for osu_session_id in current_channel_members:
-        await packet_bundles.enqueue(
-            osu_session_id,
-            packets.write_channel_info_packet(
-                "#spectator",
-                spectator_channel["topic"],
-                len(current_channel_members),
-            ),
-        )
+    await packet_bundles.enqueue_many(
+        current_channel_members,
+        packets.write_channel_info_packet(
+            "#spectator",
+            spectator_channel["topic"],
+            len(current_channel_members),
+        ),
+        supersede_key=packet_bundles.make_supersede_key(
+            packets.ServerPackets.CHANNEL_INFO,
+            "#spectator",
+        ),
+    )
 
     if len(current_channel_members) == 1:  # only the host remains
         # remove the host from the channel
@@ -581,38 +559,56 @@ async def stop_spectating_handler(osu_session: "OsuSession", packet_data: bytes)
         packets.write_spectator_left_packet(osu_session["account_id"]),
     )
 
-    for spectator_osu_session_id in await spectators.members(
-        host_osu_session["osu_session_id"]
-    ):
-        if spectator_osu_session_id == osu_session["osu_session_id"]:
-            continue
-
-        await packet_bundles.enqueue(
-            spectator_osu_session_id,
-            packets.write_fellow_spectator_left_packet(osu_session["account_id"]),
-        )
+    await packet_bundles.enqueue_many(
+        [
+            spectator_osu_session_id
+            for spectator_osu_session_id in await spectators.members(
+                host_osu_session["osu_session_id"]
+            )
+            if spectator_osu_session_id != osu_session["osu_session_id"]
+        ],
+        packets.write_fellow_spectator_left_packet(osu_session["account_id"]),
+    )
 
 
 # SPECTATE_FRAMES = 18
 
 
 @bancho_handler(packets.ClientPackets.SPECTATE_FRAMES)
-async def spectate_frames_handler(osu_session: "OsuSession", packet_data: bytes):
+async def spectate_frames_handler(osu_session: "OsuSession", packet_data: memoryview):
     if not osu_session["privileges"] & ServerPrivileges.UNRESTRICTED:
         return
 
-    packet_reader = packets.PacketReader(packet_data)
-    replay_frame_bundle = packet_reader.read_replay_frame_bundle()
+    # frames are relayed without being decoded, so always check their length
+    if len(packet_data) < packets.REPLAY_FRAME_BUNDLE_MIN_SIZE:
+        logger.warning(
+            "User sent a malformed replay frame bundle",
+            account_id=osu_session["account_id"],
+            packet_size=len(packet_data),
+        )
+        return
 
-    # TODO: make assertions on replay_frame_bundle
+    # frames are relayed as-is; only decode a sample of them for validation
+    if random.random() < settings.SPECTATE_FRAMES_VALIDATION_SAMPLE_RATE:
+        packet_reader = packets.PacketReader(packet_data)
+        replay_frame_bundle = packet_reader.read_replay_frame_bundle()
 
-    for spectator_osu_session_id in await spectators.members(
-        osu_session["osu_session_id"]
-    ):
-        await packet_bundles.enqueue(
-            spectator_osu_session_id,
-            packets.write_spectate_frames_packet(replay_frame_bundle),
-        )
+        if not validation.validate_replay_frames(replay_frame_bundle["replay_frames"]):
+            logger.warning(
+                "User sent invalid replay frames",
+                account_id=osu_session["account_id"],
+                sequence_number=replay_frame_bundle["sequence_number"],
+            )
+            return
+
+    spectator_osu_session_ids = await spectators.members(osu_session["osu_session_id"])
+    if not spectator_osu_session_ids:
+        return
+
+    await packet_bundles.enqueue_many(
+        spectator_osu_session_ids,
+        packets.write_relayed_spectate_frames_packet(packet_data),
+    )
 
 
 # ERROR_REPORT = 20
@@ -622,7 +618,7 @@ async def spectate_frames_handler(osu_session: "OsuSession", packet_data: bytes)
 
 
 @bancho_handler(packets.ClientPackets.CANT_SPECTATE)
-async def cant_spectate_handler(osu_session: "OsuSession", packet_data: bytes):
+async def cant_spectate_handler(osu_session: "OsuSession", packet_data: memoryview):
     if osu_session["spectator_host_osu_session_id"] is None:
         logger.warning(
             "A user told us they can't spectate while not spectating anyone",
@@ -641,23 +637,26 @@ async def cant_spectate_handler(osu_session: "OsuSession", packet_data: bytes):
         )
         return
 
-    packet_data = packets.write_spectator_cant_spectate_packet(
+    cant_spectate_packet_data = packets.write_spectator_cant_spectate_packet(
         osu_session["account_id"]
     )
 
-    await packet_bundles.enqueue(host_osu_session["osu_session_id"], packet_data)
-
-    for spectator_osu_session_id in await spectators.members(
-        host_osu_session["osu_session_id"]
-    ):
-        await packet_bundles.enqueue(spectator_osu_session_id, packet_data)
+    await packet_bundles.enqueue_many(
+        [
+            host_osu_session["osu_session_id"],
+            *await spectators.members(host_osu_session["osu_session_id"]),
+        ],
+        cant_spectate_packet_data,
+    )
 
 
 # SEND_PRIVATE_MESSAGE = 25
 
 
 @bancho_handler(packets.ClientPackets.SEND_PRIVATE_MESSAGE)
-async def send_private_message_handler(osu_session: "OsuSession", packet_data: bytes):
+async def send_private_message_handler(
+    osu_session: "OsuSession", packet_data: memoryview
+):
     account = await accounts.fetch_by_account_id(osu_session["account_id"])
     assert not isinstance(account, ServiceError)
     if account["silence_end"] is not None:
@@ -765,7 +764,7 @@ async def send_private_message_handler(osu_session: "OsuSession", packet_data: b
 
 
 @bancho_handler(packets.ClientPackets.PART_LOBBY)
-async def part_lobby_handler(osu_session: "OsuSession", packet_data: bytes):
+async def part_lobby_handler(osu_session: "OsuSession", packet_data: memoryview):
     maybe_osu_session = await osu_sessions.partial_update(
         osu_session["osu_session_id"],
         receive_match_updates=False,
@@ -783,24 +782,30 @@ async def part_lobby_handler(osu_session: "OsuSession", packet_data: bytes):
 
     current_channel_members = await channel_members.members(channel["channel_id"])
 
-    for other_osu_session in await osu_sessions.fetch_all(
-        has_any_privilege_bit=channel["read_privileges"]
-    ):
-        await packet_bundles.enqueue(
-            other_osu_session["osu_session_id"],
-            packets.write_channel_info_packet(
-                channel["name"],
-                channel["topic"],
-                len(current_channel_members),
-            ),
-        )
+    await packet_bundles.enqueue_many(
+        [
+            other_osu_session["osu_session_id"]
+            for other_osu_session in await osu_sessions.fetch_all(
+                has_any_privilege_bit=channel["read_privileges"]
+            )
+        ],
+        packets.write_channel_info_packet(
+            channel["name"],
+            channel["topic"],
+            len(current_channel_members),
+        ),
+        supersede_key=packet_bundles.make_supersede_key(
+            packets.ServerPackets.CHANNEL_INFO,
+            channel["name"],
+        ),
+    )
 
 
 # JOIN_LOBBY = 30
 
 
 @bancho_handler(packets.ClientPackets.JOIN_LOBBY)
-async def join_lobby_handler(osu_session: "OsuSession", packet_data: bytes):
+async def join_lobby_handler(osu_session: "OsuSession", packet_data: memoryview):
     maybe_osu_session = await osu_sessions.partial_update(
         osu_session["osu_session_id"],
         receive_match_updates=True,
@@ -811,45 +816,18 @@ async def join_lobby_handler(osu_session: "OsuSession", packet_data: bytes):
     matches = await multiplayer_matches.fetch_all()
     assert not isinstance(matches, ServiceError)
 
+    lobby_update_match_packets = []
     for match in matches:
-        slots = await multiplayer_slots.fetch_all(match["match_id"])
+        match_packets = await multiplayer.fetch_update_match_packets(match["match_id"])
+        if match_packets is None:
+            continue
 
-        vanilla_game_mode = game_modes.for_client(match["game_mode"])
-        osu_match_data: packets.OsuMatch = {
-            "match_id": match["match_id"],
-            "match_in_progress": match["status"] == MatchStatus.PLAYING,
-            "mods": match["mods"],
-            "match_name": match["match_name"],
-            "match_password": match["match_password"],
-            "beatmap_name": match["beatmap_name"],
-            "beatmap_id": match["beatmap_id"],
-            "beatmap_md5": match["beatmap_md5"],
-            "slot_statuses": [s["status"] for s in slots],
-            "slot_teams": [s["team"] for s in slots],
-            "per_slot_account_ids": [
-                s["account_id"]
-                for s in slots
-                if s["status"] & SlotStatus.HAS_PLAYER != 0
-            ],
-            "host_account_id": match["host_account_id"],
-            "game_mode": vanilla_game_mode,
-            "win_condition": match["win_condition"],
-            "team_type": match["team_type"],
-            "freemods_enabled": match["freemods_enabled"],
-            "per_slot_mods": [s["mods"] for s in slots]
-            if match["freemods_enabled"]
-            else [],
-            "random_seed": match["random_seed"],
-        }
-
-        match_packet = packets.write_update_match_packet(
-            osu_match_data,
-            should_send_password=False,
-        )
+        lobby_update_match_packets.append(match_packets["lobby_update_match_packet"])
 
+    if lobby_update_match_packets:
         await packet_bundles.enqueue(
             osu_session_id=osu_session["osu_session_id"],
-            data=match_packet,
+            data=b"".join(lobby_update_match_packets),
         )
 
 
@@ -860,23 +838,25 @@ async def _broadcast_to_match(
     match_id: int,
     data: bytes,
     slot_flags: int,
+    supersede_key: str | None = None,
 ):
     match = await multiplayer_matches.fetch_one(match_id)
     assert not isinstance(match, ServiceError)
 
     slots = await multiplayer_slots.fetch_all(match["match_id"])
 
-    for slot in slots:
-        if slot["account_id"] == -1 or (slot["status"] & slot_flags) == 0:
-            continue
-
-        await packet_bundles.enqueue(
-            slot["osu_session_id"],
-            data,
-        )
+    await packet_bundles.enqueue_many(
+        [
+            slot["osu_session_id"]
+            for slot in slots
+            if slot["account_id"] != -1 and (slot["status"] & slot_flags) != 0
+        ],
+        data,
+        supersede_key=supersede_key,
+    )
 
 
-async def _broadcast_to_lobby(data: bytes):
+async def _broadcast_to_lobby(data: bytes, supersede_key: str | None = None):
     lobby_channel = await channels.fetch_one_by_name("#lobby")
     if lobby_channel is None:
         logger.error(
@@ -884,11 +864,11 @@ async def _broadcast_to_lobby(data: bytes):
         )
         return False
 
-    for osu_session_id in await channel_members.members(lobby_channel["channel_id"]):
-        await packet_bundles.enqueue(
-            osu_session_id,
-            data,
-        )
+    await packet_bundles.enqueue_many(
+        await channel_members.members(lobby_channel["channel_id"]),
+        data,
+        supersede_key=supersede_key,
+    )
 
 
 # XXX: this is a helper for some code that is repeated several times
@@ -898,64 +878,40 @@ async def _broadcast_match_updates(
     send_to_lobby: bool = True,
     extra_osu_session_ids: list[UUID] = [],
 ):
-    match = await multiplayer_matches.fetch_one(match_id)
-    assert not isinstance(match, ServiceError)
-
-    slots = await multiplayer_slots.fetch_all(match["match_id"])
+    match_packets = await multiplayer.fetch_update_match_packets(match_id)
+    assert match_packets is not None
 
-    vanilla_game_mode = game_modes.for_client(match["game_mode"])
-
-    osu_match_data: packets.OsuMatch = {
-        "match_id": match["match_id"],
-        "match_in_progress": match["status"] == MatchStatus.PLAYING,
-        "mods": match["mods"],
-        "match_name": match["match_name"],
-        "match_password": match["match_password"],
-        "beatmap_name": match["beatmap_name"],
-        "beatmap_id": match["beatmap_id"],
-        "beatmap_md5": match["beatmap_md5"],
-        "slot_statuses": [s["status"] for s in slots],
-        "slot_teams": [s["team"] for s in slots],
-        "per_slot_account_ids": [
-            s["account_id"] for s in slots if s["status"] & SlotStatus.HAS_PLAYER != 0
-        ],
-        "host_account_id": match["host_account_id"],
-        "game_mode": vanilla_game_mode,
-        "win_condition": match["win_condition"],
-        "team_type": match["team_type"],
-        "freemods_enabled": match["freemods_enabled"],
-        "per_slot_mods": [s["mods"] for s in slots]
-        if match["freemods_enabled"]
-        else [],
-        "random_seed": match["random_seed"],
-    }
+    # only the latest state of the match is worth sending
+    supersede_key = packet_bundles.make_supersede_key(
+        packets.ServerPackets.UPDATE_MATCH,
+        match_id,
+    )
 
     # send the match data (with password) to those in the multiplayer match
-    match_packet = packets.write_update_match_packet(
-        osu_match_data,
-        should_send_password=True,
-    )
+    match_packet = match_packets["update_match_packet"]
 
-    for osu_session_id in extra_osu_session_ids:
-        await packet_bundles.enqueue(osu_session_id, match_packet)
+    await packet_bundles.enqueue_many(
+        extra_osu_session_ids,
+        match_packet,
+        supersede_key=supersede_key,
+    )
 
     await _broadcast_to_match(
         match_id=match_id,
         data=match_packet,
         slot_flags=SlotStatus.HAS_PLAYER,
+        supersede_key=supersede_key,
     )
 
     if send_to_lobby:
-        match_packet = packets.write_update_match_packet(
-            osu_match_data,
-            should_send_password=False,
+        await _broadcast_to_lobby(
+            match_packets["lobby_update_match_packet"],
+            supersede_key=supersede_key,
         )
 
-        await _broadcast_to_lobby(match_packet)
-
 
 @bancho_handler(packets.ClientPackets.CREATE_MATCH)
-async def create_match_handler(osu_session: "OsuSession", packet_data: bytes):
+async def create_match_handler(osu_session: "OsuSession", packet_data: memoryview):
     if not osu_session["privileges"] & ServerPrivileges.UNRESTRICTED:
         await packet_bundles.enqueue(
             osu_session["osu_session_id"],
@@ -967,7 +923,6 @@ async def create_match_handler(osu_session: "OsuSession", packet_data: bytes):
 
     osu_match_data = packet_reader.read_osu_match()
 
-    vanilla_game_mode = osu_match_data["game_mode"]
     game_mode = game_modes.for_server(
         osu_match_data["game_mode"],
         osu_session["mods"],
@@ -1009,16 +964,16 @@ async def create_match_handler(osu_session: "OsuSession", packet_data: bytes):
         )
 
         # inform the other spectators that we left
-        for spectator_osu_session_id in await spectators.members(
-            host_osu_session["osu_session_id"]
-        ):
-            if spectator_osu_session_id == osu_session["osu_session_id"]:
-                continue
-
-            await packet_bundles.enqueue(
-                spectator_osu_session_id,
-                packets.write_fellow_spectator_left_packet(osu_session["account_id"]),
-            )
+        await packet_bundles.enqueue_many(
+            [
+                spectator_osu_session_id
+                for spectator_osu_session_id in await spectators.members(
+                    host_osu_session["osu_session_id"]
+                )
+                if spectator_osu_session_id != osu_session["osu_session_id"]
+            ],
+            packets.write_fellow_spectator_left_packet(osu_session["account_id"]),
+        )
 
     # create the multiplayer match
     match = await multiplayer_matches.create(
@@ -1109,30 +1064,7 @@ async def create_match_handler(osu_session: "OsuSession", packet_data: bytes):
     slots = await multiplayer_slots.fetch_all(match["match_id"])
 
     # send the match data (with password) to the creator
-    osu_match_data: packets.OsuMatch = {
-        "match_id": match["match_id"],
-        "match_in_progress": match["status"] == MatchStatus.PLAYING,
-        "mods": match["mods"],
-        "match_name": match["match_name"],
-        "match_password": match["match_password"],
-        "beatmap_name": match["beatmap_name"],
-        "beatmap_id": match["beatmap_id"],
-        "beatmap_md5": match["beatmap_md5"],
-        "slot_statuses": [s["status"] for s in slots],
-        "slot_teams": [s["team"] for s in slots],
-        "per_slot_account_ids": [
-            s["account_id"] for s in slots if s["status"] & SlotStatus.HAS_PLAYER != 0
-        ],
-        "host_account_id": match["host_account_id"],
-        "game_mode": vanilla_game_mode,
-        "win_condition": match["win_condition"],
-        "team_type": match["team_type"],
-        "freemods_enabled": match["freemods_enabled"],
-        "per_slot_mods": [s["mods"] for s in slots]
-        if match["freemods_enabled"]
-        else [],
-        "random_seed": match["random_seed"],
-    }
+    osu_match_data = multiplayer.osu_match_data(match, slots)
     match_join_success_packet = packets.write_match_join_success_packet(
         osu_match_data,
         should_send_password=True,
@@ -1157,7 +1089,9 @@ async def create_match_handler(osu_session: "OsuSession", packet_data: bytes):
 
 
 @bancho_handler(packets.ClientPackets.JOIN_MATCH)
-async def join_match_handler(osu_session: "OsuSession", packet_data: bytes) -> None:
+async def join_match_handler(
+    osu_session: "OsuSession", packet_data: memoryview
+) -> None:
     reader = packets.PacketReader(packet_data)
 
     match_id = reader.read_i32()
@@ -1245,33 +1179,8 @@ async def join_match_handler(osu_session: "OsuSession", packet_data: bytes) -> N
 
     slots = await multiplayer_slots.fetch_all(match["match_id"])
 
-    vanilla_game_mode = game_modes.for_client(match["game_mode"])
-
     # send the match data (with password) to the creator
-    osu_match_data: packets.OsuMatch = {
-        "match_id": match["match_id"],
-        "match_in_progress": match["status"] == MatchStatus.PLAYING,
-        "mods": match["mods"],
-        "match_name": match["match_name"],
-        "match_password": match["match_password"],
-        "beatmap_name": match["beatmap_name"],
-        "beatmap_id": match["beatmap_id"],
-        "beatmap_md5": match["beatmap_md5"],
-        "slot_statuses": [s["status"] for s in slots],
-        "slot_teams": [s["team"] for s in slots],
-        "per_slot_account_ids": [
-            s["account_id"] for s in slots if s["status"] & SlotStatus.HAS_PLAYER != 0
-        ],
-        "host_account_id": match["host_account_id"],
-        "game_mode": vanilla_game_mode,
-        "win_condition": match["win_condition"],
-        "team_type": match["team_type"],
-        "freemods_enabled": match["freemods_enabled"],
-        "per_slot_mods": [s["mods"] for s in slots]
-        if match["freemods_enabled"]
-        else [],
-        "random_seed": match["random_seed"],
-    }
+    osu_match_data = multiplayer.osu_match_data(match, slots)
 
     match_join_success_packet = packets.write_match_join_success_packet(
         osu_match_data,
@@ -1296,7 +1205,9 @@ async def join_match_handler(osu_session: "OsuSession", packet_data: bytes) -> N
 
 
 @bancho_handler(packets.ClientPackets.PART_MATCH)
-async def part_match_handler(osu_session: "OsuSession", packet_data: bytes) -> None:
+async def part_match_handler(
+    osu_session: "OsuSession", packet_data: memoryview
+) -> None:
     if osu_session["multiplayer_match_id"] is None:
         logger.warning(
             "User tried to leave a match while not in a match",
@@ -1362,25 +1273,23 @@ async def part_match_handler(osu_session: "OsuSession", packet_data: bytes) -> N
             assert lobby_channel is not None
 
             # inform everyone in the lobby that the match no longer exists
-            for other_osu_session_id in await channel_members.members(
-                lobby_channel["channel_id"]
-            ):
-                await packet_bundles.enqueue(
-                    other_osu_session_id,
-                    packets.write_dispose_match_packet(match["match_id"]),
-                )
+            await packet_bundles.enqueue_many(
+                await channel_members.members(lobby_channel["channel_id"]),
+                packets.write_dispose_match_packet(match["match_id"]),
+            )
 
             # kick everyone out of the multiplayer match and channel
-            for other_osu_session_id in await channel_members.members(
+            match_channel_members = await channel_members.members(
                 match_channel["channel_id"]
-            ):
-                await packet_bundles.enqueue(
-                    other_osu_session_id,
-                    data=(
-                        packets.write_dispose_match_packet(match["match_id"])
-                        + packets.write_channel_kick_packet("#multiplayer")
-                    ),
-                )
+            )
+            await packet_bundles.enqueue_many(
+                match_channel_members,
+                data=(
+                    packets.write_dispose_match_packet(match["match_id"])
+                    + packets.write_channel_kick_packet("#multiplayer")
+                ),
+            )
+            for other_osu_session_id in match_channel_members:
                 await channel_members.remove(
                     match_channel["channel_id"],
                     other_osu_session_id,
@@ -1442,7 +1351,7 @@ async def part_match_handler(osu_session: "OsuSession", packet_data: bytes) -> N
 
 @bancho_handler(packets.ClientPackets.MATCH_CHANGE_SLOT)
 async def match_change_slot_handler(
-    osu_session: "OsuSession", packet_data: bytes
+    osu_session: "OsuSession", packet_data: memoryview
 ) -> None:
     reader = packets.PacketReader(packet_data)
 
@@ -1541,7 +1450,7 @@ async def match_change_slot_handler(
 
 
 @bancho_handler(packets.ClientPackets.MATCH_READY)
-async def match_ready_handler(osu_session: "OsuSession", packet_data: bytes):
+async def match_ready_handler(osu_session: "OsuSession", packet_data: memoryview):
     match_id = osu_session["multiplayer_match_id"]
     if match_id is None:
         logger.warning(
@@ -1584,7 +1493,7 @@ async def match_ready_handler(osu_session: "OsuSession", packet_data: bytes):
 
 
 @bancho_handler(packets.ClientPackets.MATCH_LOCK)
-async def match_lock_handler(osu_session: "OsuSession", packet_data: bytes):
+async def match_lock_handler(osu_session: "OsuSession", packet_data: memoryview):
     reader = packets.PacketReader(packet_data)
     slot_id = reader.read_i32()
 
@@ -1701,7 +1610,9 @@ async def match_lock_handler(osu_session: "OsuSession", packet_data: bytes):
 
 
 @bancho_handler(packets.ClientPackets.MATCH_CHANGE_SETTINGS)
-async def match_change_settings_handler(osu_session: "OsuSession", packet_data: bytes):
+async def match_change_settings_handler(
+    osu_session: "OsuSession", packet_data: memoryview
+):
     match_id = osu_session["multiplayer_match_id"]
     if match_id is None:
         logger.warning(
@@ -1816,7 +1727,7 @@ async def match_change_settings_handler(osu_session: "OsuSession", packet_data:
 
 
 @bancho_handler(packets.ClientPackets.MATCH_START)
-async def match_start_handler(osu_session: "OsuSession", packet_data: bytes):
+async def match_start_handler(osu_session: "OsuSession", packet_data: memoryview):
     match_id = osu_session["multiplayer_match_id"]
     if not match_id:
         logger.warning(
@@ -1859,32 +1770,7 @@ async def match_start_handler(osu_session: "OsuSession", packet_data: bytes):
             assert new_slot
             slots[i] = new_slot
 
-    vanilla_game_mode = game_modes.for_client(match["game_mode"])
-
-    osu_match_data: packets.OsuMatch = {
-        "match_id": match["match_id"],
-        "match_in_progress": match["status"] == MatchStatus.PLAYING,
-        "mods": match["mods"],
-        "match_name": match["match_name"],
-        "match_password": match["match_password"],
-        "beatmap_name": match["beatmap_name"],
-        "beatmap_id": match["beatmap_id"],
-        "beatmap_md5": match["beatmap_md5"],
-        "slot_statuses": [s["status"] for s in slots],
-        "slot_teams": [s["team"] for s in slots],
-        "per_slot_account_ids": [
-            s["account_id"] for s in slots if s["status"] & SlotStatus.HAS_PLAYER != 0
-        ],
-        "host_account_id": match["host_account_id"],
-        "game_mode": vanilla_game_mode,
-        "win_condition": match["win_condition"],
-        "team_type": match["team_type"],
-        "freemods_enabled": match["freemods_enabled"],
-        "per_slot_mods": [s["mods"] for s in slots]
-        if match["freemods_enabled"]
-        else [],
-        "random_seed": match["random_seed"],
-    }
+    osu_match_data = multiplayer.osu_match_data(match, slots)
 
     match_started_packet = packets.write_match_start_packet(
         osu_match_data,
@@ -1909,7 +1795,9 @@ async def match_start_handler(osu_session: "OsuSession", packet_data: bytes):
 
 
 @bancho_handler(packets.ClientPackets.MATCH_SCORE_UPDATE)
-async def match_score_update_handler(osu_session: "OsuSession", packet_data: bytes):
+async def match_score_update_handler(
+    osu_session: "OsuSession", packet_data: memoryview
+):
     match_id = osu_session["multiplayer_match_id"]
     if match_id is None:
         logger.warning(
@@ -1918,31 +1806,34 @@ async def match_score_update_handler(osu_session: "OsuSession", packet_data: byt
         )
         return
 
-    match = await multiplayer_matches.fetch_one(match_id)
-    if isinstance(match, ServiceError):
+    # this is sent many times per second by every player,
+    # so we relay the score frame without decoding it
+    if len(packet_data) < packets.OSU_SCORE_FRAME_MIN_SIZE:
         logger.warning(
-            "A user sent a match score frame but their match doesn't exist.",
+            "A user sent a malformed match score frame.",
             account_id=osu_session["account_id"],
+            packet_size=len(packet_data),
         )
         return
 
-    slot = await multiplayer_slots.fetch_one_by_osu_session_id(
-        match_id=match_id, osu_session_id=osu_session["osu_session_id"]
-    )
-    if not slot:
+    occupied_slots = await multiplayer_slots.fetch_occupied_slots(match_id)
+
+    slot = occupied_slots.get(osu_session["osu_session_id"])
+    if slot is None:
         logger.warning(
             "A user sent a match score frame but they don't have a slot.",
             account_id=osu_session["account_id"],
         )
         return
 
-    new_packet_data = packet_data[:4] + chr(slot["slot_id"]).encode() + packet_data[5:]
-
-    score_update_packet = packets.write_match_score_update_packet(new_packet_data)
-    await _broadcast_to_match(
-        match_id=match_id,
-        data=score_update_packet,
-        slot_flags=SlotStatus.PLAYING,
+    slot_id, _ = slot
+    await packet_bundles.enqueue_many(
+        [
+            osu_session_id
+            for osu_session_id, (_, status) in occupied_slots.items()
+            if status & SlotStatus.PLAYING
+        ],
+        packets.write_relayed_match_score_update_packet(packet_data, slot_id),
     )
 
 
@@ -1950,7 +1841,7 @@ async def match_score_update_handler(osu_session: "OsuSession", packet_data: byt
 
 
 @bancho_handler(packets.ClientPackets.MATCH_COMPLETE)
-async def match_complete_handler(osu_session: "OsuSession", packet_data: bytes):
+async def match_complete_handler(osu_session: "OsuSession", packet_data: memoryview):
     match_id = osu_session["multiplayer_match_id"]
     if match_id is None:
         logger.warning(
@@ -2010,7 +1901,7 @@ async def match_complete_handler(osu_session: "OsuSession", packet_data: bytes):
 
 
 @bancho_handler(packets.ClientPackets.MATCH_CHANGE_MODS)
-async def match_change_mods_handler(osu_session: "OsuSession", packet_data: bytes):
+async def match_change_mods_handler(osu_session: "OsuSession", packet_data: memoryview):
     match_id = osu_session["multiplayer_match_id"]
     if not match_id:
         logger.warning(
@@ -2108,7 +1999,9 @@ async def match_change_mods_handler(osu_session: "OsuSession", packet_data: byte
 
 
 @bancho_handler(packets.ClientPackets.MATCH_LOAD_COMPLETE)
-async def match_load_complete_handler(osu_session: "OsuSession", packet_data: bytes):
+async def match_load_complete_handler(
+    osu_session: "OsuSession", packet_data: memoryview
+):
     match_id = osu_session["multiplayer_match_id"]
     if match_id is None:
         logger.warning(
@@ -2150,7 +2043,7 @@ async def match_load_complete_handler(osu_session: "OsuSession", packet_data: by
 
 
 @bancho_handler(packets.ClientPackets.MATCH_NO_BEATMAP)
-async def match_no_beatmap_handler(osu_session: "OsuSession", packet_data: bytes):
+async def match_no_beatmap_handler(osu_session: "OsuSession", packet_data: memoryview):
     match_id = osu_session["multiplayer_match_id"]
     if match_id is None:
         logger.warning(
@@ -2193,7 +2086,7 @@ async def match_no_beatmap_handler(osu_session: "OsuSession", packet_data: bytes
 
 
 @bancho_handler(packets.ClientPackets.MATCH_NOT_READY)
-async def match_not_ready_handler(osu_session: "OsuSession", packet_data: bytes):
+async def match_not_ready_handler(osu_session: "OsuSession", packet_data: memoryview):
     match_id = osu_session["multiplayer_match_id"]
     if match_id is None:
         logger.warning(
@@ -2236,7 +2129,7 @@ async def match_not_ready_handler(osu_session: "OsuSession", packet_data: bytes)
 
 
 @bancho_handler(packets.ClientPackets.MATCH_FAILED)
-async def match_failed_handler(osu_session: "OsuSession", packet_data: bytes):
+async def match_failed_handler(osu_session: "OsuSession", packet_data: memoryview):
     match_id = osu_session["multiplayer_match_id"]
     if match_id is None:
         logger.warning(
@@ -2268,7 +2161,7 @@ async def match_failed_handler(osu_session: "OsuSession", packet_data: bytes):
 
 
 @bancho_handler(packets.ClientPackets.MATCH_HAS_BEATMAP)
-async def match_has_beatmap_handler(osu_session: "OsuSession", packet_data: bytes):
+async def match_has_beatmap_handler(osu_session: "OsuSession", packet_data: memoryview):
     match_id = osu_session["multiplayer_match_id"]
     if match_id is None:
         logger.warning(
@@ -2311,7 +2204,7 @@ async def match_has_beatmap_handler(osu_session: "OsuSession", packet_data: byte
 
 
 @bancho_handler(packets.ClientPackets.MATCH_SKIP_REQUEST)
-async def match_skip_request(osu_session: "OsuSession", packet_data: bytes):
+async def match_skip_request(osu_session: "OsuSession", packet_data: memoryview):
     match_id = osu_session["multiplayer_match_id"]
     if match_id is None:
         logger.warning(
@@ -2354,7 +2247,9 @@ async def match_skip_request(osu_session: "OsuSession", packet_data: bytes):
 
 
 @bancho_handler(packets.ClientPackets.CHANNEL_JOIN)
-async def user_joins_channel_handler(osu_session: "OsuSession", packet_data: bytes):
+async def user_joins_channel_handler(
+    osu_session: "OsuSession", packet_data: memoryview
+):
     packet_reader = packets.PacketReader(packet_data)
     channel_name = packet_reader.read_string()
 
@@ -2379,17 +2274,23 @@ async def user_joins_channel_handler(osu_session: "OsuSession", packet_data: byt
         packets.write_channel_join_success_packet(channel["name"]),
     )
 
-    for other_osu_session in await osu_sessions.fetch_all(
-        has_any_privilege_bit=channel["read_privileges"]
-    ):
-        await packet_bundles.enqueue(
-            other_osu_session["osu_session_id"],
-            packets.write_channel_info_packet(
-                channel["name"],
-                channel["topic"],
-                len(current_channel_members) + 1,
-            ),
-        )
+    await packet_bundles.enqueue_many(
+        [
+            other_osu_session["osu_session_id"]
+            for other_osu_session in await osu_sessions.fetch_all(
+                has_any_privilege_bit=channel["read_privileges"]
+            )
+        ],
+        packets.write_channel_info_packet(
+            channel["name"],
+            channel["topic"],
+            len(current_channel_members) + 1,
+        ),
+        supersede_key=packet_bundles.make_supersede_key(
+            packets.ServerPackets.CHANNEL_INFO,
+            channel["name"],
+        ),
+    )
 
     logger.info(
         "User joined channel",
@@ -2406,7 +2307,9 @@ async def user_joins_channel_handler(osu_session: "OsuSession", packet_data: byt
 
 
 @bancho_handler(packets.ClientPackets.MATCH_TRANSFER_HOST)
-async def match_transfer_host_handler(osu_session: "OsuSession", packet_data: bytes):
+async def match_transfer_host_handler(
+    osu_session: "OsuSession", packet_data: memoryview
+):
     match_id = osu_session["multiplayer_match_id"]
     if match_id is None:
         logger.warning(
@@ -2465,7 +2368,7 @@ async def match_transfer_host_handler(osu_session: "OsuSession", packet_data: by
 
 
 @bancho_handler(packets.ClientPackets.FRIEND_ADD)
-async def friend_add_handler(osu_session: "OsuSession", packet_data: bytes):
+async def friend_add_handler(osu_session: "OsuSession", packet_data: memoryview):
     packet_reader = packets.PacketReader(packet_data)
     target_id = packet_reader.read_i32()
 
@@ -2480,7 +2383,7 @@ async def friend_add_handler(osu_session: "OsuSession", packet_data: bytes):
 
 
 @bancho_handler(packets.ClientPackets.FRIEND_REMOVE)
-async def friend_remove_handler(osu_session: "OsuSession", packet_data: bytes):
+async def friend_remove_handler(osu_session: "OsuSession", packet_data: memoryview):
     packet_reader = packets.PacketReader(packet_data)
     target_id = packet_reader.read_i32()
 
@@ -2491,7 +2394,7 @@ async def friend_remove_handler(osu_session: "OsuSession", packet_data: bytes):
 
 
 @bancho_handler(packets.ClientPackets.MATCH_CHANGE_TEAM)
-async def match_change_team_handler(osu_session: "OsuSession", packet_data: bytes):
+async def match_change_team_handler(osu_session: "OsuSession", packet_data: memoryview):
     match_id = osu_session["multiplayer_match_id"]
     if not match_id:
         logger.warning(
@@ -2554,7 +2457,9 @@ async def match_change_team_handler(osu_session: "OsuSession", packet_data: byte
 
 
 @bancho_handler(packets.ClientPackets.CHANNEL_PART)
-async def user_leaves_channel_handler(osu_session: "OsuSession", packet_data: bytes):
+async def user_leaves_channel_handler(
+    osu_session: "OsuSession", packet_data: memoryview
+):
     packet_reader = packets.PacketReader(packet_data)
     channel_name = packet_reader.read_string()
 
@@ -2579,19 +2484,23 @@ async def user_leaves_channel_handler(osu_session: "OsuSession", packet_data: by
 
     await channel_members.remove(channel["channel_id"], osu_session["osu_session_id"])
 
-    for other_osu_session in await osu_sessions.fetch_all(
-        has_any_privilege_bit=channel["read_privileges"]
-    ):
-        await packet_bundles.enqueue(
-            other_osu_session["osu_session_id"],
-            packets.write_channel_info_packet(
-                channel["name"],
-                channel["topic"],
-                len(current_channel_members) - 1
-                if len(current_channel_members) > 0
-                else 0,
-            ),
-        )
+    await packet_bundles.enqueue_many(
+        [
+            other_osu_session["osu_session_id"]
+            for other_osu_session in await osu_sessions.fetch_all(
+                has_any_privilege_bit=channel["read_privileges"]
+            )
+        ],
+        packets.write_channel_info_packet(
+            channel["name"],
+            channel["topic"],
+            len(current_channel_members) - 1 if len(current_channel_members) > 0 else 0,
+        ),
+        supersede_key=packet_bundles.make_supersede_key(
+            packets.ServerPackets.CHANNEL_INFO,
+            channel["name"],
+        ),
+    )
 
 
 # RECEIVE_UPDATES = 79
@@ -2602,7 +2511,7 @@ async def user_leaves_channel_handler(osu_session: "OsuSession", packet_data: by
 
 @bancho_handler(packets.ClientPackets.SET_AWAY_MESSAGE)
 async def set_away_message_handler(
-    osu_session: "OsuSession", packet_data: bytes
+    osu_session: "OsuSession", packet_data: memoryview
 ) -> None:
     reader = packets.PacketReader(packet_data)
 
@@ -2652,12 +2561,13 @@ async def set_away_message_handler(
 
 @bancho_handler(packets.ClientPackets.USER_STATS_REQUEST)
 async def user_stats_request_handler(
-    osu_session: "OsuSession", packet_data: bytes
+    osu_session: "OsuSession", packet_data: memoryview
 ) -> None:
     reader = packets.PacketReader(packet_data)
 
     account_ids = reader.read_i32_list_i16_length()
 
+    stats_packets = []
     for account_id in account_ids:
         if account_id == osu_session["account_id"]:
             continue
@@ -2666,36 +2576,16 @@ async def user_stats_request_handler(
         if other_osu_session is None:
             continue
 
-        other_stats = await stats.fetch_one(
-            account_id,
-            other_osu_session["game_mode"],
-        )
-        if other_stats is None:
+        others_packets = await presence.fetch_packets(other_osu_session)
+        if others_packets is None:
             continue
 
-        vanilla_game_mode = game_modes.for_client(other_osu_session["game_mode"])
+        stats_packets.append(others_packets["stats_packet"])
 
-        other_global_rank = await ranking.get_global_rank(
-            other_stats["account_id"],
-            other_stats["game_mode"],
-        )
+    if stats_packets:
         await packet_bundles.enqueue(
             osu_session["osu_session_id"],
-            data=packets.write_user_stats_packet(
-                other_stats["account_id"],
-                other_osu_session["action"],
-                other_osu_session["info_text"],
-                other_osu_session["beatmap_md5"],
-                other_osu_session["mods"],
-                vanilla_game_mode,
-                other_osu_session["beatmap_id"],
-                other_stats["ranked_score"],
-                other_stats["accuracy"],
-                other_stats["play_count"],
-                other_stats["total_score"],
-                other_global_rank,
-                other_stats["performance_points"],
-            ),
+            data=b"".join(stats_packets),
         )
 
 
@@ -2703,7 +2593,7 @@ async def user_stats_request_handler(
 
 
 @bancho_handler(packets.ClientPackets.MATCH_INVITE)
-async def match_invite_handler(osu_session: "OsuSession", packet_data: bytes):
+async def match_invite_handler(osu_session: "OsuSession", packet_data: memoryview):
     match_id = osu_session["multiplayer_match_id"]
     if not match_id:
         logger.warning(
@@ -2760,7 +2650,9 @@ async def match_invite_handler(osu_session: "OsuSession", packet_data: bytes):
 
 
 @bancho_handler(packets.ClientPackets.MATCH_CHANGE_PASSWORD)
-async def match_change_password_handler(osu_session: "OsuSession", packet_data: bytes):
+async def match_change_password_handler(
+    osu_session: "OsuSession", packet_data: memoryview
+):
     match_id = osu_session["multiplayer_match_id"]
     if not match_id:
         logger.warning(
@@ -2811,51 +2703,19 @@ async def match_change_password_handler(osu_session: "OsuSession", packet_data:
 
 @bancho_handler(packets.ClientPackets.TOURNAMENT_MATCH_INFO_REQUEST)
 async def tournament_match_info_request_handler(
-    osu_session: "OsuSession", packet_data: bytes
+    osu_session: "OsuSession", packet_data: memoryview
 ):
     packet_reader = packets.PacketReader(packet_data)
 
     match_id = packet_reader.read_i32()
 
-    match = await multiplayer_matches.fetch_one(match_id)
-    if isinstance(match, ServiceError):
+    match_packets = await multiplayer.fetch_update_match_packets(match_id)
+    if match_packets is None:
         return
 
-    slots = await multiplayer_slots.fetch_all(match_id)
-
-    clientside_mode = game_modes.for_client(match["game_mode"])
-
-    osu_match_data: packets.OsuMatch = {
-        "match_id": match["match_id"],
-        "match_in_progress": match["status"] == MatchStatus.PLAYING,
-        "mods": match["mods"],
-        "match_name": match["match_name"],
-        "match_password": match["match_password"],
-        "beatmap_name": match["beatmap_name"],
-        "beatmap_id": match["beatmap_id"],
-        "beatmap_md5": match["beatmap_md5"],
-        "slot_statuses": [s["status"] for s in slots],
-        "slot_teams": [s["team"] for s in slots],
-        "per_slot_account_ids": [
-            s["account_id"] for s in slots if s["status"] & SlotStatus.HAS_PLAYER != 0
-        ],
-        "host_account_id": match["host_account_id"],
-        "game_mode": clientside_mode,
-        "win_condition": match["win_condition"],
-        "team_type": match["team_type"],
-        "freemods_enabled": match["freemods_enabled"],
-        "per_slot_mods": [s["mods"] for s in slots]
-        if match["freemods_enabled"]
-        else [],
-        "random_seed": match["random_seed"],
-    }
-
     await packet_bundles.enqueue(
         osu_session["osu_session_id"],
-        packets.write_update_match_packet(
-            osu_match_data,
-            should_send_password=False,
-        ),
+        match_packets["lobby_update_match_packet"],
     )
 
 
@@ -2869,7 +2729,9 @@ async def tournament_match_info_request_handler(
 
 
 @bancho_handler(packets.ClientPackets.TOGGLE_BLOCK_NON_FRIEND_DMS)
-async def toggle_block_non_friend_dms(osu_session: "OsuSession", packet_data: bytes):
+async def toggle_block_non_friend_dms(
+    osu_session: "OsuSession", packet_data: memoryview
+):
     await osu_sessions.partial_update(
         osu_session_id=osu_session["osu_session_id"],
         pm_private=not osu_session["pm_private"],
@@ -2888,7 +2750,7 @@ async def toggle_block_non_friend_dms(osu_session: "OsuSession", packet_data: by
 @bancho_handler(packets.ClientPackets.TOURNAMENT_JOIN_MATCH_CHANNEL)
 async def tournament_join_match_channel_handler(
     osu_session: "OsuSession",
-    packet_data: bytes,
+    packet_data: memoryview,
 ):
     packet_reader = packets.PacketReader(packet_data)
 
@@ -2914,7 +2776,7 @@ async def tournament_join_match_channel_handler(
 @bancho_handler(packets.ClientPackets.TOURNAMENT_LEAVE_MATCH_CHANNEL)
 async def tournament_leave_match_channel_handler(
     osu_session: "OsuSession",
-    packet_data: bytes,
+    packet_data: memoryview,
 ):
     packet_reader = packets.PacketReader(packet_data)
 
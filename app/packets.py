@@ -1,4 +1,6 @@
 import struct
+from collections.abc import Callable
+from collections.abc import Iterator
 from dataclasses import dataclass
 from enum import Enum
 from typing import Any
@@ -137,11 +139,20 @@ class ServerPackets:
     SWITCH_TOURNAMENT_SERVER = 107
 
 
-@dataclass
+PACKET_HEADER = struct.Struct("<HxL")
+
+_PING_PACKET = PACKET_HEADER.pack(ClientPackets.PING, 0)
+
+
+class MalformedPacketError(Exception):
+    """Raised when request data cannot be parsed into packets."""
+
+
+@dataclass(slots=True)
 class Packet:
     packet_id: int
     packet_data_length: int
-    packet_data: bytes
+    packet_data: memoryview  # a view into the request data; not a copy
 
 
 class OsuMessage(TypedDict):
@@ -228,46 +239,107 @@ class OsuReplayFrameBundle(TypedDict):
     sequence_number: int
 
 
+# precompiled structs for reading, shared by all packet readers
+
+_I8 = struct.Struct("<b")
+_U8 = struct.Struct("<B")
+_I16 = struct.Struct("<h")
+_U16 = struct.Struct("<H")
+_I32 = struct.Struct("<i")
+_U32 = struct.Struct("<I")
+_I64 = struct.Struct("<q")
+_U64 = struct.Struct("<Q")
+_F32 = struct.Struct("<f")
+_F64 = struct.Struct("<d")
+
+_OSU_MATCH_HEADER = struct.Struct("<hbbi")  # id, in progress, powerplay, mods
+_OSU_MATCH_SLOTS = struct.Struct("<16b16b")  # slot statuses, slot teams
+_OSU_MATCH_SETTINGS = struct.Struct("<ibbbb")  # host, mode, win cond, team type, fm
+_OSU_SCORE_FRAME = struct.Struct("<iBHHHHHHiHHBBBB")
+_OSU_SCORE_FRAME_V2 = struct.Struct("<dd")  # combo portion, bonus portion
+_OSU_REPLAY_FRAME = struct.Struct("<BBffi")
+_OSU_REPLAY_FRAME_BUNDLE_HEADER = struct.Struct("<iH")  # extra, frame count
+
+# the shortest score frame a client can send, which is relayed without being
+# decoded; shorter ones must be dropped before relaying
+OSU_SCORE_FRAME_MIN_SIZE = _OSU_SCORE_FRAME.size
+
+# the shortest replay frame bundle (without frames) a client can send, which is
+# also relayed without being decoded
+REPLAY_FRAME_BUNDLE_MIN_SIZE = (
+    _OSU_REPLAY_FRAME_BUNDLE_HEADER.size
+    + 1  # replay action
+    + OSU_SCORE_FRAME_MIN_SIZE
+    + 2  # sequence number
+)
+
+_list_structs: dict[tuple[str, int], struct.Struct] = {}
+
+
+def _list_struct(format: str, count: int) -> struct.Struct:
+    list_struct = _list_structs.get((format, count))
+    if list_struct is None:
+        list_struct = struct.Struct(f"<{count}{format}")
+        _list_structs[(format, count)] = list_struct
+    return list_struct
+
+
 class PacketReader:
-    def __init__(self, data: bytes) -> None:
+    """Reads osu! data types in place from a buffer, tracking an offset into it."""
+
+    def __init__(self, data: bytes | bytearray | memoryview) -> None:
         self.data_view = memoryview(data)
+        self.offset = 0
 
     def read(self, num_bytes: int) -> bytes:
-        data = self.data_view[:num_bytes]
-        self.data_view = self.data_view[num_bytes:]
+        data = self.data_view[self.offset : self.offset + num_bytes]
+        self.offset += len(data)
         return data.tobytes()  # copy on exit
 
+    def _unpack(self, struct_: struct.Struct) -> tuple[Any, ...]:
+        values = struct_.unpack_from(self.data_view, self.offset)
+        self.offset += struct_.size
+        return values
+
     # primitive data types
 
     def read_i8(self) -> int:
-        return struct.unpack("<b", self.read(1))[0]
+        return self._unpack(_I8)[0]
 
     def read_u8(self) -> int:
-        return struct.unpack("<B", self.read(1))[0]
+        return self._unpack(_U8)[0]
 
     def read_i16(self) -> int:
-        return struct.unpack("<h", self.read(2))[0]
+        return self._unpack(_I16)[0]
 
     def read_u16(self) -> int:
-        return struct.unpack("<H", self.read(2))[0]
+        return self._unpack(_U16)[0]
 
     def read_i32(self) -> int:
-        return struct.unpack("<i", self.read(4))[0]
+        return self._unpack(_I32)[0]
 
     def read_u32(self) -> int:
-        return struct.unpack("<I", self.read(4))[0]
+        return self._unpack(_U32)[0]
 
     def read_i64(self) -> int:
-        return struct.unpack("<q", self.read(8))[0]
+        return self._unpack(_I64)[0]
 
     def read_u64(self) -> int:
-        return struct.unpack("<Q", self.read(8))[0]
+        return self._unpack(_U64)[0]
 
     def read_f32(self) -> float:
-        return struct.unpack("<f", self.read(4))[0]
+        return self._unpack(_F32)[0]
 
     def read_f64(self) -> float:
-        return struct.unpack("<d", self.read(8))[0]
+        return self._unpack(_F64)[0]
+
+    # bulk reads of primitive data types
+
+    def read_i8_list(self, count: int) -> list[int]:
+        return list(self._unpack(_list_struct("b", count)))
+
+    def read_i32_list(self, count: int) -> list[int]:
+        return list(self._unpack(_list_struct("i", count)))
 
     # more complex data types
 
@@ -283,16 +355,18 @@ class PacketReader:
         return value
 
     def read_string(self) -> str:
-        if self.read(1) != b"\x0b":
+        if self.read_u8() != 0x0B:
             return ""
         length = self.read_uleb128()
-        return self.read(length).decode()
+        data = self.data_view[self.offset : self.offset + length]
+        self.offset += len(data)
+        return str(data, "utf-8")
 
     def read_i32_list_i16_length(self) -> list[int]:
-        return [self.read_i32() for _ in range(self.read_i16())]
+        return self.read_i32_list(self.read_i16())
 
     def read_i32_list_i32_length(self) -> list[int]:
-        return [self.read_i32() for _ in range(self.read_i32())]
+        return self.read_i32_list(self.read_i32())
 
     # osu! specific data types
 
@@ -312,32 +386,36 @@ class PacketReader:
         }
 
     def read_osu_match(self) -> OsuMatch:
-        match_id = self.read_i16()  # match id
-        match_in_progress = self.read_i8() == 1  # in_progress
-        _ = self.read_i8()  # powerplay
-        mods = self.read_i32()  # mods
+        (
+            match_id,
+            match_in_progress,
+            _,  # powerplay
+            mods,
+        ) = self._unpack(_OSU_MATCH_HEADER)
         match_name = self.read_string()
         match_password = self.read_string()
         beatmap_name = self.read_string()
         beatmap_id = self.read_i32()
         beatmap_md5 = self.read_string()
-        slot_statuses = [self.read_i8() for _ in range(16)]
-        slot_teams = [self.read_i8() for _ in range(16)]
+        slots = self._unpack(_OSU_MATCH_SLOTS)
+        slot_statuses = list(slots[:16])
+        slot_teams = list(slots[16:])
         # ^^ up to slot_ids, as it relies on slot_statuses ^^
 
-        per_slot_account_ids = []
-        for status in slot_statuses:
-            if status & 0b01111100 != 0:  # slot has a player
-                per_slot_account_ids.append(self.read_i32())
+        # slot has a player
+        player_count = sum(1 for status in slot_statuses if status & 0b01111100 != 0)
+        per_slot_account_ids = self.read_i32_list(player_count)
 
-        host_account_id = self.read_i32()
-        game_mode = self.read_i8()
-        win_condition = self.read_i8()
-        team_type = self.read_i8()
-        freemods_enabled = self.read_i8() == 1
+        (
+            host_account_id,
+            game_mode,
+            win_condition,
+            team_type,
+            freemods_enabled,
+        ) = self._unpack(_OSU_MATCH_SETTINGS)
 
-        if freemods_enabled:
-            per_slot_mods = [self.read_i32() for _ in range(16)]
+        if freemods_enabled == 1:
+            per_slot_mods = self.read_i32_list(16)
         else:
             per_slot_mods = []
 
@@ -345,7 +423,7 @@ class PacketReader:
 
         return {
             "match_id": match_id,
-            "match_in_progress": match_in_progress,
+            "match_in_progress": match_in_progress == 1,
             "mods": mods,
             "match_name": match_name,
             "match_password": match_password,
@@ -359,50 +437,88 @@ class PacketReader:
             "game_mode": game_mode,
             "win_condition": win_condition,
             "team_type": team_type,
-            "freemods_enabled": freemods_enabled,
+            "freemods_enabled": freemods_enabled == 1,
             "per_slot_mods": per_slot_mods,
             "random_seed": random_seed,
         }
 
     def read_osu_score_frame(self) -> OsuScoreFrame:
+        (
+            time,
+            id,
+            num_300s,
+            num_100s,
+            num_50s,
+            num_gekis,
+            num_katus,
+            num_misses,
+            total_score,
+            current_combo,
+            max_combo,
+            perfect,
+            current_hp,
+            tag_byte,
+            score_v2,
+        ) = self._unpack(_OSU_SCORE_FRAME)
         rec: OsuScoreFrame = {
-            "time": self.read_i32(),
-            "id": self.read_u8(),
-            "num_300s": self.read_u16(),
-            "num_100s": self.read_u16(),
-            "num_50s": self.read_u16(),
-            "num_gekis": self.read_u16(),
-            "num_katus": self.read_u16(),
-            "num_misses": self.read_u16(),
-            "total_score": self.read_i32(),
-            "current_combo": self.read_u16(),
-            "max_combo": self.read_u16(),
-            "perfect": self.read_u8() == 1,
-            "current_hp": self.read_u8(),
-            "tag_byte": self.read_u8(),
-            "score_v2": self.read_u8() == 1,
+            "time": time,
+            "id": id,
+            "num_300s": num_300s,
+            "num_100s": num_100s,
+            "num_50s": num_50s,
+            "num_gekis": num_gekis,
+            "num_katus": num_katus,
+            "num_misses": num_misses,
+            "total_score": total_score,
+            "current_combo": current_combo,
+            "max_combo": max_combo,
+            "perfect": perfect == 1,
+            "current_hp": current_hp,
+            "tag_byte": tag_byte,
+            "score_v2": score_v2 == 1,
         }
         if rec["score_v2"]:
-            rec["combo_portion"] = self.read_f64()
-            rec["bonus_portion"] = self.read_f64()
+            rec["combo_portion"], rec["bonus_portion"] = self._unpack(
+                _OSU_SCORE_FRAME_V2
+            )
 
         return rec
 
     def read_osu_replay_frame(self) -> OsuReplayFrame:
+        button_state, taiko_byte, x, y, time = self._unpack(_OSU_REPLAY_FRAME)
         return {
-            "button_state": self.read_u8(),
-            "taiko_byte": self.read_u8(),  # pre-taiko support (<=2008)
-            "x": self.read_f32(),
-            "y": self.read_f32(),
-            "time": self.read_i32(),
+            "button_state": button_state,
+            "taiko_byte": taiko_byte,  # pre-taiko support (<=2008)
+            "x": x,
+            "y": y,
+            "time": time,
         }
 
     def read_replay_frame_bundle(self) -> OsuReplayFrameBundle:
-        extra = self.read_i32()  # bancho proto >= 18
-        replay_frame_count = self.read_u16()
-        replay_frames = [
-            self.read_osu_replay_frame() for _ in range(replay_frame_count)
+        # bancho proto >= 18
+        extra, replay_frame_count = self._unpack(_OSU_REPLAY_FRAME_BUNDLE_HEADER)
+
+        replay_frames_size = _OSU_REPLAY_FRAME.size * replay_frame_count
+        replay_frames_view = self.data_view[
+            self.offset : self.offset + replay_frames_size
+        ]
+        if len(replay_frames_view) != replay_frames_size:
+            raise struct.error("replay frame bundle shorter than expected")
+        self.offset += replay_frames_size
+
+        replay_frames: list[OsuReplayFrame] = [
+            {
+                "button_state": button_state,
+                "taiko_byte": taiko_byte,  # pre-taiko support (<=2008)
+                "x": x,
+                "y": y,
+                "time": time,
+            }
+            for button_state, taiko_byte, x, y, time in _OSU_REPLAY_FRAME.iter_unpack(
+                replay_frames_view
+            )
         ]
+
         replay_action = self.read_u8()
         score_frame = self.read_osu_score_frame()
         sequence_number = self.read_u16()
@@ -416,21 +532,32 @@ class PacketReader:
         }
 
 
-def read_packets(request_data: bytes) -> list[Packet]:
-    packets = []
+def is_ping_only(request_data: bytes) -> bool:
+    """Whether request data is nothing but PING packets, as idle clients send."""
+    ping_count, remainder = divmod(len(request_data), PACKET_HEADER.size)
+    return (
+        ping_count > 0 and remainder == 0 and request_data == _PING_PACKET * ping_count
+    )
+
+
+def read_packets(request_data: bytes) -> Iterator[Packet]:
+    request_view = memoryview(request_data)
+    request_length = len(request_view)
+
     offset = 0
-    while request_data[offset:]:
-        packet_id, packet_len = struct.unpack("<HxL", request_data[offset : offset + 7])
-        offset += 7
+    while offset < request_length:
+        if request_length - offset < PACKET_HEADER.size:
+            raise MalformedPacketError("packet header shorter than expected")
 
-        packet_data = request_data[offset : offset + packet_len]
-        assert len(packet_data) == packet_len, "packet data shorter than expected"
-        offset += packet_len
+        packet_id, packet_len = PACKET_HEADER.unpack_from(request_view, offset)
+        offset += PACKET_HEADER.size
 
-        packet = Packet(packet_id, packet_len, packet_data)
-        packets.append(packet)
+        packet_data = request_view[offset : offset + packet_len]
+        if len(packet_data) != packet_len:
+            raise MalformedPacketError("packet data shorter than expected")
+        offset += packet_len
 
-    return packets
+        yield Packet(packet_id, packet_len, packet_data)
 
 
 class DataType(Enum):
@@ -473,11 +600,17 @@ def write_uleb128(value: int) -> bytes:
     return data
 
 
+# string headers for every length that fits in a single uleb128 byte
+_STRING_HEADERS = tuple(bytes((0x0B, length)) for length in range(0x80))
+
+
 def write_string(value: str) -> bytes:
     if len(value) == 0:
         return b"\x00"
     else:
         encoded = value.encode()
+        if len(encoded) < 0x80:
+            return _STRING_HEADERS[len(encoded)] + encoded
         return b"\x0b" + write_uleb128(len(encoded)) + encoded
 
 
@@ -542,50 +675,89 @@ def write_osu_match(
 
 
 def write_osu_score_frame(score_frame: OsuScoreFrame) -> bytes:
-    buffer = bytearray()
-    buffer += struct.pack("<i", score_frame["time"])
-    buffer += struct.pack("<B", score_frame["id"])
-    buffer += struct.pack("<H", score_frame["num_300s"])
-    buffer += struct.pack("<H", score_frame["num_100s"])
-    buffer += struct.pack("<H", score_frame["num_50s"])
-    buffer += struct.pack("<H", score_frame["num_gekis"])
-    buffer += struct.pack("<H", score_frame["num_katus"])
-    buffer += struct.pack("<H", score_frame["num_misses"])
-    buffer += struct.pack("<i", score_frame["total_score"])
-    buffer += struct.pack("<H", score_frame["current_combo"])
-    buffer += struct.pack("<H", score_frame["max_combo"])
-    buffer += struct.pack("<B", score_frame["perfect"])
-    buffer += struct.pack("<B", score_frame["current_hp"])
-    buffer += struct.pack("<B", score_frame["tag_byte"])
-    buffer += struct.pack("<B", score_frame["score_v2"])
+    data = _OSU_SCORE_FRAME.pack(
+        score_frame["time"],
+        score_frame["id"],
+        score_frame["num_300s"],
+        score_frame["num_100s"],
+        score_frame["num_50s"],
+        score_frame["num_gekis"],
+        score_frame["num_katus"],
+        score_frame["num_misses"],
+        score_frame["total_score"],
+        score_frame["current_combo"],
+        score_frame["max_combo"],
+        score_frame["perfect"],
+        score_frame["current_hp"],
+        score_frame["tag_byte"],
+        score_frame["score_v2"],
+    )
     if score_frame["score_v2"]:
         assert "combo_portion" in score_frame
         assert "bonus_portion" in score_frame
-        buffer += struct.pack("<d", score_frame["combo_portion"])
-        buffer += struct.pack("<d", score_frame["bonus_portion"])
-    return bytes(buffer)
+        data += _OSU_SCORE_FRAME_V2.pack(
+            score_frame["combo_portion"],
+            score_frame["bonus_portion"],
+        )
+    return data
 
 
 def write_osu_replay_frame(replay_frame: OsuReplayFrame) -> bytes:
-    buffer = bytearray()
-    buffer += struct.pack("<B", replay_frame["button_state"])
-    buffer += struct.pack("<B", replay_frame["taiko_byte"])
-    buffer += struct.pack("<f", replay_frame["x"])
-    buffer += struct.pack("<f", replay_frame["y"])
-    buffer += struct.pack("<i", replay_frame["time"])
-    return bytes(buffer)
+    return _OSU_REPLAY_FRAME.pack(
+        replay_frame["button_state"],
+        replay_frame["taiko_byte"],
+        replay_frame["x"],
+        replay_frame["y"],
+        replay_frame["time"],
+    )
 
 
 def write_replay_frame_bundle(replay_frame_bundle: OsuReplayFrameBundle) -> bytes:
-    buffer = bytearray()
-    buffer += struct.pack("<i", 0)  # extra
-    buffer += struct.pack("<H", len(replay_frame_bundle["replay_frames"]))
-    for frame in replay_frame_bundle["replay_frames"]:
-        buffer += write_osu_replay_frame(frame)
-    buffer += struct.pack("<B", replay_frame_bundle["replay_action"])
-    buffer += write_osu_score_frame(replay_frame_bundle["score_frame"])
-    buffer += struct.pack("<H", replay_frame_bundle["sequence_number"])
-    return bytes(buffer)
+    replay_frames = replay_frame_bundle["replay_frames"]
+    return b"".join(
+        [
+            _OSU_REPLAY_FRAME_BUNDLE_HEADER.pack(0, len(replay_frames)),  # extra
+            *[
+                _OSU_REPLAY_FRAME.pack(
+                    frame["button_state"],
+                    frame["taiko_byte"],
+                    frame["x"],
+                    frame["y"],
+                    frame["time"],
+                )
+                for frame in replay_frames
+            ],
+            _U8.pack(replay_frame_bundle["replay_action"]),
+            write_osu_score_frame(replay_frame_bundle["score_frame"]),
+            _U16.pack(replay_frame_bundle["sequence_number"]),
+        ]
+    )
+
+
+# struct formats for primitive types, and encoders for types of variable length
+
+PRIMITIVE_FORMATS: dict[DataType, str] = {
+    DataType.I8: "b",
+    DataType.U8: "B",
+    DataType.I16: "h",
+    DataType.U16: "H",
+    DataType.I32: "i",
+    DataType.U32: "I",
+    DataType.I64: "q",
+    DataType.U64: "Q",
+    DataType.F32: "f",
+    DataType.F64: "d",
+}
+
+VARIABLE_LENGTH_ENCODERS: dict[DataType, Callable[[Any], bytes]] = {
+    DataType.STRING: write_string,
+    DataType.I32_LIST_I16_LEN: write_i32_list_i16_len,
+    DataType.OSU_MESSAGE: write_osu_message,
+    DataType.OSU_MATCH: lambda value: write_osu_match(*value),
+    DataType.OSU_SCOREFRAME: write_osu_score_frame,
+    DataType.OSU_REPLAY_FRAME_BUNDLE: write_replay_frame_bundle,
+    DataType.RAW_DATA: lambda value: value,
+}
 
 
 def write_packet(
@@ -593,61 +765,208 @@ def write_packet(
     packet_data_inputs: list[tuple[DataType, Any]],
 ) -> bytes:
     # packet data
-    packet_body = b""
+    packet_body = bytearray()
 
-    # TODO: create data out of packet_data_inputs
     for type, value in packet_data_inputs:
-        if type == DataType.I8:
-            packet_body += struct.pack("<b", value)
-        elif type == DataType.I16:
-            packet_body += struct.pack("<h", value)
-        elif type == DataType.I32:
-            packet_body += struct.pack("<i", value)
-        elif type == DataType.I64:
-            packet_body += struct.pack("<q", value)
-        elif type == DataType.U8:
-            packet_body += struct.pack("<B", value)
-        elif type == DataType.U16:
-            packet_body += struct.pack("<H", value)
-        elif type == DataType.U32:
-            packet_body += struct.pack("<I", value)
-        elif type == DataType.U64:
-            packet_body += struct.pack("<Q", value)
-        elif type == DataType.F32:
-            packet_body += struct.pack("<f", value)
-        elif type == DataType.F64:
-            packet_body += struct.pack("<d", value)
-        elif type == DataType.STRING:
-            packet_body += write_string(value)
-        elif type == DataType.I32_LIST_I16_LEN:
-            packet_body += write_i32_list_i16_len(value)
-        elif type == DataType.OSU_MESSAGE:
-            packet_body += write_osu_message(value)
-        elif type == DataType.OSU_MATCH:
-            packet_body += write_osu_match(*value)
-        elif type == DataType.OSU_SCOREFRAME:
-            packet_body += write_osu_score_frame(value)
-        elif type == DataType.OSU_REPLAY_FRAME_BUNDLE:
-            packet_body += write_replay_frame_bundle(value)
-        elif type == DataType.RAW_DATA:
-            packet_body += value
-        else:
+        primitive_format = PRIMITIVE_FORMATS.get(type)
+        if primitive_format is not None:
+            packet_body += struct.pack("<" + primitive_format, value)
+            continue
+
+        encoder = VARIABLE_LENGTH_ENCODERS.get(type)
+        if encoder is None:
             raise RuntimeError("Unknown packet type")
 
+        packet_body += encoder(value)
+
     # packet header
-    packet_header = struct.pack("<HxL", packet_id, len(packet_body))
+    packet_header = PACKET_HEADER.pack(packet_id, len(packet_body))
 
     return packet_header + packet_body
 
 
+# compiled packet encoders
+# each server packet's schema is declared once in SERVER_PACKET_SCHEMAS, and
+# is compiled at import time into an encoder specialised for its layout:
+# runs of primitive fields are packed with a single precomputed struct.Struct,
+# and only the variable length fields (strings, lists, etc.) are encoded
+# individually. the result is joined into the packet in one allocation.
+
+PacketEncoder = Callable[..., bytes]
+
+
+def compile_packet_encoder(
+    packet_id: int,
+    schema: tuple[DataType, ...],
+) -> PacketEncoder:
+    # packets without any data are always the same bytes
+    if not schema:
+        packet_data = PACKET_HEADER.pack(packet_id, 0)
+        return lambda: packet_data
+
+    # packets with only primitive fields are a single struct, header included
+    if all(type in PRIMITIVE_FORMATS for type in schema):
+        packet_struct = struct.Struct(
+            PACKET_HEADER.format + "".join(PRIMITIVE_FORMATS[type] for type in schema)
+        )
+        packet_data_length = packet_struct.size - PACKET_HEADER.size
+
+        def encode_fixed_size_packet(*values: Any) -> bytes:
+            return packet_struct.pack(packet_id, packet_data_length, *values)
+
+        return encode_fixed_size_packet
+
+    # otherwise, split the schema into segments of (value count, encoder);
+    # either a run of primitives packed by one struct, or a variable length field
+    segments: list[tuple[int, Callable[..., bytes]]] = []
+    primitive_run = ""
+    for type in schema:
+        if type in PRIMITIVE_FORMATS:
+            primitive_run += PRIMITIVE_FORMATS[type]
+            continue
+
+        if type not in VARIABLE_LENGTH_ENCODERS:
+            raise RuntimeError("Unknown packet type")
+
+        if primitive_run:
+            segments.append(
+                (len(primitive_run), struct.Struct("<" + primitive_run).pack)
+            )
+            primitive_run = ""
+
+        segments.append((1, VARIABLE_LENGTH_ENCODERS[type]))
+
+    if primitive_run:
+        segments.append((len(primitive_run), struct.Struct("<" + primitive_run).pack))
+
+    def encode_variable_size_packet(*values: Any) -> bytes:
+        parts = [b""]  # reserved for the header
+        packet_data_length = 0
+        offset = 0
+        for value_count, encoder in segments:
+            part = encoder(*values[offset : offset + value_count])
+            parts.append(part)
+            packet_data_length += len(part)
+            offset += value_count
+
+        parts[0] = PACKET_HEADER.pack(packet_id, packet_data_length)
+        return b"".join(parts)
+
+    return encode_variable_size_packet
+
+
+SERVER_PACKET_SCHEMAS: dict[int, tuple[DataType, ...]] = {
+    ServerPackets.USER_ID: (DataType.I32,),
+    ServerPackets.SEND_MESSAGE: (
+        DataType.STRING,  # sender name
+        DataType.STRING,  # message content
+        DataType.STRING,  # recipient name
+        DataType.I32,  # sender id
+    ),
+    ServerPackets.USER_STATS: (
+        DataType.I32,  # account id
+        DataType.U8,  # action
+        DataType.STRING,  # info text
+        DataType.STRING,  # beatmap md5
+        DataType.I32,  # mods
+        DataType.U8,  # game mode
+        DataType.I32,  # beatmap id
+        DataType.I64,  # ranked score
+        DataType.F32,  # accuracy
+        DataType.I32,  # play count
+        DataType.I64,  # total score
+        DataType.I32,  # global rank
+        DataType.I16,  # performance points
+    ),
+    ServerPackets.USER_LOGOUT: (
+        DataType.I32,  # user id
+        DataType.U8,  # always 0
+    ),
+    ServerPackets.SPECTATOR_JOINED: (DataType.I32,),
+    ServerPackets.SPECTATOR_LEFT: (DataType.I32,),
+    ServerPackets.SPECTATE_FRAMES: (DataType.OSU_REPLAY_FRAME_BUNDLE,),
+    ServerPackets.SPECTATOR_CANT_SPECTATE: (DataType.I32,),
+    ServerPackets.NOTIFICATION: (DataType.STRING,),
+    ServerPackets.UPDATE_MATCH: (DataType.OSU_MATCH,),
+    ServerPackets.NEW_MATCH: (DataType.OSU_MATCH,),
+    ServerPackets.DISPOSE_MATCH: (DataType.I32,),
+    ServerPackets.MATCH_JOIN_SUCCESS: (DataType.OSU_MATCH,),
+    ServerPackets.MATCH_JOIN_FAIL: (),
+    ServerPackets.FELLOW_SPECTATOR_JOINED: (DataType.I32,),
+    ServerPackets.FELLOW_SPECTATOR_LEFT: (DataType.I32,),
+    ServerPackets.MATCH_START: (DataType.OSU_MATCH,),
+    ServerPackets.MATCH_SCORE_UPDATE: (DataType.RAW_DATA,),
+    ServerPackets.MATCH_TRANSFER_HOST: (),
+    ServerPackets.MATCH_ALL_PLAYERS_LOADED: (),
+    ServerPackets.MATCH_PLAYER_FAILED: (DataType.I32,),
+    ServerPackets.MATCH_COMPLETE: (),
+    ServerPackets.MATCH_SKIP: (),
+    ServerPackets.CHANNEL_JOIN_SUCCESS: (DataType.STRING,),
+    ServerPackets.CHANNEL_INFO: (
+        DataType.STRING,  # name
+        DataType.STRING,  # topic
+        DataType.U16,  # session count
+    ),
+    ServerPackets.CHANNEL_KICK: (DataType.STRING,),
+    ServerPackets.CHANNEL_AUTO_JOIN: (
+        DataType.STRING,  # name
+        DataType.STRING,  # topic
+        DataType.U16,  # session count
+    ),
+    ServerPackets.PRIVILEGES: (DataType.I32,),
+    ServerPackets.FRIENDS_LIST: (DataType.I32_LIST_I16_LEN,),
+    ServerPackets.PROTOCOL_VERSION: (DataType.I32,),
+    ServerPackets.MATCH_PLAYER_SKIPPED: (DataType.I32,),
+    ServerPackets.USER_PRESENCE: (
+        DataType.I32,  # account id
+        DataType.STRING,  # username
+        DataType.U8,  # utc offset
+        DataType.U8,  # country
+        DataType.U8,  # privileges & game mode
+        DataType.F32,  # longitude
+        DataType.F32,  # latitude
+        DataType.I32,  # global rank
+    ),
+    ServerPackets.RESTART: (DataType.I32,),
+    ServerPackets.CHANNEL_INFO_END: (),
+    ServerPackets.SILENCE_END: (DataType.I32,),
+    ServerPackets.USER_SILENCED: (DataType.I32,),
+    ServerPackets.USER_DM_BLOCKED: (DataType.OSU_MESSAGE,),
+    ServerPackets.TARGET_IS_SILENCED: (DataType.OSU_MESSAGE,),
+    ServerPackets.ACCOUNT_RESTRICTED: (),
+}
+
+SERVER_PACKET_ENCODERS: dict[int, PacketEncoder] = {
+    packet_id: compile_packet_encoder(packet_id, schema)
+    for packet_id, schema in SERVER_PACKET_SCHEMAS.items()
+}
+
+# packets with no data, or only a handful of possible values, encoded once
+
+CONSTANT_PACKETS: dict[int, bytes] = {
+    packet_id: SERVER_PACKET_ENCODERS[packet_id]()
+    for packet_id, schema in SERVER_PACKET_SCHEMAS.items()
+    if not schema
+}
+
+MATCH_SLOT_COUNT = 16
+
+_MATCH_PLAYER_FAILED_PACKETS = tuple(
+    SERVER_PACKET_ENCODERS[ServerPackets.MATCH_PLAYER_FAILED](slot_id)
+    for slot_id in range(MATCH_SLOT_COUNT)
+)
+_MATCH_PLAYER_SKIPPED_PACKETS = tuple(
+    SERVER_PACKET_ENCODERS[ServerPackets.MATCH_PLAYER_SKIPPED](slot_id)
+    for slot_id in range(MATCH_SLOT_COUNT)
+)
+_RESTART_NOW_PACKET = SERVER_PACKET_ENCODERS[ServerPackets.RESTART](0)
+
+
 # USER_ID = 5
 
 
 def write_user_id_packet(user_id: int) -> bytes:
-    return write_packet(
-        packet_id=ServerPackets.USER_ID,
-        packet_data_inputs=[(DataType.I32, user_id)],
-    )
+    return SERVER_PACKET_ENCODERS[ServerPackets.USER_ID](user_id)
 
 
 # SEND_MESSAGE = 7
@@ -659,14 +978,11 @@ def write_send_message_packet(
     recipient_name: str,
     sender_id: int,
 ) -> bytes:
-    return write_packet(
-        packet_id=ServerPackets.SEND_MESSAGE,
-        packet_data_inputs=[
-            (DataType.STRING, sender_name),
-            (DataType.STRING, message_content),
-            (DataType.STRING, recipient_name),
-            (DataType.I32, sender_id),
-        ],
+    return SERVER_PACKET_ENCODERS[ServerPackets.SEND_MESSAGE](
+        sender_name,
+        message_content,
+        recipient_name,
+        sender_id,
     )
 
 
@@ -697,23 +1013,20 @@ def write_user_stats_packet(
     global_rank: int,
     performance_points: int,
 ) -> bytes:
-    return write_packet(
-        packet_id=ServerPackets.USER_STATS,
-        packet_data_inputs=[
-            (DataType.I32, account_id),
-            (DataType.U8, action),
-            (DataType.STRING, info_text),
-            (DataType.STRING, beatmap_md5),
-            (DataType.I32, mods),
-            (DataType.U8, game_mode),
-            (DataType.I32, beatmap_id),
-            (DataType.I64, ranked_score),
-            (DataType.F32, accuracy / 100.0),
-            (DataType.I32, play_count),
-            (DataType.I64, total_score),
-            (DataType.I32, global_rank),
-            (DataType.I16, performance_points),
-        ],
+    return SERVER_PACKET_ENCODERS[ServerPackets.USER_STATS](
+        account_id,
+        action,
+        info_text,
+        beatmap_md5,
+        mods,
+        game_mode,
+        beatmap_id,
+        ranked_score,
+        accuracy / 100.0,
+        play_count,
+        total_score,
+        global_rank,
+        performance_points,
     )
 
 
@@ -721,45 +1034,41 @@ def write_user_stats_packet(
 
 
 def write_logout_packet(user_id: int) -> bytes:
-    return write_packet(
-        packet_id=ServerPackets.USER_LOGOUT,
-        packet_data_inputs=[
-            (DataType.I32, user_id),
-            (DataType.U8, 0),
-        ],
-    )
+    return SERVER_PACKET_ENCODERS[ServerPackets.USER_LOGOUT](user_id, 0)
 
 
 # SPECTATOR_JOINED = 13
 
 
 def write_spectator_joined_packet(user_id: int) -> bytes:
-    return write_packet(
-        packet_id=ServerPackets.SPECTATOR_JOINED,
-        packet_data_inputs=[(DataType.I32, user_id)],
-    )
+    return SERVER_PACKET_ENCODERS[ServerPackets.SPECTATOR_JOINED](user_id)
 
 
 # SPECTATOR_LEFT = 14
 
 
 def write_spectator_left_packet(user_id: int) -> bytes:
-    return write_packet(
-        packet_id=ServerPackets.SPECTATOR_LEFT,
-        packet_data_inputs=[(DataType.I32, user_id)],
-    )
+    return SERVER_PACKET_ENCODERS[ServerPackets.SPECTATOR_LEFT](user_id)
 
 
 # SPECTATE_FRAMES = 15
 
 
 def write_spectate_frames_packet(replay_frame_bundle: OsuReplayFrameBundle) -> bytes:
-    return write_packet(
-        packet_id=ServerPackets.SPECTATE_FRAMES,
-        packet_data_inputs=[
-            (DataType.OSU_REPLAY_FRAME_BUNDLE, replay_frame_bundle),
-        ],
+    return SERVER_PACKET_ENCODERS[ServerPackets.SPECTATE_FRAMES](replay_frame_bundle)
+
+
+def write_relayed_spectate_frames_packet(
+    replay_frame_bundle_data: bytes | memoryview,
+) -> bytes:
+    # forward the client's bundle, with its extra zeroed as when re-encoded
+    packet_data = bytearray(PACKET_HEADER.size + len(replay_frame_bundle_data))
+    PACKET_HEADER.pack_into(
+        packet_data, 0, ServerPackets.SPECTATE_FRAMES, len(replay_frame_bundle_data)
     )
+    packet_data[PACKET_HEADER.size :] = replay_frame_bundle_data
+    _I32.pack_into(packet_data, PACKET_HEADER.size, 0)  # extra
+    return bytes(packet_data)
 
 
 # VERSION_UPDATE = 19
@@ -769,10 +1078,7 @@ def write_spectate_frames_packet(replay_frame_bundle: OsuReplayFrameBundle) -> b
 
 
 def write_spectator_cant_spectate_packet(user_id: int) -> bytes:
-    return write_packet(
-        packet_id=ServerPackets.SPECTATOR_CANT_SPECTATE,
-        packet_data_inputs=[(DataType.I32, user_id)],
-    )
+    return SERVER_PACKET_ENCODERS[ServerPackets.SPECTATOR_CANT_SPECTATE](user_id)
 
 
 # GET_ATTENTION = 23
@@ -784,12 +1090,7 @@ def write_spectator_cant_spectate_packet(user_id: int) -> bytes:
 def write_notification_packet(
     message: str,
 ) -> bytes:
-    return write_packet(
-        packet_id=ServerPackets.NOTIFICATION,
-        packet_data_inputs=[
-            (DataType.STRING, message),
-        ],
-    )
+    return SERVER_PACKET_ENCODERS[ServerPackets.NOTIFICATION](message)
 
 
 # UPDATE_MATCH = 26
@@ -799,11 +1100,8 @@ def write_update_match_packet(
     match_data: OsuMatch,
     should_send_password: bool,
 ) -> bytes:
-    return write_packet(
-        packet_id=ServerPackets.UPDATE_MATCH,
-        packet_data_inputs=[
-            (DataType.OSU_MATCH, (match_data, should_send_password)),
-        ],
+    return SERVER_PACKET_ENCODERS[ServerPackets.UPDATE_MATCH](
+        (match_data, should_send_password)
     )
 
 
@@ -811,24 +1109,14 @@ def write_update_match_packet(
 
 
 def write_new_match_packet(match_data: OsuMatch) -> bytes:
-    return write_packet(
-        packet_id=ServerPackets.NEW_MATCH,
-        packet_data_inputs=[
-            (DataType.OSU_MATCH, match_data),
-        ],
-    )
+    return SERVER_PACKET_ENCODERS[ServerPackets.NEW_MATCH]((match_data, False))
 
 
 # DISPOSE_MATCH = 28
 
 
 def write_dispose_match_packet(match_id: int) -> bytes:
-    return write_packet(
-        ServerPackets.DISPOSE_MATCH,
-        packet_data_inputs=[
-            (DataType.I32, match_id),
-        ],
-    )
+    return SERVER_PACKET_ENCODERS[ServerPackets.DISPOSE_MATCH](match_id)
 
 
 # TOGGLE_BLOCK_NON_FRIEND_DMS = 34
@@ -841,11 +1129,8 @@ def write_match_join_success_packet(
     match_data: OsuMatch,
     should_send_password: bool,
 ) -> bytes:
-    return write_packet(
-        packet_id=ServerPackets.MATCH_JOIN_SUCCESS,
-        packet_data_inputs=[
-            (DataType.OSU_MATCH, (match_data, should_send_password)),
-        ],
+    return SERVER_PACKET_ENCODERS[ServerPackets.MATCH_JOIN_SUCCESS](
+        (match_data, should_send_password)
     )
 
 
@@ -853,30 +1138,21 @@ def write_match_join_success_packet(
 
 
 def write_match_join_fail_packet() -> bytes:
-    return write_packet(
-        packet_id=ServerPackets.MATCH_JOIN_FAIL,
-        packet_data_inputs=[],
-    )
+    return CONSTANT_PACKETS[ServerPackets.MATCH_JOIN_FAIL]
 
 
 # FELLOW_SPECTATOR_JOINED = 42
 
 
 def write_fellow_spectator_joined_packet(user_id: int) -> bytes:
-    return write_packet(
-        packet_id=ServerPackets.FELLOW_SPECTATOR_JOINED,
-        packet_data_inputs=[(DataType.I32, user_id)],
-    )
+    return SERVER_PACKET_ENCODERS[ServerPackets.FELLOW_SPECTATOR_JOINED](user_id)
 
 
 # FELLOW_SPECTATOR_LEFT = 43
 
 
 def write_fellow_spectator_left_packet(user_id: int) -> bytes:
-    return write_packet(
-        packet_id=ServerPackets.FELLOW_SPECTATOR_LEFT,
-        packet_data_inputs=[(DataType.I32, user_id)],
-    )
+    return SERVER_PACKET_ENCODERS[ServerPackets.FELLOW_SPECTATOR_LEFT](user_id)
 
 
 # ALL_PLAYERS_LOADED = 45
@@ -889,11 +1165,8 @@ def write_match_start_packet(
     match_data: OsuMatch,
     should_send_password: bool,
 ) -> bytes:
-    return write_packet(
-        packet_id=ServerPackets.MATCH_START,
-        packet_data_inputs=[
-            (DataType.OSU_MATCH, (match_data, should_send_password)),
-        ],
+    return SERVER_PACKET_ENCODERS[ServerPackets.MATCH_START](
+        (match_data, should_send_password)
     )
 
 
@@ -901,64 +1174,58 @@ def write_match_start_packet(
 
 
 def write_match_score_update_packet(data: bytes) -> bytes:
-    return write_packet(
-        packet_id=ServerPackets.MATCH_SCORE_UPDATE,
-        packet_data_inputs=[
-            (DataType.RAW_DATA, data),
-        ],
+    return SERVER_PACKET_ENCODERS[ServerPackets.MATCH_SCORE_UPDATE](data)
+
+
+def write_relayed_match_score_update_packet(
+    score_frame_data: bytes | memoryview,
+    slot_id: int,
+) -> bytes:
+    # forward the client's score frame, with its id replaced by the slot id
+    packet_data = bytearray(PACKET_HEADER.size + len(score_frame_data))
+    PACKET_HEADER.pack_into(
+        packet_data, 0, ServerPackets.MATCH_SCORE_UPDATE, len(score_frame_data)
     )
+    packet_data[PACKET_HEADER.size :] = score_frame_data
+    _U8.pack_into(packet_data, PACKET_HEADER.size + _I32.size, slot_id)  # after time
+    return bytes(packet_data)
 
 
 # MATCH_TRANSFER_HOST = 50
 
 
 def write_match_transfer_host_packet() -> bytes:
-    return write_packet(
-        packet_id=ServerPackets.MATCH_TRANSFER_HOST,
-        packet_data_inputs=[],
-    )
+    return CONSTANT_PACKETS[ServerPackets.MATCH_TRANSFER_HOST]
 
 
 # MATCH_ALL_PLAYERS_LOADED = 53
 
 
 def write_match_all_players_loaded_packet() -> bytes:
-    return write_packet(
-        packet_id=ServerPackets.MATCH_ALL_PLAYERS_LOADED,
-        packet_data_inputs=[],
-    )
+    return CONSTANT_PACKETS[ServerPackets.MATCH_ALL_PLAYERS_LOADED]
 
 
 # MATCH_PLAYER_FAILED = 57
 
 
 def write_match_player_failed_packet(slot_id: int) -> bytes:
-    return write_packet(
-        packet_id=ServerPackets.MATCH_PLAYER_FAILED,
-        packet_data_inputs=[
-            (DataType.I32, slot_id),
-        ],
-    )
+    if 0 <= slot_id < MATCH_SLOT_COUNT:
+        return _MATCH_PLAYER_FAILED_PACKETS[slot_id]
+    return SERVER_PACKET_ENCODERS[ServerPackets.MATCH_PLAYER_FAILED](slot_id)
 
 
 # MATCH_COMPLETE = 58
 
 
 def write_match_complete_packet() -> bytes:
-    return write_packet(
-        packet_id=ServerPackets.MATCH_COMPLETE,
-        packet_data_inputs=[],
-    )
+    return CONSTANT_PACKETS[ServerPackets.MATCH_COMPLETE]
 
 
 # MATCH_SKIP = 61
 
 
 def write_match_skip_packet() -> bytes:
-    return write_packet(
-        packet_id=ServerPackets.MATCH_SKIP,
-        packet_data_inputs=[],
-    )
+    return CONSTANT_PACKETS[ServerPackets.MATCH_SKIP]
 
 
 # UNAUTHORIZED = 62  # unused
@@ -968,10 +1235,7 @@ def write_match_skip_packet() -> bytes:
 
 
 def write_channel_join_success_packet(channel_name: str) -> bytes:
-    return write_packet(
-        packet_id=ServerPackets.CHANNEL_JOIN_SUCCESS,
-        packet_data_inputs=[(DataType.STRING, channel_name)],
-    )
+    return SERVER_PACKET_ENCODERS[ServerPackets.CHANNEL_JOIN_SUCCESS](channel_name)
 
 
 # CHANNEL_INFO = 65
@@ -982,13 +1246,10 @@ def write_channel_info_packet(
     topic: str,
     num_sessions: int,
 ) -> bytes:
-    return write_packet(
-        packet_id=ServerPackets.CHANNEL_INFO,
-        packet_data_inputs=[
-            (DataType.STRING, name),
-            (DataType.STRING, topic),
-            (DataType.U16, num_sessions),
-        ],
+    return SERVER_PACKET_ENCODERS[ServerPackets.CHANNEL_INFO](
+        name,
+        topic,
+        num_sessions,
     )
 
 
@@ -996,12 +1257,7 @@ def write_channel_info_packet(
 
 
 def write_channel_kick_packet(channel_name: str) -> bytes:
-    return write_packet(
-        packet_id=ServerPackets.CHANNEL_KICK,
-        packet_data_inputs=[
-            (DataType.STRING, channel_name),
-        ],
-    )
+    return SERVER_PACKET_ENCODERS[ServerPackets.CHANNEL_KICK](channel_name)
 
 
 # CHANNEL_AUTO_JOIN = 67
@@ -1012,13 +1268,10 @@ def write_channel_auto_join_packet(
     topic: str,
     session_count: int,
 ) -> bytes:
-    return write_packet(
-        packet_id=ServerPackets.CHANNEL_AUTO_JOIN,
-        packet_data_inputs=[
-            (DataType.STRING, name),
-            (DataType.STRING, topic),
-            (DataType.U16, session_count),
-        ],
+    return SERVER_PACKET_ENCODERS[ServerPackets.CHANNEL_AUTO_JOIN](
+        name,
+        topic,
+        session_count,
     )
 
 
@@ -1029,30 +1282,21 @@ def write_channel_auto_join_packet(
 
 
 def write_user_privileges_packet(privileges: int) -> bytes:
-    return write_packet(
-        packet_id=ServerPackets.PRIVILEGES,
-        packet_data_inputs=[(DataType.I32, privileges)],
-    )
+    return SERVER_PACKET_ENCODERS[ServerPackets.PRIVILEGES](privileges)
 
 
 # FRIENDS_LIST = 72
 
 
 def write_friends_list_packet(user_ids: list[int]) -> bytes:
-    return write_packet(
-        packet_id=ServerPackets.FRIENDS_LIST,
-        packet_data_inputs=[(DataType.I32_LIST_I16_LEN, user_ids)],
-    )
+    return SERVER_PACKET_ENCODERS[ServerPackets.FRIENDS_LIST](user_ids)
 
 
 # PROTOCOL_VERSION = 75
 
 
 def write_protocol_version_packet(version: int) -> bytes:
-    return write_packet(
-        packet_id=ServerPackets.PROTOCOL_VERSION,
-        packet_data_inputs=[(DataType.I32, version)],
-    )
+    return SERVER_PACKET_ENCODERS[ServerPackets.PROTOCOL_VERSION](version)
 
 
 # MAIN_MENU_ICON = 76
@@ -1065,10 +1309,9 @@ def write_protocol_version_packet(version: int) -> bytes:
 
 
 def write_match_player_skipped_packet(slot_id: int) -> bytes:
-    return write_packet(
-        packet_id=ServerPackets.MATCH_PLAYER_SKIPPED,
-        packet_data_inputs=[(DataType.I32, slot_id)],
-    )
+    if 0 <= slot_id < MATCH_SLOT_COUNT:
+        return _MATCH_PLAYER_SKIPPED_PACKETS[slot_id]
+    return SERVER_PACKET_ENCODERS[ServerPackets.MATCH_PLAYER_SKIPPED](slot_id)
 
 
 # USER_PRESENCE = 83
@@ -1085,18 +1328,15 @@ def write_user_presence_packet(
     longitude: int,
     global_rank: int,
 ) -> bytes:
-    return write_packet(
-        packet_id=ServerPackets.USER_PRESENCE,
-        packet_data_inputs=[
-            (DataType.I32, account_id),
-            (DataType.STRING, username),
-            (DataType.U8, utc_offset + 24),
-            (DataType.U8, country),
-            (DataType.U8, privileges | (game_mode << 5)),
-            (DataType.F32, longitude),
-            (DataType.F32, latitude),
-            (DataType.I32, global_rank),
-        ],
+    return SERVER_PACKET_ENCODERS[ServerPackets.USER_PRESENCE](
+        account_id,
+        username,
+        utc_offset + 24,
+        country,
+        privileges | (game_mode << 5),
+        longitude,
+        latitude,
+        global_rank,
     )
 
 
@@ -1104,10 +1344,9 @@ def write_user_presence_packet(
 
 
 def write_restart_packet(millseconds_until_restart: int) -> bytes:
-    return write_packet(
-        packet_id=ServerPackets.RESTART,
-        packet_data_inputs=[(DataType.I32, millseconds_until_restart)],
-    )
+    if millseconds_until_restart == 0:
+        return _RESTART_NOW_PACKET
+    return SERVER_PACKET_ENCODERS[ServerPackets.RESTART](millseconds_until_restart)
 
 
 # MATCH_INVITE = 88
@@ -1117,10 +1356,7 @@ def write_restart_packet(millseconds_until_restart: int) -> bytes:
 
 
 def write_channel_listing_complete_packet() -> bytes:
-    return write_packet(
-        packet_id=ServerPackets.CHANNEL_INFO_END,
-        packet_data_inputs=[],
-    )
+    return CONSTANT_PACKETS[ServerPackets.CHANNEL_INFO_END]
 
 
 # MATCH_CHANGE_PASSWORD = 91
@@ -1130,20 +1366,14 @@ def write_channel_listing_complete_packet() -> bytes:
 
 
 def write_silence_end_packet(seconds_remaining: int) -> bytes:
-    return write_packet(
-        packet_id=ServerPackets.SILENCE_END,
-        packet_data_inputs=[(DataType.I32, seconds_remaining)],
-    )
+    return SERVER_PACKET_ENCODERS[ServerPackets.SILENCE_END](seconds_remaining)
 
 
 # USER_SILENCED = 94
 
 
 def write_user_silenced_packet(user_id: int) -> bytes:
-    return write_packet(
-        packet_id=ServerPackets.USER_SILENCED,
-        packet_data_inputs=[(DataType.I32, user_id)],
-    )
+    return SERVER_PACKET_ENCODERS[ServerPackets.USER_SILENCED](user_id)
 
 
 # USER_PRESENCE_SINGLE = 95
@@ -1162,10 +1392,7 @@ def write_user_dm_blocked_packet(username: str) -> bytes:
         message_content="",
         recipient_name=username,
     )
-    return write_packet(
-        packet_id=ServerPackets.USER_DM_BLOCKED,
-        packet_data_inputs=[(DataType.OSU_MESSAGE, message)],
-    )
+    return SERVER_PACKET_ENCODERS[ServerPackets.USER_DM_BLOCKED](message)
 
 
 # TARGET_IS_SILENCED = 101
@@ -1178,10 +1405,7 @@ def write_target_is_silenced_packet(username: str) -> bytes:
         message_content="",
         recipient_name=username,
     )
-    return write_packet(
-        packet_id=ServerPackets.TARGET_IS_SILENCED,
-        packet_data_inputs=[(DataType.OSU_MESSAGE, message)],
-    )
+    return SERVER_PACKET_ENCODERS[ServerPackets.TARGET_IS_SILENCED](message)
 
 
 # VERSION_UPDATE_FORCED = 102
@@ -1194,10 +1418,7 @@ def write_target_is_silenced_packet(username: str) -> bytes:
 
 
 def write_account_restricted_packet() -> bytes:
-    return write_packet(
-        packet_id=ServerPackets.ACCOUNT_RESTRICTED,
-        packet_data_inputs=[],
-    )
+    return CONSTANT_PACKETS[ServerPackets.ACCOUNT_RESTRICTED]
 
 
 # RTX = 105  # unused
@@ -0,0 +1,111 @@
+from collections.abc import Sequence
+from typing import TYPE_CHECKING
+
+from app import game_modes
+from app import geolocation
+from app import packets
+from app import privileges
+from app import ranking
+from app.repositories import presence_packets
+from app.repositories import stats
+from app.repositories.presence_packets import PresencePackets
+
+if TYPE_CHECKING:
+    from app.repositories.osu_sessions import OsuSession
+
+
+async def fetch_packets(
+    osu_session: "OsuSession",
+    game_mode: int | None = None,
+) -> PresencePackets | None:
+    """Fetch a session's encoded presence & stats packets, encoding them if stale.
+
+    The packets carry the stats of the session's game mode, unless another is given.
+    """
+    if game_mode is None:
+        game_mode = osu_session["game_mode"]
+
+    cached_packets = await presence_packets.fetch_one(
+        osu_session["account_id"],
+        game_mode,
+    )
+    if cached_packets is not None:
+        return cached_packets
+
+    return await _encode_packets(osu_session, game_mode)
+
+
+async def fetch_many_packets(
+    osu_sessions: Sequence["OsuSession"],
+) -> list[PresencePackets | None]:
+    """Fetch many sessions' encoded packets, reading the cached ones in one round trip."""
+    all_cached_packets = await presence_packets.fetch_many(
+        [
+            (osu_session["account_id"], osu_session["game_mode"])
+            for osu_session in osu_sessions
+        ]
+    )
+
+    all_packets = []
+    for osu_session, cached_packets in zip(osu_sessions, all_cached_packets):
+        if cached_packets is None:
+            cached_packets = await _encode_packets(
+                osu_session,
+                osu_session["game_mode"],
+            )
+        all_packets.append(cached_packets)
+
+    return all_packets
+
+
+async def _encode_packets(
+    osu_session: "OsuSession",
+    game_mode: int,
+) -> PresencePackets | None:
+    account_id = osu_session["account_id"]
+
+    # read the version first; if it's bumped while we encode, our packets are
+    # stored as stale and will be encoded again by the next reader
+    version = await presence_packets.fetch_version(account_id)
+
+    own_stats = await stats.fetch_one(account_id, game_mode)
+    if own_stats is None:
+        return None
+
+    global_rank = await ranking.get_global_rank(account_id, game_mode)
+    vanilla_game_mode = game_modes.for_client(game_mode)
+
+    presence_packet = packets.write_user_presence_packet(
+        account_id,
+        osu_session["username"],
+        osu_session["utc_offset"],
+        geolocation.country_str_to_int(osu_session["country"]),
+        privileges.server_to_client_privileges(osu_session["privileges"]),
+        vanilla_game_mode,
+        int(osu_session["latitude"]),
+        int(osu_session["longitude"]),
+        global_rank,
+    )
+    stats_packet = packets.write_user_stats_packet(
+        account_id,
+        osu_session["action"],
+        osu_session["info_text"],
+        osu_session["beatmap_md5"],
+        osu_session["mods"],
+        vanilla_game_mode,
+        osu_session["beatmap_id"],
+        own_stats["ranked_score"],
+        own_stats["accuracy"],
+        own_stats["play_count"],
+        own_stats["total_score"],
+        global_rank,
+        own_stats["performance_points"],
+    )
+
+    return await presence_packets.create(
+        account_id,
+        game_mode,
+        version,
+        presence_packet,
+        stats_packet,
+    )
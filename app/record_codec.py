@@ -0,0 +1,346 @@
+import json
+import struct
+import uuid
+from collections.abc import Callable
+from collections.abc import Iterable
+from collections.abc import Mapping
+from collections.abc import Sequence
+from datetime import datetime
+from datetime import timedelta
+from typing import Any
+from typing import NamedTuple
+
+# a compact, versioned binary encoding for the records kept in redis. each
+# record type declares a schema of its fields & their types, & is encoded as
+#
+#   version (u8) | null bitmap | fixed-size fields | string end offsets | strings
+#
+# so that any single field can be read without decoding the rest. timestamps
+# are stored as milliseconds since the epoch, & uuids as their 16 bytes.
+#
+# records stored as redis hashes encode each field's value on its own instead;
+# numbers stay decimal there, so that redis (& our scripts) can work with them
+#
+# records were stored as json objects before; they're still decoded, as they
+# start with "{", which is never a version byte
+_JSON_PREFIX = b"{"
+
+
+def _identity(value: Any) -> Any:
+    return value
+
+
+# our datetimes are naive (as from datetime.now()), so they're stored as they
+# are, rather than converted to & from utc through the local timezone
+_EPOCH = datetime(1970, 1, 1)
+_MILLISECOND = timedelta(milliseconds=1)
+
+
+def _to_epoch_ms(value: datetime) -> int:
+    return (value - _EPOCH) // _MILLISECOND
+
+
+def _from_epoch_ms(epoch_ms: int) -> datetime:
+    return _EPOCH + timedelta(milliseconds=epoch_ms)
+
+
+_EPOCH_MS = struct.Struct("<q")
+
+
+class FieldType(NamedTuple):
+    # the struct format of fixed-size types; None for strings
+    format: str | None
+    # what's packed in place of null values of fixed-size types
+    null_value: Any
+    to_packed: Callable[[Any], Any]
+    from_packed: Callable[[Any], Any]
+    # single values, e.g. as redis hash fields
+    encode_value: Callable[[Any], bytes]
+    decode_value: Callable[[bytes], Any]
+    # values of json records
+    from_json: Callable[[Any], Any]
+
+
+INT = FieldType(
+    format="q",
+    null_value=0,
+    to_packed=_identity,
+    from_packed=_identity,
+    encode_value=lambda value: str(value).encode(),
+    decode_value=int,
+    from_json=int,
+)
+FLOAT = FieldType(
+    format="d",
+    null_value=0.0,
+    to_packed=_identity,
+    from_packed=_identity,
+    encode_value=lambda value: repr(value).encode(),
+    decode_value=float,
+    from_json=float,
+)
+BOOL = FieldType(
+    format="?",
+    null_value=False,
+    to_packed=_identity,
+    from_packed=_identity,
+    encode_value=lambda value: b"1" if value else b"0",
+    decode_value=lambda raw_value: raw_value == b"1",
+    from_json=bool,
+)
+UUID = FieldType(
+    format="16s",
+    null_value=bytes(16),
+    to_packed=lambda value: value.bytes,
+    from_packed=lambda packed: uuid.UUID(bytes=packed),
+    encode_value=lambda value: value.bytes,
+    decode_value=lambda raw_value: uuid.UUID(bytes=raw_value),
+    from_json=uuid.UUID,
+)
+DATETIME = FieldType(
+    format="q",
+    null_value=0,
+    to_packed=_to_epoch_ms,
+    from_packed=_from_epoch_ms,
+    encode_value=lambda value: _EPOCH_MS.pack(_to_epoch_ms(value)),
+    decode_value=lambda raw_value: _from_epoch_ms(_EPOCH_MS.unpack(raw_value)[0]),
+    from_json=datetime.fromisoformat,
+)
+STR = FieldType(
+    format=None,
+    null_value=None,
+    to_packed=str.encode,
+    from_packed=bytes.decode,
+    encode_value=str.encode,
+    decode_value=bytes.decode,
+    from_json=str,
+)
+
+
+class Field(NamedTuple):
+    name: str
+    type: FieldType
+    nullable: bool = False
+
+
+_NULL_BITMAP_FORMATS = ["B", "H", "I", "Q"]
+
+
+class RecordSchema:
+    def __init__(self, version: int, fields: Sequence[Field]) -> None:
+        if not 0 < version < _JSON_PREFIX[0]:
+            raise ValueError(f"Unsupported record version {version}")
+
+        self.version = version
+        self.fields = {field.name: field for field in fields}
+        self._hash_field_decoders = [
+            (field.name, field.name.encode(), field.type.decode_value)
+            for field in fields
+        ]
+
+        nullable_fields = [field.name for field in fields if field.nullable]
+        self._null_bits = {
+            field_name: 1 << bit for bit, field_name in enumerate(nullable_fields)
+        }
+        null_bitmap_format = next(
+            format
+            for format in _NULL_BITMAP_FORMATS
+            if struct.calcsize(format) * 8 >= len(nullable_fields)
+        )
+
+        self._fixed_fields = [field for field in fields if field.type.format]
+        self._string_fields = [field for field in fields if not field.type.format]
+
+        header_format = "<B" + null_bitmap_format
+        self._null_bitmap = struct.Struct("<" + null_bitmap_format)
+
+        # (offset, struct) of each fixed-size field, for reading it alone
+        self._fixed_field_readers: dict[str, tuple[int, struct.Struct]] = {}
+        for field in self._fixed_fields:
+            assert field.type.format is not None
+            self._fixed_field_readers[field.name] = (
+                struct.calcsize(header_format),
+                struct.Struct("<" + field.type.format),
+            )
+            header_format += field.type.format
+
+        # (offset of its end offset, offset of the previous one) of each string
+        string_end_offsets_start = struct.calcsize(header_format)
+        self._string_field_readers: dict[str, tuple[int, int | None]] = {}
+        for index, field in enumerate(self._string_fields):
+            end_offset_offset = string_end_offsets_start + index * 4
+            self._string_field_readers[field.name] = (
+                end_offset_offset,
+                end_offset_offset - 4 if index > 0 else None,
+            )
+        header_format += "I" * len(self._string_fields)
+
+        # (name, null bit or 0, from_packed) of each field, in packed order
+        self._fixed_field_decoders = [
+            (field.name, self._null_bits.get(field.name, 0), field.type.from_packed)
+            for field in self._fixed_fields
+        ]
+        self._string_field_decoders = [
+            (field.name, self._null_bits.get(field.name, 0), field.type.from_packed)
+            for field in self._string_fields
+        ]
+
+        self._header = struct.Struct(header_format)
+        self._string_offset = struct.Struct("<I")
+
+    def _null_bit(self, field_name: str) -> int:
+        null_bit = self._null_bits.get(field_name)
+        if null_bit is None:
+            raise ValueError(f"{field_name} cannot be null")
+        return null_bit
+
+    def encode(self, record: Mapping[str, Any]) -> bytes:
+        null_bitmap = 0
+
+        fixed_values = []
+        for field in self._fixed_fields:
+            value = record[field.name]
+            if value is None:
+                null_bitmap |= self._null_bit(field.name)
+                fixed_values.append(field.type.null_value)
+            else:
+                fixed_values.append(field.type.to_packed(value))
+
+        strings = []
+        string_end_offsets = []
+        string_end_offset = 0
+        for field in self._string_fields:
+            value = record[field.name]
+            if value is None:
+                null_bitmap |= self._null_bit(field.name)
+            else:
+                string = field.type.to_packed(value)
+                strings.append(string)
+                string_end_offset += len(string)
+            string_end_offsets.append(string_end_offset)
+
+        return self._header.pack(
+            self.version,
+            null_bitmap,
+            *fixed_values,
+            *string_end_offsets,
+        ) + b"".join(strings)
+
+    def _check_version(self, raw_record: bytes) -> None:
+        if raw_record[0] != self.version:
+            raise ValueError(
+                f"Unsupported record version {raw_record[0]} (expected {self.version})"
+            )
+
+    def decode(self, raw_record: bytes) -> dict[str, Any]:
+        if raw_record[:1] == _JSON_PREFIX:
+            return self.decode_json(raw_record)
+
+        self._check_version(raw_record)
+
+        _, null_bitmap, *values = self._header.unpack_from(raw_record)
+
+        record: dict[str, Any] = {}
+        for (field_name, null_bit, from_packed), value in zip(
+            self._fixed_field_decoders,
+            values,
+        ):
+            record[field_name] = None if null_bitmap & null_bit else from_packed(value)
+
+        header_size = self._header.size
+        string_start = header_size
+        for (field_name, null_bit, from_packed), string_end_offset in zip(
+            self._string_field_decoders,
+            values[len(self._fixed_field_decoders) :],
+        ):
+            string_end = header_size + string_end_offset
+            record[field_name] = (
+                None
+                if null_bitmap & null_bit
+                else from_packed(raw_record[string_start:string_end])
+            )
+            string_start = string_end
+
+        return record
+
+    def decode_field(self, raw_record: bytes, field_name: str) -> Any:
+        """Decode a single field of a record, without decoding the rest."""
+        if raw_record[:1] == _JSON_PREFIX:
+            return self.decode_json(raw_record)[field_name]
+
+        self._check_version(raw_record)
+
+        null_bit = self._null_bits.get(field_name, 0)
+        if null_bit and self._null_bitmap.unpack_from(raw_record, 1)[0] & null_bit:
+            return None
+
+        field = self.fields[field_name]
+
+        fixed_field_reader = self._fixed_field_readers.get(field_name)
+        if fixed_field_reader is not None:
+            offset, field_struct = fixed_field_reader
+            return field.type.from_packed(
+                field_struct.unpack_from(raw_record, offset)[0]
+            )
+
+        end_offset_offset, start_offset_offset = self._string_field_readers[field_name]
+        string_start = self._header.size
+        if start_offset_offset is not None:
+            string_start += self._string_offset.unpack_from(
+                raw_record, start_offset_offset
+            )[0]
+        string_end = (
+            self._header.size
+            + self._string_offset.unpack_from(raw_record, end_offset_offset)[0]
+        )
+        return field.type.from_packed(raw_record[string_start:string_end])
+
+    def decode_json(self, raw_record: bytes) -> dict[str, Any]:
+        """Decode a record stored as json, before this encoding.
+
+        Fields it didn't store are None.
+        """
+        json_record = json.loads(raw_record)
+        return {
+            field_name: (
+                field.type.from_json(json_record[field_name])
+                if json_record.get(field_name) is not None
+                else None
+            )
+            for field_name, field in self.fields.items()
+        }
+
+    def encode_values(self, values: Mapping[str, Any]) -> dict[str, bytes]:
+        """Encode field values on their own, e.g. as redis hash fields.
+
+        Null values are left out.
+        """
+        return {
+            field_name: self.fields[field_name].type.encode_value(value)
+            for field_name, value in values.items()
+            if value is not None
+        }
+
+    def decode_values(
+        self,
+        field_names: Iterable[str],
+        raw_values: Iterable[bytes | None],
+    ) -> dict[str, Any]:
+        return {
+            field_name: (
+                self.fields[field_name].type.decode_value(raw_value)
+                if raw_value is not None
+                else None
+            )
+            for field_name, raw_value in zip(field_names, raw_values)
+        }
+
+    def decode_hash(self, raw_hash: Mapping[bytes, bytes]) -> dict[str, Any]:
+        """Decode a record stored as a redis hash of its encoded values."""
+        record = {}
+        for field_name, raw_field_name, decode_value in self._hash_field_decoders:
+            raw_value = raw_hash.get(raw_field_name)
+            record[field_name] = (
+                decode_value(raw_value) if raw_value is not None else None
+            )
+        return record
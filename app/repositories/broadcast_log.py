@@ -0,0 +1,178 @@
+from typing import TypedDict
+from uuid import UUID
+
+from redis.asyncio.client import Pipeline
+
+from app import clients
+from app.adapters.redis import Script
+from app.repositories.osu_sessions import OSU_SESSION_TTL
+
+BROADCASTS_KEY = "server:broadcasts"
+
+# sessions poll every few seconds, so this is far more history than they need
+BROADCASTS_MAX_LENGTH = 10_000
+
+# the most broadcasts a session reads per poll; it reads the rest next time
+BROADCASTS_READ_COUNT = 1_000
+
+# the stream id before any entry; reading after it reads everything
+START_BROADCAST_ID = "0-0"
+
+
+def make_cursor_key(osu_session_id: UUID) -> str:
+    return f"server:broadcast-cursors:{osu_session_id}"
+
+
+class Broadcast(TypedDict):
+    broadcast_id: str
+    data: bytes
+    # the session the broadcast is about, if any
+    sender_osu_session_id: UUID | None
+    sender_privileges: int
+    include_sender: bool
+    # readers need any of these privilege bits to see the broadcast; 0 for none
+    read_privileges: int
+    # see packet_bundles.make_supersede_key
+    supersede_key: str | None
+
+
+def deserialize(broadcast_id: bytes, fields: dict[bytes, bytes]) -> Broadcast:
+    return {
+        "broadcast_id": broadcast_id.decode(),
+        "data": fields[b"data"],
+        "sender_osu_session_id": (
+            UUID(fields[b"sender_osu_session_id"].decode())
+            if fields[b"sender_osu_session_id"]
+            else None
+        ),
+        "sender_privileges": int(fields[b"sender_privileges"]),
+        "include_sender": fields[b"include_sender"] == b"1",
+        "read_privileges": int(fields[b"read_privileges"]),
+        "supersede_key": fields.get(b"supersede_key", b"").decode() or None,
+    }
+
+
+async def create(
+    data: bytes,
+    sender_osu_session_id: UUID | None = None,
+    sender_privileges: int = 0,
+    include_sender: bool = True,
+    read_privileges: int = 0,
+    supersede_key: str | None = None,
+) -> str:
+    broadcast_id = await clients.redis.xadd(
+        BROADCASTS_KEY,
+        {
+            "data": data,
+            "sender_osu_session_id": (
+                str(sender_osu_session_id) if sender_osu_session_id else ""
+            ),
+            "sender_privileges": sender_privileges,
+            "include_sender": int(include_sender),
+            "read_privileges": read_privileges,
+            "supersede_key": supersede_key or "",
+        },
+        maxlen=BROADCASTS_MAX_LENGTH,
+        approximate=True,
+    )
+    return broadcast_id.decode()
+
+
+async def fetch_latest_id() -> str:
+    latest_broadcasts = await clients.redis.xrevrange(BROADCASTS_KEY, count=1)
+    if not latest_broadcasts:
+        return START_BROADCAST_ID
+
+    broadcast_id, _ = latest_broadcasts[0]
+    return broadcast_id.decode()
+
+
+async def fetch_many_after(broadcast_id: str) -> list[Broadcast]:
+    raw_broadcasts = await clients.redis.xrange(BROADCASTS_KEY, min=f"({broadcast_id}")
+    return [
+        deserialize(broadcast_id, fields) for broadcast_id, fields in raw_broadcasts
+    ]
+
+
+# reads the broadcasts after a session's cursor & advances it past them, or
+# returns nil if the session's cursor has expired, or fell behind the start
+# of the log as it was trimmed (so broadcasts it hadn't read may be gone)
+_READ_AFTER_CURSOR_SCRIPT = Script(
+    """
+local function parse_id(broadcast_id)
+    local ms, seq = string.match(broadcast_id, '(%d+)-(%d+)')
+    return tonumber(ms), tonumber(seq)
+end
+
+local cursor = redis.call('GET', KEYS[2])
+if not cursor then
+    return false
+end
+local first_broadcasts = redis.call('XRANGE', KEYS[1], '-', '+', 'COUNT', 1)
+if cursor ~= ARGV[3] and #first_broadcasts > 0 then
+    local cursor_ms, cursor_seq = parse_id(cursor)
+    local first_ms, first_seq = parse_id(first_broadcasts[1][1])
+    if cursor_ms < first_ms or (cursor_ms == first_ms and cursor_seq < first_seq) then
+        return false
+    end
+end
+local raw_broadcasts = redis.call(
+    'XRANGE', KEYS[1], '(' .. cursor, '+', 'COUNT', ARGV[2]
+)
+if #raw_broadcasts > 0 then
+    redis.call('SET', KEYS[2], raw_broadcasts[#raw_broadcasts][1], 'EX', ARGV[1])
+else
+    redis.call('EXPIRE', KEYS[2], ARGV[1])
+end
+return raw_broadcasts
+"""
+)
+
+
+def queue_read_after_cursor(pipe: Pipeline, osu_session_id: UUID) -> None:
+    """Queue reading a session's unread broadcasts; finish with `deserialize_read`."""
+    _READ_AFTER_CURSOR_SCRIPT.queue(
+        pipe,
+        keys=[BROADCASTS_KEY, make_cursor_key(osu_session_id)],
+        args=[OSU_SESSION_TTL, BROADCASTS_READ_COUNT, START_BROADCAST_ID],
+    )
+
+
+def deserialize_read(
+    raw_broadcasts: list[tuple[bytes, list[bytes]]] | None
+) -> list[Broadcast] | None:
+    if raw_broadcasts is None:
+        return None
+
+    # (scripts return stream entries' fields as flat lists)
+    return [
+        deserialize(broadcast_id, dict(zip(fields[::2], fields[1::2])))
+        for broadcast_id, fields in raw_broadcasts
+    ]
+
+
+async def read_after_cursor(osu_session_id: UUID) -> list[Broadcast] | None:
+    """Read a session's unread broadcasts, or None if there's no telling what
+    it missed, as its cursor expired or fell behind the log."""
+    async with clients.redis.pipeline(transaction=False) as pipe:
+        queue_read_after_cursor(pipe, osu_session_id)
+        (raw_broadcasts,) = await pipe.execute()
+
+    return deserialize_read(raw_broadcasts)
+
+
+async def fetch_cursor(osu_session_id: UUID) -> str | None:
+    cursor = await clients.redis.get(make_cursor_key(osu_session_id))
+    return cursor.decode() if cursor is not None else None
+
+
+async def update_cursor(osu_session_id: UUID, broadcast_id: str) -> None:
+    await clients.redis.set(
+        make_cursor_key(osu_session_id),
+        broadcast_id,
+        ex=OSU_SESSION_TTL,
+    )
+
+
+async def delete_cursor(osu_session_id: UUID) -> None:
+    await clients.redis.delete(make_cursor_key(osu_session_id))
@@ -2,6 +2,7 @@ from typing import Literal
 from uuid import UUID
 
 from app import clients
+from app import unit_of_work
 
 
 def make_key(channel_id: int | Literal["*"]) -> str:
@@ -20,10 +21,15 @@ async def add(
     channel_id: int,
     session_id: UUID,
 ) -> UUID:
-    await clients.redis.sadd(
-        make_key(channel_id),
-        serialize(session_id),
+    channel_key = make_key(channel_id)
+    await unit_of_work.write(
+        [channel_key],
+        lambda pipe: pipe.sadd(channel_key, serialize(session_id)),
     )
+
+    pending_members = unit_of_work.read_pending(channel_key) or set()
+    unit_of_work.set_pending(channel_key, pending_members | {session_id})
+
     return session_id
 
 
@@ -32,6 +38,8 @@ async def remove(
     osu_session_id: UUID,
 ) -> UUID | None:
     channel_key = make_key(channel_id)
+    await unit_of_work.flush_pending([channel_key])
+
     success = await clients.redis.srem(channel_key, serialize(osu_session_id))
     return osu_session_id if success == 1 else None
 
@@ -39,4 +47,5 @@ async def remove(
 async def members(channel_id: int) -> set[UUID]:
     channel_key = make_key(channel_id)
     members = await clients.redis.smembers(channel_key)
-    return {deserialize(member) for member in members}
+    pending_members = unit_of_work.read_pending(channel_key) or set()
+    return {deserialize(member) for member in members} | pending_members
@@ -0,0 +1,154 @@
+import time
+from uuid import UUID
+from uuid import uuid4
+
+from app import clients
+from app.repositories.osu_sessions import OSU_SESSION_TTL
+
+# sessions whose polls land on this worker have their packet bundles queued
+# in-process, skipping redis. each session's worker is recorded in redis so
+# that when a session's polls move to another worker, the new worker can ask
+# the previous one to hand the session's queue back to redis.
+#
+# this relies on sticky routing, i.e. a session's polls landing on the same
+# worker (e.g. by its osu-token): were they spread across workers, each poll
+# would move the session, costing a claim, a handoff & a re-push of its queue
+
+WORKER_ID = str(uuid4())
+
+# how often a worker re-asserts that it's serving a session's polls
+CLAIM_REFRESH_INTERVAL = 60  # 1 minute
+
+# how often stale claims (of sessions which stopped polling) are pruned
+PRUNE_INTERVAL = 60  # 1 minute
+
+
+def make_worker_key(osu_session_id: UUID) -> str:
+    return f"server:packet-bundle-workers:{osu_session_id}"
+
+
+def make_handoff_channel(worker_id: str) -> str:
+    return f"server:packet-bundle-handoffs:{worker_id}"
+
+
+# (raw bundle, supersede key)
+LocalBundle = tuple[bytes, str | None]
+
+_queues: dict[UUID, list[LocalBundle]] = {}
+_claimed_at: dict[UUID, float] = {}
+
+
+def is_claimed(osu_session_id: UUID) -> bool:
+    claimed_at = _claimed_at.get(osu_session_id)
+    if claimed_at is None:
+        return False
+
+    # the session has stopped polling; let its queue expire in redis instead
+    return time.monotonic() - claimed_at < OSU_SESSION_TTL
+
+
+async def claim(osu_session_id: UUID) -> None:
+    """Route a session's bundles to this worker, which is serving its polls."""
+    now = time.monotonic()
+    claimed_at = _claimed_at.get(osu_session_id)
+    if claimed_at is not None and now - claimed_at < CLAIM_REFRESH_INTERVAL:
+        return
+
+    previous_worker_id = await clients.redis.set(
+        make_worker_key(osu_session_id),
+        WORKER_ID,
+        ex=OSU_SESSION_TTL,
+        get=True,
+    )
+
+    _claimed_at[osu_session_id] = now
+    _queues.setdefault(osu_session_id, [])
+
+    if previous_worker_id is not None and previous_worker_id.decode() != WORKER_ID:
+        await clients.redis.publish(
+            make_handoff_channel(previous_worker_id.decode()),
+            str(osu_session_id),
+        )
+
+
+def claimed_osu_session_ids() -> list[UUID]:
+    return list(_claimed_at)
+
+
+def prune_stale() -> int:
+    """Forget sessions which stopped polling, returning how many there were.
+
+    Their queues are dropped, as they would have expired in redis.
+    """
+    stale_osu_session_ids = [
+        osu_session_id
+        for osu_session_id in _claimed_at
+        if not is_claimed(osu_session_id)
+    ]
+    for osu_session_id in stale_osu_session_ids:
+        release(osu_session_id)
+
+    return len(stale_osu_session_ids)
+
+
+def release(osu_session_id: UUID) -> list[LocalBundle]:
+    """Stop serving a session from this worker, returning its unsent bundles."""
+    _claimed_at.pop(osu_session_id, None)
+    return _queues.pop(osu_session_id, [])
+
+
+def push(
+    osu_session_id: UUID,
+    raw_bundle: bytes,
+    supersede_key: str | None,
+) -> tuple[int, int]:
+    queue = _queues[osu_session_id]
+
+    if supersede_key is not None:
+        queue[:] = [bundle for bundle in queue if bundle[1] != supersede_key]
+
+    queue.append((raw_bundle, supersede_key))
+
+    return len(queue), sum(len(raw_bundle) for raw_bundle, _ in queue)
+
+
+def shed(
+    osu_session_id: UUID,
+    max_size: int,
+    max_bytes: int,
+    restart_bundle: bytes,
+) -> tuple[int, bool]:
+    """Shed a session's oversized queue, as packet_bundles does in redis."""
+    queue = _queues[osu_session_id]
+
+    # only bundles replaced by a later one with the same supersede key may be
+    # dropped; every other bundle must be delivered, in order
+    latest_supersede_keys: set[str] = set()
+    kept_bundles: list[LocalBundle] = []
+    for raw_bundle, supersede_key in reversed(queue):
+        if supersede_key is not None:
+            if supersede_key in latest_supersede_keys:
+                continue
+            latest_supersede_keys.add(supersede_key)
+        kept_bundles.append((raw_bundle, supersede_key))
+    kept_bundles.reverse()
+
+    queue_bytes = sum(len(raw_bundle) for raw_bundle, _ in kept_bundles)
+    if len(kept_bundles) > max_size or queue_bytes > max_bytes:
+        dropped_bundles = len(queue)
+        queue[:] = [(restart_bundle, None)]
+        return dropped_bundles, True
+
+    dropped_bundles = len(queue) - len(kept_bundles)
+    queue[:] = kept_bundles
+    return dropped_bundles, False
+
+
+def pop_all(osu_session_id: UUID) -> list[bytes]:
+    queue = _queues.get(osu_session_id)
+    if not queue:
+        return []
+
+    raw_bundles = [raw_bundle for raw_bundle, _ in queue]
+    queue.clear()
+    return raw_bundles
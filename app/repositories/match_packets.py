@@ -0,0 +1,61 @@
+from typing import TypedDict
+
+from app import clients
+from app.repositories import multiplayer_matches
+
+
+def make_key(match_id: int) -> str:
+    return f"server:match-packets:{match_id}"
+
+
+class MatchPackets(TypedDict):
+    version: int
+    # sent to the match's participants, who know its password
+    update_match_packet: bytes
+    # sent to the lobby, with the password blanked
+    lobby_update_match_packet: bytes
+
+
+async def create(
+    match_id: int,
+    version: int,
+    update_match_packet: bytes,
+    lobby_update_match_packet: bytes,
+) -> MatchPackets:
+    match_packets: MatchPackets = {
+        "version": version,
+        "update_match_packet": update_match_packet,
+        "lobby_update_match_packet": lobby_update_match_packet,
+    }
+
+    async with clients.redis.pipeline() as pipe:
+        pipe.hset(make_key(match_id), mapping=match_packets)  # type: ignore
+        pipe.expire(make_key(match_id), multiplayer_matches.MATCH_VERSION_TTL)
+        await pipe.execute()
+
+    return match_packets
+
+
+async def fetch_one(match_id: int) -> MatchPackets | None:
+    """Fetch encoded packets, if they were built at the match's current version."""
+    async with clients.redis.pipeline() as pipe:
+        pipe.get(multiplayer_matches.make_version_key(match_id))
+        pipe.hgetall(make_key(match_id))
+        raw_version, raw_match_packets = await pipe.execute()
+
+    if not raw_match_packets:
+        return None
+
+    version = int(raw_version) if raw_version is not None else 0
+    if int(raw_match_packets[b"version"]) != version:
+        return None
+
+    return {
+        "version": version,
+        "update_match_packet": raw_match_packets[b"update_match_packet"],
+        "lobby_update_match_packet": raw_match_packets[b"lobby_update_match_packet"],
+    }
+
+
+async def delete(match_id: int) -> None:
+    await clients.redis.delete(make_key(match_id))
@@ -1,10 +1,10 @@
-import json
 from datetime import datetime
 from typing import cast
 from typing import Literal
 from typing import TypedDict
 
 from app import clients
+from app import record_codec
 
 
 # TODO: a subset of the data here needs to be persisted to the database
@@ -53,35 +53,51 @@ class MatchTeams:
     RED = 2
 
 
+# how long a match's version outlives its last change
+MATCH_VERSION_TTL = 60 * 60 * 24  # 1 day
+
+
 def make_key(match_id: int | Literal["*"]) -> str:
     return f"server:matches:{match_id}"
 
 
-def serialize(match: MultiplayerMatch) -> str:
-    return json.dumps(
-        {
-            "match_id": match["match_id"],
-            "match_name": match["match_name"],
-            "match_password": match["match_password"],
-            "beatmap_name": match["beatmap_name"],
-            "beatmap_id": match["beatmap_id"],
-            "beatmap_md5": match["beatmap_md5"],
-            "host_account_id": match["host_account_id"],
-            "game_mode": match["game_mode"],
-            "mods": match["mods"],
-            "win_condition": match["win_condition"],
-            "team_type": match["team_type"],
-            "freemods_enabled": match["freemods_enabled"],
-            "random_seed": match["random_seed"],
-            "status": match["status"],
-        }
-    )
+def make_version_key(match_id: int) -> str:
+    return f"server:match_versions:{match_id}"
+
+
+MULTIPLAYER_MATCH_SCHEMA = record_codec.RecordSchema(
+    version=1,
+    fields=[
+        record_codec.Field("match_id", record_codec.INT),
+        record_codec.Field("match_name", record_codec.STR),
+        record_codec.Field("match_password", record_codec.STR),
+        record_codec.Field("beatmap_name", record_codec.STR),
+        record_codec.Field("beatmap_id", record_codec.INT),
+        record_codec.Field("beatmap_md5", record_codec.STR),
+        record_codec.Field("host_account_id", record_codec.INT),
+        record_codec.Field("game_mode", record_codec.INT),
+        record_codec.Field("mods", record_codec.INT),
+        record_codec.Field("win_condition", record_codec.INT),
+        record_codec.Field("team_type", record_codec.INT),
+        record_codec.Field("freemods_enabled", record_codec.BOOL),
+        record_codec.Field("random_seed", record_codec.INT),
+        record_codec.Field("status", record_codec.INT),
+        record_codec.Field("created_at", record_codec.DATETIME),
+        record_codec.Field("updated_at", record_codec.DATETIME),
+    ],
+)
+
 
+def serialize(match: MultiplayerMatch) -> bytes:
+    return MULTIPLAYER_MATCH_SCHEMA.encode(match)
 
-def deserialize(raw_match: str) -> MultiplayerMatch:
-    match = json.loads(raw_match)
 
-    assert isinstance(match, dict)
+def deserialize(raw_match: bytes) -> MultiplayerMatch:
+    match = MULTIPLAYER_MATCH_SCHEMA.decode(raw_match)
+
+    # (matches stored as json didn't keep when they were created or updated)
+    if match["created_at"] is None:
+        match["created_at"] = match["updated_at"] = datetime.now()
 
     return cast(MultiplayerMatch, match)
 
@@ -125,6 +141,7 @@ async def create(
         name=make_key(match_id),
         value=serialize(match),
     )
+    await bump_version(match_id)
 
     return match
     # MetalFace Was Here
@@ -232,6 +249,7 @@ async def partial_update(
         name=make_key(match_id),
         value=serialize(match),
     )
+    await bump_version(match_id)
 
     return match
 
@@ -245,5 +263,21 @@ async def delete(match_id: int) -> MultiplayerMatch | None:
         return None
 
     await clients.redis.delete(match_key)
+    await bump_version(match_id)
 
     return deserialize(raw_match)
+
+
+async def bump_version(match_id: int) -> int:
+    """Invalidate everything cached against a match & its slots."""
+    async with clients.redis.pipeline() as pipe:
+        pipe.incr(make_version_key(match_id))
+        pipe.expire(make_version_key(match_id), MATCH_VERSION_TTL)
+        version, _ = await pipe.execute()
+
+    return version
+
+
+async def fetch_version(match_id: int) -> int:
+    version = await clients.redis.get(make_version_key(match_id))
+    return int(version) if version is not None else 0
@@ -1,10 +1,11 @@
-import json
 from typing import cast
 from typing import Literal
 from typing import TypedDict
 from uuid import UUID
 
 from app import clients
+from app import record_codec
+from app.repositories import multiplayer_matches
 
 
 class MultiplayerSlot(TypedDict):
@@ -40,29 +41,31 @@ def make_key(match_id: int, slot_id: int | Literal["*"]) -> str:
     return f"server:match_slots:{match_id}:{slot_id}"
 
 
-def serialize(slot: MultiplayerSlot) -> str:
-    return json.dumps(
-        {
-            "slot_id": slot["slot_id"],
-            "account_id": slot["account_id"],
-            "osu_session_id": str(slot["osu_session_id"]),
-            "status": slot["status"],
-            "team": slot["team"],
-            "mods": slot["mods"],
-            "loaded": slot["loaded"],
-            "skipped": slot["skipped"],
-        }
-    )
+def make_occupied_slots_key(match_id: int) -> str:
+    return f"server:match_occupied_slots:{match_id}"
+
 
+MULTIPLAYER_SLOT_SCHEMA = record_codec.RecordSchema(
+    version=1,
+    fields=[
+        record_codec.Field("slot_id", record_codec.INT),
+        record_codec.Field("account_id", record_codec.INT),
+        record_codec.Field("osu_session_id", record_codec.UUID),
+        record_codec.Field("status", record_codec.INT),
+        record_codec.Field("team", record_codec.INT),
+        record_codec.Field("mods", record_codec.INT),
+        record_codec.Field("loaded", record_codec.BOOL),
+        record_codec.Field("skipped", record_codec.BOOL),
+    ],
+)
 
-def deserialize(raw_slot: str) -> MultiplayerSlot:
-    match = json.loads(raw_slot)
 
-    assert isinstance(match, dict)
+def serialize(slot: MultiplayerSlot) -> bytes:
+    return MULTIPLAYER_SLOT_SCHEMA.encode(slot)
 
-    match["osu_session_id"] = UUID(match["osu_session_id"])
 
-    return cast(MultiplayerSlot, match)
+def deserialize(raw_slot: bytes) -> MultiplayerSlot:
+    return cast(MultiplayerSlot, MULTIPLAYER_SLOT_SCHEMA.decode(raw_slot))
 
 
 async def claim_slot_id(match_id: int) -> int | None:
@@ -106,6 +109,7 @@ async def create(
         name=make_key(match_id, slot_id),
         value=serialize(slot),
     )
+    await multiplayer_matches.bump_version(match_id)
 
     return slot
 
@@ -130,10 +134,13 @@ async def fetch_one_by_osu_session_id(
 
     for raw_slot in raw_slots:
         assert raw_slot is not None  # TODO: why does mget return list[T | None]?
-        slot = deserialize(raw_slot)
 
-        if slot["osu_session_id"] == osu_session_id:
-            return slot
+        # (only the matching slot needs decoding)
+        if (
+            MULTIPLAYER_SLOT_SCHEMA.decode_field(raw_slot, "osu_session_id")
+            == osu_session_id
+        ):
+            return deserialize(raw_slot)
 
     return None
 
@@ -225,6 +232,12 @@ async def partial_update(
         value=serialize(slot),
     )
 
+    # invalidate cached slot ids & match packets if anything they carry changed
+    if any(
+        field is not None for field in (account_id, osu_session_id, status, team, mods)
+    ):
+        await multiplayer_matches.bump_version(match_id)
+
     return slot
 
 
@@ -237,5 +250,57 @@ async def delete(match_id: int, slot_id: int) -> MultiplayerSlot | None:
         return None
 
     await clients.redis.delete(slot_key)
+    await multiplayer_matches.bump_version(match_id)
 
     return deserialize(raw_slot)
+
+
+async def fetch_occupied_slots(match_id: int) -> dict[UUID, tuple[int, int]]:
+    """Fetch the (slot id, status) of a match's occupied slots, by osu! session id."""
+    occupied_slots_key = make_occupied_slots_key(match_id)
+
+    async with clients.redis.pipeline() as pipe:
+        pipe.get(multiplayer_matches.make_version_key(match_id))
+        pipe.hgetall(occupied_slots_key)
+        raw_version, raw_occupied_slots = await pipe.execute()
+
+    version = int(raw_version) if raw_version is not None else 0
+
+    if raw_occupied_slots and int(raw_occupied_slots[b"version"]) == version:
+        occupied_slots = {}
+        for raw_osu_session_id, raw_slot in raw_occupied_slots.items():
+            if raw_osu_session_id == b"version":
+                continue
+
+            raw_slot_id, raw_status = raw_slot.split(b":")
+            occupied_slots[UUID(raw_osu_session_id.decode())] = (
+                int(raw_slot_id),
+                int(raw_status),
+            )
+        return occupied_slots
+
+    occupied_slots = {
+        slot["osu_session_id"]: (slot["slot_id"], slot["status"])
+        for slot in await fetch_all(match_id)
+        if slot["account_id"] != -1
+    }
+
+    # if the slots change while we read them, the version will be bumped,
+    # and these will be stored as stale & read again next time. the previous
+    # version's slots are replaced, rather than merged into
+    async with clients.redis.pipeline() as pipe:
+        pipe.delete(occupied_slots_key)
+        pipe.hset(
+            occupied_slots_key,
+            mapping={
+                "version": version,
+                **{
+                    str(osu_session_id): f"{slot_id}:{status}"
+                    for osu_session_id, (slot_id, status) in occupied_slots.items()
+                },
+            },
+        )
+        pipe.expire(occupied_slots_key, multiplayer_matches.MATCH_VERSION_TTL)
+        await pipe.execute()
+
+    return occupied_slots
@@ -0,0 +1,213 @@
+from __future__ import annotations
+
+import time
+from collections import Counter
+from collections import OrderedDict
+from datetime import datetime
+from typing import TYPE_CHECKING
+from typing import TypedDict
+from uuid import UUID
+
+from redis.asyncio.client import Pipeline
+
+from app import clients
+from app import settings
+
+if TYPE_CHECKING:
+    from app.repositories.osu_sessions import OsuSession
+
+# decoded sessions are cached in-process, in a least recently used cache of
+# OSU_SESSION_CACHE_SIZE sessions. writes to a session publish its id on
+# INVALIDATION_CHANNEL, which every worker listens to, evicting the session.
+# nothing is cached while a worker isn't listening, as it could miss writes.
+#
+# heartbeats don't invalidate sessions, so cached sessions' last_communicated_at
+# & expires_at may lag by up to MAX_AGE, after which they're read again
+
+INVALIDATION_CHANNEL = "server:osu-session-invalidations"
+
+STATS_KEY = "server:osu-session-cache-stats"
+
+# how long a session may be cached for
+MAX_AGE = 30  # 30 seconds
+
+# how often each worker adds its stats to STATS_KEY
+STATS_FLUSH_INTERVAL = 10  # 10 seconds
+
+# session id -> (monotonic time to expire at, session)
+_entries: OrderedDict[UUID, tuple[float, OsuSession]] = OrderedDict()
+
+# session id -> a token for the read in progress; invalidations remove it, so
+# that sessions read before a write aren't cached after its invalidation
+_loading: dict[UUID, object] = {}
+
+_listening = False
+
+_stats: Counter[str] = Counter()
+
+
+def is_enabled() -> bool:
+    return settings.OSU_SESSION_CACHE_SIZE > 0
+
+
+def get(osu_session_id: UUID) -> OsuSession | None:
+    if not _listening:
+        return None
+
+    entry = _entries.get(osu_session_id)
+    if entry is None:
+        _stats["misses"] += 1
+        return None
+
+    expires_at, osu_session = entry
+    if time.monotonic() >= expires_at:
+        del _entries[osu_session_id]
+        _stats["expirations"] += 1
+        _stats["misses"] += 1
+        return None
+
+    _entries.move_to_end(osu_session_id)
+    _stats["hits"] += 1
+    return osu_session.copy()
+
+
+def start_read(osu_session_id: UUID) -> object | None:
+    """Note that a session is being read from redis, to be `put` once read."""
+    if not _listening:
+        return None
+
+    token = object()
+    _loading[osu_session_id] = token
+    return token
+
+
+def put(
+    osu_session_id: UUID,
+    token: object | None,
+    osu_session: OsuSession | None,
+) -> None:
+    """Cache a session read from redis, unless it was written while being read."""
+    if token is None or _loading.get(osu_session_id) is not token:
+        return
+
+    del _loading[osu_session_id]
+    if osu_session is None:
+        return
+
+    # (sessions may expire sooner than MAX_AGE, & their expiry only moves later)
+    max_age = min(
+        MAX_AGE,
+        (osu_session["expires_at"] - datetime.now()).total_seconds(),
+    )
+    if max_age <= 0:
+        return
+
+    _entries[osu_session_id] = (time.monotonic() + max_age, osu_session.copy())
+    _entries.move_to_end(osu_session_id)
+
+    while len(_entries) > settings.OSU_SESSION_CACHE_SIZE:
+        _entries.popitem(last=False)
+        _stats["evictions"] += 1
+
+
+def invalidate(osu_session_id: UUID) -> bool:
+    """Evict a session from this worker's cache, returning whether it was cached."""
+    _loading.pop(osu_session_id, None)
+    return _entries.pop(osu_session_id, None) is not None
+
+
+def queue_invalidation(pipe: Pipeline, osu_session_id: UUID) -> None:
+    """Queue the eviction of a session from every worker's cache."""
+    if is_enabled():
+        pipe.publish(INVALIDATION_CHANNEL, f"{osu_session_id}:{time.time()}")
+
+
+async def publish_invalidation(osu_session_id: UUID) -> None:
+    if is_enabled():
+        await clients.redis.publish(
+            INVALIDATION_CHANNEL,
+            f"{osu_session_id}:{time.time()}",
+        )
+
+
+def handle_invalidation(raw_invalidation: bytes) -> None:
+    raw_osu_session_id, raw_published_at = raw_invalidation.split(b":")
+    if invalidate(UUID(raw_osu_session_id.decode())):
+        # how long the session could have been read stale for
+        _stats["invalidations"] += 1
+        _stats["invalidation_lag_ms"] += max(
+            int((time.time() - float(raw_published_at)) * 1000),
+            0,
+        )
+
+
+async def listen_for_invalidations() -> None:
+    """Cache sessions while evicting those written by any worker, until cancelled."""
+    global _listening
+
+    async with clients.redis.pubsub() as pubsub:
+        await pubsub.subscribe(INVALIDATION_CHANNEL)
+        # (wait for the subscription to be confirmed before caching anything)
+        await pubsub.get_message(timeout=None)
+
+        _listening = True
+        stats_flushed_at = time.monotonic()
+        try:
+            while True:
+                message = await pubsub.get_message(
+                    ignore_subscribe_messages=True,
+                    timeout=STATS_FLUSH_INTERVAL,
+                )
+                if message is not None:
+                    handle_invalidation(message["data"])
+
+                if time.monotonic() - stats_flushed_at >= STATS_FLUSH_INTERVAL:
+                    await flush_stats()
+                    stats_flushed_at = time.monotonic()
+        finally:
+            _listening = False
+            _entries.clear()
+            _loading.clear()
+
+
+async def flush_stats() -> None:
+    """Add this worker's stats since they were last flushed to STATS_KEY."""
+    if not _stats:
+        return
+
+    stats = _stats.copy()
+    _stats.clear()
+
+    async with clients.redis.pipeline(transaction=False) as pipe:
+        for stat, value in stats.items():
+            pipe.hincrby(STATS_KEY, stat, value)
+        await pipe.execute()
+
+
+class OsuSessionCacheStats(TypedDict):
+    hits: int
+    misses: int
+    hit_rate: float
+    # sessions evicted to make room for others
+    evictions: int
+    # sessions which were cached for MAX_AGE, or until they expired
+    expirations: int
+    # sessions evicted as they were written, & how long it took in total from
+    # the writes to the evictions, i.e. how long they could be read stale for
+    invalidations: int
+    invalidation_lag_ms: int
+
+
+async def fetch_stats() -> OsuSessionCacheStats:
+    raw_stats = await clients.redis.hgetall(STATS_KEY)
+    hits = int(raw_stats.get(b"hits", 0))
+    misses = int(raw_stats.get(b"misses", 0))
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+        "evictions": int(raw_stats.get(b"evictions", 0)),
+        "expirations": int(raw_stats.get(b"expirations", 0)),
+        "invalidations": int(raw_stats.get(b"invalidations", 0)),
+        "invalidation_lag_ms": int(raw_stats.get(b"invalidation_lag_ms", 0)),
+    }
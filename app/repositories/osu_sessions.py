@@ -1,23 +1,60 @@
 from __future__ import annotations
 
-import json
+import itertools
+from collections.abc import Iterable
+from collections.abc import Mapping
+from collections.abc import Sequence
 from datetime import datetime
 from datetime import timedelta
+from typing import Any
 from typing import cast
 from typing import Literal
 from typing import TypedDict
 from uuid import UUID
 
+from redis.asyncio.client import Pipeline
+
 from app import clients
+from app import record_codec
+from app import unit_of_work
 from app._typing import UNSET
 from app._typing import Unset
+from app.adapters.redis import Script
+from app.repositories import osu_session_cache
+from app.repositories import presence_packets
 
 
 OSU_SESSION_TTL = 60 * 60  # 1 hour
 
+# live session ids, scored by when they expire
+REGISTRY_KEY = "server:osu-session-registry"
+
+# live session ids, all scored 0 so they're ordered by id, for pagination
+ORDERED_INDEX_KEY = "server:osu-session-ids"
+
+# privileges -> how many live sessions have them
+PRIVILEGE_COUNTS_KEY = "server:osu-session-counts-by-privileges"
+
+# session id -> "{account_id}:{privileges}:{username}", for removing expired
+# sessions from the indexes & counts once their own keys are gone
+INDEX_ENTRIES_KEY = "server:osu-session-index-entries"
+
 
 def make_key(osu_session_id: UUID | Literal["*"]) -> str:
-    return f"server:osu_sessions:{osu_session_id}"
+    # (session hashes' values aren't versioned themselves, so their keys are)
+    return f"server:osu-sessions:v{OSU_SESSION_SCHEMA.version}:{osu_session_id}"
+
+
+def make_account_index_key(account_id: int) -> str:
+    return f"server:osu-session-ids-by-account:{account_id}"
+
+
+def make_username_index_key(username: str) -> str:
+    return f"server:osu-session-ids-by-username:{username.lower()}"
+
+
+def make_primary_key(account_id: int) -> str:
+    return f"server:primary-osu-session-ids:{account_id}"
 
 
 class OsuSession(TypedDict):
@@ -65,71 +102,59 @@ class Action:
     OSU_DIRECT = 13
 
 
-def serialize(osu_session: OsuSession) -> str:
-    return json.dumps(
-        {
-            "osu_session_id": str(osu_session["osu_session_id"]),
-            "account_id": osu_session["account_id"],
-            "username": osu_session["username"],
-            "utc_offset": osu_session["utc_offset"],
-            "country": osu_session["country"],
-            "privileges": osu_session["privileges"],
-            "game_mode": osu_session["game_mode"],
-            "latitude": osu_session["latitude"],
-            "longitude": osu_session["longitude"],
-            "action": osu_session["action"],
-            "info_text": osu_session["info_text"],
-            "beatmap_md5": osu_session["beatmap_md5"],
-            "beatmap_id": osu_session["beatmap_id"],
-            "mods": osu_session["mods"],
-            "pm_private": osu_session["pm_private"],
-            "receive_match_updates": osu_session["receive_match_updates"],
-            "spectator_host_osu_session_id": (
-                str(osu_session["spectator_host_osu_session_id"])
-                if osu_session["spectator_host_osu_session_id"] is not None
-                else None
-            ),
-            "away_message": osu_session["away_message"],
-            "multiplayer_match_id": osu_session["multiplayer_match_id"],
-            "last_communicated_at": osu_session["last_communicated_at"].isoformat(),
-            "last_np_beatmap_id": osu_session["last_np_beatmap_id"],
-            "primary": osu_session["primary"],
-            "expires_at": osu_session["expires_at"].isoformat(),
-            "created_at": osu_session["created_at"].isoformat(),
-            "updated_at": osu_session["updated_at"].isoformat(),
-        }
-    )
-
-
-def deserialize(raw_session: str) -> OsuSession:
-    untyped_session = json.loads(raw_session)
-
-    assert isinstance(untyped_session, dict)
-
-    untyped_session["osu_session_id"] = UUID(untyped_session["osu_session_id"])
-    untyped_session["account_id"] = untyped_session["account_id"]
-
-    untyped_session["spectator_host_osu_session_id"] = (
-        UUID(untyped_session["spectator_host_osu_session_id"])
-        if untyped_session["spectator_host_osu_session_id"] is not None
-        else None
-    )
-
-    untyped_session["last_communicated_at"] = datetime.fromisoformat(
-        untyped_session["last_communicated_at"]
-    )
-
-    untyped_session["expires_at"] = datetime.fromisoformat(
-        untyped_session["expires_at"]
-    )
-    untyped_session["created_at"] = datetime.fromisoformat(
-        untyped_session["created_at"]
-    )
-    untyped_session["updated_at"] = datetime.fromisoformat(
-        untyped_session["updated_at"]
-    )
-
-    return cast(OsuSession, untyped_session)
+# sessions are stored as hashes of their encoded fields, so they can be read &
+# updated field by field; fields which are None aren't stored
+OSU_SESSION_SCHEMA = record_codec.RecordSchema(
+    version=1,
+    fields=[
+        record_codec.Field("osu_session_id", record_codec.UUID),
+        record_codec.Field("account_id", record_codec.INT),
+        record_codec.Field("username", record_codec.STR),
+        record_codec.Field("utc_offset", record_codec.INT),
+        record_codec.Field("country", record_codec.STR),
+        record_codec.Field("privileges", record_codec.INT),
+        record_codec.Field("game_mode", record_codec.INT),
+        record_codec.Field("latitude", record_codec.FLOAT),
+        record_codec.Field("longitude", record_codec.FLOAT),
+        record_codec.Field("action", record_codec.INT),
+        record_codec.Field("info_text", record_codec.STR),
+        record_codec.Field("beatmap_md5", record_codec.STR),
+        record_codec.Field("beatmap_id", record_codec.INT),
+        record_codec.Field("mods", record_codec.INT),
+        record_codec.Field("pm_private", record_codec.BOOL),
+        record_codec.Field("receive_match_updates", record_codec.BOOL),
+        record_codec.Field(
+            "spectator_host_osu_session_id", record_codec.UUID, nullable=True
+        ),
+        record_codec.Field("away_message", record_codec.STR, nullable=True),
+        record_codec.Field("multiplayer_match_id", record_codec.INT, nullable=True),
+        record_codec.Field("last_communicated_at", record_codec.DATETIME),
+        record_codec.Field("last_np_beatmap_id", record_codec.INT, nullable=True),
+        record_codec.Field("primary", record_codec.BOOL),
+        record_codec.Field("expires_at", record_codec.DATETIME),
+        record_codec.Field("created_at", record_codec.DATETIME),
+        record_codec.Field("updated_at", record_codec.DATETIME),
+    ],
+)
+
+
+def serialize_fields(fields: Mapping[str, Any]) -> dict[str, bytes]:
+    return OSU_SESSION_SCHEMA.encode_values(fields)
+
+
+def deserialize_fields(
+    fields: Iterable[str],
+    raw_values: Iterable[bytes | None],
+) -> dict[str, Any]:
+    return OSU_SESSION_SCHEMA.decode_values(fields, raw_values)
+
+
+def serialize(osu_session: OsuSession) -> dict[str, bytes]:
+    return serialize_fields(osu_session)
+
+
+def deserialize(raw_osu_session: Mapping[bytes, bytes]) -> OsuSession:
+    return cast(OsuSession, OSU_SESSION_SCHEMA.decode_hash(raw_osu_session))
 
 
 async def create(
@@ -186,152 +211,427 @@ async def create(
         "updated_at": now,
     }
 
-    await clients.redis.set(
-        name=make_key(osu_session_id),
-        value=serialize(osu_session),
-        ex=OSU_SESSION_TTL,
-    )
+    async with clients.redis.pipeline(transaction=True) as pipe:
+        pipe.hset(make_key(osu_session_id), mapping=serialize(osu_session))
+        pipe.expire(make_key(osu_session_id), OSU_SESSION_TTL)
+        pipe.zadd(REGISTRY_KEY, {str(osu_session_id): expires_at.timestamp()})
+        pipe.zadd(ORDERED_INDEX_KEY, {str(osu_session_id): 0})
+        pipe.hincrby(PRIVILEGE_COUNTS_KEY, str(privileges), 1)
+        pipe.hset(
+            INDEX_ENTRIES_KEY,
+            str(osu_session_id),
+            _make_index_entry(account_id, privileges, username),
+        )
+        pipe.sadd(make_account_index_key(account_id), str(osu_session_id))
+        pipe.sadd(make_username_index_key(username), str(osu_session_id))
+        if primary:
+            pipe.set(make_primary_key(account_id), str(osu_session_id))
+        await pipe.execute()
+
+    await presence_packets.bump_version(account_id)
 
     return osu_session
 
 
-async def fetch_by_id(osu_session_id: UUID) -> OsuSession | None:
-    osu_session_key = make_key(osu_session_id)
-    osu_session = await clients.redis.get(osu_session_key)
-    return deserialize(osu_session) if osu_session is not None else None
+def _make_index_entry(account_id: int, privileges: int, username: str) -> str:
+    # (_PARTIAL_UPDATE_SCRIPT also builds these)
+    return f"{account_id}:{privileges}:{username}"
+
+
+def _parse_index_entry(raw_index_entry: bytes) -> tuple[int, int, str]:
+    raw_account_id, raw_privileges, raw_username = raw_index_entry.split(b":", 2)
+    return int(raw_account_id), int(raw_privileges), raw_username.decode()
+
+
+# removes a session from the indexes. the primary session id (KEYS[1]) is
+# only replaced if it's still this session's, rather than a newer one's, by
+# another of the account's (KEYS[2]) live primary sessions, if it has any.
+# ARGV: the session's id, the session key pattern (make_key("*"))
+_REMOVE_FROM_INDEXES_SCRIPT = Script(
+    """
+for i = 2, #KEYS do
+    redis.call('SREM', KEYS[i], ARGV[1])
+end
+if redis.call('GET', KEYS[1]) ~= ARGV[1] then
+    return
+end
+for _, osu_session_id in ipairs(redis.call('SMEMBERS', KEYS[2])) do
+    local key = (string.gsub(ARGV[2], '%*', osu_session_id, 1))
+    if redis.call('HGET', key, 'primary') == '1' then
+        redis.call('SET', KEYS[1], osu_session_id)
+        return
+    end
+end
+redis.call('DEL', KEYS[1])
+"""
+)
+
+
+def _queue_remove_from_indexes(
+    pipe: Pipeline,
+    osu_session_id: UUID,
+    account_id: int,
+    username: str | None,
+) -> None:
+    index_keys = [make_primary_key(account_id), make_account_index_key(account_id)]
+    if username is not None:
+        index_keys.append(make_username_index_key(username))
+
+    _REMOVE_FROM_INDEXES_SCRIPT.queue(
+        pipe,
+        keys=index_keys,
+        args=[str(osu_session_id), make_key("*")],
+    )
 
 
-async def fetch_primary_by_account_id(account_id: int) -> OsuSession | None:
-    all_osu_sessions = await fetch_all()
-    for osu_session in all_osu_sessions:
-        if osu_session["account_id"] == account_id and osu_session["primary"]:
-            return osu_session
+def _with_pending_writes(osu_session: OsuSession) -> OsuSession:
+    pending_osu_session = unit_of_work.read_pending(
+        make_key(osu_session["osu_session_id"])
+    )
+    return pending_osu_session.copy() if pending_osu_session else osu_session
 
-    return None
 
+async def fetch_by_id(osu_session_id: UUID) -> OsuSession | None:
+    osu_session_key = make_key(osu_session_id)
 
-async def fetch_primary_by_username(username: str) -> OsuSession | None:
-    osu_sessions = await fetch_all()
+    pending_osu_session = unit_of_work.read_pending(osu_session_key)
+    if pending_osu_session is not None:
+        return pending_osu_session.copy()
 
-    for osu_session in osu_sessions:
-        if osu_session["username"] == username and osu_session["primary"]:
-            return osu_session
+    cached_osu_session = osu_session_cache.get(osu_session_id)
+    if cached_osu_session is not None:
+        return cached_osu_session
 
-    return None
+    cache_token = osu_session_cache.start_read(osu_session_id)
+    raw_osu_session = await clients.redis.hgetall(osu_session_key)
+    osu_session = deserialize(raw_osu_session) if raw_osu_session else None
+    osu_session_cache.put(osu_session_id, cache_token, osu_session)
 
+    return osu_session
 
-async def fetch_many(
-    has_any_privilege_bit: int | None = None,
-    page: int = 1,
-    page_size: int = 50,
-) -> list[OsuSession]:
-    osu_session_key = make_key("*")
 
-    osu_sessions = []
+async def fetch_fields(
+    osu_session_id: UUID,
+    fields: Sequence[str],
+) -> dict[str, Any] | None:
+    """Fetch only some of a session's fields, e.g. to avoid decoding the rest."""
+    osu_session_key = make_key(osu_session_id)
 
-    _, keys = await clients.redis.scan(
-        cursor=page_size * (page - 1),
-        count=page_size,
-        match=osu_session_key,
+    pending_osu_session = unit_of_work.read_pending(osu_session_key)
+    if pending_osu_session is not None:
+        return {field: pending_osu_session[field] for field in fields}
+
+    # (osu_session_id is always stored, so tells us if the session exists)
+    *raw_values, raw_osu_session_id = await clients.redis.hmget(
+        osu_session_key,
+        [*fields, "osu_session_id"],
     )
+    if raw_osu_session_id is None:
+        return None
 
-    raw_osu_sessions = await clients.redis.mget(keys)
+    return deserialize_fields(fields, raw_values)
 
-    for raw_osu_session in raw_osu_sessions:
-        assert raw_osu_session is not None  # TODO: why does mget return list[T | None]?
-        osu_session = deserialize(raw_osu_session)
 
-        if (
-            has_any_privilege_bit not in (None, 0)
-            and (osu_session["privileges"] & has_any_privilege_bit) == 0
+async def _fetch_many_by_ids(osu_session_ids: Sequence[UUID]) -> list[OsuSession]:
+    osu_sessions: list[OsuSession | None] = []
+    # (index, session id, cache token) of sessions to read from redis
+    uncached_osu_sessions: list[tuple[int, UUID, object | None]] = []
+    for index, osu_session_id in enumerate(osu_session_ids):
+        osu_session = osu_session_cache.get(osu_session_id)
+        if osu_session is None:
+            uncached_osu_sessions.append(
+                (index, osu_session_id, osu_session_cache.start_read(osu_session_id))
+            )
+        osu_sessions.append(osu_session)
+
+    if uncached_osu_sessions:
+        async with clients.redis.pipeline(transaction=False) as pipe:
+            for _, osu_session_id, _ in uncached_osu_sessions:
+                pipe.hgetall(make_key(osu_session_id))
+            raw_osu_sessions = await pipe.execute()
+
+        for (index, osu_session_id, cache_token), raw_osu_session in zip(
+            uncached_osu_sessions,
+            raw_osu_sessions,
         ):
-            continue
+            osu_session = deserialize(raw_osu_session) if raw_osu_session else None
+            osu_session_cache.put(osu_session_id, cache_token, osu_session)
+            osu_sessions[index] = osu_session
+
+    # (sessions may have expired since their ids were read)
+    return [
+        _with_pending_writes(osu_session)
+        for osu_session in osu_sessions
+        if osu_session is not None
+    ]
+
+
+async def _fetch_indexed(index_key: str) -> list[OsuSession]:
+    await unit_of_work.flush_pending([index_key])
+
+    raw_osu_session_ids = await clients.redis.smembers(index_key)
+    if not raw_osu_session_ids:
+        return []
+
+    osu_sessions = await _fetch_many_by_ids(
+        [
+            UUID(raw_osu_session_id.decode())
+            for raw_osu_session_id in raw_osu_session_ids
+        ]
+    )
 
-        osu_sessions.append(osu_session)
+    # sessions expire without being removed from the indexes; prune them now
+    expired_osu_session_ids = raw_osu_session_ids - {
+        str(osu_session["osu_session_id"]).encode() for osu_session in osu_sessions
+    }
+    if expired_osu_session_ids:
+        await clients.redis.srem(index_key, *expired_osu_session_ids)
 
     return osu_sessions
 
 
-async def fetch_total_count(has_any_privilege_bit: int | None = None) -> int:
-    osu_session_key = make_key("*")
+async def fetch_primary_by_account_id(account_id: int) -> OsuSession | None:
+    primary_key = make_primary_key(account_id)
+    await unit_of_work.flush_pending([primary_key])
 
-    cursor = None
-    count = 0
+    raw_osu_session_id = await clients.redis.get(primary_key)
+    if raw_osu_session_id is None:
+        return None
 
-    while cursor != 0:
-        cursor, keys = await clients.redis.scan(
-            cursor=cursor or 0,
-            match=osu_session_key,
-        )
+    osu_session = await fetch_by_id(UUID(raw_osu_session_id.decode()))
+    if osu_session is None:
+        # the session expired; if it's still the primary one, another of the
+        # account's primary sessions (e.g. tourney clients) takes its place
+        async with clients.redis.pipeline(transaction=False) as pipe:
+            _queue_remove_from_indexes(
+                pipe,
+                UUID(raw_osu_session_id.decode()),
+                account_id,
+                username=None,
+            )
+            pipe.get(primary_key)
+            _, raw_osu_session_id = await pipe.execute()
+        if raw_osu_session_id is None:
+            return None
+
+        osu_session = await fetch_by_id(UUID(raw_osu_session_id.decode()))
+
+    return osu_session
+
+
+async def fetch_primary_by_username(username: str) -> OsuSession | None:
+    osu_sessions = await _fetch_indexed(make_username_index_key(username))
 
-        raw_osu_sessions = await clients.redis.mget(keys)
+    for osu_session in osu_sessions:
+        if osu_session["username"] == username and osu_session["primary"]:
+            return osu_session
+
+    return None
+
+
+async def fetch_many(
+    has_any_privilege_bit: int | None = None,
+    after_osu_session_id: UUID | None = None,
+    page_size: int = 50,
+) -> list[OsuSession]:
+    """Fetch a page of sessions, in id order, starting after the given id."""
+    osu_sessions: list[OsuSession] = []
+    min_osu_session_id = (
+        f"({after_osu_session_id}" if after_osu_session_id is not None else "-"
+    )
 
-        for raw_osu_session in raw_osu_sessions:
-            assert (
-                raw_osu_session is not None
-            )  # TODO: why does mget return list[T | None]?
-            osu_session = deserialize(raw_osu_session)
+    # keep reading until the page is full, as filtered out & expired
+    # sessions leave gaps
+    while len(osu_sessions) < page_size:
+        raw_osu_session_ids = await clients.redis.zrangebylex(
+            ORDERED_INDEX_KEY,
+            min_osu_session_id,
+            "+",
+            start=0,
+            num=page_size,
+        )
 
+        for osu_session in await _fetch_many_by_ids(
+            [
+                UUID(raw_osu_session_id.decode())
+                for raw_osu_session_id in raw_osu_session_ids
+            ]
+        ):
             if (
                 has_any_privilege_bit not in (None, 0)
                 and (osu_session["privileges"] & has_any_privilege_bit) == 0
             ):
                 continue
 
-            count += 1
-
-    return count
+            osu_sessions.append(osu_session)
+            if len(osu_sessions) == page_size:
+                break
 
+        if len(raw_osu_session_ids) < page_size:
+            break
 
-async def fetch_all_by_account_id(account_id: int) -> list[OsuSession]:
-    all_osu_sessions = await fetch_all()
-    osu_sessions = []
-    for osu_session in all_osu_sessions:
-        if osu_session["account_id"] == account_id:
-            osu_sessions.append(osu_session)
+        min_osu_session_id = f"({raw_osu_session_ids[-1].decode()}"
 
     return osu_sessions
 
 
-async def fetch_all_by_username(username: str) -> list[OsuSession]:
-    all_osu_sessions = await fetch_all()
-    osu_sessions = []
-    for osu_session in all_osu_sessions:
-        if osu_session["username"] == username:
-            osu_sessions.append(osu_session)
+async def fetch_total_count(has_any_privilege_bit: int | None = None) -> int:
+    await unit_of_work.flush_pending([PRIVILEGE_COUNTS_KEY, REGISTRY_KEY])
+
+    # the registry is scored by expiry, so sessions which lapsed without
+    # being deleted (e.g. an unclean disconnect) are pruned before counting.
+    # (there are only ever a handful of distinct privileges)
+    async with clients.redis.pipeline(transaction=False) as pipe:
+        pipe.zrangebyscore(REGISTRY_KEY, "-inf", datetime.now().timestamp())
+        pipe.hgetall(PRIVILEGE_COUNTS_KEY)
+        raw_lapsed_osu_session_ids, raw_counts = await pipe.execute()
+
+    if raw_lapsed_osu_session_ids:
+        # (redis' clock may lag ours, so only prune sessions without a key)
+        async with clients.redis.pipeline(transaction=False) as pipe:
+            for raw_osu_session_id in raw_lapsed_osu_session_ids:
+                pipe.exists(make_key(UUID(raw_osu_session_id.decode())))
+            exists_results = await pipe.execute()
+
+        expired_osu_session_ids = [
+            raw_osu_session_id
+            for raw_osu_session_id, exists in zip(
+                raw_lapsed_osu_session_ids,
+                exists_results,
+            )
+            if not exists
+        ]
+        if expired_osu_session_ids:
+            await _prune_expired(expired_osu_session_ids)
+            raw_counts = await clients.redis.hgetall(PRIVILEGE_COUNTS_KEY)
+
+    return sum(
+        int(raw_count)
+        for raw_privileges, raw_count in raw_counts.items()
+        if (
+            has_any_privilege_bit in (None, 0)
+            or (int(raw_privileges) & has_any_privilege_bit) != 0
+        )
+    )
 
-    return osu_sessions
 
+async def fetch_all_by_account_id(account_id: int) -> list[OsuSession]:
+    return await _fetch_indexed(make_account_index_key(account_id))
 
-async def fetch_all(has_any_privilege_bit: int | None = None) -> list[OsuSession]:
-    osu_session_key = make_key("*")
 
-    cursor = None
-    osu_sessions = []
+async def fetch_all_by_username(username: str) -> list[OsuSession]:
+    osu_sessions = await _fetch_indexed(make_username_index_key(username))
 
-    while cursor != 0:
-        cursor, keys = await clients.redis.scan(
-            cursor=cursor or 0,
-            match=osu_session_key,
-        )
+    # (the index is case-insensitive, but lookups have always been exact)
+    return [
+        osu_session
+        for osu_session in osu_sessions
+        if osu_session["username"] == username
+    ]
 
-        raw_osu_sessions = await clients.redis.mget(keys)
 
-        for raw_osu_session in raw_osu_sessions:
-            assert (
-                raw_osu_session is not None
-            )  # TODO: why does mget return list[T | None]?
-            osu_session = deserialize(raw_osu_session)
+async def fetch_all(has_any_privilege_bit: int | None = None) -> list[OsuSession]:
+    raw_osu_session_ids = await clients.redis.zrange(REGISTRY_KEY, 0, -1)
+    if not raw_osu_session_ids:
+        return []
+
+    osu_sessions = await _fetch_many_by_ids(
+        [
+            UUID(raw_osu_session_id.decode())
+            for raw_osu_session_id in raw_osu_session_ids
+        ]
+    )
 
-            if (
-                has_any_privilege_bit not in (None, 0)
-                and (osu_session["privileges"] & has_any_privilege_bit) == 0
-            ):
-                continue
+    # (sessions are created atomically, so any without a key have expired)
+    expired_osu_session_ids = set(raw_osu_session_ids) - {
+        str(osu_session["osu_session_id"]).encode() for osu_session in osu_sessions
+    }
+    if expired_osu_session_ids:
+        await _prune_expired(list(expired_osu_session_ids))
 
-            osu_sessions.append(osu_session)
+    return [
+        osu_session
+        for osu_session in osu_sessions
+        if (
+            has_any_privilege_bit in (None, 0)
+            or (osu_session["privileges"] & has_any_privilege_bit) != 0
+        )
+    ]
+
+
+async def _prune_expired(raw_osu_session_ids: list[bytes]) -> None:
+    """Remove expired sessions from the registry, indexes & counts."""
+    # taking the index entries atomically ensures only one pruner decrements
+    # the counts for each session
+    async with clients.redis.pipeline(transaction=True) as pipe:
+        pipe.hmget(INDEX_ENTRIES_KEY, raw_osu_session_ids)
+        pipe.hdel(INDEX_ENTRIES_KEY, *raw_osu_session_ids)
+        pipe.zrem(REGISTRY_KEY, *raw_osu_session_ids)
+        pipe.zrem(ORDERED_INDEX_KEY, *raw_osu_session_ids)
+        raw_index_entries, *_ = await pipe.execute()
+
+    async with clients.redis.pipeline(transaction=False) as pipe:
+        for raw_osu_session_id, raw_index_entry in zip(
+            raw_osu_session_ids,
+            raw_index_entries,
+        ):
+            if raw_index_entry is None:
+                continue
 
-    return osu_sessions
+            account_id, privileges, username = _parse_index_entry(raw_index_entry)
+            pipe.hincrby(PRIVILEGE_COUNTS_KEY, str(privileges), -1)
+            _queue_remove_from_indexes(
+                pipe,
+                UUID(raw_osu_session_id.decode()),
+                account_id,
+                username,
+            )
+        await pipe.execute()
+
+
+# updates a session's fields, if it exists, & returns the updated session,
+# moving it between privilege counts & updating its index entry as needed.
+# HSET keeps the key's ttl, so the session's expiry is pushed back as by a
+# heartbeat, unless expires_at was set. KEYS: the session, the privilege
+# counts, the index entries, the registry. ARGV: the session's id, the unix
+# time to expire at, the encoded expires_at, '1' if expires_at was set, the
+# ttl, how many fields are set, the fields & values to set, then the fields
+# to delete
+_PARTIAL_UPDATE_SCRIPT = Script(
+    """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return false
+end
+local previous = redis.call('HMGET', KEYS[1], 'privileges', 'username')
+local set_count = tonumber(ARGV[6])
+redis.call('HSET', KEYS[1], unpack(ARGV, 7, 6 + set_count * 2))
+if #ARGV > 6 + set_count * 2 then
+    redis.call('HDEL', KEYS[1], unpack(ARGV, 7 + set_count * 2))
+end
+if ARGV[4] == '1' then
+    redis.call('EXPIREAT', KEYS[1], ARGV[2])
+    redis.call('ZADD', KEYS[4], ARGV[2], ARGV[1])
+else
+    local ttl = redis.call('TTL', KEYS[1])
+    if ttl >= 0 and ttl < tonumber(ARGV[5]) then
+        redis.call('HSET', KEYS[1], 'expires_at', ARGV[3])
+        redis.call('EXPIRE', KEYS[1], ARGV[5])
+        redis.call('ZADD', KEYS[4], ARGV[2], ARGV[1])
+    end
+end
+local current = redis.call('HMGET', KEYS[1], 'privileges', 'username', 'account_id')
+if current[1] ~= previous[1] then
+    redis.call('HINCRBY', KEYS[2], previous[1], -1)
+    redis.call('HINCRBY', KEYS[2], current[1], 1)
+end
+if current[1] ~= previous[1] or current[2] ~= previous[2] then
+    redis.call(
+        'HSET', KEYS[3], ARGV[1], current[3] .. ':' .. current[1] .. ':' .. current[2]
+    )
+end
+return redis.call('HGETALL', KEYS[1])
+"""
+)
 
 
 async def partial_update(
@@ -359,70 +659,237 @@ async def partial_update(
 ) -> OsuSession | None:
     osu_session_key = make_key(osu_session_id)
 
-    raw_osu_session = await clients.redis.get(osu_session_key)
-
-    if raw_osu_session is None:
-        return None
-
-    osu_session = deserialize(raw_osu_session)
+    previous_username = None
+    if not isinstance(username, Unset):
+        previous_fields = await fetch_fields(osu_session_id, ["username"])
+        if previous_fields is not None:
+            previous_username = previous_fields["username"]
 
+    updates: dict[str, Any] = {}
     if not isinstance(username, Unset):
-        osu_session["username"] = username
+        updates["username"] = username
     if not isinstance(utc_offset, Unset):
-        osu_session["utc_offset"] = utc_offset
+        updates["utc_offset"] = utc_offset
     if not isinstance(country, Unset):
-        osu_session["country"] = country
+        updates["country"] = country
     if not isinstance(privileges, Unset):
-        osu_session["privileges"] = privileges
+        updates["privileges"] = privileges
     if not isinstance(game_mode, Unset):
-        osu_session["game_mode"] = game_mode
+        updates["game_mode"] = game_mode
     if not isinstance(latitude, Unset):
-        osu_session["latitude"] = latitude
+        updates["latitude"] = latitude
     if not isinstance(longitude, Unset):
-        osu_session["longitude"] = longitude
+        updates["longitude"] = longitude
     if not isinstance(action, Unset):
-        osu_session["action"] = action
+        updates["action"] = action
     if not isinstance(info_text, Unset):
-        osu_session["info_text"] = info_text
+        updates["info_text"] = info_text
     if not isinstance(beatmap_md5, Unset):
-        osu_session["beatmap_md5"] = beatmap_md5
+        updates["beatmap_md5"] = beatmap_md5
     if not isinstance(beatmap_id, Unset):
-        osu_session["beatmap_id"] = beatmap_id
+        updates["beatmap_id"] = beatmap_id
     if not isinstance(mods, Unset):
-        osu_session["mods"] = mods
+        updates["mods"] = mods
     if not isinstance(pm_private, Unset):
-        osu_session["pm_private"] = pm_private
+        updates["pm_private"] = pm_private
     if not isinstance(receive_match_updates, Unset):
-        osu_session["receive_match_updates"] = receive_match_updates
+        updates["receive_match_updates"] = receive_match_updates
     if not isinstance(spectator_host_osu_session_id, Unset):
-        osu_session["spectator_host_osu_session_id"] = spectator_host_osu_session_id
+        updates["spectator_host_osu_session_id"] = spectator_host_osu_session_id
     if not isinstance(away_message, Unset):
-        osu_session["away_message"] = away_message
+        updates["away_message"] = away_message
     if not isinstance(multiplayer_match_id, Unset):
-        osu_session["multiplayer_match_id"] = multiplayer_match_id
+        updates["multiplayer_match_id"] = multiplayer_match_id
     if not isinstance(last_communicated_at, Unset):
-        osu_session["last_communicated_at"] = last_communicated_at
+        updates["last_communicated_at"] = last_communicated_at
     if not isinstance(last_np_beatmap_id, Unset):
-        osu_session["last_np_beatmap_id"] = last_np_beatmap_id
+        updates["last_np_beatmap_id"] = last_np_beatmap_id
     # (primary cannot be updated)
     if not isinstance(expires_at, Unset):
-        osu_session["expires_at"] = expires_at
-        await clients.redis.expireat(osu_session_key, expires_at)
+        updates["expires_at"] = expires_at
+    updates["updated_at"] = datetime.now()
 
-    osu_session["updated_at"] = datetime.now()
+    expire_at = (
+        expires_at
+        if not isinstance(expires_at, Unset)
+        else updates["updated_at"] + timedelta(seconds=OSU_SESSION_TTL)
+    )
 
-    await clients.redis.set(osu_session_key, serialize(osu_session))
+    set_fields = serialize_fields(updates)
+    deleted_fields = [field for field, value in updates.items() if value is None]
+    script_keys = [
+        osu_session_key,
+        PRIVILEGE_COUNTS_KEY,
+        INDEX_ENTRIES_KEY,
+        REGISTRY_KEY,
+    ]
+    script_args = [
+        str(osu_session_id),
+        int(expire_at.timestamp()),
+        record_codec.DATETIME.encode_value(expire_at),
+        "1" if not isinstance(expires_at, Unset) else "",
+        OSU_SESSION_TTL,
+        len(set_fields),
+        *itertools.chain.from_iterable(set_fields.items()),
+        *deleted_fields,
+    ]
+
+    if unit_of_work.current() is None:
+        raw_osu_session = await _PARTIAL_UPDATE_SCRIPT.run(
+            clients.redis,
+            keys=script_keys,
+            args=script_args,
+        )
+        osu_session_cache.invalidate(osu_session_id)
+        await osu_session_cache.publish_invalidation(osu_session_id)
+        if raw_osu_session is None:
+            return None
 
-    return cast(OsuSession, osu_session)
+        osu_session = deserialize(
+            dict(zip(raw_osu_session[::2], raw_osu_session[1::2]))
+        )
+    else:
+        # the caller is owed the updated session; read it before the write is
+        # deferred, unless it's already pending from an earlier write
+        maybe_osu_session = await fetch_by_id(osu_session_id)
+        if maybe_osu_session is None:
+            return None
+
+        osu_session = maybe_osu_session
+        osu_session.update(updates)  # type: ignore
+
+        def update(pipe: Pipeline) -> None:
+            _PARTIAL_UPDATE_SCRIPT.queue(pipe, keys=script_keys, args=script_args)
+            osu_session_cache.queue_invalidation(pipe, osu_session_id)
+
+        async def on_updated(results: list[Any]) -> None:
+            osu_session_cache.invalidate(osu_session_id)
+
+        await unit_of_work.write(script_keys, update, on_updated)
+        unit_of_work.set_pending(osu_session_key, osu_session.copy())
+
+    if previous_username is not None or not isinstance(expires_at, Unset):
+        await _update_indexes(osu_session, previous_username)
+
+    # invalidate the encoded presence & stats packets if they've changed
+    if not all(
+        isinstance(field, Unset)
+        for field in (
+            username,
+            utc_offset,
+            country,
+            privileges,
+            game_mode,
+            latitude,
+            longitude,
+            action,
+            info_text,
+            beatmap_md5,
+            beatmap_id,
+            mods,
+        )
+    ):
+        await presence_packets.bump_version(osu_session["account_id"])
+
+    return osu_session
+
+
+async def _update_indexes(
+    osu_session: OsuSession,
+    previous_username: str | None,
+) -> None:
+    """Update the registry & indexes after a session's username or expiry changes."""
+    osu_session_id = str(osu_session["osu_session_id"])
+    username_index_key = make_username_index_key(osu_session["username"])
+
+    def update_indexes(pipe: Pipeline) -> None:
+        pipe.zadd(REGISTRY_KEY, {osu_session_id: osu_session["expires_at"].timestamp()})
+        if previous_username is not None:
+            pipe.srem(make_username_index_key(previous_username), osu_session_id)
+            pipe.sadd(username_index_key, osu_session_id)
+
+    await unit_of_work.write([REGISTRY_KEY, username_index_key], update_indexes)
+
+
+# refreshes last_communicated_at & pushes back the session's expiry (unless
+# it's been set later), so sessions only expire once their clients stop
+# polling. KEYS: the session, the registry. ARGV: last_communicated_at, the
+# new expires_at, its unix time, the ttl, the session id. returns the
+# session's privileges, or nil if the session doesn't exist
+_HEARTBEAT_SCRIPT = Script(
+    """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return false
+end
+redis.call('HSET', KEYS[1], 'last_communicated_at', ARGV[1])
+local ttl = redis.call('TTL', KEYS[1])
+if ttl >= 0 and ttl < tonumber(ARGV[4]) then
+    redis.call('HSET', KEYS[1], 'expires_at', ARGV[2])
+    redis.call('EXPIRE', KEYS[1], ARGV[4])
+    redis.call('ZADD', KEYS[2], ARGV[3], ARGV[5])
+end
+return tonumber(redis.call('HGET', KEYS[1], 'privileges'))
+"""
+)
+
+
+def queue_heartbeat(
+    pipe: Pipeline,
+    osu_session_id: UUID,
+    last_communicated_at: datetime,
+) -> None:
+    """Queue a heartbeat, resulting in the session's privileges (or None if gone)."""
+    expires_at = last_communicated_at + timedelta(seconds=OSU_SESSION_TTL)
+    _HEARTBEAT_SCRIPT.queue(
+        pipe,
+        keys=[make_key(osu_session_id), REGISTRY_KEY],
+        args=[
+            record_codec.DATETIME.encode_value(last_communicated_at),
+            record_codec.DATETIME.encode_value(expires_at),
+            expires_at.timestamp(),
+            OSU_SESSION_TTL,
+            str(osu_session_id),
+        ],
+    )
+
+
+async def heartbeat(osu_session_id: UUID, last_communicated_at: datetime) -> None:
+    """Record that a session's client has communicated with the server."""
+    await unit_of_work.write(
+        [make_key(osu_session_id), REGISTRY_KEY],
+        lambda pipe: queue_heartbeat(pipe, osu_session_id, last_communicated_at),
+    )
 
 
 async def delete_by_id(osu_session_id: UUID) -> OsuSession | None:
     session_key = make_key(osu_session_id)
+    await unit_of_work.flush_pending([session_key])
 
-    osu_session = await clients.redis.get(session_key)
-    if osu_session is None:
+    # (the index entry goes with the session, so it won't also be pruned)
+    async with clients.redis.pipeline(transaction=True) as pipe:
+        pipe.hgetall(session_key)
+        pipe.delete(session_key)
+        pipe.hdel(INDEX_ENTRIES_KEY, str(osu_session_id))
+        osu_session_cache.queue_invalidation(pipe, osu_session_id)
+        raw_osu_session, *_ = await pipe.execute()
+
+    osu_session_cache.invalidate(osu_session_id)
+
+    if not raw_osu_session:
         return None
 
-    await clients.redis.delete(session_key)
+    osu_session = deserialize(raw_osu_session)
+
+    async with clients.redis.pipeline(transaction=True) as pipe:
+        pipe.zrem(REGISTRY_KEY, str(osu_session_id))
+        pipe.zrem(ORDERED_INDEX_KEY, str(osu_session_id))
+        pipe.hincrby(PRIVILEGE_COUNTS_KEY, str(osu_session["privileges"]), -1)
+        _queue_remove_from_indexes(
+            pipe,
+            osu_session_id,
+            osu_session["account_id"],
+            osu_session["username"],
+        )
+        await pipe.execute()
 
-    return deserialize(osu_session)
+    return osu_session
@@ -1,41 +1,79 @@
+import struct
+import time
+from collections.abc import Iterable
+from collections.abc import Mapping
 from datetime import datetime
-from typing import cast
-from typing import Literal
+from typing import Any
 from typing import TypedDict
 from uuid import UUID
 
+from redis.asyncio.client import Pipeline
+
 from app import clients
-from app import json
 from app import logger
+from app import packets
+from app import settings
+from app import unit_of_work
+from app.adapters.redis import Script
+from app.repositories import local_packet_bundles
+from app.repositories.osu_sessions import OSU_SESSION_TTL
+
 
+STATS_KEY = "server:packet-bundle-stats"
 
-def make_key(osu_session_id: UUID | Literal["*"]) -> str:
+
+def make_key(osu_session_id: UUID) -> str:
     return f"server:packet-bundles:{osu_session_id}"
 
 
+def make_byte_size_key(osu_session_id: UUID) -> str:
+    return f"server:packet-bundle-bytes:{osu_session_id}"
+
+
+def make_supersede_keys_key(osu_session_id: UUID) -> str:
+    return f"server:packet-bundle-supersede-keys:{osu_session_id}"
+
+
+def make_supersede_key(packet_id: int, subject_id: int | str) -> str:
+    """Key packets that make earlier unsent ones with the same key obsolete.
+
+    e.g. only the latest USER_STATS packet for an account is worth sending.
+    """
+    return f"{packet_id}:{subject_id}"
+
+
 class PacketBundle(TypedDict):
     data: bytes
     created_at: datetime
 
 
+# bundles are stored as a format version & creation timestamp, then raw data
+BUNDLE_FORMAT_VERSION = 1
+_BUNDLE_HEADER = struct.Struct("<Bd")
+
+
 def serialize(bundle: PacketBundle) -> bytes:
-    return json.dumps(
-        {
-            "data": list(bundle["data"]),
-            "created_at": bundle["created_at"].isoformat(),
-        }
+    return (
+        _BUNDLE_HEADER.pack(BUNDLE_FORMAT_VERSION, bundle["created_at"].timestamp())
+        + bundle["data"]
     )
 
 
-def deserialize(raw_bundle: str) -> PacketBundle:
-    untyped_bundle = json.loads(raw_bundle)
-    untyped_bundle["created_at"] = datetime.fromisoformat(untyped_bundle["created_at"])
-    return cast(PacketBundle, untyped_bundle)
+def deserialize(raw_bundle: bytes) -> PacketBundle:
+    format_version, created_at = _BUNDLE_HEADER.unpack_from(raw_bundle)
+    if format_version != BUNDLE_FORMAT_VERSION:
+        raise ValueError(f"Unknown packet bundle format version: {format_version}")
+
+    return {
+        "data": raw_bundle[_BUNDLE_HEADER.size :],
+        "created_at": datetime.fromtimestamp(created_at),
+    }
 
 
 async def enqueue(
     osu_session_id: UUID,
     data: bytes,
+    supersede_key: str | None = None,
 ) -> PacketBundle:
     now = datetime.now()
     bundle: PacketBundle = {
@@ -43,39 +81,397 @@ async def enqueue(
         "created_at": now,
     }
 
-    queue_size = await clients.redis.rpush(
-        make_key(osu_session_id),
-        serialize(bundle),
+    await _push_many([(osu_session_id, serialize(bundle), supersede_key)])
+
+    return bundle
+
+
+async def enqueue_many(
+    osu_session_ids: Iterable[UUID],
+    data: bytes,
+    supersede_key: str | None = None,
+) -> PacketBundle:
+    """Enqueue the same bundle for many sessions, in a single round trip."""
+    now = datetime.now()
+    bundle: PacketBundle = {
+        "data": data,
+        "created_at": now,
+    }
+    raw_bundle = serialize(bundle)
+
+    await _push_many(
+        [
+            (osu_session_id, raw_bundle, supersede_key)
+            for osu_session_id in osu_session_ids
+        ]
+    )
+
+    return bundle
+
+
+async def enqueue_each(
+    data_by_osu_session_id: Mapping[UUID, bytes],
+    supersede_key: str | None = None,
+) -> None:
+    """Enqueue a different bundle for each session, in a single round trip."""
+    now = datetime.now()
+
+    await _push_many(
+        [
+            (
+                osu_session_id,
+                serialize({"data": data, "created_at": now}),
+                supersede_key,
+            )
+            for osu_session_id, data in data_by_osu_session_id.items()
+        ]
+    )
+
+
+# pushes a bundle, replacing the session's unsent bundle with the same
+# supersede key (if any), and keeps the queue's byte size & expiry up to date
+_PUSH_SCRIPT = Script(
+    """
+if ARGV[2] ~= '' then
+    local superseded_bundle = redis.call('HGET', KEYS[2], ARGV[2])
+    if superseded_bundle and redis.call('LREM', KEYS[1], 1, superseded_bundle) == 1 then
+        redis.call('DECRBY', KEYS[3], #superseded_bundle)
+    end
+    redis.call('HSET', KEYS[2], ARGV[2], ARGV[1])
+    redis.call('EXPIRE', KEYS[2], ARGV[3])
+end
+local queue_size = redis.call('RPUSH', KEYS[1], ARGV[1])
+local queue_bytes = redis.call('INCRBY', KEYS[3], #ARGV[1])
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+redis.call('EXPIRE', KEYS[3], ARGV[3])
+return {queue_size, queue_bytes}
+"""
+)
+
+# sheds an oversized queue. superseded bundles are already dropped as they're
+# replaced (see _PUSH_SCRIPT), & every other bundle must be delivered in order
+# (e.g. messages, match starts, spectate frames), so a queue which is still
+# too large is replaced with a request to reconnect, rather than thinned out.
+# (the queue may have been dequeued from since it was pushed to)
+_SHED_SCRIPT = Script(
+    """
+local queue_size = redis.call('LLEN', KEYS[1])
+local queue_bytes = tonumber(redis.call('GET', KEYS[3]) or '0')
+if queue_size <= tonumber(ARGV[1]) and queue_bytes <= tonumber(ARGV[2]) then
+    return {0, 0}
+end
+
+redis.call('DEL', KEYS[1], KEYS[2])
+redis.call('RPUSH', KEYS[1], ARGV[3])
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+redis.call('SET', KEYS[3], #ARGV[3], 'EX', ARGV[4])
+redis.call('HINCRBY', KEYS[4], 'shed_queues', 1)
+redis.call('HINCRBY', KEYS[4], 'dropped_bundles', queue_size)
+redis.call('HINCRBY', KEYS[4], 'forced_restarts', 1)
+return {queue_size, 1}
+"""
+)
+
+
+async def _push_many(raw_bundles: list[tuple[UUID, bytes, str | None]]) -> None:
+    if settings.PACKET_BUNDLE_LOCAL_DELIVERY:
+        raw_bundles = await _push_locally(raw_bundles)
+
+    if not raw_bundles:
+        return
+
+    def push(pipe: Pipeline) -> None:
+        for osu_session_id, raw_bundle, supersede_key in raw_bundles:
+            _PUSH_SCRIPT.queue(
+                pipe,
+                keys=[
+                    make_key(osu_session_id),
+                    make_supersede_keys_key(osu_session_id),
+                    make_byte_size_key(osu_session_id),
+                ],
+                args=[raw_bundle, supersede_key or "", OSU_SESSION_TTL],
+            )
+
+    async def shed_oversized_queues(queue_sizes: list[Any]) -> None:
+        oversized_queues = {
+            osu_session_id: (queue_size, queue_bytes)
+            for (osu_session_id, _, _), (queue_size, queue_bytes) in zip(
+                raw_bundles, queue_sizes
+            )
+            if queue_size > settings.PACKET_BUNDLE_QUEUE_MAX_SIZE
+            or queue_bytes > settings.PACKET_BUNDLE_QUEUE_MAX_BYTES
+        }
+        if oversized_queues:
+            await _shed(oversized_queues)
+
+    await unit_of_work.write(
+        [make_key(osu_session_id) for osu_session_id, _, _ in raw_bundles],
+        push,
+        on_results=shed_oversized_queues,
     )
 
-    # XXX: warn developers if a queue's size becomes very large
-    if queue_size > 50:
+
+async def _push_locally(
+    raw_bundles: list[tuple[UUID, bytes, str | None]]
+) -> list[tuple[UUID, bytes, str | None]]:
+    """Push bundles for sessions served by this worker, returning the rest."""
+    remote_raw_bundles = []
+    local_shed_results = []
+
+    for osu_session_id, raw_bundle, supersede_key in raw_bundles:
+        if not local_packet_bundles.is_claimed(osu_session_id):
+            remote_raw_bundles.append((osu_session_id, raw_bundle, supersede_key))
+            continue
+
+        queue_size, queue_bytes = local_packet_bundles.push(
+            osu_session_id,
+            raw_bundle,
+            supersede_key,
+        )
+        if (
+            queue_size > settings.PACKET_BUNDLE_QUEUE_MAX_SIZE
+            or queue_bytes > settings.PACKET_BUNDLE_QUEUE_MAX_BYTES
+        ):
+            dropped_bundles, restarted = local_packet_bundles.shed(
+                osu_session_id,
+                settings.PACKET_BUNDLE_QUEUE_MAX_SIZE,
+                settings.PACKET_BUNDLE_QUEUE_MAX_BYTES,
+                _make_restart_bundle(),
+            )
+            logger.warning(
+                "Packet bundle queue exceeded its limits",
+                osu_session_id=osu_session_id,
+                queue_size=queue_size,
+                queue_bytes=queue_bytes,
+                dropped_bundles=dropped_bundles,
+                forced_restart=restarted,
+                worker_local=True,
+            )
+            local_shed_results.append((dropped_bundles, restarted))
+
+    if local_shed_results:
+        async with clients.redis.pipeline(transaction=False) as pipe:
+            for dropped_bundles, restarted in local_shed_results:
+                pipe.hincrby(STATS_KEY, "shed_queues", 1)
+                pipe.hincrby(STATS_KEY, "dropped_bundles", dropped_bundles)
+                if restarted:
+                    pipe.hincrby(STATS_KEY, "forced_restarts", 1)
+            await pipe.execute()
+
+    return remote_raw_bundles
+
+
+def _make_restart_bundle() -> bytes:
+    return serialize(
+        {
+            "data": packets.write_restart_packet(millseconds_until_restart=0),
+            "created_at": datetime.now(),
+        }
+    )
+
+
+async def _shed(oversized_queues: Mapping[UUID, tuple[int, int]]) -> None:
+    restart_bundle = _make_restart_bundle()
+
+    async with clients.redis.pipeline(transaction=False) as pipe:
+        for osu_session_id in oversized_queues:
+            _SHED_SCRIPT.queue(
+                pipe,
+                keys=[
+                    make_key(osu_session_id),
+                    make_supersede_keys_key(osu_session_id),
+                    make_byte_size_key(osu_session_id),
+                    STATS_KEY,
+                ],
+                args=[
+                    settings.PACKET_BUNDLE_QUEUE_MAX_SIZE,
+                    settings.PACKET_BUNDLE_QUEUE_MAX_BYTES,
+                    restart_bundle,
+                    OSU_SESSION_TTL,
+                ],
+            )
+        shed_results = await pipe.execute()
+
+    for (osu_session_id, (queue_size, queue_bytes)), (
+        dropped_bundles,
+        restarted,
+    ) in zip(oversized_queues.items(), shed_results):
+        if not restarted:
+            # (the session has since polled its queue back within its limits)
+            continue
+
         logger.warning(
-            "Packet bundle size exceeded 20 items",
-            queue_size=queue_size,
+            "Packet bundle queue exceeded its limits",
             osu_session_id=osu_session_id,
+            queue_size=queue_size,
+            queue_bytes=queue_bytes,
+            dropped_bundles=dropped_bundles,
+            forced_restart=bool(restarted),
         )
 
-    return bundle
+
+class PacketBundleStats(TypedDict):
+    # how many times a queue exceeded its limits & was shed
+    shed_queues: int
+    dropped_bundles: int
+    forced_restarts: int
+
+
+async def fetch_stats() -> PacketBundleStats:
+    raw_stats = await clients.redis.hgetall(STATS_KEY)
+    return {
+        "shed_queues": int(raw_stats.get(b"shed_queues", 0)),
+        "dropped_bundles": int(raw_stats.get(b"dropped_bundles", 0)),
+        "forced_restarts": int(raw_stats.get(b"forced_restarts", 0)),
+    }
+
+
+async def fetch_queue_size(osu_session_id: UUID) -> tuple[int, int]:
+    """Fetch the number of bundles, & bytes of them, in a session's queue."""
+    await unit_of_work.flush_pending([make_key(osu_session_id)])
+
+    async with clients.redis.pipeline() as pipe:
+        pipe.llen(make_key(osu_session_id))
+        pipe.get(make_byte_size_key(osu_session_id))
+        queue_size, raw_queue_bytes = await pipe.execute()
+
+    return queue_size, int(raw_queue_bytes) if raw_queue_bytes is not None else 0
+
+
+# pops the oldest bundle, keeping the queue's byte size up to date, & forgets
+# it as the latest for its supersede key (if any), so nothing else is removed
+# in its place when it's superseded
+_DEQUEUE_ONE_SCRIPT = Script(
+    """
+local bundle = redis.call('LPOP', KEYS[1])
+if not bundle then
+    return false
+end
+redis.call('DECRBY', KEYS[3], #bundle)
+local supersedable_bundles = redis.call('HGETALL', KEYS[2])
+for i = 1, #supersedable_bundles, 2 do
+    if supersedable_bundles[i + 1] == bundle then
+        redis.call('HDEL', KEYS[2], supersedable_bundles[i])
+    end
+end
+return bundle
+"""
+)
 
 
 async def dequeue_one(osu_session_id: UUID) -> PacketBundle | None:
-    bundle = await clients.redis.lpop(make_key(osu_session_id))
+    await unit_of_work.flush_pending([make_key(osu_session_id)])
+
+    bundle = await _DEQUEUE_ONE_SCRIPT.run(
+        clients.redis,
+        keys=[
+            make_key(osu_session_id),
+            make_supersede_keys_key(osu_session_id),
+            make_byte_size_key(osu_session_id),
+        ],
+    )
     if bundle is None:
         return None
 
     return deserialize(bundle)
 
 
+async def claim(osu_session_id: UUID) -> None:
+    """Deliver a session's bundles in-process, as this worker serves its polls."""
+    if settings.PACKET_BUNDLE_LOCAL_DELIVERY:
+        await local_packet_bundles.claim(osu_session_id)
+
+
+async def release(osu_session_id: UUID) -> None:
+    """Hand a session's in-process bundles back to redis, for another worker."""
+    local_raw_bundles = local_packet_bundles.release(osu_session_id)
+
+    await _push_many(
+        [
+            (osu_session_id, raw_bundle, supersede_key)
+            for raw_bundle, supersede_key in local_raw_bundles
+        ]
+    )
+
+
+async def release_all() -> None:
+    """Hand all in-process bundles back to redis, e.g. when shutting down."""
+    for osu_session_id in local_packet_bundles.claimed_osu_session_ids():
+        await release(osu_session_id)
+
+
+def discard(osu_session_id: UUID) -> None:
+    """Drop a session's in-process bundles, e.g. when they log out."""
+    local_packet_bundles.release(osu_session_id)
+
+
+async def listen_for_handoffs() -> None:
+    """Release sessions whose polls have moved to other workers, & prune those
+    which stopped polling, until cancelled."""
+    async with clients.redis.pubsub() as pubsub:
+        await pubsub.subscribe(
+            local_packet_bundles.make_handoff_channel(local_packet_bundles.WORKER_ID)
+        )
+
+        pruned_at = time.monotonic()
+        while True:
+            message = await pubsub.get_message(
+                ignore_subscribe_messages=True,
+                timeout=local_packet_bundles.PRUNE_INTERVAL,
+            )
+            if message is not None:
+                await release(UUID(message["data"].decode()))
+
+            if time.monotonic() - pruned_at >= local_packet_bundles.PRUNE_INTERVAL:
+                pruned_sessions = local_packet_bundles.prune_stale()
+                if pruned_sessions:
+                    logger.info(
+                        "Pruned packet bundle queues of sessions which stopped polling",
+                        pruned_sessions=pruned_sessions,
+                    )
+                pruned_at = time.monotonic()
+
+
 async def dequeue_all(osu_session_id: UUID) -> list[PacketBundle]:
-    bundles = await clients.redis.lrange(
+    return [deserialize(raw_bundle) for raw_bundle in await _drain(osu_session_id)]
+
+
+async def dequeue_all_data(osu_session_id: UUID) -> bytes:
+    """Dequeue all pending bundles' data, concatenated, in a single round trip."""
+    return join_data(await _drain(osu_session_id))
+
+
+def join_data(raw_bundles: list[bytes]) -> bytes:
+    return b"".join(
+        raw_bundle[_BUNDLE_HEADER.size :]
+        if raw_bundle[:1] != b"{"
+        else deserialize(raw_bundle)["data"]
+        for raw_bundle in raw_bundles
+    )
+
+
+def queue_drain(pipe: Pipeline, osu_session_id: UUID) -> None:
+    """Queue reading & clearing a session's queue, resulting in its bundles & a
+    count of deleted keys. Use with a transaction, & finish with `drained`."""
+    pipe.lrange(make_key(osu_session_id), start=0, end=-1)
+    pipe.delete(
         make_key(osu_session_id),
-        start=0,
-        end=-1,
+        make_supersede_keys_key(osu_session_id),
+        make_byte_size_key(osu_session_id),
     )
-    if bundles is None:
-        return []
 
-    await clients.redis.delete(make_key(osu_session_id))
 
-    return [deserialize(bundle) for bundle in bundles]
+def drained(osu_session_id: UUID, raw_bundles: list[bytes]) -> list[bytes]:
+    # bundles from other workers (or from before our claim) come first
+    return raw_bundles + local_packet_bundles.pop_all(osu_session_id)
+
+
+async def _drain(osu_session_id: UUID) -> list[bytes]:
+    await unit_of_work.flush_pending([make_key(osu_session_id)])
+
+    # read & clear the queue atomically, so nothing enqueued in between is lost
+    async with clients.redis.pipeline(transaction=True) as pipe:
+        queue_drain(pipe, osu_session_id)
+        raw_bundles, _ = await pipe.execute()
+
+    return drained(osu_session_id, raw_bundles)
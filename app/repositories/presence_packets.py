@@ -0,0 +1,124 @@
+from collections.abc import Sequence
+from typing import TypedDict
+
+from redis.asyncio.client import Pipeline
+
+from app import clients
+from app import unit_of_work
+
+# the ranks of other players shift without bumping an account's version,
+# so bound how long an encoded global rank can be served for
+PRESENCE_PACKETS_TTL = 60 * 5  # 5 minutes
+
+# how long an account's version outlives its last change, or the last packets
+# encoded at it (so that it can't expire, & restart, while they're cached)
+PRESENCE_VERSION_TTL = 60 * 60 * 24  # 1 day
+
+
+def make_key(account_id: int, game_mode: int) -> str:
+    return f"server:presence-packets:{account_id}:{game_mode}"
+
+
+def make_version_key(account_id: int) -> str:
+    return f"server:presence-packets-version:{account_id}"
+
+
+class PresencePackets(TypedDict):
+    version: int
+    presence_packet: bytes
+    stats_packet: bytes
+
+
+async def bump_version(account_id: int) -> None:
+    """Invalidate all encoded presence & stats packets for an account."""
+    version_key = make_version_key(account_id)
+
+    # (deferred along with the session write it follows, so packets can't be
+    # encoded from the stale session at the new version)
+    def bump(pipe: Pipeline) -> None:
+        pipe.incr(version_key)
+        pipe.expire(version_key, PRESENCE_VERSION_TTL)
+
+    await unit_of_work.write([version_key], bump)
+
+
+async def fetch_version(account_id: int) -> int:
+    await unit_of_work.flush_pending([make_version_key(account_id)])
+
+    version = await clients.redis.get(make_version_key(account_id))
+    return int(version) if version is not None else 0
+
+
+async def create(
+    account_id: int,
+    game_mode: int,
+    version: int,
+    presence_packet: bytes,
+    stats_packet: bytes,
+) -> PresencePackets:
+    presence_packets: PresencePackets = {
+        "version": version,
+        "presence_packet": presence_packet,
+        "stats_packet": stats_packet,
+    }
+
+    async with clients.redis.pipeline() as pipe:
+        pipe.hset(make_key(account_id, game_mode), mapping=presence_packets)  # type: ignore
+        pipe.expire(make_key(account_id, game_mode), PRESENCE_PACKETS_TTL)
+        pipe.expire(make_version_key(account_id), PRESENCE_VERSION_TTL)
+        await pipe.execute()
+
+    return presence_packets
+
+
+def _deserialize(
+    raw_version: bytes | None,
+    raw_presence_packets: dict[bytes, bytes],
+) -> PresencePackets | None:
+    if not raw_presence_packets:
+        return None
+
+    version = int(raw_version) if raw_version is not None else 0
+    if int(raw_presence_packets[b"version"]) != version:
+        return None
+
+    return {
+        "version": version,
+        "presence_packet": raw_presence_packets[b"presence_packet"],
+        "stats_packet": raw_presence_packets[b"stats_packet"],
+    }
+
+
+async def fetch_one(account_id: int, game_mode: int) -> PresencePackets | None:
+    """Fetch encoded packets, if they were built at the account's current version."""
+    await unit_of_work.flush_pending([make_version_key(account_id)])
+
+    async with clients.redis.pipeline() as pipe:
+        pipe.get(make_version_key(account_id))
+        pipe.hgetall(make_key(account_id, game_mode))
+        raw_version, raw_presence_packets = await pipe.execute()
+
+    return _deserialize(raw_version, raw_presence_packets)
+
+
+async def fetch_many(
+    account_game_modes: Sequence[tuple[int, int]],
+) -> list[PresencePackets | None]:
+    """Fetch the encoded packets of many (account id, game mode)s in one round trip."""
+    if not account_game_modes:
+        return []
+
+    await unit_of_work.flush_pending(
+        [make_version_key(account_id) for account_id, _ in account_game_modes]
+    )
+
+    async with clients.redis.pipeline() as pipe:
+        for account_id, game_mode in account_game_modes:
+            pipe.get(make_version_key(account_id))
+            pipe.hgetall(make_key(account_id, game_mode))
+        results = await pipe.execute()
+
+    return [
+        _deserialize(raw_version, raw_presence_packets)
+        for raw_version, raw_presence_packets in zip(results[::2], results[1::2])
+    ]
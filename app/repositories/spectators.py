@@ -2,6 +2,7 @@ from typing import Literal
 from uuid import UUID
 
 from app import clients
+from app import unit_of_work
 
 
 def make_key(host_osu_session_id: UUID | Literal["*"]) -> str:
@@ -20,10 +21,15 @@ async def add(
     host_osu_session_id: UUID,
     osu_session_id: UUID,
 ) -> UUID:
-    await clients.redis.sadd(
-        make_key(host_osu_session_id),
-        serialize(osu_session_id),
+    host_key = make_key(host_osu_session_id)
+    await unit_of_work.write(
+        [host_key],
+        lambda pipe: pipe.sadd(host_key, serialize(osu_session_id)),
     )
+
+    pending_spectators = unit_of_work.read_pending(host_key) or set()
+    unit_of_work.set_pending(host_key, pending_spectators | {osu_session_id})
+
     return osu_session_id
 
 
@@ -32,6 +38,8 @@ async def remove(
     osu_session_id: UUID,
 ) -> UUID | None:
     host_key = make_key(host_osu_session_id)
+    await unit_of_work.flush_pending([host_key])
+
     success = await clients.redis.srem(host_key, serialize(osu_session_id))
     return osu_session_id if success == 1 else None
 
@@ -39,4 +47,5 @@ async def remove(
 async def members(host_osu_session_id: UUID) -> set[UUID]:
     host_key = make_key(host_osu_session_id)
     spectators = await clients.redis.smembers(host_key)
-    return {deserialize(spectator) for spectator in spectators}
+    pending_spectators = unit_of_work.read_pending(host_key) or set()
+    return {deserialize(spectator) for spectator in spectators} | pending_spectators
@@ -4,6 +4,7 @@ from typing import TypedDict
 from app import clients
 from app._typing import UNSET
 from app._typing import Unset
+from app.repositories import presence_packets
 
 READ_PARAMS = """\
     s.account_id,
@@ -325,4 +326,17 @@ async def partial_update(
         """,
         values={"account_id": account_id, "game_mode": game_mode} | update_fields,
     )
-    return deserialize(stats) if stats is not None else None
+    if stats is None:
+        return None
+
+    # invalidate the encoded stats packets if they've changed
+    if update_fields.keys() & {
+        "total_score",
+        "ranked_score",
+        "performance_points",
+        "play_count",
+        "accuracy",
+    }:
+        await presence_packets.bump_version(account_id)
+
+    return deserialize(stats)
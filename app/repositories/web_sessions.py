@@ -1,6 +1,5 @@
 from __future__ import annotations
 
-import json
 from datetime import datetime
 from datetime import timedelta
 from typing import cast
@@ -9,6 +8,7 @@ from typing import TypedDict
 from uuid import UUID
 
 from app import clients
+from app import record_codec
 from app._typing import UNSET
 from app._typing import Unset
 
@@ -28,37 +28,24 @@ class WebSession(TypedDict):
     updated_at: datetime
 
 
-def serialize(web_session: WebSession) -> str:
-    return json.dumps(
-        {
-            "web_session_id": str(web_session["web_session_id"]),
-            "account_id": web_session["account_id"],
-            "expires_at": web_session["expires_at"].isoformat(),
-            "created_at": web_session["created_at"].isoformat(),
-            "updated_at": web_session["updated_at"].isoformat(),
-        }
-    )
+WEB_SESSION_SCHEMA = record_codec.RecordSchema(
+    version=1,
+    fields=[
+        record_codec.Field("web_session_id", record_codec.UUID),
+        record_codec.Field("account_id", record_codec.INT),
+        record_codec.Field("expires_at", record_codec.DATETIME),
+        record_codec.Field("created_at", record_codec.DATETIME),
+        record_codec.Field("updated_at", record_codec.DATETIME),
+    ],
+)
 
 
-def deserialize(raw_session: str) -> WebSession:
-    untyped_session = json.loads(raw_session)
+def serialize(web_session: WebSession) -> bytes:
+    return WEB_SESSION_SCHEMA.encode(web_session)
 
-    assert isinstance(untyped_session, dict)
 
-    untyped_session["web_session_id"] = UUID(untyped_session["web_session_id"])
-    untyped_session["account_id"] = untyped_session["account_id"]
-
-    untyped_session["expires_at"] = datetime.fromisoformat(
-        untyped_session["expires_at"]
-    )
-    untyped_session["created_at"] = datetime.fromisoformat(
-        untyped_session["created_at"]
-    )
-    untyped_session["updated_at"] = datetime.fromisoformat(
-        untyped_session["updated_at"]
-    )
-
-    return cast(WebSession, untyped_session)
+def deserialize(raw_session: bytes) -> WebSession:
+    return cast(WebSession, WEB_SESSION_SCHEMA.decode(raw_session))
 
 
 async def create(
@@ -91,10 +78,10 @@ async def fetch_by_id(web_session_id: UUID) -> WebSession | None:
 
 
 async def fetch_by_account_id(account_id: int) -> WebSession | None:
-    all_web_sessions = await fetch_all()
-    for web_session in all_web_sessions:
-        if web_session["account_id"] == account_id:
-            return web_session
+    for raw_web_session in await _fetch_all_raw():
+        # (only the matching session needs decoding)
+        if WEB_SESSION_SCHEMA.decode_field(raw_web_session, "account_id") == account_id:
+            return deserialize(raw_web_session)
 
     return None
 
@@ -140,30 +127,32 @@ async def fetch_total_count() -> int:
     return count
 
 
-async def fetch_all() -> list[WebSession]:
+async def _fetch_all_raw() -> list[bytes]:
     web_session_key = make_key("*")
 
     cursor = None
-    web_sessions = []
+    raw_web_sessions = []
 
     while cursor != 0:
         cursor, keys = await clients.redis.scan(
             cursor=cursor or 0,
             match=web_session_key,
         )
+        if not keys:
+            continue
+
+        # (sessions may have expired since their keys were read)
+        raw_web_sessions.extend(
+            raw_web_session
+            for raw_web_session in await clients.redis.mget(keys)
+            if raw_web_session is not None
+        )
 
-        raw_web_sessions = await clients.redis.mget(keys)
-
-        for raw_web_session in raw_web_sessions:
-            assert (
-                raw_web_session is not None
-            )  # TODO: why does mget return list[T | None]?
-
-            web_session = deserialize(raw_web_session)
+    return raw_web_sessions
 
-            web_sessions.append(web_session)
 
-    return web_sessions
+async def fetch_all() -> list[WebSession]:
+    return [deserialize(raw_web_session) for raw_web_session in await _fetch_all_raw()]
 
 
 async def partial_update(
@@ -2,6 +2,7 @@ from uuid import UUID
 
 from app import logger
 from app.errors import ServiceError
+from app.repositories import match_packets
 from app.repositories import multiplayer_match_ids
 from app.repositories import multiplayer_matches
 from app.repositories import multiplayer_slots
@@ -132,6 +133,7 @@ async def delete(match_id: int) -> MultiplayerMatch | ServiceError:
         match = await multiplayer_matches.delete(match_id)
         for slot in await multiplayer_slots.fetch_all(match_id):
             await multiplayer_slots.delete(match_id, slot["slot_id"])
+        await match_packets.delete(match_id)
     except Exception as exc:  # pragma: no cover
         logger.error("Failed to delete multiplayer match", exc_info=exc)
         return ServiceError.MULTIPLAYER_MATCHES_DELETE_FAILED
@@ -1,3 +1,5 @@
+import base64
+import binascii
 import uuid
 from datetime import datetime
 from typing import Any
@@ -81,22 +83,44 @@ async def fetch_by_id(osu_session_id: UUID) -> OsuSession | ServiceError:
     return osu_session
 
 
+def _encode_cursor(osu_session_id: UUID) -> str:
+    return base64.urlsafe_b64encode(osu_session_id.bytes).rstrip(b"=").decode()
+
+
+def _decode_cursor(cursor: str) -> UUID | None:
+    try:
+        return UUID(bytes=base64.urlsafe_b64decode(cursor + "=="))
+    except (binascii.Error, ValueError):
+        return None
+
+
 async def fetch_many(
     has_any_privilege_bit: int | None = None,
-    page: int = 1,
+    cursor: str | None = None,
     page_size: int = 50,
-) -> list[OsuSession] | ServiceError:
+) -> tuple[list[OsuSession], str | None] | ServiceError:
+    """Fetch a page of sessions, along with the cursor for the next page."""
+    after_osu_session_id = None
+    if cursor is not None:
+        after_osu_session_id = _decode_cursor(cursor)
+        if after_osu_session_id is None:
+            return ServiceError.OSU_SESSIONS_CURSOR_INVALID
+
     try:
         _osu_sessions = await osu_sessions.fetch_many(
             has_any_privilege_bit=has_any_privilege_bit,
-            page=page,
+            after_osu_session_id=after_osu_session_id,
             page_size=page_size,
         )
     except Exception as exc:  # pragma: no cover
         logger.error("Failed to fetch osu! sessions", exc_info=exc)
         return ServiceError.INTERNAL_SERVER_ERROR
 
-    return _osu_sessions
+    next_cursor = None
+    if _osu_sessions and len(_osu_sessions) == page_size:
+        next_cursor = _encode_cursor(_osu_sessions[-1]["osu_session_id"])
+
+    return _osu_sessions, next_cursor
 
 
 async def fetch_total_count(
@@ -55,3 +55,23 @@ S3_BUCKET_NAME = os.environ["S3_BUCKET_NAME"]
 S3_ENDPOINT_URL = os.environ["S3_ENDPOINT_URL"]
 
 RECAPTCHA_SECRET_KEY = os.environ["RECAPTCHA_SECRET_KEY"]
+
+# the portion of relayed spectator frame bundles fully decoded & validated
+SPECTATE_FRAMES_VALIDATION_SAMPLE_RATE = float(
+    os.environ["SPECTATE_FRAMES_VALIDATION_SAMPLE_RATE"]
+)
+
+# the most packet bundles (& bytes of them) a session's queue may hold before
+# it is replaced with a request to reconnect (superseded bundles are dropped
+# as they are replaced, so don't count towards these)
+PACKET_BUNDLE_QUEUE_MAX_SIZE = int(os.environ["PACKET_BUNDLE_QUEUE_MAX_SIZE"])
+PACKET_BUNDLE_QUEUE_MAX_BYTES = int(os.environ["PACKET_BUNDLE_QUEUE_MAX_BYTES"])
+
+# queue packet bundles in-process for sessions polling this worker, rather
+# than in redis. requires sessions' polls to be routed to the same worker;
+# see app/repositories/local_packet_bundles.py
+PACKET_BUNDLE_LOCAL_DELIVERY = read_bool(os.environ["PACKET_BUNDLE_LOCAL_DELIVERY"])
+
+# how many decoded sessions each worker caches in-process, or 0 to disable;
+# see app/repositories/osu_session_cache.py
+OSU_SESSION_CACHE_SIZE = int(os.environ["OSU_SESSION_CACHE_SIZE"])
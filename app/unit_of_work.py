@@ -0,0 +1,125 @@
+from collections.abc import AsyncIterator
+from collections.abc import Awaitable
+from collections.abc import Callable
+from collections.abc import Iterable
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Any
+
+from redis.asyncio.client import Pipeline
+
+from app import clients
+
+# redis writes made while a unit of work is active are queued, & applied in
+# the order they were made, in one round trip when it ends. repositories keep
+# their pending writes readable (e.g. updated sessions) in `pending`, & flush
+# before operations that must see the writes land in redis first
+
+# queues one or more commands on a pipeline
+WriteCommand = Callable[[Pipeline], object]
+# handles the results of the commands, once they've been executed
+ResultsCallback = Callable[[list[Any]], Awaitable[None]]
+
+
+class UnitOfWork:
+    def __init__(self) -> None:
+        self.writes: list[tuple[WriteCommand, ResultsCallback | None]] = []
+        self.keys: set[str] = set()
+        # key -> a repository's view of the key's value with pending writes
+        self.pending: dict[str, Any] = {}
+
+
+_current_unit_of_work: ContextVar[UnitOfWork | None] = ContextVar(
+    "current_unit_of_work",
+    default=None,
+)
+
+
+def current() -> UnitOfWork | None:
+    return _current_unit_of_work.get()
+
+
+@asynccontextmanager
+async def begin() -> AsyncIterator[UnitOfWork]:
+    """Defer redis writes until the end of the block, then flush them together."""
+    unit_of_work = UnitOfWork()
+    token = _current_unit_of_work.set(unit_of_work)
+    try:
+        yield unit_of_work
+    finally:
+        # (writes made before an error were already visible before batching)
+        try:
+            await flush()
+        finally:
+            _current_unit_of_work.reset(token)
+
+
+async def write(
+    keys: Iterable[str],
+    command: WriteCommand,
+    on_results: ResultsCallback | None = None,
+) -> None:
+    """Write to the given keys, deferring the write if a unit of work is active."""
+    unit_of_work = current()
+    if unit_of_work is None:
+        async with clients.redis.pipeline(transaction=False) as pipe:
+            command(pipe)
+            results = await pipe.execute()
+
+        if on_results is not None:
+            await on_results(results)
+        return
+
+    unit_of_work.writes.append((command, on_results))
+    unit_of_work.keys.update(keys)
+
+
+def read_pending(key: str) -> Any | None:
+    """Read a repository's view of a key with pending writes, if there is one."""
+    unit_of_work = current()
+    if unit_of_work is None:
+        return None
+
+    return unit_of_work.pending.get(key)
+
+
+def set_pending(key: str, value: Any) -> None:
+    unit_of_work = current()
+    if unit_of_work is not None:
+        unit_of_work.pending[key] = value
+
+
+async def flush_pending(keys: Iterable[str]) -> None:
+    """Flush all pending writes if any are to the given keys."""
+    unit_of_work = current()
+    if unit_of_work is not None and not unit_of_work.keys.isdisjoint(keys):
+        await flush()
+
+
+async def flush() -> None:
+    """Apply all pending writes, atomically & in order, in a single round trip."""
+    unit_of_work = current()
+    if unit_of_work is None:
+        return
+
+    # (result callbacks may make writes of their own)
+    while unit_of_work.writes:
+        writes = unit_of_work.writes
+        unit_of_work.writes = []
+        unit_of_work.keys.clear()
+        unit_of_work.pending.clear()
+
+        async with clients.redis.pipeline(transaction=True) as pipe:
+            command_counts = []
+            for command, _ in writes:
+                queued_commands = len(pipe)
+                command(pipe)
+                command_counts.append(len(pipe) - queued_commands)
+
+            results = await pipe.execute()
+
+        offset = 0
+        for (_, on_results), command_count in zip(writes, command_counts):
+            if on_results is not None:
+                await on_results(results[offset : offset + command_count])
+            offset += command_count
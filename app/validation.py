@@ -1,6 +1,13 @@
+import math
+
 import email_validator
 
 from app import geolocation
+from app.packets import OsuReplayFrame
+
+# cursor positions are in osu!pixels relative to the 512x384 playfield;
+# they may leave the playfield, but never by this much
+REPLAY_FRAME_COORDINATE_LIMIT = 16384.0
 
 
 def validate_username(username: str) -> bool:
@@ -35,3 +42,21 @@ def validate_email(email: str) -> bool:
 
 def validate_country(country: str) -> bool:
     return country in geolocation.COUNTRY_STR_TO_INT
+
+
+def validate_replay_frames(replay_frames: list[OsuReplayFrame]) -> bool:
+    xs = [frame["x"] for frame in replay_frames]
+    ys = [frame["y"] for frame in replay_frames]
+    times = [frame["time"] for frame in replay_frames]
+
+    # Coordinate check (also rejects nan & inf)
+    if not all(
+        math.isfinite(coordinate) and abs(coordinate) <= REPLAY_FRAME_COORDINATE_LIMIT
+        for coordinate in xs + ys
+    ):
+        return False
+    # Time check
+    if not all(time <= next_time for time, next_time in zip(times, times[1:])):
+        return False
+
+    return True
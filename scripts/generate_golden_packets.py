@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+import os
+import sys
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+mount_dir = os.path.join(script_dir, "..")
+sys.path.append(mount_dir)
+
+from testing import sample_packets
+
+GOLDEN_DIR = os.path.join(mount_dir, "tests", "golden")
+
+
+def write_corpus(subdirectory: str, corpus: dict[str, bytes]) -> None:
+    corpus_dir = os.path.join(GOLDEN_DIR, subdirectory)
+    os.makedirs(corpus_dir, exist_ok=True)
+
+    for name, data in corpus.items():
+        with open(os.path.join(corpus_dir, f"{name}.bin"), "wb") as f:
+            f.write(data)
+
+
+def main() -> int:
+    write_corpus(
+        "server",
+        {
+            name: sample_packets.write_server_packet(name)
+            for name in sample_packets.SERVER_PACKETS
+        },
+    )
+    write_corpus(
+        "client",
+        {
+            name: sample_packets.write_client_packet(name)
+            for name in sample_packets.CLIENT_PACKETS
+        },
+    )
+    write_corpus(
+        "poll",
+        {
+            name: sample_packets.write_poll_request(name)
+            for name in sample_packets.POLL_REQUESTS
+        },
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,5 +1,6 @@
 import random
 import uuid
+from datetime import datetime
 from typing import TYPE_CHECKING
 
 from faker import Faker
@@ -17,6 +18,12 @@ def fake_country() -> str:
     return random.choice(tuple(geolocation.COUNTRY_STR_TO_INT))
 
 
+def fake_datetime() -> datetime:
+    # (records are stored to the millisecond)
+    value = fake.date_time()
+    return value.replace(microsecond=value.microsecond // 1000 * 1000)
+
+
 def fake_osu_session() -> "OsuSession":
     return {
         "osu_session_id": uuid.uuid4(),
@@ -39,12 +46,12 @@ def fake_osu_session() -> "OsuSession":
         "away_message": fake.text(),
         "multiplayer_match_id": fake.pyint(),
         "receive_match_updates": fake.pybool(),
-        "last_communicated_at": fake.date_time(),
+        "last_communicated_at": fake_datetime(),
         "last_np_beatmap_id": fake.pyint(),
         "primary": fake.pybool(),
-        "expires_at": fake.date_time(),
-        "created_at": fake.date_time(),
-        "updated_at": fake.date_time(),
+        "expires_at": fake_datetime(),
+        "created_at": fake_datetime(),
+        "updated_at": fake_datetime(),
     }
 
 
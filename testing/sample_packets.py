@@ -0,0 +1,230 @@
+from collections.abc import Callable
+from typing import Any
+
+from app import packets
+from app.packets import ClientPackets
+from app.packets import DataType
+from app.packets import OsuMatch
+from app.packets import OsuReplayFrameBundle
+from app.packets import OsuScoreFrame
+
+# packets with fixed, realistic contents; these are the source of the golden
+# corpus in tests/golden, so changing any of them means regenerating it with
+# scripts/generate_golden_packets.py
+
+
+def sample_osu_match(match_password: str = "") -> OsuMatch:
+    return {
+        "match_id": 7,
+        "match_in_progress": False,
+        "mods": 64,
+        "match_name": "cmyui's game",
+        "match_password": match_password,
+        "beatmap_name": "xi - FREEDOM DiVE [FOUR DIMENSIONS]",
+        "beatmap_id": 129891,
+        "beatmap_md5": "da8aae79c8f3306b5d65ec951874a7fb",
+        "slot_statuses": [8, 8, 4, 16] + [1] * 10 + [2] * 2,
+        "slot_teams": [0] * 16,
+        "per_slot_account_ids": [1000, 1001, 1002, 1003],
+        "host_account_id": 1000,
+        "game_mode": 0,
+        "win_condition": 3,
+        "team_type": 0,
+        "freemods_enabled": True,
+        "per_slot_mods": [8, 0, 16, 64] + [0] * 12,
+        "random_seed": 1337,
+    }
+
+
+def sample_score_frame(score_v2: bool = True) -> OsuScoreFrame:
+    score_frame: OsuScoreFrame = {
+        "time": 91_234,
+        "id": 0,
+        "num_300s": 812,
+        "num_100s": 21,
+        "num_50s": 2,
+        "num_gekis": 190,
+        "num_katus": 14,
+        "num_misses": 1,
+        "total_score": 48_123_456,
+        "current_combo": 402,
+        "max_combo": 1011,
+        "perfect": False,
+        "current_hp": 187,
+        "tag_byte": 0,
+        "score_v2": score_v2,
+    }
+    if score_v2:
+        score_frame["combo_portion"] = 0.625
+        score_frame["bonus_portion"] = 0.125
+    return score_frame
+
+
+def sample_replay_frame_bundle(frame_count: int = 40) -> OsuReplayFrameBundle:
+    return {
+        "replay_frames": [
+            {
+                "button_state": i % 4,
+                "taiko_byte": 0,
+                "x": 256.0 + (i % 32) * 4.5,
+                "y": 192.0 - (i % 16) * 2.25,
+                "time": 90_000 + 16 * i,
+            }
+            for i in range(frame_count)
+        ],
+        "score_frame": sample_score_frame(),
+        "replay_action": packets.ReplayAction.STANDARD,
+        "extra": 0,
+        "sequence_number": 1204,
+    }
+
+
+# server packet name -> (writer, writer args)
+SERVER_PACKETS: dict[str, tuple[Callable[..., bytes], tuple[Any, ...]]] = {
+    "user_id": (packets.write_user_id_packet, (1000,)),
+    "send_message": (
+        packets.write_send_message_packet,
+        ("cmyui", "hello world ✨", "#osu", 1000),
+    ),
+    "user_stats": (
+        packets.write_user_stats_packet,
+        (1000, 2, "playing", "a" * 32, 72, 0, 75, 10**10, 98.5, 3, 10**11, 1, 727),
+    ),
+    "user_logout": (packets.write_logout_packet, (1000,)),
+    "spectator_joined": (packets.write_spectator_joined_packet, (1000,)),
+    "spectator_left": (packets.write_spectator_left_packet, (1000,)),
+    "spectate_frames": (
+        packets.write_spectate_frames_packet,
+        (sample_replay_frame_bundle(),),
+    ),
+    "spectator_cant_spectate": (packets.write_spectator_cant_spectate_packet, (1000,)),
+    "notification": (
+        packets.write_notification_packet,
+        ("Welcome to the osu!bancho server!",),
+    ),
+    "update_match": (packets.write_update_match_packet, (sample_osu_match(), False)),
+    "new_match": (packets.write_new_match_packet, (sample_osu_match(),)),
+    "dispose_match": (packets.write_dispose_match_packet, (7,)),
+    "match_join_success": (
+        packets.write_match_join_success_packet,
+        (sample_osu_match("hunter2"), True),
+    ),
+    "match_join_fail": (packets.write_match_join_fail_packet, ()),
+    "fellow_spectator_joined": (packets.write_fellow_spectator_joined_packet, (1000,)),
+    "fellow_spectator_left": (packets.write_fellow_spectator_left_packet, (1000,)),
+    "match_start": (packets.write_match_start_packet, (sample_osu_match(), False)),
+    "match_score_update": (
+        packets.write_match_score_update_packet,
+        (packets.write_osu_score_frame(sample_score_frame()),),
+    ),
+    "match_transfer_host": (packets.write_match_transfer_host_packet, ()),
+    "match_all_players_loaded": (packets.write_match_all_players_loaded_packet, ()),
+    "match_player_failed": (packets.write_match_player_failed_packet, (3,)),
+    "match_complete": (packets.write_match_complete_packet, ()),
+    "match_skip": (packets.write_match_skip_packet, ()),
+    "channel_join_success": (packets.write_channel_join_success_packet, ("#osu",)),
+    "channel_info": (
+        packets.write_channel_info_packet,
+        ("#osu", "General discussion.", 42),
+    ),
+    "channel_kick": (packets.write_channel_kick_packet, ("#multiplayer",)),
+    "channel_auto_join": (
+        packets.write_channel_auto_join_packet,
+        ("#spectator", "", 2),
+    ),
+    "privileges": (packets.write_user_privileges_packet, (0b111,)),
+    "friends_list": (packets.write_friends_list_packet, ([1000, 1001, 1002],)),
+    "protocol_version": (packets.write_protocol_version_packet, (19,)),
+    "match_player_skipped": (packets.write_match_player_skipped_packet, (3,)),
+    "user_presence": (
+        packets.write_user_presence_packet,
+        (1000, "cmyui", -5, 38, 1, 0, 43, -79, 1),
+    ),
+    "restart": (packets.write_restart_packet, (0,)),
+    "channel_info_end": (packets.write_channel_listing_complete_packet, ()),
+    "silence_end": (packets.write_silence_end_packet, (60,)),
+    "user_silenced": (packets.write_user_silenced_packet, (1000,)),
+    "user_dm_blocked": (packets.write_user_dm_blocked_packet, ("cmyui",)),
+    "target_is_silenced": (packets.write_target_is_silenced_packet, ("cmyui",)),
+    "account_restricted": (packets.write_account_restricted_packet, ()),
+}
+
+# client packet name -> (packet id, packet data inputs)
+CLIENT_PACKETS: dict[str, tuple[int, list[tuple[DataType, Any]]]] = {
+    "change_action": (
+        ClientPackets.CHANGE_ACTION,
+        [
+            (DataType.U8, 2),
+            (DataType.STRING, "xi - FREEDOM DiVE [FOUR DIMENSIONS]"),
+            (DataType.STRING, "da8aae79c8f3306b5d65ec951874a7fb"),
+            (DataType.U32, 72),
+            (DataType.U8, 0),
+            (DataType.I32, 129891),
+        ],
+    ),
+    "send_public_message": (
+        ClientPackets.SEND_PUBLIC_MESSAGE,
+        [
+            (DataType.STRING, ""),
+            (DataType.STRING, "does anyone want to play some multi? ✨"),
+            (DataType.STRING, "#osu"),
+            (DataType.I32, 0),
+        ],
+    ),
+    "request_status_update": (ClientPackets.REQUEST_STATUS_UPDATE, []),
+    "ping": (ClientPackets.PING, []),
+    "start_spectating": (ClientPackets.START_SPECTATING, [(DataType.I32, 1001)]),
+    "spectate_frames": (
+        ClientPackets.SPECTATE_FRAMES,
+        [(DataType.OSU_REPLAY_FRAME_BUNDLE, sample_replay_frame_bundle())],
+    ),
+    "send_private_message": (
+        ClientPackets.SEND_PRIVATE_MESSAGE,
+        [
+            (DataType.STRING, ""),
+            (DataType.STRING, "gl hf"),
+            (DataType.STRING, "cmyui"),
+            (DataType.I32, 0),
+        ],
+    ),
+    "create_match": (
+        ClientPackets.CREATE_MATCH,
+        [(DataType.OSU_MATCH, (sample_osu_match("hunter2"), True))],
+    ),
+    "join_match": (
+        ClientPackets.JOIN_MATCH,
+        [(DataType.I32, 7), (DataType.STRING, "hunter2")],
+    ),
+    "match_score_update": (
+        ClientPackets.MATCH_SCORE_UPDATE,
+        [(DataType.OSU_SCOREFRAME, sample_score_frame())],
+    ),
+    "channel_join": (ClientPackets.CHANNEL_JOIN, [(DataType.STRING, "#osu")]),
+    "receive_updates": (ClientPackets.RECEIVE_UPDATES, [(DataType.I32, 1)]),
+    "user_stats_request": (
+        ClientPackets.USER_STATS_REQUEST,
+        [(DataType.I32_LIST_I16_LEN, [1001, 1002, 1003, 1004])],
+    ),
+}
+
+# the packets sent in a typical poll by an idle, playing & spectated client
+POLL_REQUESTS: dict[str, list[str]] = {
+    "idle": ["ping"],
+    "playing": ["change_action", "ping", "request_status_update"],
+    "spectated": ["spectate_frames", "spectate_frames", "send_public_message", "ping"],
+    "multiplayer": ["match_score_update", "send_public_message", "ping"],
+}
+
+
+def write_server_packet(name: str) -> bytes:
+    writer, writer_args = SERVER_PACKETS[name]
+    return writer(*writer_args)
+
+
+def write_client_packet(name: str) -> bytes:
+    packet_id, packet_data_inputs = CLIENT_PACKETS[name]
+    return packets.write_packet(packet_id, packet_data_inputs)
+
+
+def write_poll_request(name: str) -> bytes:
+    return b"".join(write_client_packet(packet) for packet in POLL_REQUESTS[name])
@@ -0,0 +1,162 @@
+import asyncio
+import itertools
+from typing import Any
+
+import pytest
+
+from app import clients
+from app import packets
+from app.api.osu import bancho
+from app.repositories import broadcast_log
+from app.repositories import osu_sessions
+from testing import sample_data
+
+SESSION_COUNT = 10_000
+
+_PING_REQUEST = packets.write_packet(packets.ClientPackets.PING, [])
+
+REQUEST_BODIES = {
+    "ping_only": _PING_REQUEST,
+    # the same poll, but with a (no-op) packet that takes the regular path
+    "regular": _PING_REQUEST
+    + packets.write_packet(
+        packets.ClientPackets.RECEIVE_UPDATES, [(packets.DataType.I32, 1)]
+    ),
+}
+
+
+class _FakeRedis:
+    """Just enough of redis for an idle poll, counting round trips."""
+
+    def __init__(self, values: dict[str, Any]) -> None:
+        self.values = values
+        self.round_trips = 0
+
+    def pipeline(self, transaction: bool = True) -> "_FakePipeline":
+        return _FakePipeline(self)
+
+    async def hgetall(self, key: str) -> Any:
+        self.round_trips += 1
+        return self.run("hgetall", key)
+
+    def run(self, command_name: str, *args: Any, **kwargs: Any) -> Any:
+        if command_name == "hgetall":
+            return self.values.get(args[0], {})
+        elif command_name == "lrange":
+            return self.values.get(args[0], [])
+        elif command_name == "delete":
+            return sum(self.values.pop(key, None) is not None for key in args)
+        elif (
+            command_name == "evalsha" and args[0] == osu_sessions._HEARTBEAT_SCRIPT.sha
+        ):
+            raw_osu_session = self.values.get(args[2])
+            if raw_osu_session is None:
+                return None
+
+            raw_osu_session[b"last_communicated_at"] = args[4]
+            raw_osu_session[b"expires_at"] = args[5]
+            return int(raw_osu_session[b"privileges"])
+        elif (
+            command_name == "evalsha"
+            and args[0] == osu_sessions._PARTIAL_UPDATE_SCRIPT.sha
+        ):
+            raw_osu_session = self.values.get(args[2])
+            if raw_osu_session is None:
+                return None
+
+            set_count = args[11]
+            set_args = args[12 : 12 + set_count * 2]
+            for field, value in zip(set_args[::2], set_args[1::2]):
+                raw_osu_session[field.encode()] = value
+            return [
+                item for field_value in raw_osu_session.items() for item in field_value
+            ]
+        elif (
+            command_name == "evalsha"
+            and args[0] == broadcast_log._READ_AFTER_CURSOR_SCRIPT.sha
+        ):
+            return []
+        else:
+            raise NotImplementedError(command_name)
+
+
+class _FakePipeline:
+    def __init__(self, redis: _FakeRedis) -> None:
+        self.redis = redis
+        self.commands: list[tuple[str, tuple[Any, ...], dict[str, Any]]] = []
+
+    async def __aenter__(self) -> "_FakePipeline":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        pass
+
+    def __len__(self) -> int:
+        return len(self.commands)
+
+    def __getattr__(self, command_name: str):
+        def queue_command(*args: Any, **kwargs: Any) -> None:
+            self.commands.append((command_name, args, kwargs))
+
+        return queue_command
+
+    async def execute(self) -> list[Any]:
+        self.redis.round_trips += 1
+        return [
+            self.redis.run(command_name, *args, **kwargs)
+            for command_name, args, kwargs in self.commands
+        ]
+
+
+class _FakeRequest:
+    def __init__(self, osu_session_id: str, body: bytes) -> None:
+        self.headers = {"osu-token": osu_session_id}
+        self._body = body
+
+    async def body(self) -> bytes:
+        return self._body
+
+
+@pytest.fixture(scope="module")
+def sample_osu_sessions():
+    return [sample_data.fake_osu_session() for _ in range(SESSION_COUNT)]
+
+
+@pytest.mark.parametrize("poll_kind", REQUEST_BODIES)
+def test_idle_poll(benchmark, monkeypatch, sample_osu_sessions, poll_kind):
+    redis = _FakeRedis(
+        {
+            osu_sessions.make_key(osu_session["osu_session_id"]): {
+                field.encode(): value
+                for field, value in osu_sessions.serialize(osu_session).items()
+            }
+            for osu_session in sample_osu_sessions
+        }
+    )
+    monkeypatch.setattr(clients, "redis", redis, raising=False)
+
+    requests = itertools.cycle(
+        [
+            _FakeRequest(
+                str(osu_session["osu_session_id"]),
+                REQUEST_BODIES[poll_kind],
+            )
+            for osu_session in sample_osu_sessions
+        ]
+    )
+    poll_count = 0
+
+    loop = asyncio.new_event_loop()
+
+    def poll() -> None:
+        nonlocal poll_count
+        poll_count += 1
+        loop.run_until_complete(bancho.handle_bancho_request(next(requests)))
+
+    try:
+        benchmark(poll)
+    finally:
+        loop.close()
+
+    benchmark.extra_info["sessions"] = SESSION_COUNT
+    benchmark.extra_info["round_trips_per_poll"] = redis.round_trips / poll_count
@@ -0,0 +1,83 @@
+from datetime import datetime
+
+import pytest
+
+from app import json
+from app.repositories import packet_bundles
+from app.repositories.packet_bundles import PacketBundle
+from testing import sample_packets
+
+# a spread of commonly broadcast packets, from small to large
+BUNDLED_PACKETS = ["user_logout", "send_message", "update_match", "spectate_frames"]
+
+
+def _serialize_json(bundle: PacketBundle) -> bytes:
+    # the format bundles were stored in before the binary one
+    return json.dumps(
+        {
+            "data": list(bundle["data"]),
+            "created_at": bundle["created_at"].isoformat(),
+        }
+    )
+
+
+def _deserialize_json(raw_bundle: bytes) -> PacketBundle:
+    untyped_bundle = json.loads(raw_bundle)
+    return {
+        "data": bytes(untyped_bundle["data"]),
+        "created_at": datetime.fromisoformat(untyped_bundle["created_at"]),
+    }
+
+
+SERIALIZERS = {
+    "json": _serialize_json,
+    "binary": packet_bundles.serialize,
+}
+
+DESERIALIZERS = {
+    "json": _deserialize_json,
+    "binary": packet_bundles.deserialize,
+}
+
+
+def _sample_bundle(packet_name: str) -> PacketBundle:
+    return {
+        "data": sample_packets.write_server_packet(packet_name),
+        "created_at": datetime.now(),
+    }
+
+
+@pytest.mark.parametrize("packet_name", BUNDLED_PACKETS)
+@pytest.mark.parametrize("bundle_format", SERIALIZERS)
+def test_serialize(benchmark, bundle_format, packet_name):
+    serialize = SERIALIZERS[bundle_format]
+    bundle = _sample_bundle(packet_name)
+
+    # the redis memory used per queued packet, excluding per-entry overhead
+    benchmark.extra_info["packet_bytes"] = len(bundle["data"])
+    benchmark.extra_info["stored_bytes"] = len(serialize(bundle))
+
+    benchmark(serialize, bundle)
+
+
+@pytest.mark.parametrize("packet_name", BUNDLED_PACKETS)
+@pytest.mark.parametrize("bundle_format", SERIALIZERS)
+def test_deserialize(benchmark, bundle_format, packet_name):
+    bundle = _sample_bundle(packet_name)
+    raw_bundle = SERIALIZERS[bundle_format](bundle)
+
+    benchmark(DESERIALIZERS[bundle_format], raw_bundle)
+
+
+@pytest.mark.parametrize("packet_name", BUNDLED_PACKETS)
+def test_binary_bundles_are_smaller(packet_name):
+    # arrange
+    bundle = _sample_bundle(packet_name)
+
+    # act
+    json_size = len(_serialize_json(bundle))
+    binary_size = len(packet_bundles.serialize(bundle))
+
+    # assert
+    assert binary_size < json_size
+    assert binary_size - len(bundle["data"]) == packet_bundles._BUNDLE_HEADER.size
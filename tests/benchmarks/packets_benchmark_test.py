@@ -0,0 +1,261 @@
+import inspect
+import os
+import struct
+from collections.abc import Callable
+from typing import Any
+
+import pytest
+
+from app import packets
+from app.packets import DataType
+from testing import sample_packets
+
+GOLDEN_DIR = os.path.join(os.path.dirname(__file__), "..", "golden")
+
+_MESSAGE: packets.OsuMessage = {
+    "sender_name": "",
+    "message_content": "does anyone want to play some multi? ✨",
+    "recipient_name": "#osu",
+    "sender_id": 0,
+}
+
+# reader method name -> data for it to read (& any arguments for it)
+READ_CASES: dict[str, tuple[bytes, tuple[Any, ...]]] = {
+    "read_i8": (struct.pack("<b", -7), ()),
+    "read_u8": (struct.pack("<B", 7), ()),
+    "read_i16": (struct.pack("<h", -727), ()),
+    "read_u16": (struct.pack("<H", 727), ()),
+    "read_i32": (struct.pack("<i", -129891), ()),
+    "read_u32": (struct.pack("<I", 129891), ()),
+    "read_i64": (struct.pack("<q", -(10**10)), ()),
+    "read_u64": (struct.pack("<Q", 10**10), ()),
+    "read_f32": (struct.pack("<f", 98.5), ()),
+    "read_f64": (struct.pack("<d", 98.5), ()),
+    "read_i8_list": (struct.pack("<16b", *range(16)), (16,)),
+    "read_i32_list": (struct.pack("<16i", *range(16)), (16,)),
+    "read_uleb128": (packets.write_uleb128(300), ()),
+    "read_string": (packets.write_string(_MESSAGE["message_content"]), ()),
+    "read_i32_list_i16_length": (
+        packets.write_i32_list_i16_len(list(range(64))),
+        (),
+    ),
+    "read_i32_list_i32_length": (struct.pack("<i64i", 64, *range(64)), ()),
+    "read_osu_message": (packets.write_osu_message(_MESSAGE), ()),
+    "read_osu_channel": (
+        packets.write_string("#osu")
+        + packets.write_string("General discussion.")
+        + struct.pack("<h", 42),
+        (),
+    ),
+    "read_osu_match": (
+        packets.write_osu_match(sample_packets.sample_osu_match("hunter2"), True),
+        (),
+    ),
+    "read_osu_score_frame": (
+        packets.write_osu_score_frame(sample_packets.sample_score_frame()),
+        (),
+    ),
+    "read_osu_replay_frame": (
+        packets.write_osu_replay_frame(
+            sample_packets.sample_replay_frame_bundle()["replay_frames"][0]
+        ),
+        (),
+    ),
+    "read_replay_frame_bundle": (
+        packets.write_replay_frame_bundle(sample_packets.sample_replay_frame_bundle()),
+        (),
+    ),
+}
+
+# writer -> arguments, for writers not covered by the sample server packets
+WRITE_CASES: list[tuple[Callable[..., bytes], tuple[Any, ...]]] = [
+    (packets.write_uleb128, (300,)),
+    (packets.write_string, (_MESSAGE["message_content"],)),
+    (packets.write_i32_list_i16_len, (list(range(64)),)),
+    (packets.write_osu_message, (_MESSAGE,)),
+    (packets.write_osu_match, (sample_packets.sample_osu_match("hunter2"), True)),
+    (packets.write_osu_score_frame, (sample_packets.sample_score_frame(),)),
+    (
+        packets.write_osu_replay_frame,
+        (sample_packets.sample_replay_frame_bundle()["replay_frames"][0],),
+    ),
+    (
+        packets.write_replay_frame_bundle,
+        (sample_packets.sample_replay_frame_bundle(),),
+    ),
+    (
+        packets.write_packet,
+        sample_packets.CLIENT_PACKETS["change_action"],
+    ),
+    (
+        packets.write_relayed_spectate_frames_packet,
+        (
+            memoryview(
+                packets.write_replay_frame_bundle(
+                    sample_packets.sample_replay_frame_bundle()
+                )
+            ),
+        ),
+    ),
+    (
+        packets.write_relayed_match_score_update_packet,
+        (
+            memoryview(
+                packets.write_osu_score_frame(sample_packets.sample_score_frame())
+            ),
+            3,
+        ),
+    ),
+] + list(sample_packets.SERVER_PACKETS.values())
+
+
+def _read_golden_poll(name: str) -> bytes:
+    with open(os.path.join(GOLDEN_DIR, "poll", f"{name}.bin"), "rb") as f:
+        return f.read()
+
+
+def test_every_codec_function_is_benchmarked():
+    # arrange
+    readers = {
+        name
+        for name, _ in inspect.getmembers(packets.PacketReader, inspect.isfunction)
+        if name.startswith("read_")
+    }
+    writers = {
+        name
+        for name, _ in inspect.getmembers(packets, inspect.isfunction)
+        if name.startswith("write_")
+    }
+
+    # assert
+    assert readers == set(READ_CASES)
+    assert writers == {writer.__name__ for writer, _ in WRITE_CASES}
+
+
+@pytest.mark.parametrize("reader_name", READ_CASES)
+def test_read(benchmark, reader_name):
+    data, reader_args = READ_CASES[reader_name]
+
+    def read() -> Any:
+        reader = packets.PacketReader(data)
+        return getattr(reader, reader_name)(*reader_args)
+
+    benchmark(read)
+
+
+@pytest.mark.parametrize(
+    "writer, writer_args",
+    WRITE_CASES,
+    ids=[writer.__name__ for writer, _ in WRITE_CASES],
+)
+def test_write(benchmark, writer, writer_args):
+    benchmark(writer, *writer_args)
+
+
+@pytest.mark.parametrize("poll_request", sample_packets.POLL_REQUESTS)
+def test_read_packets(benchmark, poll_request):
+    request_data = _read_golden_poll(poll_request)
+
+    def read_packets() -> list[packets.Packet]:
+        return list(packets.read_packets(request_data))
+
+    benchmark(read_packets)
+
+
+@pytest.mark.parametrize("frame_count", [1, 40, 200])
+def test_replay_frame_bundle_round_trip(benchmark, frame_count):
+    replay_frame_bundle = sample_packets.sample_replay_frame_bundle(frame_count)
+    benchmark.extra_info["frames"] = frame_count
+
+    def round_trip() -> bytes:
+        data = packets.write_replay_frame_bundle(replay_frame_bundle)
+        reader = packets.PacketReader(data)
+        return packets.write_replay_frame_bundle(reader.read_replay_frame_bundle())
+
+    benchmark(round_trip)
+
+
+def _write_replay_frame_bundle_fieldwise(
+    replay_frame_bundle: packets.OsuReplayFrameBundle,
+) -> bytes:
+    # the encoder before bundles were packed with precompiled structs, appending
+    # each field of each dict in turn; kept as the baseline to compare against
+    buffer = bytearray()
+    buffer += struct.pack("<i", 0)  # extra
+    buffer += struct.pack("<H", len(replay_frame_bundle["replay_frames"]))
+    for frame in replay_frame_bundle["replay_frames"]:
+        buffer += struct.pack("<B", frame["button_state"])
+        buffer += struct.pack("<B", frame["taiko_byte"])
+        buffer += struct.pack("<f", frame["x"])
+        buffer += struct.pack("<f", frame["y"])
+        buffer += struct.pack("<i", frame["time"])
+    buffer += struct.pack("<B", replay_frame_bundle["replay_action"])
+
+    score_frame = replay_frame_bundle["score_frame"]
+    buffer += struct.pack("<i", score_frame["time"])
+    buffer += struct.pack("<B", score_frame["id"])
+    buffer += struct.pack("<H", score_frame["num_300s"])
+    buffer += struct.pack("<H", score_frame["num_100s"])
+    buffer += struct.pack("<H", score_frame["num_50s"])
+    buffer += struct.pack("<H", score_frame["num_gekis"])
+    buffer += struct.pack("<H", score_frame["num_katus"])
+    buffer += struct.pack("<H", score_frame["num_misses"])
+    buffer += struct.pack("<i", score_frame["total_score"])
+    buffer += struct.pack("<H", score_frame["current_combo"])
+    buffer += struct.pack("<H", score_frame["max_combo"])
+    buffer += struct.pack("<B", score_frame["perfect"])
+    buffer += struct.pack("<B", score_frame["current_hp"])
+    buffer += struct.pack("<B", score_frame["tag_byte"])
+    buffer += struct.pack("<B", score_frame["score_v2"])
+    if score_frame["score_v2"]:
+        buffer += struct.pack("<d", score_frame["combo_portion"])
+        buffer += struct.pack("<d", score_frame["bonus_portion"])
+
+    buffer += struct.pack("<H", replay_frame_bundle["sequence_number"])
+    return bytes(buffer)
+
+
+REPLAY_FRAME_BUNDLE_WRITERS: dict[
+    str, Callable[[packets.OsuReplayFrameBundle], bytes]
+] = {
+    "fieldwise": _write_replay_frame_bundle_fieldwise,
+    "struct": packets.write_replay_frame_bundle,
+}
+
+
+@pytest.mark.parametrize("frame_count", [1, 40, 200])
+def test_replay_frame_bundle_writers_match(frame_count):
+    # arrange
+    replay_frame_bundle = sample_packets.sample_replay_frame_bundle(frame_count)
+
+    # act
+    fieldwise_data = _write_replay_frame_bundle_fieldwise(replay_frame_bundle)
+    struct_data = packets.write_replay_frame_bundle(replay_frame_bundle)
+
+    # assert
+    assert fieldwise_data == struct_data
+
+
+@pytest.mark.parametrize("frame_count", [1, 40, 200])
+@pytest.mark.parametrize("writer_name", REPLAY_FRAME_BUNDLE_WRITERS)
+def test_write_replay_frame_bundle(benchmark, writer_name, frame_count):
+    write_replay_frame_bundle = REPLAY_FRAME_BUNDLE_WRITERS[writer_name]
+    replay_frame_bundle = sample_packets.sample_replay_frame_bundle(frame_count)
+
+    # (compare frames/sec between writers with frames / mean time)
+    benchmark.extra_info["frames"] = frame_count
+
+    benchmark(write_replay_frame_bundle, replay_frame_bundle)
+
+
+@pytest.mark.parametrize("freemods_enabled", [False, True])
+def test_osu_match_round_trip(benchmark, freemods_enabled):
+    match_data = sample_packets.sample_osu_match("hunter2")
+    match_data["freemods_enabled"] = freemods_enabled
+
+    def round_trip() -> bytes:
+        data = packets.write_osu_match(match_data, should_send_password=True)
+        reader = packets.PacketReader(data)
+        return packets.write_osu_match(reader.read_osu_match(), True)
+
+    benchmark(round_trip)
@@ -0,0 +1,166 @@
+import json
+from datetime import datetime
+from typing import Any
+from uuid import UUID
+from uuid import uuid4
+
+import pytest
+
+from app import record_codec
+from app.repositories import multiplayer_matches
+from app.repositories import multiplayer_slots
+from app.repositories import osu_sessions
+from app.repositories import web_sessions
+from testing import sample_data
+
+_NOW = sample_data.fake_datetime()
+
+SAMPLE_RECORDS: dict[str, tuple[record_codec.RecordSchema, dict[str, Any]]] = {
+    "osu_session": (
+        osu_sessions.OSU_SESSION_SCHEMA,
+        dict(sample_data.fake_osu_session()),
+    ),
+    "web_session": (
+        web_sessions.WEB_SESSION_SCHEMA,
+        {
+            "web_session_id": uuid4(),
+            "account_id": 1001,
+            "expires_at": _NOW,
+            "created_at": _NOW,
+            "updated_at": _NOW,
+        },
+    ),
+    "multiplayer_match": (
+        multiplayer_matches.MULTIPLAYER_MATCH_SCHEMA,
+        {
+            "match_id": 1,
+            "match_name": "4* 4dt 1v1",
+            "match_password": "",
+            "beatmap_name": "xi - Blue Zenith [FOUR DIMENSIONS]",
+            "beatmap_id": 658127,
+            "beatmap_md5": "da8aae79c8f3306b5d65ec951874a7fb",
+            "host_account_id": 1001,
+            "game_mode": 0,
+            "mods": 64,
+            "win_condition": 3,
+            "team_type": 0,
+            "freemods_enabled": False,
+            "random_seed": 1337,
+            "status": 0,
+            "created_at": _NOW,
+            "updated_at": _NOW,
+        },
+    ),
+    "multiplayer_slot": (
+        multiplayer_slots.MULTIPLAYER_SLOT_SCHEMA,
+        {
+            "slot_id": 3,
+            "osu_session_id": uuid4(),
+            "account_id": 1001,
+            "status": 8,
+            "team": 0,
+            "mods": 0,
+            "loaded": True,
+            "skipped": False,
+        },
+    ),
+}
+
+
+def _serialize_json(schema: record_codec.RecordSchema, record: dict[str, Any]) -> str:
+    # the format records were stored in before the binary one
+    return json.dumps(
+        {
+            field_name: (
+                value.isoformat()
+                if isinstance(value, datetime)
+                else str(value)
+                if isinstance(value, UUID)
+                else value
+            )
+            for field_name, value in record.items()
+        }
+    )
+
+
+def _deserialize_json(schema: record_codec.RecordSchema, raw_record: str) -> Any:
+    record = json.loads(raw_record)
+    for field_name, field in schema.fields.items():
+        if record[field_name] is None:
+            continue
+        if field.type is record_codec.DATETIME:
+            record[field_name] = datetime.fromisoformat(record[field_name])
+        elif field.type is record_codec.UUID:
+            record[field_name] = UUID(record[field_name])
+    return record
+
+
+def _serialize_binary(schema: record_codec.RecordSchema, record: dict[str, Any]) -> Any:
+    # (sessions are stored as hashes of individually encoded fields)
+    if schema is osu_sessions.OSU_SESSION_SCHEMA:
+        return {
+            field_name.encode(): value
+            for field_name, value in schema.encode_values(record).items()
+        }
+    return schema.encode(record)
+
+
+def _deserialize_binary(schema: record_codec.RecordSchema, raw_record: Any) -> Any:
+    if schema is osu_sessions.OSU_SESSION_SCHEMA:
+        return schema.decode_hash(raw_record)
+    return schema.decode(raw_record)
+
+
+def _stored_bytes(raw_record: Any) -> int:
+    if isinstance(raw_record, dict):
+        return sum(len(field) + len(value) for field, value in raw_record.items())
+    return len(raw_record)
+
+
+CODECS = {
+    "json": (_serialize_json, _deserialize_json),
+    "binary": (_serialize_binary, _deserialize_binary),
+}
+
+
+@pytest.mark.parametrize("record_kind", SAMPLE_RECORDS)
+@pytest.mark.parametrize("record_format", CODECS)
+def test_encode(benchmark, record_format, record_kind):
+    serialize, _ = CODECS[record_format]
+    schema, record = SAMPLE_RECORDS[record_kind]
+
+    benchmark.extra_info["stored_bytes"] = _stored_bytes(serialize(schema, record))
+
+    benchmark(serialize, schema, record)
+
+
+@pytest.mark.parametrize("record_kind", SAMPLE_RECORDS)
+@pytest.mark.parametrize("record_format", CODECS)
+def test_decode(benchmark, record_format, record_kind):
+    serialize, deserialize = CODECS[record_format]
+    schema, record = SAMPLE_RECORDS[record_kind]
+    raw_record = serialize(schema, record)
+
+    assert benchmark(deserialize, schema, raw_record) == record
+
+
+@pytest.mark.parametrize("record_kind", ["multiplayer_slot", "web_session"])
+def test_decode_one_field(benchmark, record_kind):
+    schema, record = SAMPLE_RECORDS[record_kind]
+    raw_record = schema.encode(record)
+    field_name = "account_id"
+
+    assert benchmark(schema.decode_field, raw_record, field_name) == record[field_name]
+
+
+@pytest.mark.parametrize("record_kind", SAMPLE_RECORDS)
+def test_binary_records_are_smaller(record_kind):
+    # arrange
+    schema, record = SAMPLE_RECORDS[record_kind]
+
+    # act
+    json_size = _stored_bytes(_serialize_json(schema, record))
+    binary_size = _stored_bytes(_serialize_binary(schema, record))
+
+    # assert
+    assert binary_size < json_size
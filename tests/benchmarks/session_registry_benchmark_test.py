@@ -0,0 +1,156 @@
+import asyncio
+import fnmatch
+from collections import OrderedDict
+from datetime import datetime
+from datetime import timedelta
+from typing import Any
+from uuid import UUID
+
+import pytest
+
+from app import clients
+from app import settings
+from app.repositories import osu_session_cache
+from app.repositories import osu_sessions
+from testing import sample_data
+
+SESSION_COUNT = 1_000
+UNRELATED_KEY_COUNT = 100_000
+
+
+class _FakeRedis:
+    """Just enough of redis to enumerate sessions, counting round trips."""
+
+    def __init__(self, values: dict[str, Any]) -> None:
+        self.values = values
+        self.keys = list(values)
+        self.round_trips = 0
+
+    def pipeline(self, transaction: bool = True) -> "_FakePipeline":
+        return _FakePipeline(self)
+
+    async def scan(self, cursor: int, match: str, count: int = 10) -> Any:
+        # like redis, each call visits `count` keys, matching or not
+        self.round_trips += 1
+        visited_keys = self.keys[cursor : cursor + count]
+        next_cursor = cursor + count if cursor + count < len(self.keys) else 0
+        return next_cursor, [
+            key.encode() for key in visited_keys if fnmatch.fnmatchcase(key, match)
+        ]
+
+    async def zrange(self, key: str, start: int, end: int) -> Any:
+        self.round_trips += 1
+        return [member.encode() for member in self.values.get(key, {})]
+
+    def run(self, command_name: str, *args: Any, **kwargs: Any) -> Any:
+        if command_name == "hgetall":
+            key = args[0].decode() if isinstance(args[0], bytes) else args[0]
+            return self.values.get(key, {})
+        else:
+            raise NotImplementedError(command_name)
+
+
+class _FakePipeline:
+    def __init__(self, redis: _FakeRedis) -> None:
+        self.redis = redis
+        self.commands: list[tuple[str, tuple[Any, ...], dict[str, Any]]] = []
+
+    async def __aenter__(self) -> "_FakePipeline":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        pass
+
+    def __getattr__(self, command_name: str):
+        def queue_command(*args: Any, **kwargs: Any) -> None:
+            self.commands.append((command_name, args, kwargs))
+
+        return queue_command
+
+    async def execute(self) -> list[Any]:
+        self.redis.round_trips += 1
+        return [
+            self.redis.run(command_name, *args, **kwargs)
+            for command_name, args, kwargs in self.commands
+        ]
+
+
+async def _fetch_all_by_scan() -> list[osu_sessions.OsuSession]:
+    # how sessions were enumerated before the registry
+    cursor = None
+    all_osu_sessions = []
+
+    while cursor != 0:
+        cursor, keys = await clients.redis.scan(
+            cursor=cursor or 0,
+            match=osu_sessions.make_key("*"),
+        )
+        all_osu_sessions.extend(
+            await osu_sessions._fetch_many_by_ids(
+                [UUID(key.decode().rsplit(":", 1)[1]) for key in keys]
+            )
+        )
+
+    return all_osu_sessions
+
+
+FETCHERS = {
+    "scan": _fetch_all_by_scan,
+    "registry": osu_sessions.fetch_all,
+    # with every session already cached in-process
+    "registry_cached": osu_sessions.fetch_all,
+}
+
+
+@pytest.fixture(scope="module")
+def redis_values():
+    sample_osu_sessions = [sample_data.fake_osu_session() for _ in range(SESSION_COUNT)]
+    for osu_session in sample_osu_sessions:
+        osu_session["expires_at"] = datetime.now() + timedelta(
+            seconds=osu_sessions.OSU_SESSION_TTL
+        )
+
+    # other data (packet queues, cursors, matches, ...) shares the keyspace
+    values: dict[str, Any] = {
+        f"server:unrelated:{i}": b"" for i in range(UNRELATED_KEY_COUNT)
+    }
+    for osu_session in sample_osu_sessions:
+        values[osu_sessions.make_key(osu_session["osu_session_id"])] = {
+            field.encode(): value
+            for field, value in osu_sessions.serialize(osu_session).items()
+        }
+    values[osu_sessions.REGISTRY_KEY] = {
+        str(osu_session["osu_session_id"]): osu_session["expires_at"].timestamp()
+        for osu_session in sample_osu_sessions
+    }
+    return values
+
+
+@pytest.mark.parametrize("fetcher", FETCHERS)
+def test_fetch_all(benchmark, monkeypatch, redis_values, fetcher):
+    redis = _FakeRedis(redis_values)
+    monkeypatch.setattr(clients, "redis", redis, raising=False)
+    if fetcher == "registry_cached":
+        monkeypatch.setattr(settings, "OSU_SESSION_CACHE_SIZE", SESSION_COUNT)
+        monkeypatch.setattr(osu_session_cache, "_listening", True)
+        monkeypatch.setattr(osu_session_cache, "_entries", OrderedDict())
+
+    fetch_count = 0
+
+    loop = asyncio.new_event_loop()
+
+    def fetch_all() -> list[osu_sessions.OsuSession]:
+        nonlocal fetch_count
+        fetch_count += 1
+        return loop.run_until_complete(FETCHERS[fetcher]())
+
+    try:
+        fetched_osu_sessions = benchmark(fetch_all)
+    finally:
+        loop.close()
+
+    assert len(fetched_osu_sessions) == SESSION_COUNT
+
+    benchmark.extra_info["sessions"] = SESSION_COUNT
+    benchmark.extra_info["unrelated_keys"] = UNRELATED_KEY_COUNT
+    benchmark.extra_info["round_trips"] = redis.round_trips / fetch_count
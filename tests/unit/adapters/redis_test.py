@@ -0,0 +1,60 @@
+import pytest
+import pytest_mock
+from redis.exceptions import NoScriptError
+
+from app.adapters import redis
+
+
+@pytest.fixture(autouse=True)
+def scripts(mocker: pytest_mock.MockerFixture):
+    mocker.patch.object(redis, "_scripts", [])
+
+
+def test_script_should_queue_by_sha(mocker: pytest_mock.MockerFixture):
+    # arrange
+    script = redis.Script("return KEYS[1]")
+    pipe = mocker.MagicMock()
+
+    # act
+    script.queue(pipe, keys=["key"], args=[1, 2])
+
+    # assert
+    pipe.evalsha.assert_called_once_with(script.sha, 1, "key", 1, 2)
+    pipe.eval.assert_not_called()
+
+
+async def test_script_should_load_itself_if_flushed(
+    mocker: pytest_mock.MockerFixture,
+):
+    # arrange
+    script = redis.Script("return ARGV[1]")
+    client = mocker.MagicMock()
+    client.evalsha = mocker.AsyncMock(side_effect=[NoScriptError(), b"1"])
+    client.script_load = mocker.AsyncMock()
+
+    # act
+    result = await script.run(client, keys=[], args=[1])
+
+    # assert
+    assert result == b"1"
+    client.script_load.assert_awaited_once_with(script.source)
+    assert client.evalsha.await_count == 2
+
+
+async def test_connections_should_load_every_script(
+    mocker: pytest_mock.MockerFixture,
+):
+    # arrange
+    script = redis.Script("return 1")
+    connection = mocker.MagicMock()
+    connection.on_connect = mocker.AsyncMock()
+    connection.send_command = mocker.AsyncMock()
+    connection.read_response = mocker.AsyncMock()
+
+    # act
+    await redis._load_scripts(connection)
+
+    # assert
+    connection.on_connect.assert_awaited_once()
+    connection.send_command.assert_any_await("SCRIPT", "LOAD", script.source)
+    assert connection.read_response.await_count == 1
@@ -0,0 +1,185 @@
+from uuid import uuid4
+
+import pytest_mock
+
+from app import broadcasts
+from app import packets
+from app.privileges import ServerPrivileges
+from app.repositories import broadcast_log
+from app.repositories.broadcast_log import Broadcast
+from testing import sample_data
+
+
+def _fake_broadcast(broadcast_id: str, data: bytes, **kwargs) -> Broadcast:
+    broadcast: Broadcast = {
+        "broadcast_id": broadcast_id,
+        "data": data,
+        "sender_osu_session_id": None,
+        "sender_privileges": 0,
+        "include_sender": True,
+        "read_privileges": 0,
+        "supersede_key": None,
+    }
+    broadcast.update(kwargs)  # type: ignore
+    return broadcast
+
+
+async def test_read_pending_should_filter_and_advance_cursor(
+    mocker: pytest_mock.MockerFixture,
+):
+    # arrange
+    osu_session = sample_data.fake_osu_session()
+    osu_session["privileges"] = ServerPrivileges.UNRESTRICTED
+
+    pending_broadcasts = [
+        _fake_broadcast("1-0", b"everyone"),
+        _fake_broadcast(
+            "2-0",
+            b"own logout",
+            sender_osu_session_id=osu_session["osu_session_id"],
+            sender_privileges=ServerPrivileges.UNRESTRICTED,
+            include_sender=False,
+        ),
+        _fake_broadcast(
+            "3-0",
+            b"own stats",
+            sender_osu_session_id=osu_session["osu_session_id"],
+            sender_privileges=ServerPrivileges.UNRESTRICTED,
+        ),
+        _fake_broadcast(
+            "4-0",
+            b"restricted user's stats",
+            sender_osu_session_id=uuid4(),
+            sender_privileges=0,
+        ),
+        _fake_broadcast(
+            "5-0",
+            b"staff only",
+            read_privileges=ServerPrivileges.SUPER_ADMIN,
+        ),
+    ]
+
+    read_after_cursor = mocker.patch(
+        "app.repositories.broadcast_log.read_after_cursor",
+        return_value=pending_broadcasts,
+    )
+
+    # act
+    data = await broadcasts.read_pending(osu_session)
+
+    # assert
+    assert data == b"everyone" + b"own stats"
+    read_after_cursor.assert_called_once_with(osu_session["osu_session_id"])
+
+
+async def test_read_pending_should_show_restricted_users_their_own_broadcasts(
+    mocker: pytest_mock.MockerFixture,
+):
+    # arrange
+    osu_session = sample_data.fake_osu_session()
+    osu_session["privileges"] = 0
+
+    mocker.patch(
+        "app.repositories.broadcast_log.read_after_cursor",
+        return_value=[
+            _fake_broadcast(
+                "1-0",
+                b"own stats",
+                sender_osu_session_id=osu_session["osu_session_id"],
+                sender_privileges=0,
+            ),
+        ],
+    )
+    # act
+    data = await broadcasts.read_pending(osu_session)
+
+    # assert
+    assert data == b"own stats"
+
+
+async def test_read_pending_should_restart_sessions_which_missed_broadcasts(
+    mocker: pytest_mock.MockerFixture,
+):
+    # arrange
+    osu_session = sample_data.fake_osu_session()
+
+    mocker.patch(
+        "app.repositories.broadcast_log.read_after_cursor",
+        return_value=None,
+    )
+    mocker.patch("app.repositories.broadcast_log.fetch_latest_id", return_value="9-0")
+    update_cursor = mocker.patch("app.repositories.broadcast_log.update_cursor")
+
+    # act
+    data = await broadcasts.read_pending(osu_session)
+
+    # assert
+    assert data == packets.write_restart_packet(millseconds_until_restart=0)
+    update_cursor.assert_called_once_with(osu_session["osu_session_id"], "9-0")
+
+
+async def test_read_pending_should_only_send_latest_superseding_broadcast(
+    mocker: pytest_mock.MockerFixture,
+):
+    # arrange
+    osu_session = sample_data.fake_osu_session()
+
+    mocker.patch(
+        "app.repositories.broadcast_log.read_after_cursor",
+        return_value=[
+            _fake_broadcast("1-0", b"stats 1", supersede_key="11:1000"),
+            _fake_broadcast("2-0", b"logout", supersede_key=None),
+            _fake_broadcast("3-0", b"other stats", supersede_key="11:1001"),
+            _fake_broadcast("4-0", b"stats 2", supersede_key="11:1000"),
+        ],
+    )
+    # act
+    data = await broadcasts.read_pending(osu_session)
+
+    # assert
+    assert data == b"logout" + b"other stats" + b"stats 2"
+
+
+async def test_read_after_cursor_should_deserialize_script_results(
+    mocker: pytest_mock.MockerFixture,
+):
+    # arrange
+    osu_session_id = uuid4()
+
+    redis = mocker.patch("app.clients.redis", create=True)
+    pipe = mocker.MagicMock()
+    pipe.execute = mocker.AsyncMock(
+        return_value=[
+            [
+                [
+                    b"1-0",
+                    [
+                        b"data",
+                        b"stats",
+                        b"sender_osu_session_id",
+                        b"",
+                        b"sender_privileges",
+                        b"0",
+                        b"include_sender",
+                        b"1",
+                        b"read_privileges",
+                        b"0",
+                        b"supersede_key",
+                        b"11:1000",
+                    ],
+                ]
+            ]
+        ]
+    )
+    redis.pipeline.return_value.__aenter__.return_value = pipe
+
+    # act
+    pending_broadcasts = await broadcast_log.read_after_cursor(osu_session_id)
+
+    # assert
+    assert pending_broadcasts == [
+        _fake_broadcast("1-0", b"stats", supersede_key="11:1000")
+    ]
+    assert pipe.evalsha.call_args.args[3] == broadcast_log.make_cursor_key(
+        osu_session_id
+    )
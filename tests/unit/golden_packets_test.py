@@ -0,0 +1,80 @@
+import os
+from typing import Any
+
+import pytest
+
+from app import packets
+from app.packets import DataType
+from testing import sample_packets
+
+GOLDEN_DIR = os.path.join(os.path.dirname(__file__), "..", "golden")
+
+READERS = {
+    DataType.I8: packets.PacketReader.read_i8,
+    DataType.U8: packets.PacketReader.read_u8,
+    DataType.I16: packets.PacketReader.read_i16,
+    DataType.U16: packets.PacketReader.read_u16,
+    DataType.I32: packets.PacketReader.read_i32,
+    DataType.U32: packets.PacketReader.read_u32,
+    DataType.I64: packets.PacketReader.read_i64,
+    DataType.U64: packets.PacketReader.read_u64,
+    DataType.F32: packets.PacketReader.read_f32,
+    DataType.F64: packets.PacketReader.read_f64,
+    DataType.STRING: packets.PacketReader.read_string,
+    DataType.I32_LIST_I16_LEN: packets.PacketReader.read_i32_list_i16_length,
+    DataType.OSU_MESSAGE: packets.PacketReader.read_osu_message,
+    DataType.OSU_MATCH: packets.PacketReader.read_osu_match,
+    DataType.OSU_SCOREFRAME: packets.PacketReader.read_osu_score_frame,
+    DataType.OSU_REPLAY_FRAME_BUNDLE: packets.PacketReader.read_replay_frame_bundle,
+}
+
+
+def _read_golden(subdirectory: str, name: str) -> bytes:
+    with open(os.path.join(GOLDEN_DIR, subdirectory, f"{name}.bin"), "rb") as f:
+        return f.read()
+
+
+def _expected_value(type: DataType, value: Any) -> Any:
+    if type == DataType.OSU_MATCH:
+        match_data, _ = value  # (match data, should send password)
+        return match_data
+    return value
+
+
+@pytest.mark.parametrize("name", sample_packets.SERVER_PACKETS)
+def test_server_packets_match_golden_corpus(name):
+    assert sample_packets.write_server_packet(name) == _read_golden("server", name)
+
+
+@pytest.mark.parametrize("name", sample_packets.CLIENT_PACKETS)
+def test_client_packets_match_golden_corpus(name):
+    # arrange
+    packet_id, packet_data_inputs = sample_packets.CLIENT_PACKETS[name]
+    golden_packet = _read_golden("client", name)
+
+    # act
+    (packet,) = packets.read_packets(golden_packet)
+    reader = packets.PacketReader(packet.packet_data)
+    values = [READERS[type](reader) for type, _ in packet_data_inputs]
+
+    # assert
+    assert packet.packet_id == packet_id
+    assert values == [
+        _expected_value(type, value) for type, value in packet_data_inputs
+    ]
+    assert reader.offset == packet.packet_data_length
+    assert sample_packets.write_client_packet(name) == golden_packet
+
+
+@pytest.mark.parametrize("name", sample_packets.POLL_REQUESTS)
+def test_poll_requests_match_golden_corpus(name):
+    # act
+    packet_ids = [
+        packet.packet_id for packet in packets.read_packets(_read_golden("poll", name))
+    ]
+
+    # assert
+    assert packet_ids == [
+        sample_packets.CLIENT_PACKETS[packet][0]
+        for packet in sample_packets.POLL_REQUESTS[name]
+    ]
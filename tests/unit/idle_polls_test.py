@@ -0,0 +1,77 @@
+from datetime import datetime
+from uuid import uuid4
+
+import pytest_mock
+
+from app import idle_polls
+from app.privileges import ServerPrivileges
+from app.repositories import packet_bundles
+from testing import sample_packets
+
+
+def _mock_redis_pipeline(mocker: pytest_mock.MockerFixture, results: list):
+    redis = mocker.patch("app.clients.redis", create=True)
+    pipe = mocker.MagicMock()
+    pipe.execute = mocker.AsyncMock(return_value=results)
+    redis.pipeline.return_value.__aenter__.return_value = pipe
+    return redis, pipe
+
+
+async def test_poll_should_send_queued_bundles_and_broadcasts_in_one_round_trip(
+    mocker: pytest_mock.MockerFixture,
+):
+    # arrange
+    osu_session_id = uuid4()
+    queued_data = sample_packets.write_server_packet("send_message")
+    broadcast_data = sample_packets.write_server_packet("user_stats")
+
+    raw_broadcast_fields = [
+        b"data",
+        broadcast_data,
+        b"sender_osu_session_id",
+        b"",
+        b"sender_privileges",
+        b"0",
+        b"include_sender",
+        b"1",
+        b"read_privileges",
+        b"0",
+        b"supersede_key",
+        b"",
+    ]
+    redis, pipe = _mock_redis_pipeline(
+        mocker,
+        results=[
+            ServerPrivileges.UNRESTRICTED,
+            [
+                packet_bundles.serialize(
+                    {"data": queued_data, "created_at": datetime.now()}
+                )
+            ],
+            3,
+            [[b"1-0", raw_broadcast_fields]],
+        ],
+    )
+
+    # act
+    data = await idle_polls.poll(osu_session_id)
+
+    # assert
+    assert data == queued_data + broadcast_data
+    redis.pipeline.assert_called_once_with(transaction=True)
+    pipe.execute.assert_awaited_once()
+
+
+async def test_poll_should_return_none_without_session(
+    mocker: pytest_mock.MockerFixture,
+):
+    # arrange
+    _mock_redis_pipeline(mocker, results=[None, [], 0, None])
+    start_reading = mocker.patch("app.broadcasts.start_reading")
+
+    # act
+    data = await idle_polls.poll(uuid4())
+
+    # assert
+    assert data is None
+    start_reading.assert_not_called()
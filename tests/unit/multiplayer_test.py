@@ -0,0 +1,224 @@
+from datetime import datetime
+from uuid import uuid4
+
+import pytest_mock
+
+from app import multiplayer
+from app import packets
+from app.repositories import multiplayer_slots
+from app.repositories.multiplayer_matches import MultiplayerMatch
+from app.repositories.multiplayer_slots import MultiplayerSlot
+from app.repositories.multiplayer_slots import SlotStatus
+from testing import sample_packets
+
+
+def _fake_match() -> MultiplayerMatch:
+    osu_match_data = sample_packets.sample_osu_match("hunter2")
+    return {
+        "match_id": osu_match_data["match_id"],
+        "match_name": osu_match_data["match_name"],
+        "match_password": osu_match_data["match_password"],
+        "beatmap_name": osu_match_data["beatmap_name"],
+        "beatmap_id": osu_match_data["beatmap_id"],
+        "beatmap_md5": osu_match_data["beatmap_md5"],
+        "host_account_id": osu_match_data["host_account_id"],
+        "game_mode": osu_match_data["game_mode"],
+        "mods": osu_match_data["mods"],
+        "win_condition": osu_match_data["win_condition"],
+        "team_type": osu_match_data["team_type"],
+        "freemods_enabled": osu_match_data["freemods_enabled"],
+        "random_seed": osu_match_data["random_seed"],
+        "status": 0,
+        "created_at": datetime.now(),
+        "updated_at": datetime.now(),
+    }
+
+
+def _fake_slots() -> list[MultiplayerSlot]:
+    osu_match_data = sample_packets.sample_osu_match()
+    account_ids = iter(osu_match_data["per_slot_account_ids"])
+    return [
+        {
+            "slot_id": slot_id,
+            "osu_session_id": uuid4(),
+            "account_id": next(account_ids) if status & SlotStatus.HAS_PLAYER else -1,
+            "status": status,
+            "team": osu_match_data["slot_teams"][slot_id],
+            "mods": osu_match_data["per_slot_mods"][slot_id],
+            "loaded": False,
+            "skipped": False,
+        }
+        for slot_id, status in enumerate(osu_match_data["slot_statuses"])
+    ]
+
+
+def test_osu_match_data_should_match_client_format():
+    # act
+    osu_match_data = multiplayer.osu_match_data(_fake_match(), _fake_slots())
+
+    # assert
+    assert osu_match_data == sample_packets.sample_osu_match("hunter2")
+
+
+async def test_fetch_update_match_packets_should_return_cached_packets(
+    mocker: pytest_mock.MockerFixture,
+):
+    # arrange
+    cached_packets = {
+        "version": 3,
+        "update_match_packet": b"update match",
+        "lobby_update_match_packet": b"lobby update match",
+    }
+
+    mocker.patch(
+        "app.repositories.match_packets.fetch_one",
+        return_value=cached_packets,
+    )
+    fetch_match = mocker.patch("app.repositories.multiplayer_matches.fetch_one")
+
+    # act
+    match_packets = await multiplayer.fetch_update_match_packets(7)
+
+    # assert
+    assert match_packets == cached_packets
+    fetch_match.assert_not_called()
+
+
+async def test_fetch_update_match_packets_should_encode_stale_packets(
+    mocker: pytest_mock.MockerFixture,
+):
+    # arrange
+    mocker.patch("app.repositories.match_packets.fetch_one", return_value=None)
+    mocker.patch(
+        "app.repositories.multiplayer_matches.fetch_version",
+        return_value=5,
+    )
+    mocker.patch(
+        "app.repositories.multiplayer_matches.fetch_one",
+        return_value=_fake_match(),
+    )
+    mocker.patch(
+        "app.repositories.multiplayer_slots.fetch_all",
+        return_value=_fake_slots(),
+    )
+    create_packets = mocker.patch(
+        "app.repositories.match_packets.create",
+        side_effect=lambda match_id, version, update_match_packet, lobby_update_match_packet: {
+            "version": version,
+            "update_match_packet": update_match_packet,
+            "lobby_update_match_packet": lobby_update_match_packet,
+        },
+    )
+
+    # act
+    match_packets = await multiplayer.fetch_update_match_packets(7)
+
+    # assert
+    assert match_packets is not None
+    assert match_packets["version"] == 5
+    create_packets.assert_called_once()
+
+    osu_match_data = sample_packets.sample_osu_match("hunter2")
+    assert match_packets["update_match_packet"] == packets.write_update_match_packet(
+        osu_match_data,
+        should_send_password=True,
+    )
+    assert match_packets[
+        "lobby_update_match_packet"
+    ] == packets.write_update_match_packet(
+        osu_match_data,
+        should_send_password=False,
+    )
+
+
+async def test_fetch_update_match_packets_should_return_none_without_match(
+    mocker: pytest_mock.MockerFixture,
+):
+    # arrange
+    mocker.patch("app.repositories.match_packets.fetch_one", return_value=None)
+    mocker.patch(
+        "app.repositories.multiplayer_matches.fetch_version",
+        return_value=0,
+    )
+    mocker.patch("app.repositories.multiplayer_matches.fetch_one", return_value=None)
+
+    # act
+    match_packets = await multiplayer.fetch_update_match_packets(7)
+
+    # assert
+    assert match_packets is None
+
+
+async def test_fetch_update_match_packets_should_reencode_after_team_change(
+    mocker: pytest_mock.MockerFixture,
+):
+    # arrange
+    match = _fake_match()
+    slots = _fake_slots()
+    state = {"version": 0, "cached_packets": None}
+
+    async def bump_version(match_id: int) -> int:
+        state["version"] += 1
+        return state["version"]
+
+    async def fetch_cached_packets(match_id: int):
+        cached_packets = state["cached_packets"]
+        if cached_packets is None or cached_packets["version"] != state["version"]:
+            return None
+        return cached_packets
+
+    async def create_packets(match_id, version, **encoded_packets):
+        state["cached_packets"] = {"version": version, **encoded_packets}
+        return state["cached_packets"]
+
+    async def set_slot(name: str, value: bytes) -> None:
+        slot = multiplayer_slots.deserialize(value)
+        slots[slot["slot_id"]] = slot
+
+    mocker.patch(
+        "app.repositories.multiplayer_matches.bump_version",
+        side_effect=bump_version,
+    )
+    mocker.patch(
+        "app.repositories.multiplayer_matches.fetch_version",
+        side_effect=lambda match_id: state["version"],
+    )
+    mocker.patch(
+        "app.repositories.multiplayer_matches.fetch_one",
+        return_value=match,
+    )
+    mocker.patch(
+        "app.repositories.multiplayer_slots.fetch_all",
+        side_effect=lambda match_id: [slot.copy() for slot in slots],
+    )
+    mocker.patch(
+        "app.repositories.multiplayer_slots.fetch_one",
+        side_effect=lambda match_id, slot_id: slots[slot_id].copy(),
+    )
+    mocker.patch(
+        "app.repositories.match_packets.fetch_one",
+        side_effect=fetch_cached_packets,
+    )
+    mocker.patch(
+        "app.repositories.match_packets.create",
+        side_effect=create_packets,
+    )
+    redis = mocker.patch("app.clients.redis", create=True)
+    redis.set = mocker.AsyncMock(side_effect=set_slot)
+
+    previous_packets = await multiplayer.fetch_update_match_packets(match["match_id"])
+    assert previous_packets is not None
+
+    # act
+    await multiplayer_slots.partial_update(
+        match["match_id"],
+        slot_id=0,
+        team=slots[0]["team"] % 2 + 1,
+    )
+    match_packets = await multiplayer.fetch_update_match_packets(match["match_id"])
+
+    # assert
+    assert match_packets is not None
+    assert (
+        match_packets["update_match_packet"] != previous_packets["update_match_packet"]
+    )
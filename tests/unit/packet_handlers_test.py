@@ -0,0 +1,56 @@
+import pytest_mock
+
+from app import packet_handlers
+from app import packets
+from app.privileges import ServerPrivileges
+from testing import sample_data
+
+
+async def test_match_score_update_handler_should_drop_short_score_frames(
+    mocker: pytest_mock.MockerFixture,
+):
+    # arrange
+    osu_session = sample_data.fake_osu_session()
+    osu_session["multiplayer_match_id"] = 1
+
+    fetch_occupied_slots = mocker.patch(
+        "app.repositories.multiplayer_slots.fetch_occupied_slots"
+    )
+    enqueue_many = mocker.patch("app.repositories.packet_bundles.enqueue_many")
+    warning = mocker.patch("app.logger.warning")
+
+    # act
+    await packet_handlers.match_score_update_handler(
+        osu_session,
+        memoryview(bytes(packets.OSU_SCORE_FRAME_MIN_SIZE - 1)),
+    )
+
+    # assert
+    warning.assert_called_once()
+    fetch_occupied_slots.assert_not_called()
+    enqueue_many.assert_not_called()
+
+
+async def test_spectate_frames_handler_should_drop_short_frame_bundles(
+    mocker: pytest_mock.MockerFixture,
+):
+    # arrange
+    osu_session = sample_data.fake_osu_session()
+    osu_session["privileges"] = ServerPrivileges.UNRESTRICTED
+
+    # (only a sample of bundles are fully validated)
+    mocker.patch("app.settings.SPECTATE_FRAMES_VALIDATION_SAMPLE_RATE", 0.0)
+    fetch_spectators = mocker.patch("app.repositories.spectators.members")
+    enqueue_many = mocker.patch("app.repositories.packet_bundles.enqueue_many")
+    warning = mocker.patch("app.logger.warning")
+
+    # act
+    await packet_handlers.spectate_frames_handler(
+        osu_session,
+        memoryview(bytes(packets.REPLAY_FRAME_BUNDLE_MIN_SIZE - 1)),
+    )
+
+    # assert
+    warning.assert_called_once()
+    fetch_spectators.assert_not_called()
+    enqueue_many.assert_not_called()
@@ -0,0 +1,687 @@
+import struct
+from typing import Any
+
+import pytest
+
+from app import packets
+from app.packets import DataType
+from app.packets import ServerPackets
+
+
+def _legacy_write_packet(
+    packet_id: int,
+    packet_data_inputs: list[tuple[DataType, Any]],
+) -> bytes:
+    """The original if/elif packet encoder, kept as a reference implementation."""
+    packet_body = b""
+
+    for type, value in packet_data_inputs:
+        if type == DataType.I8:
+            packet_body += struct.pack("<b", value)
+        elif type == DataType.I16:
+            packet_body += struct.pack("<h", value)
+        elif type == DataType.I32:
+            packet_body += struct.pack("<i", value)
+        elif type == DataType.I64:
+            packet_body += struct.pack("<q", value)
+        elif type == DataType.U8:
+            packet_body += struct.pack("<B", value)
+        elif type == DataType.U16:
+            packet_body += struct.pack("<H", value)
+        elif type == DataType.U32:
+            packet_body += struct.pack("<I", value)
+        elif type == DataType.U64:
+            packet_body += struct.pack("<Q", value)
+        elif type == DataType.F32:
+            packet_body += struct.pack("<f", value)
+        elif type == DataType.F64:
+            packet_body += struct.pack("<d", value)
+        elif type == DataType.STRING:
+            packet_body += packets.write_string(value)
+        elif type == DataType.I32_LIST_I16_LEN:
+            packet_body += packets.write_i32_list_i16_len(value)
+        elif type == DataType.OSU_MESSAGE:
+            packet_body += packets.write_osu_message(value)
+        elif type == DataType.OSU_MATCH:
+            packet_body += packets.write_osu_match(*value)
+        elif type == DataType.OSU_SCOREFRAME:
+            packet_body += packets.write_osu_score_frame(value)
+        elif type == DataType.OSU_REPLAY_FRAME_BUNDLE:
+            packet_body += packets.write_replay_frame_bundle(value)
+        elif type == DataType.RAW_DATA:
+            packet_body += value
+        else:
+            raise RuntimeError("Unknown packet type")
+
+    packet_header = struct.pack("<HxL", packet_id, len(packet_body))
+
+    return packet_header + packet_body
+
+
+def _fake_osu_match(match_password: str = "") -> packets.OsuMatch:
+    return {
+        "match_id": 7,
+        "match_in_progress": False,
+        "mods": 64,
+        "match_name": "cmyui's game",
+        "match_password": match_password,
+        "beatmap_name": "xi - FREEDOM DiVE [FOUR DIMENSIONS]",
+        "beatmap_id": 129891,
+        "beatmap_md5": "da8aae79c8f3306b5d65ec951874a7fb",
+        "slot_statuses": [4, 8] + [1] * 14,
+        "slot_teams": [0] * 16,
+        "per_slot_account_ids": [1000, 1001],
+        "host_account_id": 1000,
+        "game_mode": 0,
+        "win_condition": 0,
+        "team_type": 0,
+        "freemods_enabled": True,
+        "per_slot_mods": [8] * 16,
+        "random_seed": 1337,
+    }
+
+
+def _fake_replay_frame_bundle() -> packets.OsuReplayFrameBundle:
+    return {
+        "replay_frames": [
+            {"button_state": 1, "taiko_byte": 0, "x": 256.0, "y": 192.0, "time": 16},
+            {"button_state": 0, "taiko_byte": 0, "x": 300.5, "y": 10.25, "time": 33},
+        ],
+        "score_frame": {
+            "time": 1234,
+            "id": 0,
+            "num_300s": 100,
+            "num_100s": 5,
+            "num_50s": 1,
+            "num_gekis": 20,
+            "num_katus": 3,
+            "num_misses": 0,
+            "total_score": 1_000_000,
+            "current_combo": 106,
+            "max_combo": 106,
+            "perfect": True,
+            "current_hp": 200,
+            "tag_byte": 0,
+            "score_v2": True,
+            "combo_portion": 0.75,
+            "bonus_portion": 0.25,
+        },
+        "replay_action": packets.ReplayAction.STANDARD,
+        "extra": 0,
+        "sequence_number": 42,
+    }
+
+
+_MESSAGE: packets.OsuMessage = {
+    "sender_name": "",
+    "message_content": "",
+    "recipient_name": "cmyui",
+    "sender_id": 0,
+}
+
+# (writer, writer args, packet id, legacy packet data inputs)
+COMPATIBILITY_CASES: list[tuple[Any, tuple[Any, ...], int, list[Any]]] = [
+    (
+        packets.write_user_id_packet,
+        (1000,),
+        ServerPackets.USER_ID,
+        [(DataType.I32, 1000)],
+    ),
+    (
+        packets.write_send_message_packet,
+        ("cmyui", "hello world ✨", "#osu", 1000),
+        ServerPackets.SEND_MESSAGE,
+        [
+            (DataType.STRING, "cmyui"),
+            (DataType.STRING, "hello world ✨"),
+            (DataType.STRING, "#osu"),
+            (DataType.I32, 1000),
+        ],
+    ),
+    (
+        packets.write_user_stats_packet,
+        (1000, 2, "playing", "a" * 32, 72, 0, 75, 10**10, 98.5, 3, 10**11, 1, 727),
+        ServerPackets.USER_STATS,
+        [
+            (DataType.I32, 1000),
+            (DataType.U8, 2),
+            (DataType.STRING, "playing"),
+            (DataType.STRING, "a" * 32),
+            (DataType.I32, 72),
+            (DataType.U8, 0),
+            (DataType.I32, 75),
+            (DataType.I64, 10**10),
+            (DataType.F32, 98.5 / 100.0),
+            (DataType.I32, 3),
+            (DataType.I64, 10**11),
+            (DataType.I32, 1),
+            (DataType.I16, 727),
+        ],
+    ),
+    (
+        packets.write_logout_packet,
+        (1000,),
+        ServerPackets.USER_LOGOUT,
+        [(DataType.I32, 1000), (DataType.U8, 0)],
+    ),
+    (
+        packets.write_spectator_joined_packet,
+        (1000,),
+        ServerPackets.SPECTATOR_JOINED,
+        [(DataType.I32, 1000)],
+    ),
+    (
+        packets.write_spectator_left_packet,
+        (1000,),
+        ServerPackets.SPECTATOR_LEFT,
+        [(DataType.I32, 1000)],
+    ),
+    (
+        packets.write_spectate_frames_packet,
+        (_fake_replay_frame_bundle(),),
+        ServerPackets.SPECTATE_FRAMES,
+        [(DataType.OSU_REPLAY_FRAME_BUNDLE, _fake_replay_frame_bundle())],
+    ),
+    (
+        packets.write_spectator_cant_spectate_packet,
+        (1000,),
+        ServerPackets.SPECTATOR_CANT_SPECTATE,
+        [(DataType.I32, 1000)],
+    ),
+    (
+        packets.write_notification_packet,
+        ("Welcome to the osu!bancho server!",),
+        ServerPackets.NOTIFICATION,
+        [(DataType.STRING, "Welcome to the osu!bancho server!")],
+    ),
+    (
+        packets.write_update_match_packet,
+        (_fake_osu_match("hunter2"), False),
+        ServerPackets.UPDATE_MATCH,
+        [(DataType.OSU_MATCH, (_fake_osu_match("hunter2"), False))],
+    ),
+    (
+        packets.write_new_match_packet,
+        (_fake_osu_match(),),
+        ServerPackets.NEW_MATCH,
+        [(DataType.OSU_MATCH, (_fake_osu_match(), False))],
+    ),
+    (
+        packets.write_dispose_match_packet,
+        (7,),
+        ServerPackets.DISPOSE_MATCH,
+        [(DataType.I32, 7)],
+    ),
+    (
+        packets.write_match_join_success_packet,
+        (_fake_osu_match("hunter2"), True),
+        ServerPackets.MATCH_JOIN_SUCCESS,
+        [(DataType.OSU_MATCH, (_fake_osu_match("hunter2"), True))],
+    ),
+    (
+        packets.write_match_join_fail_packet,
+        (),
+        ServerPackets.MATCH_JOIN_FAIL,
+        [],
+    ),
+    (
+        packets.write_fellow_spectator_joined_packet,
+        (1000,),
+        ServerPackets.FELLOW_SPECTATOR_JOINED,
+        [(DataType.I32, 1000)],
+    ),
+    (
+        packets.write_fellow_spectator_left_packet,
+        (1000,),
+        ServerPackets.FELLOW_SPECTATOR_LEFT,
+        [(DataType.I32, 1000)],
+    ),
+    (
+        packets.write_match_start_packet,
+        (_fake_osu_match(), False),
+        ServerPackets.MATCH_START,
+        [(DataType.OSU_MATCH, (_fake_osu_match(), False))],
+    ),
+    (
+        packets.write_match_score_update_packet,
+        (bytes(range(29)),),
+        ServerPackets.MATCH_SCORE_UPDATE,
+        [(DataType.RAW_DATA, bytes(range(29)))],
+    ),
+    (
+        packets.write_match_transfer_host_packet,
+        (),
+        ServerPackets.MATCH_TRANSFER_HOST,
+        [],
+    ),
+    (
+        packets.write_match_all_players_loaded_packet,
+        (),
+        ServerPackets.MATCH_ALL_PLAYERS_LOADED,
+        [],
+    ),
+    (
+        packets.write_match_player_failed_packet,
+        (3,),
+        ServerPackets.MATCH_PLAYER_FAILED,
+        [(DataType.I32, 3)],
+    ),
+    (
+        packets.write_match_complete_packet,
+        (),
+        ServerPackets.MATCH_COMPLETE,
+        [],
+    ),
+    (
+        packets.write_match_skip_packet,
+        (),
+        ServerPackets.MATCH_SKIP,
+        [],
+    ),
+    (
+        packets.write_channel_join_success_packet,
+        ("#osu",),
+        ServerPackets.CHANNEL_JOIN_SUCCESS,
+        [(DataType.STRING, "#osu")],
+    ),
+    (
+        packets.write_channel_info_packet,
+        ("#osu", "General discussion.", 42),
+        ServerPackets.CHANNEL_INFO,
+        [
+            (DataType.STRING, "#osu"),
+            (DataType.STRING, "General discussion."),
+            (DataType.U16, 42),
+        ],
+    ),
+    (
+        packets.write_channel_kick_packet,
+        ("#multiplayer",),
+        ServerPackets.CHANNEL_KICK,
+        [(DataType.STRING, "#multiplayer")],
+    ),
+    (
+        packets.write_channel_auto_join_packet,
+        ("#spectator", "", 2),
+        ServerPackets.CHANNEL_AUTO_JOIN,
+        [
+            (DataType.STRING, "#spectator"),
+            (DataType.STRING, ""),
+            (DataType.U16, 2),
+        ],
+    ),
+    (
+        packets.write_user_privileges_packet,
+        (0b111,),
+        ServerPackets.PRIVILEGES,
+        [(DataType.I32, 0b111)],
+    ),
+    (
+        packets.write_friends_list_packet,
+        ([1000, 1001, 1002],),
+        ServerPackets.FRIENDS_LIST,
+        [(DataType.I32_LIST_I16_LEN, [1000, 1001, 1002])],
+    ),
+    (
+        packets.write_protocol_version_packet,
+        (19,),
+        ServerPackets.PROTOCOL_VERSION,
+        [(DataType.I32, 19)],
+    ),
+    (
+        packets.write_match_player_skipped_packet,
+        (3,),
+        ServerPackets.MATCH_PLAYER_SKIPPED,
+        [(DataType.I32, 3)],
+    ),
+    (
+        packets.write_user_presence_packet,
+        (1000, "cmyui", -5, 38, 1, 0, 43, -79, 1),
+        ServerPackets.USER_PRESENCE,
+        [
+            (DataType.I32, 1000),
+            (DataType.STRING, "cmyui"),
+            (DataType.U8, -5 + 24),
+            (DataType.U8, 38),
+            (DataType.U8, 1 | (0 << 5)),
+            (DataType.F32, -79),
+            (DataType.F32, 43),
+            (DataType.I32, 1),
+        ],
+    ),
+    (
+        packets.write_restart_packet,
+        (0,),
+        ServerPackets.RESTART,
+        [(DataType.I32, 0)],
+    ),
+    (
+        packets.write_channel_listing_complete_packet,
+        (),
+        ServerPackets.CHANNEL_INFO_END,
+        [],
+    ),
+    (
+        packets.write_silence_end_packet,
+        (60,),
+        ServerPackets.SILENCE_END,
+        [(DataType.I32, 60)],
+    ),
+    (
+        packets.write_user_silenced_packet,
+        (1000,),
+        ServerPackets.USER_SILENCED,
+        [(DataType.I32, 1000)],
+    ),
+    (
+        packets.write_user_dm_blocked_packet,
+        ("cmyui",),
+        ServerPackets.USER_DM_BLOCKED,
+        [(DataType.OSU_MESSAGE, _MESSAGE)],
+    ),
+    (
+        packets.write_target_is_silenced_packet,
+        ("cmyui",),
+        ServerPackets.TARGET_IS_SILENCED,
+        [(DataType.OSU_MESSAGE, _MESSAGE)],
+    ),
+    (
+        packets.write_account_restricted_packet,
+        (),
+        ServerPackets.ACCOUNT_RESTRICTED,
+        [],
+    ),
+]
+
+
+@pytest.mark.parametrize(
+    "writer, writer_args, packet_id, packet_data_inputs",
+    COMPATIBILITY_CASES,
+    ids=[case[0].__name__ for case in COMPATIBILITY_CASES],
+)
+def test_compiled_encoders_match_legacy_encoder(
+    writer, writer_args, packet_id, packet_data_inputs
+):
+    # act
+    packet_data = writer(*writer_args)
+
+    # assert
+    assert packet_data == _legacy_write_packet(packet_id, packet_data_inputs)
+    assert packet_data == packets.write_packet(packet_id, packet_data_inputs)
+
+
+def test_every_server_packet_schema_has_a_compatibility_case():
+    # arrange
+    covered_packet_ids = {case[2] for case in COMPATIBILITY_CASES}
+
+    # assert
+    assert covered_packet_ids == set(packets.SERVER_PACKET_SCHEMAS)
+    assert covered_packet_ids == set(packets.SERVER_PACKET_ENCODERS)
+
+
+def test_every_server_packet_id_is_known():
+    # arrange
+    server_packet_ids = {
+        value for name, value in vars(ServerPackets).items() if not name.startswith("_")
+    }
+
+    # assert
+    assert set(packets.SERVER_PACKET_SCHEMAS) <= server_packet_ids
+
+
+def test_compiled_encoder_rejects_unknown_types():
+    # act & assert
+    with pytest.raises(RuntimeError):
+        packets.compile_packet_encoder(
+            ServerPackets.NOTIFICATION,
+            (DataType.STRING, DataType.OSU_MAP_INFO_REPLY),
+        )
+
+
+def test_write_user_id_packet_bytes():
+    # act
+    packet_data = packets.write_user_id_packet(-1)
+
+    # assert
+    assert packet_data == b"\x05\x00\x00\x04\x00\x00\x00\xff\xff\xff\xff"
+
+
+def test_packet_reader_reads_primitives_in_order():
+    # arrange
+    reader = packets.PacketReader(
+        struct.pack(
+            "<bBhHiIqQfd",
+            *(-1, 255, -2, 65535, -3, 2**32 - 1, -4, 2**64 - 1, 0.5, 0.25),
+        )
+    )
+
+    # act & assert
+    assert reader.read_i8() == -1
+    assert reader.read_u8() == 255
+    assert reader.read_i16() == -2
+    assert reader.read_u16() == 65535
+    assert reader.read_i32() == -3
+    assert reader.read_u32() == 2**32 - 1
+    assert reader.read_i64() == -4
+    assert reader.read_u64() == 2**64 - 1
+    assert reader.read_f32() == 0.5
+    assert reader.read_f64() == 0.25
+    assert reader.offset == len(reader.data_view)
+
+
+def test_packet_reader_reads_strings_and_lists():
+    # arrange
+    reader = packets.PacketReader(
+        packets.write_string("hello world ✨")
+        + packets.write_string("")
+        + packets.write_i32_list_i16_len([1000, -1, 1002])
+    )
+
+    # act & assert
+    assert reader.read_string() == "hello world ✨"
+    assert reader.read_string() == ""
+    assert reader.read_i32_list_i16_length() == [1000, -1, 1002]
+
+
+@pytest.mark.parametrize("freemods_enabled", [True, False])
+def test_packet_reader_round_trips_osu_match(freemods_enabled):
+    # arrange
+    osu_match = _fake_osu_match("hunter2")
+    osu_match["freemods_enabled"] = freemods_enabled
+    if not freemods_enabled:
+        osu_match["per_slot_mods"] = []
+
+    # act
+    reader = packets.PacketReader(
+        packets.write_osu_match(osu_match, should_send_password=True)
+    )
+
+    # assert
+    assert reader.read_osu_match() == osu_match
+
+
+def test_packet_reader_round_trips_replay_frame_bundle():
+    # arrange
+    replay_frame_bundle = _fake_replay_frame_bundle()
+
+    # act
+    reader = packets.PacketReader(
+        packets.write_replay_frame_bundle(replay_frame_bundle)
+    )
+
+    # assert
+    assert reader.read_replay_frame_bundle() == replay_frame_bundle
+
+
+def test_packet_reader_rejects_truncated_replay_frame_bundle():
+    # arrange
+    packet_data = packets.write_replay_frame_bundle(_fake_replay_frame_bundle())
+    reader = packets.PacketReader(packet_data[:20])
+
+    # act & assert
+    with pytest.raises(struct.error):
+        reader.read_replay_frame_bundle()
+
+
+def test_read_packets_yields_views_of_each_packet():
+    # arrange
+    request_data = (
+        packets.write_packet(packets.ClientPackets.PING, [])
+        + packets.write_packet(
+            packets.ClientPackets.CHANNEL_JOIN,
+            [(DataType.STRING, "#osu")],
+        )
+        + packets.write_packet(packets.ClientPackets.OSU_EXIT, [(DataType.I32, 1)])
+    )
+
+    # act
+    osu_packets = list(packets.read_packets(request_data))
+
+    # assert
+    assert [packet.packet_id for packet in osu_packets] == [
+        packets.ClientPackets.PING,
+        packets.ClientPackets.CHANNEL_JOIN,
+        packets.ClientPackets.OSU_EXIT,
+    ]
+    assert [packet.packet_data_length for packet in osu_packets] == [0, 6, 4]
+    assert all(isinstance(packet.packet_data, memoryview) for packet in osu_packets)
+    assert packets.PacketReader(osu_packets[1].packet_data).read_string() == "#osu"
+    assert packets.PacketReader(osu_packets[2].packet_data).read_i32() == 1
+
+
+def test_read_packets_is_lazy():
+    # arrange
+    request_data = packets.write_packet(packets.ClientPackets.PING, []) + b"\xff"
+
+    # act
+    osu_packets = packets.read_packets(request_data)
+
+    # assert
+    assert next(osu_packets).packet_id == packets.ClientPackets.PING
+    with pytest.raises(packets.MalformedPacketError):
+        next(osu_packets)
+
+
+@pytest.mark.parametrize(
+    "request_data",
+    [
+        b"\x04\x00",  # truncated header
+        b"\x04\x00\x00\x04\x00\x00\x00\x01\x00",  # truncated data
+        b"\x04\x00\x00\xff\xff\xff\xff",  # garbage length
+    ],
+)
+def test_read_packets_rejects_malformed_data(request_data):
+    # act & assert
+    with pytest.raises(packets.MalformedPacketError):
+        list(packets.read_packets(request_data))
+
+
+@pytest.mark.parametrize(
+    ("request_data", "expected"),
+    [
+        (b"\x04\x00\x00\x00\x00\x00\x00", True),
+        (b"\x04\x00\x00\x00\x00\x00\x00" * 3, True),
+        (b"", False),
+        (b"\x04\x00\x00\x00\x00\x00", False),  # truncated
+        (b"\x04\x00\x00\x01\x00\x00\x00\x00", False),  # with data
+        (b"\x04\x00\x00\x00\x00\x00\x00\x55\x00\x00\x00\x00\x00\x00", False),
+    ],
+)
+def test_is_ping_only(request_data, expected):
+    # act & assert
+    assert packets.is_ping_only(request_data) is expected
+
+
+@pytest.mark.parametrize(
+    "write_packet",
+    [
+        packets.write_match_join_fail_packet,
+        packets.write_match_transfer_host_packet,
+        packets.write_match_all_players_loaded_packet,
+        packets.write_match_complete_packet,
+        packets.write_match_skip_packet,
+        packets.write_channel_listing_complete_packet,
+        packets.write_account_restricted_packet,
+        lambda: packets.write_restart_packet(0),
+        lambda: packets.write_match_player_failed_packet(0),
+        lambda: packets.write_match_player_skipped_packet(15),
+    ],
+)
+def test_constant_packets_are_encoded_once(write_packet):
+    assert write_packet() is write_packet()
+
+
+@pytest.mark.parametrize("slot_id", [0, 7, 15, 16, -1])
+def test_match_player_slot_packets_match_legacy_encoder(slot_id):
+    # act
+    player_failed_packet = packets.write_match_player_failed_packet(slot_id)
+    player_skipped_packet = packets.write_match_player_skipped_packet(slot_id)
+
+    # assert
+    assert player_failed_packet == _legacy_write_packet(
+        packets.ServerPackets.MATCH_PLAYER_FAILED, [(DataType.I32, slot_id)]
+    )
+    assert player_skipped_packet == _legacy_write_packet(
+        packets.ServerPackets.MATCH_PLAYER_SKIPPED, [(DataType.I32, slot_id)]
+    )
+
+
+def test_relayed_spectate_frames_packet_matches_reencoded_packet():
+    # arrange
+    replay_frame_bundle = _fake_replay_frame_bundle()
+    replay_frame_bundle_data = packets.write_replay_frame_bundle(replay_frame_bundle)
+
+    # act
+    relayed_packet = packets.write_relayed_spectate_frames_packet(
+        memoryview(replay_frame_bundle_data)
+    )
+
+    # assert
+    assert relayed_packet == packets.write_spectate_frames_packet(replay_frame_bundle)
+
+
+def test_relayed_spectate_frames_packet_zeroes_extra():
+    # arrange
+    replay_frame_bundle = _fake_replay_frame_bundle()
+    replay_frame_bundle_data = bytearray(
+        packets.write_replay_frame_bundle(replay_frame_bundle)
+    )
+    replay_frame_bundle_data[:4] = (1234).to_bytes(4, "little")  # extra
+
+    # act
+    relayed_packet = packets.write_relayed_spectate_frames_packet(
+        memoryview(replay_frame_bundle_data)
+    )
+
+    # assert
+    assert relayed_packet == packets.write_spectate_frames_packet(replay_frame_bundle)
+
+
+@pytest.mark.parametrize("slot_id", [0, 5, 15])
+def test_relayed_match_score_update_packet_patches_slot_id(slot_id):
+    # arrange
+    score_frame = _fake_replay_frame_bundle()["score_frame"]
+    score_frame_data = packets.write_osu_score_frame(score_frame)
+
+    # act
+    relayed_packet = packets.write_relayed_match_score_update_packet(
+        memoryview(score_frame_data), slot_id
+    )
+
+    # assert
+    assert relayed_packet == packets.write_match_score_update_packet(
+        packets.write_osu_score_frame(score_frame | {"id": slot_id})
+    )
+
+
+def test_replay_frame_bundle_min_size_matches_bundle_without_frames():
+    # arrange
+    replay_frame_bundle = _fake_replay_frame_bundle()
+    replay_frame_bundle["replay_frames"] = []
+    replay_frame_bundle["score_frame"]["score_v2"] = False
+
+    # act
+    replay_frame_bundle_data = packets.write_replay_frame_bundle(replay_frame_bundle)
+
+    # assert
+    assert len(replay_frame_bundle_data) == packets.REPLAY_FRAME_BUNDLE_MIN_SIZE
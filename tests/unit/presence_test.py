@@ -0,0 +1,184 @@
+import pytest_mock
+
+from app import packets
+from app import presence
+from testing import sample_data
+
+
+async def test_fetch_packets_should_return_cached_packets(
+    mocker: pytest_mock.MockerFixture,
+):
+    # arrange
+    osu_session = sample_data.fake_osu_session()
+    cached_packets = {
+        "version": 3,
+        "presence_packet": b"presence",
+        "stats_packet": b"stats",
+    }
+
+    mocker.patch(
+        "app.repositories.presence_packets.fetch_one",
+        return_value=cached_packets,
+    )
+    fetch_stats = mocker.patch("app.repositories.stats.fetch_one")
+
+    # act
+    own_packets = await presence.fetch_packets(osu_session)
+
+    # assert
+    assert own_packets == cached_packets
+    fetch_stats.assert_not_called()
+
+
+async def test_fetch_packets_should_encode_stale_packets(
+    mocker: pytest_mock.MockerFixture,
+):
+    # arrange
+    osu_session = sample_data.fake_osu_session()
+    osu_session["game_mode"] = 4  # relax osu!
+    osu_session["country"] = sample_data.fake_country()
+    osu_session["utc_offset"] = 2
+    osu_session["privileges"] = 1
+    osu_session["action"] = 0
+
+    mocker.patch(
+        "app.repositories.presence_packets.fetch_one",
+        return_value=None,
+    )
+    mocker.patch(
+        "app.repositories.presence_packets.fetch_version",
+        return_value=7,
+    )
+    mocker.patch(
+        "app.repositories.stats.fetch_one",
+        return_value={
+            "ranked_score": 1_000,
+            "accuracy": 98.5,
+            "play_count": 10,
+            "total_score": 2_000,
+            "performance_points": 300,
+        },
+    )
+    mocker.patch("app.ranking.get_global_rank", return_value=42)
+    create_packets = mocker.patch(
+        "app.repositories.presence_packets.create",
+        side_effect=lambda account_id, game_mode, version, presence_packet, stats_packet: {
+            "version": version,
+            "presence_packet": presence_packet,
+            "stats_packet": stats_packet,
+        },
+    )
+
+    # act
+    own_packets = await presence.fetch_packets(osu_session)
+
+    # assert
+    assert own_packets is not None
+    assert own_packets["version"] == 7
+    create_packets.assert_called_once()
+    assert create_packets.call_args.args[:3] == (osu_session["account_id"], 4, 7)
+
+    assert own_packets["stats_packet"] == packets.write_user_stats_packet(
+        osu_session["account_id"],
+        osu_session["action"],
+        osu_session["info_text"],
+        osu_session["beatmap_md5"],
+        osu_session["mods"],
+        0,  # vanilla osu!
+        osu_session["beatmap_id"],
+        1_000,
+        98.5,
+        10,
+        2_000,
+        42,
+        300,
+    )
+
+
+async def test_fetch_packets_should_return_none_without_stats(
+    mocker: pytest_mock.MockerFixture,
+):
+    # arrange
+    osu_session = sample_data.fake_osu_session()
+
+    mocker.patch(
+        "app.repositories.presence_packets.fetch_one",
+        return_value=None,
+    )
+    mocker.patch(
+        "app.repositories.presence_packets.fetch_version",
+        return_value=0,
+    )
+    mocker.patch("app.repositories.stats.fetch_one", return_value=None)
+
+    # act
+    own_packets = await presence.fetch_packets(osu_session)
+
+    # assert
+    assert own_packets is None
+
+
+async def test_fetch_packets_should_use_the_given_game_mode(
+    mocker: pytest_mock.MockerFixture,
+):
+    # arrange
+    osu_session = sample_data.fake_osu_session()
+    osu_session["game_mode"] = 0  # vanilla osu!
+
+    fetch_one = mocker.patch(
+        "app.repositories.presence_packets.fetch_one",
+        return_value=None,
+    )
+    mocker.patch(
+        "app.repositories.presence_packets.fetch_version",
+        return_value=0,
+    )
+    fetch_stats = mocker.patch("app.repositories.stats.fetch_one", return_value=None)
+
+    # act
+    await presence.fetch_packets(osu_session, game_mode=3)
+
+    # assert
+    fetch_one.assert_called_once_with(osu_session["account_id"], 3)
+    fetch_stats.assert_called_once_with(osu_session["account_id"], 3)
+
+
+async def test_fetch_many_packets_should_only_encode_stale_packets(
+    mocker: pytest_mock.MockerFixture,
+):
+    # arrange
+    cached_osu_session = sample_data.fake_osu_session()
+    stale_osu_session = sample_data.fake_osu_session()
+    cached_packets = {
+        "version": 3,
+        "presence_packet": b"presence",
+        "stats_packet": b"stats",
+    }
+
+    fetch_many = mocker.patch(
+        "app.repositories.presence_packets.fetch_many",
+        return_value=[cached_packets, None],
+    )
+    mocker.patch(
+        "app.repositories.presence_packets.fetch_version",
+        return_value=0,
+    )
+    fetch_stats = mocker.patch("app.repositories.stats.fetch_one", return_value=None)
+
+    # act
+    all_packets = await presence.fetch_many_packets(
+        [cached_osu_session, stale_osu_session]
+    )
+
+    # assert
+    assert all_packets == [cached_packets, None]
+    fetch_many.assert_called_once_with(
+        [
+            (cached_osu_session["account_id"], cached_osu_session["game_mode"]),
+            (stale_osu_session["account_id"], stale_osu_session["game_mode"]),
+        ]
+    )
+    fetch_stats.assert_called_once_with(
+        stale_osu_session["account_id"],
+        stale_osu_session["game_mode"],
+    )
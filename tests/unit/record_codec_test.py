@@ -0,0 +1,233 @@
+import json
+from datetime import datetime
+from uuid import uuid4
+
+import pytest
+
+from app import record_codec
+from app.repositories import multiplayer_matches
+from app.repositories import multiplayer_slots
+from app.repositories import web_sessions
+
+SCHEMA = record_codec.RecordSchema(
+    version=1,
+    fields=[
+        record_codec.Field("id", record_codec.UUID),
+        record_codec.Field("name", record_codec.STR),
+        record_codec.Field("count", record_codec.INT),
+        record_codec.Field("ratio", record_codec.FLOAT),
+        record_codec.Field("enabled", record_codec.BOOL),
+        record_codec.Field("note", record_codec.STR, nullable=True),
+        record_codec.Field("parent_id", record_codec.UUID, nullable=True),
+        record_codec.Field("emoji", record_codec.STR),
+        record_codec.Field("created_at", record_codec.DATETIME),
+    ],
+)
+
+RECORDS = {
+    "all_set": {
+        "id": uuid4(),
+        "name": "cookiezi",
+        "count": -(2**40),
+        "ratio": 0.1,
+        "enabled": True,
+        "note": "brb",
+        "parent_id": uuid4(),
+        "emoji": "🍪",
+        "created_at": datetime(2023, 5, 1, 12, 30, 15, 123000),
+    },
+    "nulls": {
+        "id": uuid4(),
+        "name": "",
+        "count": 0,
+        "ratio": -1.5,
+        "enabled": False,
+        "note": None,
+        "parent_id": None,
+        "emoji": "😴",
+        "created_at": datetime(2023, 5, 1, 12, 30, 15),
+    },
+}
+
+
+@pytest.mark.parametrize("record_name", RECORDS)
+def test_record_should_round_trip(record_name):
+    # arrange
+    record = RECORDS[record_name]
+
+    # act
+    raw_record = SCHEMA.encode(record)
+
+    # assert
+    assert SCHEMA.decode(raw_record) == record
+
+
+@pytest.mark.parametrize("record_name", RECORDS)
+def test_decode_field_should_decode_single_fields(record_name):
+    # arrange
+    record = RECORDS[record_name]
+    raw_record = SCHEMA.encode(record)
+
+    # act
+    fields = {
+        field_name: SCHEMA.decode_field(raw_record, field_name)
+        for field_name in SCHEMA.fields
+    }
+
+    # assert
+    assert fields == record
+
+
+def test_encode_should_reject_null_in_non_nullable_field():
+    # arrange
+    record = {**RECORDS["all_set"], "name": None}
+
+    # act & assert
+    with pytest.raises(ValueError):
+        SCHEMA.encode(record)
+
+
+def test_decode_should_reject_other_versions():
+    # arrange
+    raw_record = SCHEMA.encode(RECORDS["all_set"])
+    next_schema = record_codec.RecordSchema(
+        version=2,
+        fields=list(SCHEMA.fields.values()),
+    )
+
+    # act & assert
+    with pytest.raises(ValueError):
+        next_schema.decode(raw_record)
+
+
+def test_hash_values_should_round_trip():
+    # arrange
+    record = RECORDS["nulls"]
+
+    # act
+    encoded_values = SCHEMA.encode_values(record)
+
+    # assert
+    assert "note" not in encoded_values
+    assert encoded_values["count"] == b"0"
+    assert (
+        SCHEMA.decode_hash(
+            {field.encode(): value for field, value in encoded_values.items()}
+        )
+        == record
+    )
+
+
+def test_repository_records_should_round_trip():
+    # arrange
+    now = datetime(2023, 5, 1, 12, 30, 15, 123000)
+    web_session: web_sessions.WebSession = {
+        "web_session_id": uuid4(),
+        "account_id": 1001,
+        "expires_at": now,
+        "created_at": now,
+        "updated_at": now,
+    }
+    match: multiplayer_matches.MultiplayerMatch = {
+        "match_id": 1,
+        "match_name": "4* 4dt 1v1",
+        "match_password": "",
+        "beatmap_name": "xi - Blue Zenith [FOUR DIMENSIONS]",
+        "beatmap_id": 658127,
+        "beatmap_md5": "da8aae79c8f3306b5d65ec951874a7fb",
+        "host_account_id": 1001,
+        "game_mode": 0,
+        "mods": 64,
+        "win_condition": multiplayer_matches.MatchWinCondition.SCORE_V2,
+        "team_type": multiplayer_matches.MatchTeamTypes.HEAD_TO_HEAD,
+        "freemods_enabled": False,
+        "random_seed": 1337,
+        "status": multiplayer_matches.MatchStatus.WAITING,
+        "created_at": now,
+        "updated_at": now,
+    }
+    slot: multiplayer_slots.MultiplayerSlot = {
+        "slot_id": 3,
+        "osu_session_id": uuid4(),
+        "account_id": 1001,
+        "status": multiplayer_slots.SlotStatus.READY,
+        "team": multiplayer_matches.MatchTeams.NEUTRAL,
+        "mods": 0,
+        "loaded": True,
+        "skipped": False,
+    }
+
+    # act & assert
+    assert web_sessions.deserialize(web_sessions.serialize(web_session)) == web_session
+    assert (
+        multiplayer_matches.deserialize(multiplayer_matches.serialize(match)) == match
+    )
+    assert multiplayer_slots.deserialize(multiplayer_slots.serialize(slot)) == slot
+
+
+def test_records_stored_as_json_should_still_decode():
+    # arrange
+    web_session_id = uuid4()
+    now = datetime(2023, 5, 1, 12, 30, 15, 123456)
+    raw_web_session = json.dumps(
+        {
+            "web_session_id": str(web_session_id),
+            "account_id": 1001,
+            "expires_at": now.isoformat(),
+            "created_at": now.isoformat(),
+            "updated_at": now.isoformat(),
+        }
+    ).encode()
+
+    # act
+    web_session = web_sessions.deserialize(raw_web_session)
+
+    # assert
+    assert web_session == {
+        "web_session_id": web_session_id,
+        "account_id": 1001,
+        "expires_at": now,
+        "created_at": now,
+        "updated_at": now,
+    }
+    assert (
+        web_sessions.WEB_SESSION_SCHEMA.decode_field(raw_web_session, "account_id")
+        == 1001
+    )
+
+
+def test_matches_stored_as_json_should_get_timestamps():
+    # arrange
+    raw_match = json.dumps(
+        {
+            "match_id": 1,
+            "match_name": "4* 4dt 1v1",
+            "match_password": "",
+            "beatmap_name": "xi - Blue Zenith [FOUR DIMENSIONS]",
+            "beatmap_id": 658127,
+            "beatmap_md5": "da8aae79c8f3306b5d65ec951874a7fb",
+            "host_account_id": 1001,
+            "game_mode": 0,
+            "mods": 64,
+            "win_condition": 3,
+            "team_type": 0,
+            "freemods_enabled": False,
+            "random_seed": 1337,
+            "status": 0,
+        }
+    ).encode()
+
+    # act
+    match = multiplayer_matches.deserialize(raw_match)
+
+    # assert
+    assert match["created_at"] is not None
+    assert match["updated_at"] == match["created_at"]
+    # (so they can be stored again)
+    multiplayer_matches.serialize(match)
+
+
+def test_schema_versions_should_not_collide_with_json():
+    # act & assert
+    with pytest.raises(ValueError):
+        record_codec.RecordSchema(version=ord("{"), fields=[])
@@ -0,0 +1,80 @@
+from uuid import uuid4
+
+import pytest_mock
+
+from app.repositories import multiplayer_slots
+from app.repositories.multiplayer_slots import MultiplayerSlot
+from app.repositories.multiplayer_slots import SlotStatus
+
+
+def _fake_slot(slot_id: int, status: int) -> MultiplayerSlot:
+    return {
+        "slot_id": slot_id,
+        "osu_session_id": uuid4(),
+        "account_id": 1000 + slot_id,
+        "status": status,
+        "team": 0,
+        "mods": 0,
+        "loaded": True,
+        "skipped": False,
+    }
+
+
+async def test_fetch_occupied_slots_should_replace_stale_slots(
+    mocker: pytest_mock.MockerFixture,
+):
+    # arrange
+    playing_slot = _fake_slot(0, SlotStatus.PLAYING)
+    ready_slot = _fake_slot(1, SlotStatus.READY)
+    mocker.patch(
+        "app.repositories.multiplayer_slots.fetch_all",
+        return_value=[playing_slot, ready_slot],
+    )
+
+    redis = mocker.patch("app.clients.redis", create=True)
+    pipe = mocker.MagicMock()
+    pipe.execute = mocker.AsyncMock(
+        side_effect=[
+            # (a slot from the previous version, since left)
+            [b"2", {b"version": b"1", str(uuid4()).encode(): b"2:32"}],
+            [None, None, None],
+        ]
+    )
+    redis.pipeline.return_value.__aenter__.return_value = pipe
+
+    # act
+    occupied_slots = await multiplayer_slots.fetch_occupied_slots(match_id=1)
+
+    # assert
+    assert occupied_slots == {
+        playing_slot["osu_session_id"]: (0, SlotStatus.PLAYING),
+        ready_slot["osu_session_id"]: (1, SlotStatus.READY),
+    }
+    pipe.delete.assert_called_once_with(multiplayer_slots.make_occupied_slots_key(1))
+    assert pipe.hset.call_args.kwargs["mapping"] == {
+        "version": 2,
+        str(playing_slot["osu_session_id"]): f"0:{SlotStatus.PLAYING}",
+        str(ready_slot["osu_session_id"]): f"1:{SlotStatus.READY}",
+    }
+
+
+async def test_fetch_occupied_slots_should_read_current_version(
+    mocker: pytest_mock.MockerFixture,
+):
+    # arrange
+    osu_session_id = uuid4()
+    fetch_all = mocker.patch("app.repositories.multiplayer_slots.fetch_all")
+
+    redis = mocker.patch("app.clients.redis", create=True)
+    pipe = mocker.MagicMock()
+    pipe.execute = mocker.AsyncMock(
+        return_value=[b"2", {b"version": b"2", str(osu_session_id).encode(): b"3:32"}]
+    )
+    redis.pipeline.return_value.__aenter__.return_value = pipe
+
+    # act
+    occupied_slots = await multiplayer_slots.fetch_occupied_slots(match_id=1)
+
+    # assert
+    assert occupied_slots == {osu_session_id: (3, 32)}
+    fetch_all.assert_not_called()
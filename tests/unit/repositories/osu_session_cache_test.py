@@ -0,0 +1,239 @@
+import time
+from collections import Counter
+from collections import OrderedDict
+from datetime import datetime
+from datetime import timedelta
+
+import pytest
+import pytest_mock
+
+from app.repositories import osu_session_cache
+from app.repositories import osu_sessions
+from testing import sample_data
+
+
+@pytest.fixture(autouse=True)
+def cache(mocker: pytest_mock.MockerFixture):
+    mocker.patch("app.settings.OSU_SESSION_CACHE_SIZE", 2)
+    mocker.patch.object(osu_session_cache, "_entries", OrderedDict())
+    mocker.patch.object(osu_session_cache, "_loading", {})
+    mocker.patch.object(osu_session_cache, "_stats", Counter())
+    mocker.patch.object(osu_session_cache, "_listening", True)
+
+
+def _fake_osu_session() -> osu_sessions.OsuSession:
+    osu_session = sample_data.fake_osu_session()
+    # (sessions are only cached until they expire)
+    osu_session["expires_at"] = datetime.now().replace(microsecond=0) + timedelta(
+        seconds=osu_sessions.OSU_SESSION_TTL
+    )
+    return osu_session
+
+
+def _cache(osu_session: osu_sessions.OsuSession) -> None:
+    osu_session_id = osu_session["osu_session_id"]
+    token = osu_session_cache.start_read(osu_session_id)
+    osu_session_cache.put(osu_session_id, token, osu_session)
+
+
+def _raw_osu_session(osu_session: osu_sessions.OsuSession) -> dict[bytes, bytes]:
+    return {
+        field.encode(): value
+        for field, value in osu_sessions.serialize(osu_session).items()
+    }
+
+
+def test_get_should_return_copies_of_cached_sessions():
+    # arrange
+    osu_session = _fake_osu_session()
+    _cache(osu_session)
+
+    # act
+    cached_osu_session = osu_session_cache.get(osu_session["osu_session_id"])
+    assert cached_osu_session is not None
+    cached_osu_session["action"] = osu_sessions.Action.AFK
+
+    # assert
+    assert osu_session_cache.get(osu_session["osu_session_id"]) == osu_session
+    assert osu_session_cache._stats["hits"] == 2
+
+
+def test_put_should_not_cache_sessions_invalidated_while_read():
+    # arrange
+    osu_session = _fake_osu_session()
+    token = osu_session_cache.start_read(osu_session["osu_session_id"])
+
+    # act
+    osu_session_cache.handle_invalidation(
+        f"{osu_session['osu_session_id']}:{time.time()}".encode()
+    )
+    osu_session_cache.put(osu_session["osu_session_id"], token, osu_session)
+
+    # assert
+    assert osu_session_cache.get(osu_session["osu_session_id"]) is None
+
+
+def test_put_should_evict_least_recently_used_sessions():
+    # arrange
+    sample_osu_sessions = [_fake_osu_session() for _ in range(3)]
+    _cache(sample_osu_sessions[0])
+    _cache(sample_osu_sessions[1])
+    osu_session_cache.get(sample_osu_sessions[0]["osu_session_id"])
+
+    # act
+    _cache(sample_osu_sessions[2])
+
+    # assert
+    assert list(osu_session_cache._entries) == [
+        sample_osu_sessions[0]["osu_session_id"],
+        sample_osu_sessions[2]["osu_session_id"],
+    ]
+    assert osu_session_cache._stats["evictions"] == 1
+
+
+def test_get_should_expire_sessions_after_max_age(
+    mocker: pytest_mock.MockerFixture,
+):
+    # arrange
+    osu_session = _fake_osu_session()
+    _cache(osu_session)
+    mocker.patch(
+        "time.monotonic",
+        return_value=time.monotonic() + osu_session_cache.MAX_AGE,
+    )
+
+    # act
+    result = osu_session_cache.get(osu_session["osu_session_id"])
+
+    # assert
+    assert result is None
+    assert osu_session_cache._stats["expirations"] == 1
+
+
+def test_handle_invalidation_should_record_lag():
+    # arrange
+    osu_session = _fake_osu_session()
+    _cache(osu_session)
+
+    # act
+    osu_session_cache.handle_invalidation(
+        f"{osu_session['osu_session_id']}:{time.time() - 0.25}".encode()
+    )
+
+    # assert
+    assert osu_session_cache.get(osu_session["osu_session_id"]) is None
+    assert osu_session_cache._stats["invalidations"] == 1
+    assert osu_session_cache._stats["invalidation_lag_ms"] >= 250
+
+
+def test_nothing_should_be_cached_while_not_listening(
+    mocker: pytest_mock.MockerFixture,
+):
+    # arrange
+    mocker.patch.object(osu_session_cache, "_listening", False)
+    osu_session = _fake_osu_session()
+
+    # act
+    _cache(osu_session)
+
+    # assert
+    assert not osu_session_cache._entries
+
+
+async def test_fetch_by_id_should_read_cached_sessions(
+    mocker: pytest_mock.MockerFixture,
+):
+    # arrange
+    osu_session = _fake_osu_session()
+    redis = mocker.patch("app.clients.redis", create=True)
+    redis.hgetall = mocker.AsyncMock(return_value=_raw_osu_session(osu_session))
+
+    # act
+    await osu_sessions.fetch_by_id(osu_session["osu_session_id"])
+    result = await osu_sessions.fetch_by_id(osu_session["osu_session_id"])
+
+    # assert
+    assert result == osu_session
+    redis.hgetall.assert_awaited_once()
+
+
+async def test_fetch_all_should_only_read_uncached_sessions(
+    mocker: pytest_mock.MockerFixture,
+):
+    # arrange
+    cached_osu_session, uncached_osu_session = sorted(
+        [_fake_osu_session() for _ in range(2)],
+        key=lambda osu_session: str(osu_session["osu_session_id"]),
+    )
+    _cache(cached_osu_session)
+
+    redis = mocker.patch("app.clients.redis", create=True)
+    redis.zrange = mocker.AsyncMock(
+        return_value=[
+            str(cached_osu_session["osu_session_id"]).encode(),
+            str(uncached_osu_session["osu_session_id"]).encode(),
+        ]
+    )
+    pipe = mocker.MagicMock()
+    pipe.execute = mocker.AsyncMock(
+        return_value=[_raw_osu_session(uncached_osu_session)]
+    )
+    redis.pipeline.return_value.__aenter__.return_value = pipe
+
+    # act
+    result = await osu_sessions.fetch_all()
+
+    # assert
+    assert result == [cached_osu_session, uncached_osu_session]
+    pipe.hgetall.assert_called_once_with(
+        osu_sessions.make_key(uncached_osu_session["osu_session_id"])
+    )
+
+
+async def test_partial_update_should_invalidate_session(
+    mocker: pytest_mock.MockerFixture,
+):
+    # arrange
+    osu_session = _fake_osu_session()
+    _cache(osu_session)
+
+    updated_osu_session = osu_session.copy()
+    updated_osu_session["action"] = osu_sessions.Action.AFK
+
+    redis = mocker.patch("app.clients.redis", create=True)
+    redis.evalsha = mocker.AsyncMock(
+        return_value=[
+            item
+            for field_value in _raw_osu_session(updated_osu_session).items()
+            for item in field_value
+        ]
+    )
+    redis.publish = mocker.AsyncMock()
+    mocker.patch("app.repositories.presence_packets.bump_version")
+
+    # act
+    await osu_sessions.partial_update(
+        osu_session["osu_session_id"],
+        action=osu_sessions.Action.AFK,
+    )
+
+    # assert
+    assert osu_session_cache.get(osu_session["osu_session_id"]) is None
+    channel, raw_invalidation = redis.publish.call_args.args
+    assert channel == osu_session_cache.INVALIDATION_CHANNEL
+    assert raw_invalidation.startswith(f"{osu_session['osu_session_id']}:")
+
+
+async def test_fetch_stats_should_compute_hit_rate(
+    mocker: pytest_mock.MockerFixture,
+):
+    # arrange
+    redis = mocker.patch("app.clients.redis", create=True)
+    redis.hgetall = mocker.AsyncMock(return_value={b"hits": b"3", b"misses": b"1"})
+
+    # act
+    stats = await osu_session_cache.fetch_stats()
+
+    # assert
+    assert stats["hit_rate"] == 0.75
+    assert stats["evictions"] == 0
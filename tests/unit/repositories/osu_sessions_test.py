@@ -0,0 +1,438 @@
+from uuid import uuid4
+
+import pytest_mock
+
+from app.repositories import osu_sessions
+from testing import sample_data
+
+
+def _raw_osu_session(osu_session: osu_sessions.OsuSession) -> dict[bytes, bytes]:
+    return {
+        field.encode(): value
+        for field, value in osu_sessions.serialize(osu_session).items()
+    }
+
+
+def test_serialize_should_round_trip():
+    # arrange
+    osu_session = sample_data.fake_osu_session()
+    osu_session["away_message"] = None
+    osu_session["latitude"] = 51.50735091
+
+    # act
+    raw_osu_session = _raw_osu_session(osu_session)
+
+    # assert
+    assert b"away_message" not in raw_osu_session
+    assert osu_sessions.deserialize(raw_osu_session) == osu_session
+
+
+async def test_partial_update_should_only_write_changed_fields(
+    mocker: pytest_mock.MockerFixture,
+):
+    # arrange
+    osu_session = sample_data.fake_osu_session()
+    osu_session["away_message"] = "brb"
+
+    updated_osu_session = osu_session.copy()
+    updated_osu_session["away_message"] = None
+    updated_osu_session["pm_private"] = True
+    raw_updated_osu_session = _raw_osu_session(updated_osu_session)
+
+    redis = mocker.patch("app.clients.redis", create=True)
+    redis.evalsha = mocker.AsyncMock(
+        return_value=[
+            item
+            for field_value in raw_updated_osu_session.items()
+            for item in field_value
+        ]
+    )
+
+    # act
+    result = await osu_sessions.partial_update(
+        osu_session["osu_session_id"],
+        away_message=None,
+        pm_private=True,
+    )
+
+    # assert
+    assert result == updated_osu_session
+    redis.evalsha.assert_awaited_once()
+    (
+        _,
+        _,
+        key,
+        privilege_counts_key,
+        index_entries_key,
+        registry_key,
+        osu_session_id,
+        _,
+        _,
+        expires_at_set,
+        ttl,
+        set_count,
+        *field_args,
+    ) = redis.evalsha.call_args.args
+    assert key == osu_sessions.make_key(osu_session["osu_session_id"])
+    assert privilege_counts_key == osu_sessions.PRIVILEGE_COUNTS_KEY
+    assert index_entries_key == osu_sessions.INDEX_ENTRIES_KEY
+    assert registry_key == osu_sessions.REGISTRY_KEY
+    assert osu_session_id == str(osu_session["osu_session_id"])
+    # (the session's expiry is pushed back, rather than set)
+    assert expires_at_set == ""
+    assert ttl == osu_sessions.OSU_SESSION_TTL
+    assert set_count == 2
+    assert field_args[:2] == ["pm_private", b"1"]
+    assert field_args[2] == "updated_at"
+    assert field_args[4:] == ["away_message"]
+
+
+async def test_partial_update_should_return_none_without_session(
+    mocker: pytest_mock.MockerFixture,
+):
+    # arrange
+    redis = mocker.patch("app.clients.redis", create=True)
+    redis.evalsha = mocker.AsyncMock(return_value=None)
+    bump_version = mocker.patch("app.repositories.presence_packets.bump_version")
+
+    # act
+    result = await osu_sessions.partial_update(
+        sample_data.fake_osu_session()["osu_session_id"],
+        action=osu_sessions.Action.PLAYING,
+    )
+
+    # assert
+    assert result is None
+    bump_version.assert_not_called()
+
+
+async def test_fetch_fields_should_only_decode_requested_fields(
+    mocker: pytest_mock.MockerFixture,
+):
+    # arrange
+    osu_session = sample_data.fake_osu_session()
+
+    redis = mocker.patch("app.clients.redis", create=True)
+    redis.hmget = mocker.AsyncMock(
+        return_value=[
+            str(osu_session["privileges"]).encode(),
+            None,
+            str(osu_session["osu_session_id"]).encode(),
+        ]
+    )
+
+    # act
+    fields = await osu_sessions.fetch_fields(
+        osu_session["osu_session_id"],
+        ["privileges", "multiplayer_match_id"],
+    )
+
+    # assert
+    assert fields == {
+        "privileges": osu_session["privileges"],
+        "multiplayer_match_id": None,
+    }
+
+
+async def test_fetch_all_by_account_id_should_prune_expired_sessions(
+    mocker: pytest_mock.MockerFixture,
+):
+    # arrange
+    live_osu_session = sample_data.fake_osu_session()
+    expired_osu_session_id = sample_data.fake_osu_session()["osu_session_id"]
+    index_key = osu_sessions.make_account_index_key(live_osu_session["account_id"])
+
+    redis = mocker.patch("app.clients.redis", create=True)
+    redis.smembers = mocker.AsyncMock(
+        return_value={
+            str(live_osu_session["osu_session_id"]).encode(),
+            str(expired_osu_session_id).encode(),
+        }
+    )
+    redis.srem = mocker.AsyncMock()
+    pipe = mocker.MagicMock()
+    redis.pipeline.return_value.__aenter__.return_value = pipe
+
+    async def execute():
+        keys = [call.args[0] for call in pipe.hgetall.call_args_list]
+        return [
+            _raw_osu_session(live_osu_session)
+            if key == osu_sessions.make_key(live_osu_session["osu_session_id"])
+            else {}
+            for key in keys
+        ]
+
+    pipe.execute = execute
+
+    # act
+    result = await osu_sessions.fetch_all_by_account_id(live_osu_session["account_id"])
+
+    # assert
+    assert result == [live_osu_session]
+    redis.smembers.assert_awaited_once_with(index_key)
+    redis.srem.assert_awaited_once_with(index_key, str(expired_osu_session_id).encode())
+
+
+async def test_fetch_primary_by_account_id_should_follow_primary_session_id(
+    mocker: pytest_mock.MockerFixture,
+):
+    # arrange
+    osu_session = sample_data.fake_osu_session()
+
+    redis = mocker.patch("app.clients.redis", create=True)
+    redis.get = mocker.AsyncMock(
+        return_value=str(osu_session["osu_session_id"]).encode()
+    )
+    redis.hgetall = mocker.AsyncMock(return_value=_raw_osu_session(osu_session))
+
+    # act
+    result = await osu_sessions.fetch_primary_by_account_id(osu_session["account_id"])
+
+    # assert
+    assert result == osu_session
+    redis.get.assert_awaited_once_with(
+        osu_sessions.make_primary_key(osu_session["account_id"])
+    )
+    redis.hgetall.assert_awaited_once_with(
+        osu_sessions.make_key(osu_session["osu_session_id"])
+    )
+
+
+async def test_fetch_primary_by_account_id_should_follow_promoted_primary_session(
+    mocker: pytest_mock.MockerFixture,
+):
+    # arrange
+    expired_osu_session_id = uuid4()
+    osu_session = sample_data.fake_osu_session()
+
+    redis = mocker.patch("app.clients.redis", create=True)
+    redis.get = mocker.AsyncMock(return_value=str(expired_osu_session_id).encode())
+    redis.hgetall = mocker.AsyncMock(side_effect=[{}, _raw_osu_session(osu_session)])
+    pipe = mocker.MagicMock()
+    pipe.execute = mocker.AsyncMock(
+        return_value=[None, str(osu_session["osu_session_id"]).encode()]
+    )
+    redis.pipeline.return_value.__aenter__.return_value = pipe
+
+    # act
+    result = await osu_sessions.fetch_primary_by_account_id(osu_session["account_id"])
+
+    # assert
+    assert result == osu_session
+    script_args = pipe.evalsha.call_args.args
+    assert script_args[2:] == (
+        osu_sessions.make_primary_key(osu_session["account_id"]),
+        osu_sessions.make_account_index_key(osu_session["account_id"]),
+        str(expired_osu_session_id),
+        osu_sessions.make_key("*"),
+    )
+
+
+async def test_delete_by_id_should_remove_session_from_indexes(
+    mocker: pytest_mock.MockerFixture,
+):
+    # arrange
+    osu_session = sample_data.fake_osu_session()
+
+    redis = mocker.patch("app.clients.redis", create=True)
+    pipe = mocker.MagicMock()
+    pipe.execute = mocker.AsyncMock(
+        side_effect=[[_raw_osu_session(osu_session), 1, 1], [1, 1, 0, None]]
+    )
+    redis.pipeline.return_value.__aenter__.return_value = pipe
+
+    # act
+    result = await osu_sessions.delete_by_id(osu_session["osu_session_id"])
+
+    # assert
+    assert result == osu_session
+    pipe.hincrby.assert_called_once_with(
+        osu_sessions.PRIVILEGE_COUNTS_KEY,
+        str(osu_session["privileges"]),
+        -1,
+    )
+    _, key_count, *keys, osu_session_id, _ = pipe.evalsha.call_args.args
+    assert key_count == 3
+    assert keys == [
+        osu_sessions.make_primary_key(osu_session["account_id"]),
+        osu_sessions.make_account_index_key(osu_session["account_id"]),
+        osu_sessions.make_username_index_key(osu_session["username"]),
+    ]
+    assert osu_session_id == str(osu_session["osu_session_id"])
+
+
+async def test_fetch_all_should_prune_expired_sessions_from_registry(
+    mocker: pytest_mock.MockerFixture,
+):
+    # arrange
+    live_osu_session = sample_data.fake_osu_session()
+    expired_osu_session = sample_data.fake_osu_session()
+    raw_expired_osu_session_id = str(expired_osu_session["osu_session_id"]).encode()
+
+    redis = mocker.patch("app.clients.redis", create=True)
+    redis.zrange = mocker.AsyncMock(
+        return_value=[
+            str(live_osu_session["osu_session_id"]).encode(),
+            raw_expired_osu_session_id,
+        ]
+    )
+    raw_index_entry = (
+        f"{expired_osu_session['account_id']}:{expired_osu_session['privileges']}:"
+        f"{expired_osu_session['username']}".encode()
+    )
+    pipe = mocker.MagicMock()
+    pipe.execute = mocker.AsyncMock(
+        side_effect=[
+            [_raw_osu_session(live_osu_session), {}],
+            [[raw_index_entry], 1, 1, 1],
+            [0, None],
+        ]
+    )
+    redis.pipeline.return_value.__aenter__.return_value = pipe
+
+    # act
+    result = await osu_sessions.fetch_all()
+
+    # assert
+    assert result == [live_osu_session]
+    redis.zrange.assert_awaited_once_with(osu_sessions.REGISTRY_KEY, 0, -1)
+    pipe.zrem.assert_any_call(osu_sessions.REGISTRY_KEY, raw_expired_osu_session_id)
+    pipe.hincrby.assert_called_once_with(
+        osu_sessions.PRIVILEGE_COUNTS_KEY,
+        str(expired_osu_session["privileges"]),
+        -1,
+    )
+    _, _, *keys, _, _ = pipe.evalsha.call_args.args
+    assert keys == [
+        osu_sessions.make_primary_key(expired_osu_session["account_id"]),
+        osu_sessions.make_account_index_key(expired_osu_session["account_id"]),
+        osu_sessions.make_username_index_key(expired_osu_session["username"]),
+    ]
+
+
+async def test_fetch_all_should_filter_by_privileges(
+    mocker: pytest_mock.MockerFixture,
+):
+    # arrange
+    osu_session = sample_data.fake_osu_session()
+    osu_session["privileges"] = 1
+
+    redis = mocker.patch("app.clients.redis", create=True)
+    redis.zrange = mocker.AsyncMock(
+        return_value=[str(osu_session["osu_session_id"]).encode()]
+    )
+    pipe = mocker.MagicMock()
+    pipe.execute = mocker.AsyncMock(return_value=[_raw_osu_session(osu_session)])
+    redis.pipeline.return_value.__aenter__.return_value = pipe
+
+    # act
+    result = await osu_sessions.fetch_all(has_any_privilege_bit=2)
+
+    # assert
+    assert result == []
+
+
+async def test_fetch_many_should_read_pages_after_the_given_id(
+    mocker: pytest_mock.MockerFixture,
+):
+    # arrange
+    sample_osu_sessions = sorted(
+        (sample_data.fake_osu_session() for _ in range(3)),
+        key=lambda osu_session: str(osu_session["osu_session_id"]),
+    )
+    for osu_session, privileges in zip(sample_osu_sessions, [1, 2, 3]):
+        osu_session["privileges"] = privileges
+    after_osu_session_id = sample_data.fake_osu_session()["osu_session_id"]
+
+    redis = mocker.patch("app.clients.redis", create=True)
+    redis.zrangebylex = mocker.AsyncMock(
+        side_effect=[
+            [
+                str(osu_session["osu_session_id"]).encode()
+                for osu_session in sample_osu_sessions[:2]
+            ],
+            [str(sample_osu_sessions[2]["osu_session_id"]).encode()],
+        ]
+    )
+    pipe = mocker.MagicMock()
+    pipe.execute = mocker.AsyncMock(
+        side_effect=[
+            [_raw_osu_session(osu_session) for osu_session in sample_osu_sessions[:2]],
+            [_raw_osu_session(sample_osu_sessions[2])],
+        ]
+    )
+    redis.pipeline.return_value.__aenter__.return_value = pipe
+
+    # act
+    result = await osu_sessions.fetch_many(
+        has_any_privilege_bit=1,
+        after_osu_session_id=after_osu_session_id,
+        page_size=2,
+    )
+
+    # assert
+    assert result == [sample_osu_sessions[0], sample_osu_sessions[2]]
+    assert [call.args[1] for call in redis.zrangebylex.await_args_list] == [
+        f"({after_osu_session_id}",
+        f"({sample_osu_sessions[1]['osu_session_id']}",
+    ]
+
+
+async def test_fetch_total_count_should_sum_matching_privilege_counts(
+    mocker: pytest_mock.MockerFixture,
+):
+    # arrange
+    redis = mocker.patch("app.clients.redis", create=True)
+    raw_counts = {b"1": b"3", b"3": b"2", b"4": b"5"}
+    pipe = mocker.MagicMock()
+    pipe.execute = mocker.AsyncMock(return_value=[[], raw_counts])
+    redis.pipeline.return_value.__aenter__.return_value = pipe
+
+    # act
+    total_count = await osu_sessions.fetch_total_count()
+    filtered_count = await osu_sessions.fetch_total_count(has_any_privilege_bit=2)
+
+    # assert
+    assert total_count == 10
+    assert filtered_count == 2
+
+
+async def test_fetch_total_count_should_prune_lapsed_sessions_first(
+    mocker: pytest_mock.MockerFixture,
+):
+    # arrange
+    expired_osu_session = sample_data.fake_osu_session()
+    live_osu_session = sample_data.fake_osu_session()
+    raw_expired_osu_session_id = str(expired_osu_session["osu_session_id"]).encode()
+    raw_live_osu_session_id = str(live_osu_session["osu_session_id"]).encode()
+    raw_index_entry = (
+        f"{expired_osu_session['account_id']}:{expired_osu_session['privileges']}:"
+        f"{expired_osu_session['username']}".encode()
+    )
+    privileges = str(expired_osu_session["privileges"]).encode()
+
+    redis = mocker.patch("app.clients.redis", create=True)
+    pipe = mocker.MagicMock()
+    pipe.execute = mocker.AsyncMock(
+        side_effect=[
+            [
+                [raw_expired_osu_session_id, raw_live_osu_session_id],
+                {privileges: b"2"},
+            ],
+            [0, 1],
+            [[raw_index_entry], 1, 1, 1],
+            [1, None],
+        ]
+    )
+    redis.pipeline.return_value.__aenter__.return_value = pipe
+    redis.hgetall = mocker.AsyncMock(return_value={privileges: b"1"})
+
+    # act
+    total_count = await osu_sessions.fetch_total_count()
+
+    # assert
+    assert total_count == 1
+    pipe.zrem.assert_any_call(osu_sessions.REGISTRY_KEY, raw_expired_osu_session_id)
+    pipe.hincrby.assert_called_once_with(
+        osu_sessions.PRIVILEGE_COUNTS_KEY, str(expired_osu_session["privileges"]), -1
+    )
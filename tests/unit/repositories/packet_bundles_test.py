@@ -0,0 +1,416 @@
+import time
+from datetime import datetime
+from uuid import uuid4
+
+import pytest
+import pytest_mock
+
+from app import packets
+from app.repositories import local_packet_bundles
+from app.repositories import packet_bundles
+from app.repositories.packet_bundles import PacketBundle
+from testing import sample_packets
+
+
+def test_serialize_should_round_trip():
+    # arrange
+    bundle: PacketBundle = {
+        "data": sample_packets.write_server_packet("send_message"),
+        "created_at": datetime(2023, 5, 1, 12, 30, 15, 250_000),
+    }
+
+    # act
+    raw_bundle = packet_bundles.serialize(bundle)
+
+    # assert
+    assert packet_bundles.deserialize(raw_bundle) == bundle
+
+
+def test_deserialize_should_reject_unknown_formats():
+    # arrange
+    raw_bundle = packet_bundles.serialize(
+        {
+            "data": sample_packets.write_server_packet("send_message"),
+            "created_at": datetime.now(),
+        }
+    )
+    raw_bundle = bytes([packet_bundles.BUNDLE_FORMAT_VERSION + 1]) + raw_bundle[1:]
+
+    # act & assert
+    with pytest.raises(ValueError):
+        packet_bundles.deserialize(raw_bundle)
+
+
+def test_serialize_should_store_raw_packet_data():
+    # arrange
+    data = sample_packets.write_server_packet("spectate_frames")
+    bundle: PacketBundle = {"data": data, "created_at": datetime.now()}
+
+    # act
+    raw_bundle = packet_bundles.serialize(bundle)
+
+    # assert
+    assert raw_bundle.endswith(data)
+    assert len(raw_bundle) - len(data) < 16
+
+
+async def test_dequeue_all_data_should_concatenate_pending_bundles(
+    mocker: pytest_mock.MockerFixture,
+):
+    # arrange
+    osu_session_id = uuid4()
+    first_data = sample_packets.write_server_packet("send_message")
+    second_data = sample_packets.write_server_packet("user_logout")
+    raw_bundles = [
+        packet_bundles.serialize({"data": data, "created_at": datetime.now()})
+        for data in (first_data, second_data)
+    ]
+
+    pipe = mocker.MagicMock()
+    pipe.execute = mocker.AsyncMock(return_value=[raw_bundles, 1])
+    redis = mocker.patch("app.clients.redis", create=True)
+    redis.pipeline.return_value.__aenter__.return_value = pipe
+
+    # act
+    data = await packet_bundles.dequeue_all_data(osu_session_id)
+
+    # assert
+    assert data == first_data + second_data
+    redis.pipeline.assert_called_once_with(transaction=True)
+    pipe.delete.assert_called_once_with(
+        packet_bundles.make_key(osu_session_id),
+        packet_bundles.make_supersede_keys_key(osu_session_id),
+        packet_bundles.make_byte_size_key(osu_session_id),
+    )
+
+
+async def test_enqueue_each_should_push_every_bundle_in_one_pipeline(
+    mocker: pytest_mock.MockerFixture,
+):
+    # arrange
+    data_by_osu_session_id = {
+        uuid4(): sample_packets.write_server_packet("send_message"),
+        uuid4(): sample_packets.write_server_packet("user_logout"),
+    }
+
+    pipe = mocker.MagicMock()
+    pipe.execute = mocker.AsyncMock(return_value=[[1, 50], [2, 21]])
+    redis = mocker.patch("app.clients.redis", create=True)
+    redis.pipeline.return_value.__aenter__.return_value = pipe
+
+    # act
+    await packet_bundles.enqueue_each(data_by_osu_session_id)
+
+    # assert
+    redis.pipeline.assert_called_once_with(transaction=False)
+    for (osu_session_id, data), call in zip(
+        data_by_osu_session_id.items(),
+        pipe.evalsha.call_args_list,
+    ):
+        _, num_keys, key, _, _, raw_bundle, supersede_key, _ = call.args
+        assert num_keys == 3
+        assert key == packet_bundles.make_key(osu_session_id)
+        assert packet_bundles.deserialize(raw_bundle)["data"] == data
+        assert supersede_key == ""
+
+
+async def test_enqueue_many_should_pass_supersede_key(
+    mocker: pytest_mock.MockerFixture,
+):
+    # arrange
+    osu_session_ids = [uuid4(), uuid4()]
+    data = sample_packets.write_server_packet("update_match")
+    supersede_key = packet_bundles.make_supersede_key(26, 7)
+
+    pipe = mocker.MagicMock()
+    pipe.execute = mocker.AsyncMock(return_value=[[1, 238], [1, 238]])
+    redis = mocker.patch("app.clients.redis", create=True)
+    redis.pipeline.return_value.__aenter__.return_value = pipe
+
+    # act
+    await packet_bundles.enqueue_many(
+        osu_session_ids,
+        data,
+        supersede_key=supersede_key,
+    )
+
+    # assert
+    assert pipe.evalsha.call_count == 2
+    for osu_session_id, call in zip(osu_session_ids, pipe.evalsha.call_args_list):
+        _, _, key, supersede_keys_key, byte_size_key, _, key_arg, _ = call.args
+        assert key == packet_bundles.make_key(osu_session_id)
+        assert supersede_keys_key == packet_bundles.make_supersede_keys_key(
+            osu_session_id
+        )
+        assert byte_size_key == packet_bundles.make_byte_size_key(osu_session_id)
+        assert key_arg == supersede_key
+
+
+async def test_enqueue_many_should_shed_oversized_queues(
+    mocker: pytest_mock.MockerFixture,
+):
+    # arrange
+    osu_session_ids = [uuid4(), uuid4(), uuid4()]
+    data = sample_packets.write_server_packet("user_logout")
+
+    mocker.patch("app.settings.PACKET_BUNDLE_QUEUE_MAX_SIZE", 100)
+    mocker.patch("app.settings.PACKET_BUNDLE_QUEUE_MAX_BYTES", 10_000)
+
+    pipe = mocker.MagicMock()
+    pipe.execute = mocker.AsyncMock(
+        side_effect=[
+            # too many bundles, too many bytes, & within limits
+            [[101, 2_121], [20, 10_001], [100, 10_000]],
+            # the first was polled back within limits since,
+            # the second needs to be restarted
+            [[0, 0], [20, 1]],
+        ]
+    )
+    redis = mocker.patch("app.clients.redis", create=True)
+    redis.pipeline.return_value.__aenter__.return_value = pipe
+    warning = mocker.patch("app.logger.warning")
+
+    # act
+    await packet_bundles.enqueue_many(osu_session_ids, data)
+
+    # assert
+    assert pipe.evalsha.call_count == 3 + 2
+    shed_calls = pipe.evalsha.call_args_list[3:]
+    for osu_session_id, call in zip(osu_session_ids, shed_calls):
+        _, num_keys, key, *_ = call.args
+        assert num_keys == 4
+        assert key == packet_bundles.make_key(osu_session_id)
+
+    restart_bundle = shed_calls[0].args[8]
+    assert packet_bundles.deserialize(restart_bundle)["data"] == (
+        packets.write_restart_packet(millseconds_until_restart=0)
+    )
+
+    warning.assert_called_once()
+    assert warning.call_args.kwargs["osu_session_id"] == osu_session_ids[1]
+    assert warning.call_args.kwargs["forced_restart"] is True
+
+
+async def test_enqueue_many_should_deliver_locally_to_claimed_sessions(
+    mocker: pytest_mock.MockerFixture,
+):
+    # arrange
+    local_osu_session_id = uuid4()
+    remote_osu_session_id = uuid4()
+    data = sample_packets.write_server_packet("send_message")
+
+    mocker.patch("app.settings.PACKET_BUNDLE_LOCAL_DELIVERY", True)
+
+    redis = mocker.patch("app.clients.redis", create=True)
+    redis.set = mocker.AsyncMock(return_value=None)
+    pipe = mocker.MagicMock()
+    pipe.execute = mocker.AsyncMock(return_value=[[1, 50]])
+    redis.pipeline.return_value.__aenter__.return_value = pipe
+
+    await packet_bundles.claim(local_osu_session_id)
+
+    # act
+    await packet_bundles.enqueue_many(
+        [local_osu_session_id, remote_osu_session_id],
+        data,
+    )
+
+    # assert
+    assert pipe.evalsha.call_count == 1
+    assert pipe.evalsha.call_args.args[2] == packet_bundles.make_key(
+        remote_osu_session_id
+    )
+
+    pipe.execute = mocker.AsyncMock(return_value=[[], 0])
+    assert await packet_bundles.dequeue_all_data(local_osu_session_id) == data
+
+    packet_bundles.discard(local_osu_session_id)
+
+
+async def test_claim_should_ask_previous_worker_to_hand_off(
+    mocker: pytest_mock.MockerFixture,
+):
+    # arrange
+    osu_session_id = uuid4()
+
+    mocker.patch("app.settings.PACKET_BUNDLE_LOCAL_DELIVERY", True)
+
+    redis = mocker.patch("app.clients.redis", create=True)
+    redis.set = mocker.AsyncMock(return_value=b"another-worker")
+    redis.publish = mocker.AsyncMock()
+
+    # act
+    await packet_bundles.claim(osu_session_id)
+
+    # assert
+    redis.publish.assert_called_once_with(
+        local_packet_bundles.make_handoff_channel("another-worker"),
+        str(osu_session_id),
+    )
+
+    packet_bundles.discard(osu_session_id)
+
+
+async def test_release_should_hand_local_bundles_back_to_redis(
+    mocker: pytest_mock.MockerFixture,
+):
+    # arrange
+    osu_session_id = uuid4()
+    data = sample_packets.write_server_packet("send_message")
+
+    mocker.patch("app.settings.PACKET_BUNDLE_LOCAL_DELIVERY", True)
+
+    redis = mocker.patch("app.clients.redis", create=True)
+    redis.set = mocker.AsyncMock(return_value=None)
+    pipe = mocker.MagicMock()
+    pipe.execute = mocker.AsyncMock(return_value=[[1, 50]])
+    redis.pipeline.return_value.__aenter__.return_value = pipe
+
+    await packet_bundles.claim(osu_session_id)
+    await packet_bundles.enqueue(osu_session_id, data)
+    pipe.evalsha.assert_not_called()
+
+    # act
+    await packet_bundles.release(osu_session_id)
+
+    # assert
+    assert pipe.evalsha.call_count == 1
+    _, _, key, _, _, raw_bundle, _, _ = pipe.evalsha.call_args.args
+    assert key == packet_bundles.make_key(osu_session_id)
+    assert packet_bundles.deserialize(raw_bundle)["data"] == data
+    assert not local_packet_bundles.is_claimed(osu_session_id)
+
+
+def test_local_shed_should_only_drop_superseded_bundles():
+    # arrange
+    osu_session_id = uuid4()
+    local_packet_bundles._queues[osu_session_id] = [
+        (b"old stats", "11:1001"),
+        (b"message", None),
+        (b"latest stats", "11:1001"),
+        (b"newer message", None),
+    ]
+
+    # act
+    dropped_bundles, restarted = local_packet_bundles.shed(
+        osu_session_id,
+        max_size=3,
+        max_bytes=1_000,
+        restart_bundle=b"restart",
+    )
+
+    # assert
+    assert (dropped_bundles, restarted) == (1, False)
+    assert local_packet_bundles.pop_all(osu_session_id) == [
+        b"message",
+        b"latest stats",
+        b"newer message",
+    ]
+
+    local_packet_bundles.release(osu_session_id)
+
+
+def test_local_shed_should_restart_rather_than_drop_unkeyed_bundles():
+    # arrange
+    osu_session_id = uuid4()
+    local_packet_bundles._queues[osu_session_id] = [
+        (b"message", None),
+        (b"match start", None),
+        (b"spectate frames", None),
+    ]
+
+    # act
+    dropped_bundles, restarted = local_packet_bundles.shed(
+        osu_session_id,
+        max_size=2,
+        max_bytes=1_000,
+        restart_bundle=b"restart",
+    )
+
+    # assert
+    assert (dropped_bundles, restarted) == (3, True)
+    assert local_packet_bundles.pop_all(osu_session_id) == [b"restart"]
+
+    local_packet_bundles.release(osu_session_id)
+
+
+def test_local_shed_should_restart_if_latest_bundles_exceed_limits():
+    # arrange
+    osu_session_id = uuid4()
+    local_packet_bundles._queues[osu_session_id] = [
+        (b"latest stats", "11:1001"),
+        (b"message", None),
+        (b"latest match", "26:1"),
+    ]
+
+    # act
+    dropped_bundles, restarted = local_packet_bundles.shed(
+        osu_session_id,
+        max_size=1,
+        max_bytes=1_000,
+        restart_bundle=b"restart",
+    )
+
+    # assert
+    assert (dropped_bundles, restarted) == (3, True)
+    assert local_packet_bundles.pop_all(osu_session_id) == [b"restart"]
+
+    local_packet_bundles.release(osu_session_id)
+
+
+async def test_dequeue_one_should_pop_in_one_script(
+    mocker: pytest_mock.MockerFixture,
+):
+    # arrange
+    osu_session_id = uuid4()
+    bundle: PacketBundle = {
+        "data": sample_packets.write_server_packet("send_message"),
+        "created_at": datetime(2023, 5, 1, 12, 30, 15, 250_000),
+    }
+
+    redis = mocker.patch("app.clients.redis", create=True)
+    redis.evalsha = mocker.AsyncMock(return_value=packet_bundles.serialize(bundle))
+
+    # act
+    result = await packet_bundles.dequeue_one(osu_session_id)
+
+    # assert
+    assert result == bundle
+    _, num_keys, *keys = redis.evalsha.call_args.args
+    assert num_keys == 3
+    assert keys == [
+        packet_bundles.make_key(osu_session_id),
+        packet_bundles.make_supersede_keys_key(osu_session_id),
+        packet_bundles.make_byte_size_key(osu_session_id),
+    ]
+
+
+def test_prune_stale_should_forget_sessions_which_stopped_polling(
+    mocker: pytest_mock.MockerFixture,
+):
+    # arrange
+    stale_osu_session_id = uuid4()
+    polling_osu_session_id = uuid4()
+    now = time.monotonic()
+    mocker.patch.dict(
+        local_packet_bundles._claimed_at,
+        {
+            stale_osu_session_id: now - local_packet_bundles.OSU_SESSION_TTL,
+            polling_osu_session_id: now,
+        },
+    )
+    mocker.patch.dict(
+        local_packet_bundles._queues,
+        {
+            stale_osu_session_id: [(b"undeliverable", None)],
+            polling_osu_session_id: [],
+        },
+    )
+
+    # act
+    pruned_sessions = local_packet_bundles.prune_stale()
+
+    # assert
+    assert pruned_sessions == 1
+    assert list(local_packet_bundles._claimed_at) == [polling_osu_session_id]
+    assert list(local_packet_bundles._queues) == [polling_osu_session_id]
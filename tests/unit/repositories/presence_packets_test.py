@@ -0,0 +1,24 @@
+import pytest_mock
+
+from app.repositories import presence_packets
+
+
+async def test_bump_version_should_expire_version(
+    mocker: pytest_mock.MockerFixture,
+):
+    # arrange
+    redis = mocker.patch("app.clients.redis", create=True)
+    pipe = mocker.MagicMock()
+    pipe.execute = mocker.AsyncMock(return_value=[2, True])
+    redis.pipeline.return_value.__aenter__.return_value = pipe
+
+    # act
+    await presence_packets.bump_version(1000)
+
+    # assert
+    version_key = presence_packets.make_version_key(1000)
+    pipe.incr.assert_called_once_with(version_key)
+    pipe.expire.assert_called_once_with(
+        version_key,
+        presence_packets.PRESENCE_VERSION_TTL,
+    )
@@ -0,0 +1,45 @@
+import pytest_mock
+
+from app.errors import ServiceError
+from app.services import osu_sessions
+from testing import sample_data
+
+
+async def test_fetch_many_should_continue_from_next_cursor(
+    mocker: pytest_mock.MockerFixture,
+):
+    # arrange
+    sample_osu_sessions = [sample_data.fake_osu_session() for _ in range(2)]
+    fetch_many = mocker.patch(
+        "app.repositories.osu_sessions.fetch_many",
+        side_effect=[sample_osu_sessions, []],
+    )
+
+    # act
+    first_page = await osu_sessions.fetch_many(page_size=2)
+    assert not isinstance(first_page, ServiceError)
+    _, next_cursor = first_page
+    assert next_cursor is not None
+
+    second_page = await osu_sessions.fetch_many(cursor=next_cursor, page_size=2)
+
+    # assert
+    assert second_page == ([], None)
+    assert (
+        fetch_many.call_args.kwargs["after_osu_session_id"]
+        == sample_osu_sessions[-1]["osu_session_id"]
+    )
+
+
+async def test_fetch_many_should_reject_invalid_cursor(
+    mocker: pytest_mock.MockerFixture,
+):
+    # arrange
+    fetch_many = mocker.patch("app.repositories.osu_sessions.fetch_many")
+
+    # act
+    result = await osu_sessions.fetch_many(cursor="not a cursor")
+
+    # assert
+    assert result is ServiceError.OSU_SESSIONS_CURSOR_INVALID
+    fetch_many.assert_not_called()
@@ -0,0 +1,177 @@
+from typing import Any
+from uuid import uuid4
+
+import pytest_mock
+
+from app import unit_of_work
+from app.repositories import channel_members
+from app.repositories import osu_sessions
+from testing import sample_data
+
+
+class _RecordingPipeline:
+    """Records queued commands, & returns a result for each one."""
+
+    def __init__(self, results: list[Any]) -> None:
+        self.commands: list[tuple[str, tuple[Any, ...]]] = []
+        self.results = results
+
+    def __len__(self) -> int:
+        return len(self.commands)
+
+    def __getattr__(self, command_name: str):
+        def queue_command(*args: Any, **kwargs: Any) -> None:
+            self.commands.append((command_name, args))
+
+        return queue_command
+
+    async def execute(self) -> list[Any]:
+        return self.results[: len(self.commands)]
+
+
+def _mock_redis_pipeline(mocker: pytest_mock.MockerFixture, results: list[Any]):
+    redis = mocker.patch("app.clients.redis", create=True)
+    pipe = _RecordingPipeline(results)
+    redis.pipeline.return_value.__aenter__.return_value = pipe
+    return redis, pipe
+
+
+async def test_writes_should_be_flushed_together_in_order(
+    mocker: pytest_mock.MockerFixture,
+):
+    # arrange
+    redis, pipe = _mock_redis_pipeline(mocker, results=[1, 2, 3])
+    first_results = mocker.AsyncMock()
+    second_results = mocker.AsyncMock()
+
+    # act
+    async with unit_of_work.begin():
+        await unit_of_work.write(
+            ["a"],
+            lambda pipe: pipe.set("a", 1),
+            on_results=first_results,
+        )
+        await unit_of_work.write(
+            ["b"],
+            lambda pipe: (pipe.sadd("b", 2), pipe.expire("b", 60)),
+            on_results=second_results,
+        )
+
+        assert pipe.commands == []
+
+    # assert
+    redis.pipeline.assert_called_once_with(transaction=True)
+    assert pipe.commands == [
+        ("set", ("a", 1)),
+        ("sadd", ("b", 2)),
+        ("expire", ("b", 60)),
+    ]
+    first_results.assert_awaited_once_with([1])
+    second_results.assert_awaited_once_with([2, 3])
+
+
+async def test_writes_should_run_immediately_outside_a_unit_of_work(
+    mocker: pytest_mock.MockerFixture,
+):
+    # arrange
+    redis, pipe = _mock_redis_pipeline(mocker, results=[1])
+
+    # act
+    await unit_of_work.write(["a"], lambda pipe: pipe.set("a", 1))
+
+    # assert
+    redis.pipeline.assert_called_once_with(transaction=False)
+    assert pipe.commands == [("set", ("a", 1))]
+
+
+async def test_flush_pending_should_only_flush_for_keys_with_pending_writes(
+    mocker: pytest_mock.MockerFixture,
+):
+    # arrange
+    _, pipe = _mock_redis_pipeline(mocker, results=[1, 1])
+
+    async with unit_of_work.begin():
+        await unit_of_work.write(["a"], lambda pipe: pipe.set("a", 1))
+        await unit_of_work.write(["b"], lambda pipe: pipe.set("b", 1))
+
+        # act
+        await unit_of_work.flush_pending(["c"])
+        commands_after_unrelated_read = list(pipe.commands)
+
+        await unit_of_work.flush_pending(["b"])
+        commands_after_related_read = list(pipe.commands)
+
+    # assert
+    assert commands_after_unrelated_read == []
+    assert commands_after_related_read == [("set", ("a", 1)), ("set", ("b", 1))]
+
+
+async def test_channel_members_should_include_pending_additions(
+    mocker: pytest_mock.MockerFixture,
+):
+    # arrange
+    existing_osu_session_id = uuid4()
+    new_osu_session_id = uuid4()
+
+    redis, pipe = _mock_redis_pipeline(mocker, results=[1])
+    redis.smembers = mocker.AsyncMock(
+        return_value={str(existing_osu_session_id).encode()}
+    )
+
+    async with unit_of_work.begin():
+        await channel_members.add(1, new_osu_session_id)
+
+        # act
+        members = await channel_members.members(1)
+
+        # assert
+        assert pipe.commands == []
+        assert members == {existing_osu_session_id, new_osu_session_id}
+
+    assert pipe.commands == [
+        ("sadd", (channel_members.make_key(1), str(new_osu_session_id)))
+    ]
+
+
+async def test_osu_session_updates_should_be_read_back_before_flushing(
+    mocker: pytest_mock.MockerFixture,
+):
+    # arrange
+    osu_session = sample_data.fake_osu_session()
+    osu_session_key = osu_sessions.make_key(osu_session["osu_session_id"])
+
+    redis, pipe = _mock_redis_pipeline(mocker, results=[True, True])
+    redis.hgetall = mocker.AsyncMock(
+        return_value={
+            field.encode(): value
+            for field, value in osu_sessions.serialize(osu_session).items()
+        }
+    )
+
+    async with unit_of_work.begin():
+        # act
+        await osu_sessions.partial_update(
+            osu_session["osu_session_id"],
+            away_message="brb",
+        )
+        await osu_sessions.partial_update(
+            osu_session["osu_session_id"],
+            receive_match_updates=True,
+        )
+        fetched_osu_session = await osu_sessions.fetch_by_id(
+            osu_session["osu_session_id"]
+        )
+
+        # assert
+        redis.hgetall.assert_awaited_once_with(osu_session_key)
+        assert fetched_osu_session is not None
+        assert fetched_osu_session["away_message"] == "brb"
+        assert fetched_osu_session["receive_match_updates"] is True
+
+    # (only the changed fields are written)
+    assert [command for command, _ in pipe.commands] == ["evalsha", "evalsha"]
+    first_update_args = pipe.commands[0][1]
+    second_update_args = pipe.commands[1][1]
+    assert first_update_args[2] == osu_session_key
+    assert first_update_args[11:15] == (2, "away_message", b"brb", "updated_at")
+    assert second_update_args[11:14] == (2, "receive_match_updates", b"1")
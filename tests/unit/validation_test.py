@@ -74,3 +74,24 @@ def test_validate_password(password, expected):
 )
 def test_validate_email(email, expected):
     assert validation.validate_email(email) == expected
+
+
+def _replay_frame(x: float, y: float, time: int) -> dict:
+    return {"button_state": 0, "taiko_byte": 0, "x": x, "y": y, "time": time}
+
+
+@pytest.mark.parametrize(
+    "replay_frames, expected",
+    [
+        ([], True),
+        ([_replay_frame(256.0, 192.0, 1000)], True),
+        ([_replay_frame(256.0, -500.0, 0), _replay_frame(0.0, 0.0, 16)], True),
+        ([_replay_frame(-50.0, 600.0, 16), _replay_frame(0.0, 0.0, 16)], True),
+        ([_replay_frame(0.0, 0.0, 32), _replay_frame(0.0, 0.0, 16)], False),
+        ([_replay_frame(float("nan"), 0.0, 0)], False),
+        ([_replay_frame(0.0, float("inf"), 0)], False),
+        ([_replay_frame(100_000.0, 0.0, 0)], False),
+    ],
+)
+def test_validate_replay_frames(replay_frames, expected):
+    assert validation.validate_replay_frames(replay_frames) == expected